@@ -488,7 +488,8 @@ def calculate_position_size(capital: float, risk_pct: float, stop_loss_pct: floa
 
 
 def calculate_margin_required(symbol: str, lots: int, premium: float, 
-                             is_selling: bool = True) -> float:
+                             is_selling: bool = True, spot: float = None,
+                             strike: float = None, option_type: str = "CE") -> float:
     """
     Calculate approximate margin required for a position
     
@@ -497,6 +498,10 @@ def calculate_margin_required(symbol: str, lots: int, premium: float,
         lots: Number of lots
         premium: Option premium
         is_selling: True if selling options
+        spot: Underlying price - enables the SPAN-like model in
+            services/execution_costs (otherwise the per-lot table is used)
+        strike: Option strike (defaults to ATM)
+        option_type: "CE" or "PE"
         
     Returns:
         Approximate margin required
@@ -504,6 +509,14 @@ def calculate_margin_required(symbol: str, lots: int, premium: float,
     lot_size = get_lot_size(symbol)
     symbol_upper = symbol.upper()
     
+    if spot:
+        from services.execution_costs import span_margin
+        return float(span_margin(
+            "SELL" if is_selling else "BUY", spot, lots * lot_size,
+            strike=strike if strike else spot, option_type=option_type,
+            premium=premium, is_index=symbol_upper in INDEX_LOT_SIZES,
+        ))
+    
     if is_selling:
         # Option selling requires SPAN margin
         if symbol_upper in ["NIFTY", "NIFTY50"]:
@@ -0,0 +1,207 @@
+# backend/routes/backtest_job_routes.py
+"""
+Backtest Job Routes
+Submit long-running backtests as jobs and stream their progress.
+
+Routes:
+- POST   /api/backtest/jobs                 - Submit a job (returns job_id)
+- GET    /api/backtest/jobs                 - List recent jobs
+- GET    /api/backtest/jobs/stats           - Pool / cache stats
+- GET    /api/backtest/jobs/{job_id}        - Job status (+ result when done)
+- DELETE /api/backtest/jobs/{job_id}        - Cancel a job (its submitters only)
+- GET    /api/backtest/jobs/{job_id}/events - Server-Sent Events stream
+- WS     /api/backtest/jobs/{job_id}/ws     - WebSocket event stream
+
+All routes need a signed-in user. The WebSocket route lives on ws_router:
+get_current_user reads a Request, so the socket authenticates itself with
+the same session cookie / headers (or ?token=).
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Dict, Any
+from datetime import datetime
+import asyncio
+import json
+import logging
+import os
+import sys
+
+# Add backend to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from middleware.auth import AuthUser, get_current_user
+from services.backtest_jobs import get_backtest_job_manager, BACKTEST_RUNNERS
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/backtest/jobs", tags=["Backtest Jobs"], dependencies=[Depends(get_current_user)])
+ws_router = APIRouter(prefix="/backtest/jobs", tags=["Backtest Jobs"])
+
+
+# ============================================
+# REQUEST MODELS
+# ============================================
+
+class BacktestJobRequest(BaseModel):
+    """Backtest job submission"""
+    kind: str = Field(..., description="strategy, strategy_all, tools or vwap")
+    params: Dict[str, Any] = Field(default_factory=dict, description="Same fields as the synchronous endpoint")
+
+
+def _vwap_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Check the fields the candle loader needs, so a bad request is a 400 and not a failed job"""
+    for key in ("symbol", "from_date", "to_date"):
+        if not isinstance(params.get(key), str) or not params[key].strip():
+            raise HTTPException(status_code=400, detail=f"vwap backtest needs '{key}'")
+    for key in ("from_date", "to_date"):
+        try:
+            datetime.strptime(params[key], "%Y-%m-%d")
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"'{key}' must be YYYY-MM-DD")
+    return {**params, "symbol": params["symbol"].strip().upper()}
+
+
+# ============================================
+# ENDPOINTS
+# ============================================
+
+@router.post("")
+async def submit_backtest_job(request: BacktestJobRequest, user: AuthUser = Depends(get_current_user)):
+    """
+    Submit a backtest to the worker pool.
+
+    Returns immediately with a job_id. Follow progress via /events (SSE)
+    or /ws, or poll GET /api/backtest/jobs/{job_id}.
+    """
+    if request.kind not in BACKTEST_RUNNERS:
+        raise HTTPException(status_code=400, detail=f"Unknown backtest kind: {request.kind}")
+
+    manager = get_backtest_job_manager()
+    params = request.params
+    loader = None
+
+    if request.kind == "vwap":
+        # Candles are fetched here with the shared Dhan session, simulation runs in the pool
+        from services.vwap_trading_bot import fetch_vwap_backtest_candles
+        params = _vwap_params(params)
+
+        async def load_candles():
+            return {"candles_5min": await fetch_vwap_backtest_candles(
+                params["symbol"], params["from_date"], params["to_date"]
+            )}
+
+        loader = load_candles
+
+    try:
+        job = await manager.submit(request.kind, params, loader=loader, owner=user.user_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return job.to_dict(include_result=job.cached)
+
+
+@router.get("")
+async def list_backtest_jobs():
+    """List recent backtest jobs"""
+    return {"jobs": get_backtest_job_manager().list_jobs()}
+
+
+@router.get("/stats")
+async def backtest_job_stats():
+    """Worker pool and result cache statistics"""
+    return get_backtest_job_manager().get_stats()
+
+
+@router.get("/{job_id}")
+async def get_backtest_job(job_id: str):
+    """Get job status, including the result once completed"""
+    job = get_backtest_job_manager().get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job.to_dict(include_result=True)
+
+
+@router.delete("/{job_id}")
+async def cancel_backtest_job(job_id: str, user: AuthUser = Depends(get_current_user)):
+    """Cancel a pending or running job; a job shared with other submitters keeps running for them"""
+    manager = get_backtest_job_manager()
+    job = manager.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    if user.user_id not in job.owners:
+        raise HTTPException(status_code=403, detail="Only the job's submitter can cancel it")
+    return {"job_id": job_id, "cancelled": manager.cancel(job_id, owner=user.user_id), "status": job.status}
+
+
+@router.get("/{job_id}/events")
+async def stream_backtest_job_events(job_id: str):
+    """
+    Server-Sent Events stream of job events.
+
+    Event types: progress, equity (partial equity-curve chunk),
+    completed, failed, cancelled.
+    """
+    manager = get_backtest_job_manager()
+    if not manager.get_job(job_id):
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+
+    async def event_stream():
+        async for event in manager.subscribe(job_id):
+            yield f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@ws_router.websocket("/{job_id}/ws")
+async def backtest_job_websocket(websocket: WebSocket, job_id: str):
+    """WebSocket stream of job events. Send {"action": "cancel"} to cancel."""
+    await websocket.accept()
+    manager = get_backtest_job_manager()
+
+    token = websocket.query_params.get("token")
+    try:
+        user = await get_current_user(
+            websocket,
+            f"Bearer {token}" if token else websocket.headers.get("authorization"),
+            websocket.headers.get("x-session-id"),
+        )
+    except HTTPException as e:
+        await websocket.send_json({"type": "error", "message": e.detail})
+        await websocket.close(code=1008)
+        return
+
+    if not manager.get_job(job_id):
+        await websocket.send_json({"type": "error", "message": f"Job not found: {job_id}"})
+        await websocket.close()
+        return
+
+    async def listen_for_cancel():
+        while True:
+            message = await websocket.receive_json()
+            if message.get("action") == "cancel":
+                job = manager.get_job(job_id)
+                if job and user.user_id in job.owners:
+                    manager.cancel(job_id, owner=user.user_id)
+                else:
+                    await websocket.send_json({"type": "error", "message": "Only the job's submitter can cancel it"})
+
+    listener = asyncio.create_task(listen_for_cancel())
+    try:
+        async for event in manager.subscribe(job_id):
+            await websocket.send_json(json.loads(json.dumps(event, default=str)))
+        job = manager.get_job(job_id)
+        if job:
+            await websocket.send_json({"type": "result", "job_id": job_id, "data": job.result})
+        await websocket.close()
+    except WebSocketDisconnect:
+        logger.info(f"Backtest job {job_id} stream client disconnected")
+    except Exception as e:
+        logger.error(f"Backtest job WebSocket error: {e}")
+    finally:
+        listener.cancel()
@@ -0,0 +1,117 @@
+# backend/routes/backtest_store_routes.py
+"""
+Backtest Result Store Routes
+Browse and compare stored backtest runs without rerunning them.
+
+Routes:
+- GET    /api/backtest/results                  - List / filter stored runs
+- GET    /api/backtest/results/{run_id}         - Run metadata + metrics
+- GET    /api/backtest/results/{run_id}/series  - Equity curve and daily P&L arrays
+- GET    /api/backtest/results/{run_id}/trades  - Paged trades
+- DELETE /api/backtest/results/{run_id}         - Delete a run (admin)
+- POST   /api/backtest/results/compare          - Side-by-side metrics + overlaid equity
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel, Field
+from typing import List, Optional
+import json
+import logging
+import os
+import sys
+
+# Add backend to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from middleware.auth import require_admin
+from services.backtest_store import get_backtest_store
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/backtest/results", tags=["Backtest Results"])
+
+
+# ============================================
+# REQUEST MODELS
+# ============================================
+
+class CompareRunsRequest(BaseModel):
+    """Runs to compare"""
+    run_ids: List[str] = Field(..., min_length=1, max_length=20)
+    points: int = Field(default=200, ge=10, le=2000, description="Max points per overlaid curve")
+
+
+# ============================================
+# ENDPOINTS
+# ============================================
+
+@router.get("")
+async def list_backtest_runs(
+    strategy: Optional[str] = None,
+    symbol: Optional[str] = None,
+    source: Optional[str] = None,
+    params: Optional[str] = Query(default=None, description="JSON object - exact parameter match"),
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    limit: int = Query(default=100, ge=1, le=1000),
+):
+    """List stored runs, newest first. Date filters match runs overlapping the range."""
+    try:
+        parsed_params = json.loads(params) if params else None
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="params must be a JSON object")
+
+    runs = get_backtest_store().query(
+        strategy=strategy, symbol=symbol, source=source, params=parsed_params,
+        start_date=start_date, end_date=end_date, limit=limit
+    )
+    return {"runs": runs, "count": len(runs)}
+
+
+@router.post("/compare")
+async def compare_backtest_runs(request: CompareRunsRequest):
+    """Compare stored runs from their saved arrays"""
+    try:
+        return get_backtest_store().compare(request.run_ids, points=request.points)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+
+
+@router.get("/{run_id}")
+async def get_backtest_run(run_id: str):
+    """Run metadata and headline metrics"""
+    run = get_backtest_store().get_run(run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail=f"Run not found: {run_id}")
+    return run
+
+
+@router.get("/{run_id}/series")
+async def get_backtest_run_series(run_id: str):
+    """Full equity curve and daily P&L"""
+    try:
+        return {"run_id": run_id, **get_backtest_store().get_series(run_id)}
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Run not found: {run_id}")
+
+
+@router.get("/{run_id}/trades")
+async def get_backtest_run_trades(
+    run_id: str,
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=100, ge=1, le=5000),
+):
+    """Trades of a run, paged"""
+    try:
+        trades = get_backtest_store().get_trades(run_id, offset=offset, limit=limit)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Run not found: {run_id}")
+    return {"run_id": run_id, "offset": offset, "trades": trades}
+
+
+@router.delete("/{run_id}", dependencies=[Depends(require_admin)])
+async def delete_backtest_run(run_id: str):
+    """Delete a stored run (the store is shared, so admins only)"""
+    if not get_backtest_store().delete_run(run_id):
+        raise HTTPException(status_code=404, detail=f"Run not found: {run_id}")
+    return {"run_id": run_id, "deleted": True}
@@ -16,6 +16,7 @@ import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from services.scanner_service import get_scanner_service
+from services.market_frame import MarketFrame, get_market_frame
 from middleware.error_handler import error_response, success_response
 
 logger = logging.getLogger(__name__)
@@ -385,140 +386,36 @@ async def generate_trade_signals(request: TradeSignalsRequest = Body(...)):
 # HELPER FUNCTIONS
 # ============================================
 
-async def _get_fno_stocks_data(filters: ScannerFilters) -> List[Dict]:
+async def _get_fno_stocks_data(filters: ScannerFilters) -> MarketFrame:
     """
-    Get FNO stocks data from DHAN API (Primary data source).
-    Fetches fresh data per request.
+    Get FNO stocks from the shared market frame (refreshed in the background
+    from Dhan API), with the request filters applied as a row mask.
     """
     try:
-        # Import the Dhan unified service
-        from services.dhan_unified_service import get_dhan_unified_service
-        
-        dhan_service = get_dhan_unified_service()
-        
-        # Fetch FNO stocks data from Dhan
-        stocks = await dhan_service.get_fno_stocks_data()
-        logger.info(f"Scanner got {len(stocks)} stocks from Dhan API")
-        
-        if not stocks:
-            logger.warning("No stocks from Dhan API")
-            return []
-        
-        # Apply filters
-        filtered_stocks = []
-        for stock in stocks:
-            # Price filter
-            price = stock.get('ltp', 0)
-            if filters.min_price and price < filters.min_price:
-                continue
-            if filters.max_price and price > filters.max_price:
-                continue
-                
-            # Volume filter
-            volume = stock.get('volume', 0)
-            if filters.min_volume and volume < filters.min_volume:
-                continue
-            
-            # Normalize the stock data structure for scanner
-            normalized = _normalize_stock_data(stock)
-            filtered_stocks.append(normalized)
-        
-        logger.info(f"After filters: {len(filtered_stocks)} stocks (source: Dhan API)")
-        return filtered_stocks
+        frame = await get_market_frame()
+        if not len(frame):
+            logger.warning("Market frame is empty")
+            return frame
+        
+        filtered = frame.filter(frame.mask(
+            min_price=filters.min_price,
+            max_price=filters.max_price,
+            min_volume=filters.min_volume,
+        ))
+        logger.info(f"After filters: {len(filtered)}/{len(frame)} stocks (frame v{frame.version}, {frame.source})")
+        return filtered
             
     except Exception as e:
         logger.error(f"Error getting FNO stocks data: {e}", exc_info=True)
-        return []
+        return MarketFrame.from_records([])
 
 
 def _normalize_stock_data(stock: Dict) -> Dict:
     """
     Normalize stock data from yfinance/cache format to scanner format.
-    Maps various field names to a consistent structure.
+    Maps various field names to a consistent structure (see MarketFrame.from_records).
     """
-    # Get price values
-    ltp = stock.get('ltp', 0) or stock.get('price', 0) or stock.get('close', 0)
-    prev_close = stock.get('prev_close', 0) or stock.get('previousClose', 0) or stock.get('prevClose', ltp)
-    
-    # Calculate change if not present
-    change_pct = stock.get('change_percent', 0) or stock.get('change_pct', 0)
-    if not change_pct and prev_close and ltp:
-        change_pct = ((ltp - prev_close) / prev_close) * 100
-    
-    # Volume values
-    volume = stock.get('volume', 0) or 0
-    avg_volume = stock.get('avg_volume', 0) or stock.get('averageVolume', 0) or stock.get('avgVolume', volume)
-    volume_ratio = (volume / avg_volume) if avg_volume > 0 else 1
-    
-    # Technical indicators (use defaults if not available)
-    high = stock.get('high', 0) or stock.get('dayHigh', ltp)
-    low = stock.get('low', 0) or stock.get('dayLow', ltp)
-    open_price = stock.get('open', 0) or stock.get('openPrice', ltp)
-    
-    # Calculate VWAP if not present
-    vwap = stock.get('vwap', 0)
-    if not vwap and high and low and ltp:
-        vwap = (high + low + ltp) / 3
-    
-    # EMAs - use existing or calculate approximations based on price
-    ema8 = stock.get('ema8', 0) or stock.get('ema_8', 0) or ltp * 0.995
-    ema21 = stock.get('ema21', 0) or stock.get('ema_21', 0) or ltp * 0.99
-    ema55 = stock.get('ema55', 0) or stock.get('ema_55', 0) or ltp * 0.98
-    
-    # Additional EMAs for swing scanner
-    ema20 = stock.get('ema20', 0) or stock.get('ema_20', 0) or ema21  # Use ema21 as proxy
-    ema50 = stock.get('ema50', 0) or stock.get('ema_50', 0) or ema55  # Use ema55 as proxy
-    ema200 = stock.get('ema200', 0) or stock.get('ema_200', 0) or ltp * 0.95  # Long-term EMA
-    
-    # RSI and ADX
-    rsi = stock.get('rsi', 50) or stock.get('RSI', 50)
-    adx = stock.get('adx', 0) or stock.get('ADX', 0)
-    
-    # If no ADX, estimate from price action
-    if not adx:
-        # Simple ADX approximation based on volatility
-        if high and low and ltp:
-            range_pct = ((high - low) / ltp) * 100 if ltp > 0 else 0
-            adx = min(50, max(15, range_pct * 10))  # Scale range to ADX-like value
-    
-    # MFI (Money Flow Index) for money flow scanner
-    # MFI (Money Flow Index) for money flow scanner - don't default, let scanner calculate
-    mfi = stock.get('mfi', 0) or stock.get('MFI', 0)
-    
-    # ATR for stop loss calculations
-    atr = stock.get('atr', 0) or stock.get('ATR', 0)
-    if not atr and high and low:
-        atr = high - low  # Simple approximation
-    
-    return {
-        "symbol": stock.get('symbol', '').replace('.NS', ''),
-        "security_id": stock.get('security_id'),
-        "ltp": ltp,
-        "price": ltp,
-        "prev_close": prev_close,
-        "open": open_price,
-        "high": high,
-        "low": low,
-        "close": ltp,
-        "change_percent": round(change_pct, 2),
-        "volume": volume,
-        "avg_volume": avg_volume,
-        "volume_ratio": round(volume_ratio, 2),
-        "vwap": round(vwap, 2) if vwap else 0,
-        "ema8": ema8,
-        "ema20": ema20,
-        "ema21": ema21,
-        "ema50": ema50,
-        "ema55": ema55,
-        "ema200": ema200,
-        "rsi": rsi,
-        "adx": adx,
-        "mfi": mfi,
-        "atr": atr,
-        "support": stock.get('support', 0) or low,
-        "resistance": stock.get('resistance', 0) or high,
-        "sector": stock.get('sector', 'Unknown')
-    }
+    return MarketFrame.from_records([stock]).to_records()[0]
 
 
 async def _get_option_chain_data(symbol: str, expiry: str = None) -> tuple:
@@ -24,11 +24,13 @@ import logging
 # Import strategy engine
 from services.nifty_strategies import (
     NiftyTradingStrategies,
-    StrategyBacktester,
     StrategyName,
     SignalType
 )
 
+# Backtests run in the shared worker pool
+from services.backtest_jobs import get_backtest_job_manager
+
 # Import combined strategy service
 from services.combined_strategy_service import (
     CombinedStrategyService,
@@ -41,7 +43,6 @@ router = APIRouter(prefix="/api/strategies", tags=["Trading Strategies"])
 
 # Initialize strategy engine
 strategy_engine = NiftyTradingStrategies(symbol="NIFTY")
-backtester = StrategyBacktester(strategy_engine)
 
 
 # ============================================
@@ -560,50 +561,14 @@ async def run_backtest(request: BacktestRequest):
                 detail="Need at least 50 candles for backtesting"
             )
         
-        # Run backtest
-        result = backtester.backtest_strategy(
-            df,
-            strategy,
-            request.capital,
-            request.lot_size
-        )
-        
-        return {
-            "strategy": result.strategy_name,
+        # Run backtest in the worker pool (cached by request parameters)
+        return await get_backtest_job_manager().run("strategy", {
+            "strategy": strategy.value,
             "symbol": request.symbol,
+            "candles": [c.dict() for c in request.candles],
             "capital": request.capital,
-            "lot_size": request.lot_size,
-            "period": f"{len(request.candles)} candles",
-            "results": {
-                "total_trades": result.total_trades,
-                "winning_trades": result.winning_trades,
-                "losing_trades": result.losing_trades,
-                "win_rate": result.win_rate,
-                "total_pnl": result.total_pnl,
-                "total_pnl_percent": result.total_pnl_percent,
-                "avg_profit": result.avg_profit,
-                "avg_loss": result.avg_loss,
-                "max_profit": result.max_profit,
-                "max_loss": result.max_loss,
-                "max_drawdown": result.max_drawdown,
-                "profit_factor": result.profit_factor,
-                "sharpe_ratio": result.sharpe_ratio
-            },
-            "trades": [
-                {
-                    "entry_date": t.entry_date,
-                    "entry_price": t.entry_price,
-                    "exit_date": t.exit_date,
-                    "exit_price": t.exit_price,
-                    "pnl": t.pnl,
-                    "pnl_percent": t.pnl_percent,
-                    "exit_reason": t.exit_reason
-                }
-                for t in result.trades[:50]  # Limit to 50 trades in response
-            ],
-            "equity_curve": result.equity_curve[:100] if result.equity_curve else [],
-            "recommendation": _get_backtest_recommendation(result)
-        }
+            "lot_size": request.lot_size
+        })
     
     except HTTPException:
         raise
@@ -629,36 +594,13 @@ async def run_all_backtests(request: PriceDataRequest, capital: float = 100000,
                 detail="Need at least 50 candles for backtesting"
             )
         
-        # Run all backtests
-        results = backtester.run_all_backtests(df, capital, lot_size)
-        
-        # Generate report
-        report = backtester.generate_backtest_report(results)
-        
-        # Format results
-        strategy_results = {}
-        for name, result in results.items():
-            strategy_results[name] = {
-                "total_trades": result.total_trades,
-                "win_rate": result.win_rate,
-                "total_pnl": result.total_pnl,
-                "profit_factor": result.profit_factor,
-                "max_drawdown": result.max_drawdown,
-                "sharpe_ratio": result.sharpe_ratio
-            }
-        
-        return {
+        # Run all backtests in the worker pool (cached by request parameters)
+        return await get_backtest_job_manager().run("strategy_all", {
             "symbol": request.symbol,
+            "candles": [c.dict() for c in request.candles],
             "capital": capital,
-            "lot_size": lot_size,
-            "period": f"{len(request.candles)} candles",
-            "strategy_results": strategy_results,
-            "summary": report["summary"],
-            "best_strategy": report["best_strategy"],
-            "total_combined_pnl": report["total_combined_pnl"],
-            "average_win_rate": report["average_win_rate"],
-            "recommendations": report["recommendations"]
-        }
+            "lot_size": lot_size
+        })
     
     except HTTPException:
         raise
@@ -667,21 +609,6 @@ async def run_all_backtests(request: PriceDataRequest, capital: float = 100000,
         raise HTTPException(status_code=500, detail=str(e))
 
 
-def _get_backtest_recommendation(result) -> str:
-    """Generate recommendation based on backtest results"""
-    if result.total_trades == 0:
-        return "⚠️ No trades generated - check data quality or strategy parameters"
-    
-    if result.win_rate >= 55 and result.profit_factor >= 1.5:
-        return f"✅ RECOMMENDED: Strong performance with {result.win_rate}% win rate and {result.profit_factor:.2f} profit factor"
-    
-    elif result.win_rate >= 50 and result.profit_factor >= 1.2:
-        return f"⚠️ MODERATE: Acceptable performance - consider combining with other confirmations"
-    
-    else:
-        return f"❌ CAUTION: Below average performance - optimize parameters or use different strategy"
-
-
 # ============================================
 # COMBINED SIGNAL ENDPOINTS
 # ============================================
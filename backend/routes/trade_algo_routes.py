@@ -230,7 +230,9 @@ async def get_trades(
 
 
 @router.get("/positions")
-async def get_positions():
+async def get_positions(
+    refresh: bool = Query(default=False, description="Bypass the cached account state")
+):
     """
     Fetch current positions from all brokers
     
@@ -238,7 +240,7 @@ async def get_positions():
     """
     try:
         service = get_trade_algo_service()
-        result = await service.fetch_all_positions()
+        result = await service.fetch_all_positions(force_refresh=refresh)
         
         return {
             "status": "success",
@@ -251,7 +253,9 @@ async def get_positions():
 
 
 @router.get("/funds")
-async def get_funds():
+async def get_funds(
+    refresh: bool = Query(default=False, description="Bypass the cached account state")
+):
     """
     Fetch fund/margin details from all brokers
     
@@ -259,7 +263,7 @@ async def get_funds():
     """
     try:
         service = get_trade_algo_service()
-        result = await service.fetch_funds()
+        result = await service.fetch_funds(force_refresh=refresh)
         
         return {
             "status": "success",
@@ -273,7 +277,8 @@ async def get_funds():
 
 @router.get("/orders")
 async def get_orders(
-    broker: Optional[str] = Query(default=None, description="Filter by broker: dhan, upstox")
+    broker: Optional[str] = Query(default=None, description="Filter by broker: dhan, upstox"),
+    refresh: bool = Query(default=False, description="Bypass the cached account state")
 ):
     """
     Fetch today's orders from all brokers
@@ -282,7 +287,7 @@ async def get_orders(
     """
     try:
         service = get_trade_algo_service()
-        result = await service.fetch_orders()
+        result = await service.fetch_orders(force_refresh=refresh)
         
         # Filter by broker if specified
         if broker and result.get("orders"):
@@ -495,7 +500,9 @@ async def configure_broker(credentials: BrokerCredentials):
 
 
 @router.get("/dashboard")
-async def get_algo_dashboard():
+async def get_algo_dashboard(
+    refresh: bool = Query(default=False, description="Bypass the cached account state")
+):
     """
     Get complete algo trading dashboard data
     
@@ -506,6 +513,9 @@ async def get_algo_dashboard():
     - Available funds
     - Performance metrics
     - Top suggestions
+    
+    Positions and funds come from the per-account cache (account_state),
+    refreshed in the background and on order events.
     """
     try:
         service = get_trade_algo_service()
@@ -514,8 +524,8 @@ async def get_algo_dashboard():
         import asyncio
         
         trades_task = service.fetch_all_trades()
-        positions_task = service.fetch_all_positions()
-        funds_task = service.fetch_funds()
+        positions_task = service.fetch_all_positions(force_refresh=refresh)
+        funds_task = service.fetch_funds(force_refresh=refresh)
         
         trades, positions, funds = await asyncio.gather(
             trades_task, positions_task, funds_task,
@@ -539,7 +549,7 @@ async def get_algo_dashboard():
         return {
             "status": "success",
             "dashboard": {
-                "brokers": service._get_broker_status(),
+                "brokers": positions.get("brokers") or service._get_broker_status(),
                 "trades_today": {
                     "count": trades.get("total_count", 0),
                     "recent": trades.get("trades", [])[:5]
@@ -2139,18 +2149,26 @@ async def backtest_vwap_strategy(request: VWAPBacktestRequest):
     - Exit analysis (SL/Target/Time exits)
     """
     try:
-        bot = get_vwap_bot_instance()
-        if not bot:
-            raise HTTPException(status_code=500, detail="VWAP bot not available")
+        from services.backtest_jobs import get_backtest_job_manager
+        from services.vwap_trading_bot import fetch_vwap_backtest_candles
         
-        result = await bot.backtest_vwap_strategy(
-            symbol=request.symbol.upper(),
-            from_date=request.from_date,
-            to_date=request.to_date,
-            capital=request.capital,
-            risk_per_trade=request.risk_per_trade,
-            target_rr=request.target_rr
-        )
+        symbol = request.symbol.upper()
+        
+        async def load_candles():
+            return {"candles_5min": await fetch_vwap_backtest_candles(symbol, request.from_date, request.to_date)}
+        
+        # Candles are fetched here, the simulation runs in the backtest worker pool
+        try:
+            result = await get_backtest_job_manager().run("vwap", {
+                "symbol": symbol,
+                "from_date": request.from_date,
+                "to_date": request.to_date,
+                "capital": request.capital,
+                "risk_per_trade": request.risk_per_trade,
+                "target_rr": request.target_rr
+            }, loader=load_candles)
+        except RuntimeError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
         if result.get("status") == "error":
             raise HTTPException(status_code=400, detail=result.get("message", "Backtest failed"))
@@ -2327,6 +2345,7 @@ async def start_ai_delta_strangle(request: DeltaStrangleStartRequest):
             broker_service=broker_service,
             access_token=request.access_token,
             broker=request.broker.lower(),
+            user_id=user_id,
         )
         
         result = await bot.start(config)
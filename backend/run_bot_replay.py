@@ -0,0 +1,80 @@
+"""
+Bot Replay Runner
+=================
+Replays a recorded intraday session through the trading bots on a
+simulated clock (see services/market_replay.py for the session format).
+
+Usage:
+    python run_bot_replay.py sessions/2026-01-15.json                 # VWAP bot, as fast as possible
+    python run_bot_replay.py sessions/2026-01-15/ --bots vwap,strangle,delta
+    python run_bot_replay.py sessions/2026-01-15.json --speed 60      # 1 market minute per second
+    python run_bot_replay.py sessions/2026-01-15.json --interval 30 --output replay_results.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from services.market_replay import MarketReplay, load_replay_session
+
+logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def build_bots(names):
+    bots = []
+    for name in names:
+        if name == "vwap":
+            from services.vwap_trading_bot import VWAPTradingBot
+            bots.append(VWAPTradingBot())
+        elif name == "strangle":
+            from services.ai_strangle_bot import AIStrangleBot
+            bots.append(AIStrangleBot(None, ""))
+        elif name == "delta":
+            from services.ai_delta_strangle_bot import AIDeltaStrangleBot
+            bot = AIDeltaStrangleBot(None, "")
+            bot.config.use_ai_decisions = False  # Keep replays deterministic and offline
+            bots.append(bot)
+        else:
+            raise SystemExit(f"Unknown bot: {name} (choose from vwap, strangle, delta)")
+    return bots
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded session through the trading bots")
+    parser.add_argument("session", help="Session JSON file or directory of per-symbol CSVs")
+    parser.add_argument("--bots", default="vwap", help="Comma-separated: vwap, strangle, delta")
+    parser.add_argument("--speed", type=float, default=0, help="Speed-up factor (0 = as fast as possible)")
+    parser.add_argument("--interval", type=float, default=60, help="Scan interval in simulated seconds")
+    parser.add_argument("--output", help="Write the full result JSON here")
+    args = parser.parse_args()
+
+    session = load_replay_session(args.session)
+    replay = MarketReplay(session, speed=args.speed)
+    bots = build_bots([b.strip() for b in args.bots.split(",") if b.strip()])
+
+    result = asyncio.run(replay.run(bots, scan_interval=args.interval))
+
+    print(f"\n{'=' * 60}")
+    print(f"REPLAY {result['session_date']}  ({result['simulated_start']} -> {result['simulated_end']})")
+    print(f"{'=' * 60}")
+    print(f"Scans: {result['scans']}  |  Wall time: {result['elapsed_seconds']}s  |  Errors: {len(result['errors'])}")
+    account = result["account"]
+    print(f"Mock account: trades={account['trade_count']}  realized=₹{account['realized_pnl']:,.2f}  "
+          f"charges=₹{account['charges']['total']:,.2f}  net=₹{account['net_pnl']:,.2f}")
+    if result["broker_orders"]:
+        print(f"Replay broker orders: {len(result['broker_orders'])}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2, default=str)
+        print(f"Saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,8 +15,8 @@ Data: Actual NIFTY prices (embedded + Yahoo Finance fallback)
 
 Realistic factors:
   - Slippage: ATM 0.5%, OTM 1.5%, Deep OTM 2.5%
-  - Brokerage: ₹40/lot flat
-  - STT Sell: 0.0625%
+  - Charges: brokerage, STT, exchange, SEBI, GST, stamp duty per fill
+    (services/execution_costs.py - expired-worthless legs cost nothing)
   - NIFTY Lot Size: 75 (2024) / 75
   - Margin: ₹45,000 per lot (approx)
   - Expiry: Thu (Jan-Oct 2024), Mon (Nov 2024-Feb 2025), Tue (Mar 2025+)
@@ -28,23 +28,26 @@ Realistic factors:
 
 import json
 import math
+import os
 import random
 import ssl
+import sys
 import urllib.request
 from dataclasses import dataclass, field, asdict
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Tuple
 
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from services.execution_costs import CHARGE_RATES, MONEYNESS_SLIPPAGE, calculate_charges, fill_price
+
 # ==========================================
 # CONSTANTS
 # ==========================================
 LOT_SIZE = 75  # NIFTY lot size 2024
 MARGIN_PER_LOT = 45000
-BROKERAGE_PER_LOT = 40  # Flat per lot
-STT_SELL = 0.000625  # 0.0625%
-SLIPPAGE_ATM = 0.005  # 0.5%
-SLIPPAGE_OTM = 0.015  # 1.5%
-SLIPPAGE_DEEP_OTM = 0.025  # 2.5%
 
 # Major events with expected volatility impact
 MAJOR_EVENTS = {
@@ -508,25 +511,17 @@ def get_atm_strike(spot: float) -> float:
 
 def apply_slippage(premium: float, moneyness: float, is_sell: bool) -> float:
     """Apply slippage based on moneyness"""
-    if moneyness < 0.01:
-        slip = SLIPPAGE_ATM
-    elif moneyness < 0.025:
-        slip = SLIPPAGE_OTM
-    else:
-        slip = SLIPPAGE_DEEP_OTM
-    
-    if is_sell:
-        return premium * (1 - slip)  # Receive less
-    else:
-        return premium * (1 + slip)  # Pay more
+    return float(fill_price("SELL" if is_sell else "BUY", premium, moneyness=moneyness))
 
 
-def calculate_costs(total_sell_lots: int, total_buy_lots: int, sell_premium_total: float) -> float:
-    """Calculate brokerage + STT"""
-    total_lots = total_sell_lots + total_buy_lots
-    brokerage = total_lots * BROKERAGE_PER_LOT * 2  # Entry + Exit
-    stt = sell_premium_total * STT_SELL
-    return brokerage + stt
+def calculate_costs(legs: List[dict]) -> float:
+    """Charges for entering and exiting every leg (1 lot each), in one call"""
+    opens = np.array([leg["action"] == "SELL" for leg in legs])
+    entry = np.array([leg["entry"] for leg in legs], dtype=float)
+    exit_ = np.array([leg["exit"] for leg in legs], dtype=float)
+    sides = np.concatenate([np.where(opens, "SELL", "BUY"), np.where(opens, "BUY", "SELL")])
+    charges = calculate_charges(sides, LOT_SIZE, np.concatenate([entry, exit_]), segment="options")
+    return float(charges["total"].sum())
 
 
 # ==========================================
@@ -574,8 +569,13 @@ def simulate_iron_condor(spot: float, exit_spot: float, max_spot: float, min_spo
     gross_pnl = sell_pnl + buy_pnl
     
     # Costs: 2 sell lots + 2 buy lots
-    sell_premium_total = (sell_ce_entry + sell_pe_entry) * LOT_SIZE
-    costs = calculate_costs(2, 2, sell_premium_total)
+    legs = [
+        {"strike": sell_ce, "type": "CE", "action": "SELL", "entry": round(sell_ce_entry, 1), "exit": round(sell_ce_exit, 1)},
+        {"strike": sell_pe, "type": "PE", "action": "SELL", "entry": round(sell_pe_entry, 1), "exit": round(sell_pe_exit, 1)},
+        {"strike": buy_ce, "type": "CE", "action": "BUY", "entry": round(buy_ce_entry, 1), "exit": round(buy_ce_exit, 1)},
+        {"strike": buy_pe, "type": "PE", "action": "BUY", "entry": round(buy_pe_entry, 1), "exit": round(buy_pe_exit, 1)},
+    ]
+    costs = calculate_costs(legs)
     
     # Check for early SL (if spot breached sell strikes significantly during week)
     exit_reason = "expiry"
@@ -588,12 +588,7 @@ def simulate_iron_condor(spot: float, exit_spot: float, max_spot: float, min_spo
         "net_pnl": round(gross_pnl - costs, 0),
         "exit_reason": exit_reason,
         "margin": 2 * MARGIN_PER_LOT,
-        "legs": [
-            {"strike": sell_ce, "type": "CE", "action": "SELL", "entry": round(sell_ce_entry, 1), "exit": round(sell_ce_exit, 1)},
-            {"strike": sell_pe, "type": "PE", "action": "SELL", "entry": round(sell_pe_entry, 1), "exit": round(sell_pe_exit, 1)},
-            {"strike": buy_ce, "type": "CE", "action": "BUY", "entry": round(buy_ce_entry, 1), "exit": round(buy_ce_exit, 1)},
-            {"strike": buy_pe, "type": "PE", "action": "BUY", "entry": round(buy_pe_entry, 1), "exit": round(buy_pe_exit, 1)},
-        ]
+        "legs": legs,
     }
 
 
@@ -635,8 +630,13 @@ def simulate_iron_butterfly(spot: float, exit_spot: float, max_spot: float, min_
     buy_pnl = ((buy_ce_exit - buy_ce_entry) + (buy_pe_exit - buy_pe_entry)) * LOT_SIZE
     gross_pnl = sell_pnl + buy_pnl
     
-    sell_premium_total = (sell_ce_entry + sell_pe_entry) * LOT_SIZE
-    costs = calculate_costs(2, 2, sell_premium_total)
+    legs = [
+        {"strike": sell_ce, "type": "CE", "action": "SELL", "entry": round(sell_ce_entry, 1), "exit": round(sell_ce_exit, 1)},
+        {"strike": sell_pe, "type": "PE", "action": "SELL", "entry": round(sell_pe_entry, 1), "exit": round(sell_pe_exit, 1)},
+        {"strike": buy_ce, "type": "CE", "action": "BUY", "entry": round(buy_ce_entry, 1), "exit": round(buy_ce_exit, 1)},
+        {"strike": buy_pe, "type": "PE", "action": "BUY", "entry": round(buy_pe_entry, 1), "exit": round(buy_pe_exit, 1)},
+    ]
+    costs = calculate_costs(legs)
     
     exit_reason = "expiry"
     if max_spot > buy_ce + 50 or min_spot < buy_pe - 50:
@@ -648,12 +648,7 @@ def simulate_iron_butterfly(spot: float, exit_spot: float, max_spot: float, min_
         "net_pnl": round(gross_pnl - costs, 0),
         "exit_reason": exit_reason,
         "margin": 2 * MARGIN_PER_LOT,
-        "legs": [
-            {"strike": sell_ce, "type": "CE", "action": "SELL", "entry": round(sell_ce_entry, 1), "exit": round(sell_ce_exit, 1)},
-            {"strike": sell_pe, "type": "PE", "action": "SELL", "entry": round(sell_pe_entry, 1), "exit": round(sell_pe_exit, 1)},
-            {"strike": buy_ce, "type": "CE", "action": "BUY", "entry": round(buy_ce_entry, 1), "exit": round(buy_ce_exit, 1)},
-            {"strike": buy_pe, "type": "PE", "action": "BUY", "entry": round(buy_pe_entry, 1), "exit": round(buy_pe_exit, 1)},
-        ]
+        "legs": legs,
     }
 
 
@@ -696,8 +691,11 @@ def simulate_short_strangle(spot: float, exit_spot: float, max_spot: float, min_
         sell_pnl = -min(abs(actual_loss), total_collected * 2)
         exit_reason = "stop_loss"
     
-    sell_premium_total = (sell_ce_entry + sell_pe_entry) * LOT_SIZE
-    costs = calculate_costs(2, 0, sell_premium_total)
+    legs = [
+        {"strike": sell_ce, "type": "CE", "action": "SELL", "entry": round(sell_ce_entry, 1), "exit": round(sell_ce_exit, 1)},
+        {"strike": sell_pe, "type": "PE", "action": "SELL", "entry": round(sell_pe_entry, 1), "exit": round(sell_pe_exit, 1)},
+    ]
+    costs = calculate_costs(legs)
     
     return {
         "gross_pnl": round(sell_pnl, 0),
@@ -705,10 +703,7 @@ def simulate_short_strangle(spot: float, exit_spot: float, max_spot: float, min_
         "net_pnl": round(sell_pnl - costs, 0),
         "exit_reason": exit_reason,
         "margin": 3 * MARGIN_PER_LOT,  # Naked = higher margin
-        "legs": [
-            {"strike": sell_ce, "type": "CE", "action": "SELL", "entry": round(sell_ce_entry, 1), "exit": round(sell_ce_exit, 1)},
-            {"strike": sell_pe, "type": "PE", "action": "SELL", "entry": round(sell_pe_entry, 1), "exit": round(sell_pe_exit, 1)},
-        ]
+        "legs": legs,
     }
 
 
@@ -774,9 +769,11 @@ def simulate_straddle_hedge(spot: float, exit_spot: float, max_spot: float, min_
     sell_pnl = ((sell_ce_entry - sell_ce_exit) + (sell_pe_entry - sell_pe_exit)) * LOT_SIZE
     gross_pnl = sell_pnl + hedge_pnl
     
-    sell_premium_total = (sell_ce_entry + sell_pe_entry) * LOT_SIZE
-    total_lots = 2 + len(buy_legs)
-    costs = calculate_costs(2, len(buy_legs), sell_premium_total)
+    legs = [
+        {"strike": sell_ce, "type": "CE", "action": "SELL", "entry": round(sell_ce_entry, 1), "exit": round(sell_ce_exit, 1)},
+        {"strike": sell_pe, "type": "PE", "action": "SELL", "entry": round(sell_pe_entry, 1), "exit": round(sell_pe_exit, 1)},
+    ] + buy_legs
+    costs = calculate_costs(legs)
     
     return {
         "gross_pnl": round(gross_pnl, 0),
@@ -785,10 +782,7 @@ def simulate_straddle_hedge(spot: float, exit_spot: float, max_spot: float, min_
         "exit_reason": "hedged_expiry" if hedge_triggered else "expiry",
         "margin": 2 * MARGIN_PER_LOT + (len(buy_legs) * MARGIN_PER_LOT * 0.3),
         "hedge_triggered": hedge_triggered,
-        "legs": [
-            {"strike": sell_ce, "type": "CE", "action": "SELL", "entry": round(sell_ce_entry, 1), "exit": round(sell_ce_exit, 1)},
-            {"strike": sell_pe, "type": "PE", "action": "SELL", "entry": round(sell_pe_entry, 1), "exit": round(sell_pe_exit, 1)},
-        ] + buy_legs
+        "legs": legs,
     }
 
 
@@ -1132,9 +1126,9 @@ def run_full_year_comparison():
             "lot_size": LOT_SIZE,
             "factors": [
                 "Real NIFTY OHLC data",
-                f"Slippage: ATM {SLIPPAGE_ATM*100}%, OTM {SLIPPAGE_OTM*100}%, Deep OTM {SLIPPAGE_DEEP_OTM*100}%",
-                f"Brokerage: ₹{BROKERAGE_PER_LOT}/lot",
-                f"STT: {STT_SELL*100}%",
+                "Slippage: ATM {:.1f}%, OTM {:.1f}%, Deep OTM {:.1f}%".format(*(pct * 100 for _, pct in MONEYNESS_SLIPPAGE)),
+                f"Brokerage: ₹{CHARGE_RATES['options']['brokerage_flat']:.0f}/order",
+                f"STT: {CHARGE_RATES['options']['stt_sell']*100}% (sell premium)",
                 "Major events: Budget, Elections, RBI MPC, Fed",
                 "Realized volatility → IV estimation",
                 "Volatility smile pricing"
@@ -0,0 +1,94 @@
+"""
+Import-Time Profile
+===================
+Profiles `import server` (what uvicorn does on a cold start) with
+`python -X importtime` in a fresh interpreter. Prints the total import time
+and the slowest modules by cumulative and by self time. Lazy routers and
+lazily imported libraries (yfinance, scipy.stats) should not appear.
+
+Usage:
+    python run_import_profile.py
+    python run_import_profile.py --top 40 --runs 3
+    python run_import_profile.py --eager               # LAZY_ROUTERS=0, for comparison
+    python run_import_profile.py --budget 2.5          # exit 1 if the median import exceeds 2.5s
+    python run_import_profile.py --output import_profile.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def profile_once(module: str, env: Dict[str, str]) -> Dict:
+    """Import module in a fresh interpreter; returns wall time and per-module -X importtime rows"""
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - started
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    rows: List[Dict] = []
+    for line in proc.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        })
+    total = next((r["cumulative_ms"] for r in rows if r["module"] == module), None)
+    return {"wall_s": wall, "import_ms": total, "modules": rows}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile the server's import time")
+    parser.add_argument("--module", default="server", help="Module to import")
+    parser.add_argument("--runs", type=int, default=1, help="Fresh interpreters to average over")
+    parser.add_argument("--top", type=int, default=25, help="Modules to list")
+    parser.add_argument("--eager", action="store_true", help="Import every router up front (LAZY_ROUTERS=0)")
+    parser.add_argument("--budget", type=float, help="Fail if the median import time (seconds) exceeds this")
+    parser.add_argument("--output", help="Write the full profile of the last run as JSON")
+    args = parser.parse_args()
+
+    env = dict(os.environ, LAZY_ROUTERS="0" if args.eager else "1")
+    runs = [profile_once(args.module, env) for _ in range(args.runs)]
+    import_s = statistics.median(r["import_ms"] for r in runs) / 1000
+    last = runs[-1]
+
+    print(f"import {args.module}: {import_s:.2f}s median over {args.runs} run(s) "
+          f"(process wall {statistics.median(r['wall_s'] for r in runs):.2f}s, lazy routers {'off' if args.eager else 'on'})")
+
+    modules = [r for r in last["modules"] if r["module"] != args.module]
+    print(f"\nTop {args.top} by cumulative time (top-level imports of {args.module})")
+    for row in sorted((r for r in modules if r["depth"] == 1), key=lambda r: -r["cumulative_ms"])[:args.top]:
+        print(f"  {row['cumulative_ms']:>9.1f} ms  {row['module']}")
+
+    print(f"\nTop {args.top} by self time")
+    for row in sorted(last["modules"], key=lambda r: -r["self_ms"])[:args.top]:
+        print(f"  {row['self_ms']:>9.1f} ms  {row['module']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"module": args.module, "eager": args.eager, "import_s": import_s, "runs": runs}, f, indent=2)
+        print(f"\nProfile written to {args.output}")
+
+    if args.budget is not None and import_s > args.budget:
+        print(f"\n❌ Import time {import_s:.2f}s is over the {args.budget:.2f}s budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
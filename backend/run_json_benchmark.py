@@ -0,0 +1,170 @@
+"""
+JSON Response Benchmark
+=======================
+Times the response serialization of the largest API payloads (option
+chain, F&O heatmap, scanner results) on two paths:
+
+    legacy  convert_numpy_types + jsonable_encoder + JSONResponse.render
+    fast    services.json_response.dumps (orjson, NumPy-aware)
+
+Payloads are synthetic but shaped like the real responses, with the NumPy
+and pandas values the endpoints produce.
+
+Usage:
+    python run_json_benchmark.py
+    python run_json_benchmark.py --repeat 200 --strikes 120 --stocks 220
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from services.json_response import ORJSON_AVAILABLE, dumps
+
+
+def convert_numpy_types(obj):
+    """The recursive pre-pass server.py used before the orjson path"""
+    if isinstance(obj, dict):
+        return {k: convert_numpy_types(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [convert_numpy_types(item) for item in obj]
+    elif isinstance(obj, (np.integer, np.int64, np.int32)):
+        return int(obj)
+    elif isinstance(obj, (np.floating, np.float64, np.float32)):
+        return float(obj)
+    elif isinstance(obj, (np.bool_, np.ndarray)):
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+        return bool(obj)
+    elif pd.isna(obj):
+        return None
+    else:
+        return obj
+
+
+def legacy_render(payload) -> bytes:
+    return JSONResponse(None).render(jsonable_encoder(convert_numpy_types(payload)))
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# PAYLOADS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def option_chain_payload(rng, strikes: int) -> dict:
+    spot = 24500.0
+    strike_grid = spot + (np.arange(strikes) - strikes // 2) * 50
+
+    def leg(strike):
+        return {
+            "ltp": np.float64(rng.uniform(1, 600)),
+            "oi": np.int64(rng.integers(0, 5_000_000)),
+            "oi_change": np.int64(rng.integers(-500_000, 500_000)),
+            "volume": np.int64(rng.integers(0, 20_000_000)),
+            "iv": np.float64(rng.uniform(8, 40)),
+            "delta": np.float64(rng.uniform(-1, 1)),
+            "gamma": np.float64(rng.uniform(0, 0.01)),
+            "theta": np.float64(rng.uniform(-30, 0)),
+            "vega": np.float64(rng.uniform(0, 20)),
+            "bid": np.float64(rng.uniform(1, 600)),
+            "ask": np.float64(rng.uniform(1, 600)),
+            "itm": np.bool_(strike < spot),
+        }
+
+    return {
+        "symbol": "NIFTY",
+        "spot": np.float64(spot),
+        "expiry": "2026-10-29",
+        "pcr": np.float64(rng.uniform(0.5, 1.5)),
+        "max_pain": np.int64(24500),
+        "chain": [{"strike": np.float64(s), "ce": leg(s), "pe": leg(s)} for s in strike_grid],
+        "timestamp": datetime.now().isoformat(),
+    }
+
+
+def heatmap_payload(rng, stocks: int) -> dict:
+    sectors = ["Banking", "IT", "Auto", "Pharma", "FMCG", "Metal", "Energy", "Realty"]
+    return {
+        "stocks": [
+            {
+                "symbol": f"STOCK{i}",
+                "sector": sectors[i % len(sectors)],
+                "ltp": np.float64(rng.uniform(50, 5000)),
+                "change_pct": np.float64(rng.normal(0, 2)),
+                "volume": np.int64(rng.integers(0, 50_000_000)),
+                "market_cap": np.float64(rng.uniform(1e9, 1e13)),
+                "oi_change_pct": np.float64(rng.normal(0, 5)) if i % 7 else np.nan,
+                "intraday": rng.normal(0, 1, 26).cumsum(),
+            }
+            for i in range(stocks)
+        ],
+        "timestamp": datetime.now().isoformat(),
+    }
+
+
+def scanner_payload(rng, stocks: int) -> dict:
+    frame = pd.DataFrame({
+        "symbol": [f"STOCK{i}" for i in range(stocks)],
+        "ltp": rng.uniform(50, 5000, stocks),
+        "change_pct": rng.normal(0, 2, stocks),
+        "volume_ratio": rng.uniform(0.2, 6, stocks),
+        "rsi": rng.uniform(10, 90, stocks),
+        "vwap_distance": rng.normal(0, 1, stocks),
+        "score": rng.integers(0, 100, stocks),
+        "breakout": rng.random(stocks) > 0.8,
+    })
+    frame.loc[frame.index % 11 == 0, "rsi"] = np.nan
+    rows = frame.to_dict(orient="records")
+    # to_dict hands back Python floats; the scanners' row dicts built from
+    # .iloc / .at lookups carry NumPy scalars instead
+    for row, score in zip(rows, frame["score"].to_numpy()):
+        row["score"] = score
+    return {"scanner": "momentum", "count": stocks, "results": rows, "timestamp": datetime.now().isoformat()}
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# RUNNER
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def time_it(fn, payload, repeat: int) -> float:
+    fn(payload)  # warm-up
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn(payload)
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark API response serialization")
+    parser.add_argument("--repeat", type=int, default=50, help="Serializations per payload and path")
+    parser.add_argument("--strikes", type=int, default=100, help="Option chain strikes")
+    parser.add_argument("--stocks", type=int, default=200, help="Heatmap / scanner rows")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    payloads = {
+        "option_chain": option_chain_payload(rng, args.strikes),
+        "heatmap": heatmap_payload(rng, args.stocks),
+        "scanner": scanner_payload(rng, args.stocks),
+    }
+
+    print(f"orjson available: {ORJSON_AVAILABLE}")
+    print(f"{'payload':<14}{'size KB':>10}{'legacy ms':>12}{'fast ms':>10}{'speedup':>10}")
+    for name, payload in payloads.items():
+        legacy = time_it(legacy_render, payload, args.repeat)
+        fast = time_it(dumps, payload, args.repeat)
+        size_kb = len(dumps(payload)) / 1024
+        print(f"{name:<14}{size_kb:>10.1f}{legacy:>12.2f}{fast:>10.2f}{legacy / fast:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
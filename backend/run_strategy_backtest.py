@@ -316,6 +316,17 @@ def main():
     json_path = save_results_json(backtest_data)
     print(f"\n📁 Results saved to: {json_path}")
     
+    # Keep full runs in the result store for later comparison
+    from services.backtest_store import get_backtest_store
+    store = get_backtest_store()
+    for name, result in backtest_data.get('results', {}).items():
+        store.save_result(
+            result, source="strategy_script", symbol="NIFTY",
+            params={'period': '1y', 'interval': '1d', 'capital': 100000, 'lot_size': 50},
+            initial_capital=100000
+        )
+    print(f"🗄️  Stored {len(backtest_data.get('results', {}))} runs in the backtest result store")
+    
     print("\n✅ Backtesting complete!")
 
 
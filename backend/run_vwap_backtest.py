@@ -36,7 +36,7 @@ except ImportError:
 from datetime import datetime, timedelta, time
 from pathlib import Path
 from typing import Dict, List, Optional
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, asdict
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -49,6 +49,8 @@ import yfinance as yf
 import pandas as pd
 import numpy as np
 
+from services.streaming_indicators import SessionVWAP, WilderRSI, RollingMean
+
 
 @dataclass
 class VWAPTrade:
@@ -118,73 +120,47 @@ class VWAPBacktester:
         self.equity_curve = [self.config.capital]
         self.max_equity = self.config.capital
         self.max_drawdown = 0.0
+        self._indicator_df: Optional[pd.DataFrame] = None
+        self._indicators: Dict[str, List[float]] = {}
     
-    def calculate_vwap(self, df: pd.DataFrame, idx: int) -> float:
-        """Calculate VWAP (or TWAP if volume unavailable) up to current candle for intraday"""
-        # Get all candles from day start up to current
-        current_time = df.iloc[idx]['timestamp']
-        if not isinstance(current_time, pd.Timestamp):
-            current_time = pd.to_datetime(current_time)
-        
-        current_date = current_time.date()
-        
-        # Filter candles for current day
-        day_mask = df['timestamp'].dt.date == current_date
-        day_indices = df.index[day_mask]
-        valid_indices = day_indices[day_indices <= idx]
-        
-        if len(valid_indices) == 0:
-            return df.iloc[idx]['close']
-        
-        day_data = df.loc[valid_indices]
+    def _prepare_indicators(self, df: pd.DataFrame):
+        """
+        Compute VWAP, RSI and volume ratio for every candle in one pass
+        using the streaming indicators (O(1) per bar).
+        """
+        if self._indicator_df is df:
+            return
         
-        # Typical Price = (High + Low + Close) / 3
-        typical_price = (day_data['high'] + day_data['low'] + day_data['close']) / 3
+        vwap = SessionVWAP()  # TWAP fallback when a day has no volume
+        rsi = WilderRSI(period=14)
+        avg_volume = RollingMean(period=20)
         
-        # Check if volume data is available
-        total_volume = day_data['volume'].sum()
+        vwaps, rsis, volume_ratios = [], [], []
+        for ts, high, low, close, volume in zip(
+            pd.to_datetime(df['timestamp']), df['high'], df['low'], df['close'], df['volume']
+        ):
+            vwaps.append(vwap.update(high, low, close, volume, session=ts.date()))
+            rsis.append(rsi.update(close))
+            volume_ratios.append(avg_volume.ratio(volume))
+            avg_volume.update(volume)
         
-        if total_volume > 0:
-            # Standard VWAP = Cumulative(TP * Volume) / Cumulative(Volume)
-            cumulative_tp_vol = (typical_price * day_data['volume']).sum()
-            return cumulative_tp_vol / total_volume
-        else:
-            # Fallback: Time-Weighted Average Price (simple average of TP)
-            return typical_price.mean()
+        self._indicators = {"vwap": vwaps, "rsi": rsis, "volume_ratio": volume_ratios}
+        self._indicator_df = df
     
-    def calculate_rsi(self, df: pd.DataFrame, idx: int, period: int = 14) -> float:
-        """Calculate RSI"""
-        if idx < period:
-            return 50.0
-        
-        close_prices = df.iloc[max(0, idx-period-1):idx+1]['close'].values
-        deltas = np.diff(close_prices)
-        
-        gains = np.where(deltas > 0, deltas, 0)
-        losses = np.where(deltas < 0, -deltas, 0)
-        
-        avg_gain = np.mean(gains[-period:]) if len(gains) >= period else np.mean(gains)
-        avg_loss = np.mean(losses[-period:]) if len(losses) >= period else np.mean(losses)
-        
-        if avg_loss == 0:
-            return 100.0
-        
-        rs = avg_gain / avg_loss
-        rsi = 100 - (100 / (1 + rs))
-        return rsi
+    def calculate_vwap(self, df: pd.DataFrame, idx: int) -> float:
+        """VWAP (or TWAP if volume unavailable) from day start up to current candle"""
+        self._prepare_indicators(df)
+        return self._indicators["vwap"][idx]
     
-    def calculate_volume_ratio(self, df: pd.DataFrame, idx: int, period: int = 20) -> float:
-        """Calculate volume ratio vs average"""
-        if idx < period:
-            return 1.0
-        
-        avg_volume = df.iloc[idx-period:idx]['volume'].mean()
-        current_volume = df.iloc[idx]['volume']
-        
-        if avg_volume == 0:
-            return 1.0
-        
-        return current_volume / avg_volume
+    def calculate_rsi(self, df: pd.DataFrame, idx: int) -> float:
+        """Wilder RSI(14) at current candle"""
+        self._prepare_indicators(df)
+        return self._indicators["rsi"][idx]
+    
+    def calculate_volume_ratio(self, df: pd.DataFrame, idx: int) -> float:
+        """Current volume vs average of the previous 20 candles"""
+        self._prepare_indicators(df)
+        return self._indicators["volume_ratio"][idx]
     
     def check_entry_signal(self, df: pd.DataFrame, idx: int) -> Optional[str]:
         """
@@ -369,6 +345,7 @@ class VWAPBacktester:
         self.max_drawdown = 0.0
         self.daily_trade_count = 0
         self.current_date = None
+        self._prepare_indicators(df)
         
         signals_found = 0
         candles_in_hours = 0
@@ -941,6 +918,17 @@ Examples:
         }, f, indent=2)
     
     print(f"\n📁 Results saved to: {results_path}")
+    
+    # Keep the full run in the result store for later comparison
+    from services.backtest_store import get_backtest_store
+    run_id = get_backtest_store().save_result(
+        result, source="vwap_script", strategy="vwap_momentum", symbol=args.symbol,
+        params={'interval': args.interval, 'days': args.days, **{
+            k: (str(v) if isinstance(v, time) else v) for k, v in asdict(config).items()
+        }},
+        initial_capital=config.capital
+    )
+    print(f"🗄️  Stored as backtest run: {run_id}")
     print("\n✅ VWAP Backtest Complete!")
 
 
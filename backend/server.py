@@ -1,3 +1,6 @@
+import time
+SERVER_IMPORT_STARTED = time.monotonic()
+
 from fastapi import FastAPI, APIRouter, HTTPException, Request, Response, Depends, Header, WebSocket, WebSocketDisconnect
 from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
@@ -15,21 +18,15 @@ from pydantic import BaseModel, Field, ConfigDict, EmailStr
 from typing import List, Optional, Dict, Any, Set
 import uuid
 from datetime import datetime, timezone, timedelta
-import yfinance as yf
+from services.startup import LazyRouterMiddleware, LazyRouters, get_startup_manager, lazy_attr, lazy_import
+yf = lazy_import("yfinance")  # ~0.5s to import: loaded on first use
 import pandas as pd
-from ta.trend import EMAIndicator, MACD, ADXIndicator
-from ta.momentum import RSIIndicator, StochasticOscillator
-from ta.volatility import BollingerBands, AverageTrueRange
-from ta.volume import VolumeWeightedAveragePrice, OnBalanceVolumeIndicator
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
 import httpx
 from cachetools import TTLCache
 from functools import lru_cache
-import time
 import numpy as np
-from google.oauth2 import id_token
-from google.auth.transport import requests as google_requests
 import json
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -83,29 +80,28 @@ try:
 except ImportError as e:
     unified_service = None
 
+from services.execution_costs import calculate_charges, order_charges
+from services.market_frame import get_market_frame, get_market_frame_ingestor
+from services.scanner_pipeline import MAX_AGE_SECONDS as SCANNER_MAX_AGE_SECONDS, get_scanner_pipeline
+from services.indicator_state import IndicatorState, get_indicator_store, history_bars
+from services.http_clients import get_http_client, get_http_client_registry
+from services.rate_limiter import Priority, get_rate_limiter
+from services.http_cache import HTTPCacheMiddleware, get_encoded_body_cache
+from services.bot_runtime import get_bot_runtime
+from services.bot_scheduler import get_bot_scheduler
+from services.bot_state_journal import get_bot_state_journal
+from services.order_execution import get_execution_metrics, notify_order_update, postback_order_id
+from services.llm_decision_cache import get_llm_decision_cache
+from services.llm_gateway import get_llm_gateway
+from services.account_state import AccountFetchError, get_account_state
+from services.json_response import ORJSON_AVAILABLE, FastJSONResponse, FastJSONRoute, fast_json_enabled, set_fast_json_enabled
+from services.market_scheduler import Phase, get_market_scheduler, parse_holidays
+
+scanner_pipeline = get_scanner_pipeline()
+
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# Helper function to convert numpy types to Python native types
-def convert_numpy_types(obj):
-    """Recursively convert numpy types to Python native types for JSON serialization"""
-    if isinstance(obj, dict):
-        return {k: convert_numpy_types(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [convert_numpy_types(item) for item in obj]
-    elif isinstance(obj, (np.integer, np.int64, np.int32)):
-        return int(obj)
-    elif isinstance(obj, (np.floating, np.float64, np.float32)):
-        return float(obj)
-    elif isinstance(obj, (np.bool_, np.ndarray)):
-        if isinstance(obj, np.ndarray):
-            return obj.tolist()
-        return bool(obj)
-    elif pd.isna(obj):
-        return None
-    else:
-        return obj
-
 # Google OAuth configuration
 GOOGLE_CLIENT_ID = os.environ.get('GOOGLE_CLIENT_ID', '')
 
@@ -197,8 +193,14 @@ auth_rate_limiter = RateLimiter()
 # Create the main app without a prefix
 app = FastAPI()
 
+# Feature routers are imported on first use (see LAZY ROUTERS at the end of this file)
+lazy_routers = LazyRouters(app)
+app.add_middleware(LazyRouterMiddleware, routers=lazy_routers)
+startup_manager = get_startup_manager()
+startup_manager.origin = SERVER_IMPORT_STARTED
+
 # Create a router with the /api prefix
-api_router = APIRouter(prefix="/api")
+api_router = APIRouter(prefix="/api", route_class=FastJSONRoute, default_response_class=FastJSONResponse)
 
 # Global exception handler to prevent crashes
 @app.exception_handler(Exception)
@@ -335,6 +337,29 @@ async def run_diagnostics():
     all_ok = all(r.get("ok", False) for r in [results["dhan"], results["gemini"], results["firestore"]])
     return {"all_ok": all_ok, "services": results}
 
+# ==================== UPSTREAM HTTP METRICS ====================
+@api_router.get("/http-clients/status")
+async def get_http_clients_status():
+    """Request counts, latency, open connections and NSE cookie age per shared HTTP client"""
+    return get_http_client_registry().get_metrics()
+
+@api_router.get("/rate-limits/status")
+async def get_rate_limits_status():
+    """Tokens, queue depth and per-lane queue wait for every upstream rate limit bucket"""
+    return get_rate_limiter().get_status()
+
+
+@api_router.get("/http-cache/status")
+async def get_http_cache_status():
+    """304 count, compression ratio and pre-compressed body cache usage"""
+    return get_encoded_body_cache().get_status()
+
+
+@api_router.get("/bot-runtime/status")
+async def get_bot_runtime_status():
+    """Shared market-data topics: subscribers, snapshot age and upstream fetches saved"""
+    return get_bot_runtime().get_status()
+
 # ==================== DATA SOURCE STATUS ENDPOINT ====================
 @api_router.get("/data-source/status")
 async def get_data_source_status():
@@ -364,6 +389,7 @@ async def get_data_source_status():
             "seconds_since_fetch": cache_info["seconds_since_fetch"]
         },
         "scanners": cache_info["scanners"],
+        "dhan_quote_batches": dhan_service.get_batch_stats() if dhan_service else {},
         "configuration": {
             "refresh_interval_minutes": 3,
             "persist_days": 5,
@@ -441,9 +467,7 @@ class ConnectionManager:
         self._lock = asyncio.Lock()
         # Price cache for quick lookups
         self.price_cache: Dict[str, Dict[str, Any]] = {}
-        # Background task reference
-        self.broadcast_task: Optional[asyncio.Task] = None
-        # Running flag
+        # Running flag (prices are broadcast by the market scheduler)
         self.is_running = False
     
     async def connect(self, websocket: WebSocket):
@@ -655,48 +679,34 @@ async def fetch_realtime_prices(symbols: Set[str]) -> Dict[str, Dict[str, Any]]:
     
     return results
 
-async def price_broadcast_loop():
-    """Background task that broadcasts price updates and checks alerts"""
-    logging.info("Starting price broadcast loop")
-    ws_manager.is_running = True
+async def broadcast_prices_once():
+    """
+    Broadcast price updates to WebSocket subscribers and check alerts.
+    Scheduled by the market scheduler (every few seconds while the market is
+    live, not at all once it has closed).
+    """
+    # Get all subscribed symbols
+    symbols = ws_manager.get_all_subscribed_symbols()
     
-    while ws_manager.is_running:
-        try:
-            # Get all subscribed symbols
-            symbols = ws_manager.get_all_subscribed_symbols()
-            
-            # Also get symbols from active alerts
-            try:
-                active_alerts = await db.price_alerts.find({"status": "active"}).to_list(1000)
-                alert_symbols = set(f"{a.get('symbol', '')}.NS" for a in active_alerts if a.get('symbol'))
-                symbols = symbols.union(alert_symbols)
-            except Exception as e:
-                logging.warning(f"Could not fetch alert symbols: {e}")
-            
-            if symbols:
-                # Fetch prices
-                prices = await fetch_realtime_prices(symbols)
-                
-                # Broadcast to subscribers
-                if ws_manager.get_connection_count() > 0:
-                    for symbol, price_data in prices.items():
-                        await ws_manager.broadcast_to_symbol(symbol, price_data)
-                
-                # Check alerts against current prices
-                await check_and_trigger_alerts(prices)
-            
-            # Wait before next update (configurable interval)
-            await asyncio.sleep(5)  # Update every 5 seconds
-            
-        except asyncio.CancelledError:
-            logging.info("Price broadcast loop cancelled")
-            break
-        except Exception as e:
-            logging.error(f"Error in price broadcast loop: {e}")
-            await asyncio.sleep(5)
+    # Also get symbols from active alerts
+    try:
+        active_alerts = await db.price_alerts.find({"status": "active"}).to_list(1000)
+        alert_symbols = set(f"{a.get('symbol', '')}.NS" for a in active_alerts if a.get('symbol'))
+        symbols = symbols.union(alert_symbols)
+    except Exception as e:
+        logging.warning(f"Could not fetch alert symbols: {e}")
     
-    ws_manager.is_running = False
-    logging.info("Price broadcast loop stopped")
+    if symbols:
+        # Fetch prices
+        prices = await fetch_realtime_prices(symbols)
+        
+        # Broadcast to subscribers
+        if ws_manager.get_connection_count() > 0:
+            for symbol, price_data in prices.items():
+                await ws_manager.broadcast_to_symbol(symbol, price_data)
+        
+        # Check alerts against current prices
+        await check_and_trigger_alerts(prices)
 
 # ==================== NSE INDIA OFFICIAL API INTEGRATION ====================
 class NSEIndia:
@@ -796,26 +806,16 @@ class NSEIndia:
     
     @staticmethod
     async def get_session_cookies():
-        """Get session cookies by visiting NSE homepage first"""
+        """Get session cookies from the shared, homepage-warmed NSE cookie jar"""
         try:
-            # Don't request gzip for initial cookie request
-            headers = dict(NSEIndia.HEADERS)
-            headers.pop('Accept-Encoding', None)
-            
-            async with httpx.AsyncClient(follow_redirects=True, timeout=30) as client:
-                # First visit homepage to get cookies
-                response = await client.get(
-                    NSEIndia.BASE_URL,
-                    headers=headers
-                )
-                return dict(response.cookies)
+            return await get_http_client_registry().ensure_nse_cookies()
         except Exception as e:
             logging.error(f"Error getting NSE session: {e}")
             return {}
     
     @staticmethod
     async def fetch(endpoint: str, params: dict = None, use_cache: bool = True) -> dict:
-        """Fetch data from NSE API with proper session handling"""
+        """Fetch data from NSE API over the pooled NSE session"""
         cache_key = f"nse_{endpoint}_{str(params)}"
         
         # Check cache first
@@ -823,41 +823,26 @@ class NSEIndia:
             return NSE_CACHE[cache_key]
         
         try:
-            # Get fresh cookies
-            cookies = await NSEIndia.get_session_cookies()
-            
             url = f"{NSEIndia.API_URL}{endpoint}"
             
-            # Don't include Accept-Encoding to avoid gzip issues
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Accept': 'application/json, text/plain, */*',
-                'Accept-Language': 'en-US,en;q=0.9',
-                'Connection': 'keep-alive',
-                'Referer': 'https://www.nseindia.com/'
-            }
+            # Shared 1 req/sec NSE budget; warms cookies as needed and retries
+            # once with fresh ones on 401/403
+            await get_rate_limiter().acquire("nse")
+            response = await get_http_client_registry().nse_get(url, params=params)
             
-            async with httpx.AsyncClient(follow_redirects=True, timeout=30) as client:
-                response = await client.get(
-                    url,
-                    headers=headers,
-                    params=params,
-                    cookies=cookies
-                )
-                
-                if response.status_code == 200:
-                    try:
-                        data = response.json()
-                        # Cache the result
-                        if use_cache:
-                            NSE_CACHE[cache_key] = data
-                        return data
-                    except Exception as json_error:
-                        logging.error(f"JSON decode error for NSE {endpoint}: {json_error}")
-                        return {}
-                else:
-                    logging.warning(f"NSE API returned {response.status_code} for {endpoint}")
+            if response.status_code == 200:
+                try:
+                    data = response.json()
+                    # Cache the result
+                    if use_cache:
+                        NSE_CACHE[cache_key] = data
+                    return data
+                except Exception as json_error:
+                    logging.error(f"JSON decode error for NSE {endpoint}: {json_error}")
                     return {}
+            else:
+                logging.warning(f"NSE API returned {response.status_code} for {endpoint}")
+                return {}
                     
         except Exception as e:
             logging.error(f"Error fetching from NSE {endpoint}: {e}")
@@ -2071,10 +2056,11 @@ def fetch_stock_data_sync(symbol: str) -> Optional[Dict]:
         volume = int(hist['Volume'].iloc[-1])
         avg_volume = float(hist['Volume'].mean())
         
-        # Calculate EMA for swing analysis
-        if len(hist) >= 50:
-            ema_50 = float(EMAIndicator(hist['Close'], window=50).ema_indicator().iloc[-1])
-            ema_200 = float(EMAIndicator(hist['Close'], window=200).ema_indicator().iloc[-1]) if len(hist) >= 200 else ema_50
+        # EMA for swing analysis from the symbol's incremental indicator state
+        indicators = get_indicator_store().update_history(symbol, hist)
+        if indicators.get("bars", 0) >= 50:
+            ema_50 = float(indicators["ema_50"])
+            ema_200 = float(indicators["ema_200"])
         else:
             ema_50 = ema_200 = current_price
         
@@ -2105,7 +2091,7 @@ def fetch_stock_data_sync(symbol: str) -> Optional[Dict]:
         logging.error(f"Error fetching {symbol}: {e}")
         return None
 
-async def fetch_stock_data(symbol: str) -> Optional[Dict]:
+async def fetch_stock_data(symbol: str, try_dhan: bool = True) -> Optional[Dict]:
     """Async function to fetch stock data - tries Dhan first, then Yahoo Finance"""
     # Check cache first
     if symbol in STOCK_CACHE:
@@ -2114,7 +2100,7 @@ async def fetch_stock_data(symbol: str) -> Optional[Dict]:
     clean_symbol = symbol.replace(".NS", "").replace(".BO", "").upper()
     
     # Try Dhan API first for real-time data
-    if DhanAPI.is_configured():
+    if try_dhan and DhanAPI.is_configured():
         security_id = DHAN_SECURITY_IDS.get(clean_symbol)
         if security_id:
             try:
@@ -2187,22 +2173,84 @@ async def fetch_index_data(symbol: str) -> Dict:
     loop = asyncio.get_event_loop()
     return await loop.run_in_executor(executor, fetch_index_data_sync, symbol)
 
-async def fetch_stocks_batch(symbols: List[str], delay: float = 0.1) -> List[Optional[Dict]]:
-    """Fetch multiple stocks with rate limiting"""
-    results = []
+async def fetch_dhan_quotes_batched(symbols: List[str], priority: Priority = None) -> Dict[str, Dict]:
+    """
+    Quotes for many symbols from Dhan in as few /marketfeed/quote requests as
+    possible (up to 1000 instruments each) via DhanUnifiedService.
+    
+    Returns {symbol: stock data} (fetch_stock_data layout) for the symbols
+    Dhan returned; cached symbols are served from STOCK_CACHE.
+    """
+    results: Dict[str, Dict] = {}
+    pending: Dict[int, List[str]] = {}
+    for symbol in symbols:
+        if symbol in STOCK_CACHE:
+            results[symbol] = STOCK_CACHE[symbol]
+            continue
+        security_id = DHAN_SECURITY_IDS.get(symbol.replace(".NS", "").replace(".BO", "").upper())
+        if security_id:
+            pending.setdefault(security_id, []).append(symbol)
+    
+    if not pending or not dhan_service or not dhan_service.access_token or not DhanAPI.is_configured():
+        return results
+    
+    try:
+        quotes = await dhan_service.get_quotes_batched({DhanAPI.NSE_EQ: list(pending)}, priority=priority)
+    except Exception as dhan_err:
+        logging.warning(f"Dhan batched quote fetch failed: {dhan_err}")
+        return results
+    
+    for security_id, batch_symbols in pending.items():
+        quote = quotes.get(str(security_id))
+        if not quote or not quote.get("ltp"):
+            continue
+        ltp = float(quote["ltp"])
+        prev_close = float(quote.get("close") or ltp)
+        for symbol in batch_symbols:
+            clean_symbol = symbol.replace(".NS", "").replace(".BO", "").upper()
+            result = {
+                "symbol": clean_symbol,
+                "name": clean_symbol,
+                "price": ltp,
+                "change": ltp - prev_close,
+                "change_pct": ((ltp - prev_close) / prev_close * 100) if prev_close else 0.0,
+                "volume": int(quote.get("volume", 0)),
+                "avg_volume": int(quote.get("volume", 0)),
+                "volume_ratio": 1.0,
+                "ema_50": ltp,
+                "ema_200": ltp,
+                "prev_close": prev_close,
+                "oi_change": 0,
+                "high": float(quote.get("high") or ltp),
+                "low": float(quote.get("low") or ltp),
+                "open": float(quote.get("open") or ltp),
+                "source": "dhan"
+            }
+            STOCK_CACHE[symbol] = result
+            results[symbol] = result
+    return results
+
+async def fetch_stocks_batch(symbols: List[str], delay: float = 0.1, priority: Priority = None) -> List[Optional[Dict]]:
+    """
+    Fetch multiple stocks: one batched Dhan quote request for the whole list
+    (in the given rate limiter lane), then Yahoo Finance (5 at a time, rate
+    limited) for whatever Dhan missed
+    """
+    found = await fetch_dhan_quotes_batched(symbols, priority)
+    missing = [symbol for symbol in symbols if symbol not in found]
     batch_size = 5  # Process 5 at a time
     
-    for i in range(0, len(symbols), batch_size):
-        batch = symbols[i:i + batch_size]
-        tasks = [fetch_stock_data(symbol) for symbol in batch]
+    for i in range(0, len(missing), batch_size):
+        batch = missing[i:i + batch_size]
+        tasks = [fetch_stock_data(symbol, try_dhan=False) for symbol in batch]
         batch_results = await asyncio.gather(*tasks)
-        results.extend(batch_results)
+        found.update({symbol: result for symbol, result in zip(batch, batch_results) if result})
         
         # Add delay between batches to prevent rate limiting
-        if i + batch_size < len(symbols):
+        if i + batch_size < len(missing):
             await asyncio.sleep(delay)
     
-    return results
+    return [found.get(symbol) for symbol in symbols]
 
 
 # ==================== CENTRALIZED DATA CACHE ====================
@@ -2214,23 +2262,9 @@ async def fetch_all_fno_stocks_for_cache() -> List[Dict]:
     """
     logging.info(f"Starting to fetch {len(FNO_STOCKS)} FNO stocks for cache...")
     
-    all_stocks = []
-    batch_size = 10
-    
-    for i in range(0, len(FNO_STOCKS), batch_size):
-        batch = FNO_STOCKS[i:i + batch_size]
-        logging.info(f"Fetching batch {i//batch_size + 1}/{(len(FNO_STOCKS) + batch_size - 1)//batch_size}")
-        
-        tasks = [fetch_stock_data(symbol) for symbol in batch]
-        results = await asyncio.gather(*tasks)
-        
-        for result in results:
-            if result:
-                all_stocks.append(result)
-        
-        # Delay between batches
-        if i + batch_size < len(FNO_STOCKS):
-            await asyncio.sleep(0.2)
+    # Whole universe in one batched Dhan request; Yahoo only for the gaps
+    results = await fetch_stocks_batch(FNO_STOCKS, delay=0.2, priority=Priority.LOW)
+    all_stocks = [result for result in results if result]
     
     logging.info(f"API fetch complete: {len(all_stocks)} stocks fetched successfully")
     return all_stocks
@@ -2238,15 +2272,19 @@ async def fetch_all_fno_stocks_for_cache() -> List[Dict]:
 
 async def get_stocks_fresh(symbols: List[str] = None) -> List[Dict]:
     """
-    Get stock data directly from API (no cache).
-    This is the main function scanners should use.
+    Get stock data for scanners.
+    Served from the shared market frame (refreshed in the background);
+    only symbols missing from the frame are fetched from the API.
     """
-    logging.info("Fetching fresh data from API...")
-    
-    if symbols:
-        return await fetch_stocks_batch(symbols, delay=0.15)
-    else:
-        return await fetch_stocks_batch(FNO_STOCKS[:50], delay=0.15)
+    symbols = symbols or FNO_STOCKS[:50]
+    frame = await get_market_frame()
+    rows, missing = frame.rows_for(symbols)
+    
+    results = frame.to_quotes(rows)
+    if missing:
+        logging.info(f"Fetching {len(missing)} stocks missing from market frame v{frame.version}...")
+        results.extend(await fetch_stocks_batch(missing, delay=0.15))
+    return results
 
 
 async def get_single_stock_fresh(symbol: str) -> Optional[Dict]:
@@ -2731,6 +2769,9 @@ async def google_auth(request: Request, response: Response):
             # Verify the Google JWT credential with clock tolerance
             try:
                 logging.info("🔍 Verifying Google JWT token...")
+                # google.auth costs ~250ms to import; only JWT logins need it
+                from google.oauth2 import id_token
+                from google.auth.transport import requests as google_requests
                 idinfo = id_token.verify_oauth2_token(
                     credential, 
                     google_requests.Request(), 
@@ -4474,9 +4515,34 @@ def get_dhan_api_base(is_sandbox: bool = False):
     """Get Dhan API base URL"""
     return DHAN_API_SANDBOX if is_sandbox else DHAN_API_PROD
 
-@api_router.get("/dhan/funds")
-async def get_dhan_funds(request: Request):
-    """Get user's fund/margin details from Dhan"""
+async def _dhan_user_get(access_token: str, client_id: str, api_base: str, path: str, key: Optional[str] = None):
+    """GET a Dhan account endpoint with the user's token; the loader behind the cached /dhan routes"""
+    response = await get_http_client("dhan").get(
+        f"{api_base}/{path}",
+        headers={
+            "access-token": access_token,
+            "client-id": client_id or "",
+            "Content-Type": "application/json"
+        },
+        timeout=15.0
+    )
+    logger.info(f"Dhan {path} response: {response.status_code}")
+    if response.status_code == 200:
+        data = response.json()
+        if key is None:
+            return data
+        return data if isinstance(data, list) else data.get('data', data.get(key, []))
+    if response.status_code == 401:
+        raise AccountFetchError(401, "Invalid or expired access token. Please generate a new token from web.dhan.co")
+    logger.error(f"Dhan {path} error: {response.text}")
+    raise AccountFetchError(response.status_code, f"Dhan API error: {response.text}")
+
+async def _read_dhan_account(request: Request, section: str, refresh: bool) -> Dict:
+    """
+    Positions / funds / orders of the user's Dhan account from account state:
+    served from memory while fresh, refreshed in the background and on
+    order postbacks / order-update stream events.
+    """
     access_token = request.headers.get("X-Dhan-Token") or request.headers.get("x-dhan-token")
     client_id = request.headers.get("X-Dhan-Client") or request.headers.get("x-dhan-client")
     is_sandbox = request.headers.get("X-Dhan-Sandbox", "").lower() == "true"
@@ -4485,34 +4551,26 @@ async def get_dhan_funds(request: Request):
         raise HTTPException(status_code=400, detail="Access token required in X-Dhan-Token header")
     
     api_base = get_dhan_api_base(is_sandbox)
+    state = get_account_state()
+    account = state.register("dhan", access_token, {
+        "funds": lambda: _dhan_user_get(access_token, client_id, api_base, "fundlimit"),
+        "positions": lambda: _dhan_user_get(access_token, client_id, api_base, "positions", key="positions"),
+        "orders": lambda: _dhan_user_get(access_token, client_id, api_base, "orders", key="orders"),
+    }, client_id=client_id)
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{api_base}/fundlimit",
-                headers={
-                    "access-token": access_token,
-                    "client-id": client_id or "",
-                    "Content-Type": "application/json"
-                },
-                timeout=15.0
-            )
-            
-            logger.info(f"Dhan funds response: {response.status_code}")
-            
-            if response.status_code == 200:
-                return {"success": True, "data": response.json()}
-            elif response.status_code == 401:
-                raise HTTPException(status_code=401, detail="Invalid or expired access token. Please generate a new token from web.dhan.co")
-            else:
-                error_detail = response.text
-                logger.error(f"Dhan funds error: {error_detail}")
-                raise HTTPException(status_code=response.status_code, detail=f"Dhan API error: {error_detail}")
-    except HTTPException:
-        raise
+        view = await state.read(account, section, force=refresh)
+    except AccountFetchError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
     except Exception as e:
-        logger.error(f"Dhan funds error: {e}")
+        logger.error(f"Dhan {section} error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    return {"success": True, "data": view.data, **view.meta()}
+
+@api_router.get("/dhan/funds")
+async def get_dhan_funds(request: Request, refresh: bool = False):
+    """Get user's fund/margin details from Dhan (cached, ?refresh=true bypasses)"""
+    return await _read_dhan_account(request, "funds", refresh)
 
 @api_router.get("/dhan/holdings")
 async def get_dhan_holdings(request: Request):
@@ -4560,74 +4618,14 @@ async def get_dhan_holdings(request: Request):
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/dhan/positions")
-async def get_dhan_positions(request: Request):
-    """Get user's open positions from Dhan"""
-    access_token = request.headers.get("X-Dhan-Token") or request.headers.get("x-dhan-token")
-    client_id = request.headers.get("X-Dhan-Client") or request.headers.get("x-dhan-client")
-    
-    if not access_token:
-        raise HTTPException(status_code=400, detail="Access token required in X-Dhan-Token header")
-    
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{DHAN_API_BASE}/positions",
-                headers={
-                    "access-token": access_token,
-                    "client-id": client_id or "",
-                    "Content-Type": "application/json"
-                },
-                timeout=15.0
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                positions = data if isinstance(data, list) else data.get('data', data.get('positions', []))
-                return {"success": True, "data": positions}
-            elif response.status_code == 401:
-                raise HTTPException(status_code=401, detail="Invalid or expired access token")
-            else:
-                raise HTTPException(status_code=response.status_code, detail=f"Dhan API error: {response.text}")
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Dhan positions error: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+async def get_dhan_positions(request: Request, refresh: bool = False):
+    """Get user's open positions from Dhan (cached, ?refresh=true bypasses)"""
+    return await _read_dhan_account(request, "positions", refresh)
 
 @api_router.get("/dhan/orders")
-async def get_dhan_orders(request: Request):
-    """Get user's orders for today from Dhan"""
-    access_token = request.headers.get("X-Dhan-Token") or request.headers.get("x-dhan-token")
-    client_id = request.headers.get("X-Dhan-Client") or request.headers.get("x-dhan-client")
-    
-    if not access_token:
-        raise HTTPException(status_code=400, detail="Access token required in X-Dhan-Token header")
-    
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{DHAN_API_BASE}/orders",
-                headers={
-                    "access-token": access_token,
-                    "client-id": client_id or "",
-                    "Content-Type": "application/json"
-                },
-                timeout=15.0
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                orders = data if isinstance(data, list) else data.get('data', data.get('orders', []))
-                return {"success": True, "data": orders}
-            elif response.status_code == 401:
-                raise HTTPException(status_code=401, detail="Invalid or expired access token")
-            else:
-                raise HTTPException(status_code=response.status_code, detail=f"Dhan API error: {response.text}")
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Dhan orders error: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+async def get_dhan_orders(request: Request, refresh: bool = False):
+    """Get user's orders for today from Dhan (cached, ?refresh=true bypasses)"""
+    return await _read_dhan_account(request, "orders", refresh)
 
 @api_router.get("/dhan/trades")
 async def get_dhan_trades(request: Request):
@@ -6002,77 +6000,30 @@ async def backtest_strategy(request: StrategyBacktestRequest):
 
 # ==================== ADVANCED TECHNICAL ANALYSIS ====================
 
-def calculate_technical_indicators(hist: pd.DataFrame) -> Dict:
-    """Calculate comprehensive technical indicators for a stock"""
-    if hist.empty or len(hist) < 20:
-        return {}
-    
-    close = hist['Close']
-    high = hist['High']
-    low = hist['Low']
-    volume = hist['Volume']
+def calculate_technical_indicators(hist: pd.DataFrame, symbol: str = None) -> Dict:
+    """
+    Calculate comprehensive technical indicators for a stock.
     
-    indicators = {}
+    With a symbol, the bars update that symbol's persisted incremental state
+    (only bars it has not seen are applied) and the result is a lookup.
+    Without one, the state is built from hist alone.
+    """
+    if hist.empty:
+        return get_indicator_store().get(symbol) if symbol else {}
     
     try:
-        # RSI
-        rsi = RSIIndicator(close, window=14)
-        indicators['rsi'] = float(rsi.rsi().iloc[-1]) if not pd.isna(rsi.rsi().iloc[-1]) else 50
-        
-        # MACD
-        macd = MACD(close)
-        indicators['macd'] = float(macd.macd().iloc[-1]) if not pd.isna(macd.macd().iloc[-1]) else 0
-        indicators['macd_signal'] = float(macd.macd_signal().iloc[-1]) if not pd.isna(macd.macd_signal().iloc[-1]) else 0
-        indicators['macd_histogram'] = float(macd.macd_diff().iloc[-1]) if not pd.isna(macd.macd_diff().iloc[-1]) else 0
-        
-        # EMAs
-        ema_20 = EMAIndicator(close, window=20).ema_indicator()
-        ema_50 = EMAIndicator(close, window=50).ema_indicator()
-        ema_200 = EMAIndicator(close, window=200).ema_indicator() if len(hist) >= 200 else ema_50
-        
-        indicators['ema_20'] = float(ema_20.iloc[-1]) if not pd.isna(ema_20.iloc[-1]) else float(close.iloc[-1])
-        indicators['ema_50'] = float(ema_50.iloc[-1]) if not pd.isna(ema_50.iloc[-1]) else float(close.iloc[-1])
-        indicators['ema_200'] = float(ema_200.iloc[-1]) if not pd.isna(ema_200.iloc[-1]) else float(close.iloc[-1])
-        
-        # Bollinger Bands
-        bb = BollingerBands(close)
-        indicators['bb_upper'] = float(bb.bollinger_hband().iloc[-1]) if not pd.isna(bb.bollinger_hband().iloc[-1]) else float(close.iloc[-1])
-        indicators['bb_lower'] = float(bb.bollinger_lband().iloc[-1]) if not pd.isna(bb.bollinger_lband().iloc[-1]) else float(close.iloc[-1])
-        indicators['bb_middle'] = float(bb.bollinger_mavg().iloc[-1]) if not pd.isna(bb.bollinger_mavg().iloc[-1]) else float(close.iloc[-1])
-        
-        # ATR (Average True Range)
-        atr = AverageTrueRange(high, low, close)
-        indicators['atr'] = float(atr.average_true_range().iloc[-1]) if not pd.isna(atr.average_true_range().iloc[-1]) else 0
-        
-        # Volume analysis
-        avg_volume = float(volume.mean())
-        current_volume = float(volume.iloc[-1])
-        indicators['volume_ratio'] = current_volume / avg_volume if avg_volume > 0 else 1
-        
-        # OBV trend
-        obv = OnBalanceVolumeIndicator(close, volume)
-        obv_values = obv.on_balance_volume()
-        if len(obv_values) >= 5:
-            indicators['obv_trend'] = "bullish" if obv_values.iloc[-1] > obv_values.iloc[-5] else "bearish"
-        else:
-            indicators['obv_trend'] = "neutral"
-        
-        # ADX (Trend Strength)
-        if len(hist) >= 14:
-            adx = ADXIndicator(high, low, close)
-            indicators['adx'] = float(adx.adx().iloc[-1]) if not pd.isna(adx.adx().iloc[-1]) else 0
-        else:
-            indicators['adx'] = 0
-        
-        # Stochastic
-        stoch = StochasticOscillator(high, low, close)
-        indicators['stoch_k'] = float(stoch.stoch().iloc[-1]) if not pd.isna(stoch.stoch().iloc[-1]) else 50
-        indicators['stoch_d'] = float(stoch.stoch_signal().iloc[-1]) if not pd.isna(stoch.stoch_signal().iloc[-1]) else 50
+        if symbol:
+            return get_indicator_store().update_history(symbol, hist)
         
+        if len(hist) < 20:
+            return {}
+        state = IndicatorState()
+        for bar in history_bars(hist):
+            state.update(*bar)
+        return state.indicators()
     except Exception as e:
         logging.error(f"Error calculating indicators: {e}")
-    
-    return indicators
+        return {}
 
 def calculate_swing_score(stock_data: Dict, indicators: Dict) -> Dict:
     """
@@ -6412,9 +6363,16 @@ async def get_swing_spectrum():
         for symbol in all_stocks:
             try:
                 ticker = yf.Ticker(symbol)
-                hist = ticker.history(period="3mo")  # Need more data for indicators
+                # Full history only when the symbol has no recent indicator state
+                hist = ticker.history(period=get_indicator_store().history_period(symbol, "3mo"))
+                
+                if len(hist) < 2:
+                    continue
+                
+                # Update the symbol's indicator state with the new bars
+                indicators = calculate_technical_indicators(hist, symbol)
                 
-                if hist.empty or len(hist) < 50:
+                if not indicators or indicators["bars"] < 50:
                     continue
                 
                 current_price = float(hist['Close'].iloc[-1])
@@ -6426,16 +6384,10 @@ async def get_swing_spectrum():
                     "price": current_price,
                     "change_pct": change_pct,
                     "volume": float(hist['Volume'].iloc[-1]),
-                    "avg_volume": float(hist['Volume'].mean())
+                    "avg_volume": float(indicators["avg_volume"])
                 }
                 stock_data["volume_ratio"] = stock_data["volume"] / stock_data["avg_volume"] if stock_data["avg_volume"] > 0 else 1
                 
-                # Calculate technical indicators
-                indicators = calculate_technical_indicators(hist)
-                
-                if not indicators:
-                    continue
-                
                 # Calculate swing score
                 swing_analysis = calculate_swing_score(stock_data, indicators)
                 
@@ -6495,7 +6447,7 @@ async def get_stock_analysis(symbol: str):
         ticker_symbol = f"{symbol.upper()}.NS" if not symbol.upper().endswith(".NS") else symbol.upper()
         
         ticker = yf.Ticker(ticker_symbol)
-        hist = ticker.history(period="6mo")
+        hist = ticker.history(period=get_indicator_store().history_period(ticker_symbol, "6mo"))
         info = ticker.info
         
         if hist.empty:
@@ -6505,8 +6457,8 @@ async def get_stock_analysis(symbol: str):
         prev_close = float(hist['Close'].iloc[-2]) if len(hist) > 1 else current_price
         change_pct = ((current_price - prev_close) / prev_close) * 100
         
-        # Calculate all indicators
-        indicators = calculate_technical_indicators(hist)
+        # Calculate all indicators (incremental per-symbol state)
+        indicators = calculate_technical_indicators(hist, ticker_symbol)
         
         stock_data = {
             "symbol": symbol.upper().replace(".NS", ""),
@@ -6514,7 +6466,7 @@ async def get_stock_analysis(symbol: str):
             "price": current_price,
             "change_pct": change_pct,
             "volume": float(hist['Volume'].iloc[-1]),
-            "avg_volume": float(hist['Volume'].mean())
+            "avg_volume": float(indicators.get("avg_volume", hist['Volume'].mean()))
         }
         stock_data["volume_ratio"] = stock_data["volume"] / stock_data["avg_volume"] if stock_data["avg_volume"] > 0 else 1
         
@@ -8569,9 +8521,15 @@ async def fetch_enhanced_stock_data(symbol: str) -> Optional[Dict]:
 
 
 # ==================== SCANNER ROUTES ====================
+# No-argument scanners are registered with the scanner pipeline: they run once
+# per market frame refresh and are served as cached JSON bytes with an ETag.
+
+@api_router.get("/scanners/pipeline/status")
+async def get_scanner_pipeline_status():
+    """Version, age, size and last error of every precomputed scanner"""
+    return scanner_pipeline.get_status()
 
-@api_router.get("/scanners/gainers")
-@api_router.get("/scanners/day-gainers")
+@scanner_pipeline.scanner(api_router, "/scanners/gainers", "/scanners/day-gainers", name="day-gainers")
 async def get_day_gainers():
     """
     Advanced Day Gainers Scanner
@@ -8670,8 +8628,7 @@ async def get_day_gainers():
         logging.error(f"Error fetching day gainers: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@api_router.get("/scanners/losers")
-@api_router.get("/scanners/day-losers")
+@scanner_pipeline.scanner(api_router, "/scanners/losers", "/scanners/day-losers", name="day-losers")
 async def get_day_losers():
     """
     Advanced Day Losers Scanner v2.0
@@ -8937,7 +8894,7 @@ async def get_day_losers():
         logging.error(f"Error fetching day losers: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@api_router.get("/scanners/high-volume")
+@scanner_pipeline.scanner(api_router, "/scanners/high-volume")
 async def get_high_volume_scanner():
     """
     Advanced High Volume Scanner v2.0
@@ -9174,7 +9131,7 @@ async def get_high_volume_scanner():
         logging.error(f"Error fetching high volume: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@api_router.get("/scanners/swing")
+@scanner_pipeline.scanner(api_router, "/scanners/swing")
 async def get_swing_scanner():
     """
     Advanced Swing Trading Scanner v2.0
@@ -9477,8 +9434,7 @@ async def get_swing_scanner():
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@api_router.get("/scanners/reversals")
-@api_router.get("/scanners/reversal-radar")
+@scanner_pipeline.scanner(api_router, "/scanners/reversals", "/scanners/reversal-radar", name="reversal-radar")
 async def get_reversal_radar():
     """
     Reversal Radar Scanner v2.0
@@ -9740,8 +9696,7 @@ async def get_reversal_radar():
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@api_router.get("/scanners/breakouts")
-@api_router.get("/scanners/breakout-beacon")
+@scanner_pipeline.scanner(api_router, "/scanners/breakouts", "/scanners/breakout-beacon", name="breakout-beacon")
 async def get_breakout_beacon():
     """
     Breakout Beacon Scanner v2.0
@@ -10280,7 +10235,7 @@ async def get_vwap_momentum_scanner(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@api_router.get("/scanners/option-apex")
+@scanner_pipeline.scanner(api_router, "/scanners/option-apex")
 async def get_option_apex():
     """
     Option Apex Scanner - TradeFinder Style
@@ -10650,7 +10605,7 @@ async def get_positional_buildups(buildup_type: str = "long_buildup"):
         logging.error(f"Error fetching buildups: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@api_router.get("/scanners/sector-rotation")
+@scanner_pipeline.scanner(api_router, "/scanners/sector-rotation")
 async def get_sector_rotation():
     """Analyze sector-wise performance"""
     try:
@@ -10685,7 +10640,7 @@ async def get_sector_rotation():
 
 
 # ==================== OPTION CLOCK - TradeFinder Style ====================
-@api_router.get("/scanners/option-clock")
+@scanner_pipeline.scanner(api_router, "/scanners/option-clock")
 async def get_option_clock():
     """
     Option Clock - Time-based OI Analysis like TradeFinder
@@ -10789,7 +10744,7 @@ async def get_option_clock():
 
 
 # ==================== INSIDER STRATEGY - TradeFinder Style ====================
-@api_router.get("/scanners/insider-strategy")
+@scanner_pipeline.scanner(api_router, "/scanners/insider-strategy")
 async def get_insider_strategy():
     """
     Insider Strategy Scanner - TradeFinder Style
@@ -10869,7 +10824,7 @@ async def get_insider_strategy():
 
 
 # ==================== SECTOR SCOPE - TradeFinder Style ====================
-@api_router.get("/scanners/sector-scope")
+@scanner_pipeline.scanner(api_router, "/scanners/sector-scope")
 async def get_sector_scope():
     """
     Sector Scope - Deep sector analysis like TradeFinder
@@ -10969,33 +10924,29 @@ async def get_fno_stocks():
     try:
         fno_list = []
         
-        # Use Dhan API as primary source
-        if dhan_service:
-            stocks = await dhan_service.get_fno_stocks_data()
+        # Shared market frame (Dhan API primary), sorted by absolute change percentage
+        frame = await get_market_frame()
+        order = np.argsort(-np.abs(frame["change_percent"]), kind="stable")
+        for stock in frame.to_records(order):
+            symbol = stock['symbol']
+            change_pct = stock['change_percent']
+            price = stock['ltp']
+            volume = stock['volume']
             
-            for stock in stocks:
-                symbol = stock.get('symbol', '')
-                change_pct = stock.get('change_percent', 0)
-                price = stock.get('ltp', 0)
-                volume = stock.get('volume', 0)
-                
-                fno_list.append({
-                    "symbol": symbol,
-                    "name": symbol,
-                    "price": f"₹{price:.2f}",
-                    "change": f"{'+' if change_pct >= 0 else ''}{change_pct:.2f}%",
-                    "change_pct": change_pct,
-                    "volume": f"{volume/1000000:.1f}M" if volume > 0 else "0M",
-                    "type": "GAINER" if change_pct > 0 else "LOSER" if change_pct < 0 else "NEUTRAL",
-                    "volume_ratio": 1.0,
-                    "high": stock.get('high', price),
-                    "low": stock.get('low', price),
-                    "open": stock.get('open', price),
-                    "data_source": "dhan"
-                })
-            
-            # Sort by absolute change percentage
-            fno_list.sort(key=lambda x: abs(x.get('change_pct', 0)), reverse=True)
+            fno_list.append({
+                "symbol": symbol,
+                "name": symbol,
+                "price": f"₹{price:.2f}",
+                "change": f"{'+' if change_pct >= 0 else ''}{change_pct:.2f}%",
+                "change_pct": change_pct,
+                "volume": f"{volume/1000000:.1f}M" if volume > 0 else "0M",
+                "type": "GAINER" if change_pct > 0 else "LOSER" if change_pct < 0 else "NEUTRAL",
+                "volume_ratio": 1.0,
+                "high": stock['high'],
+                "low": stock['low'],
+                "open": stock['open'],
+                "data_source": "dhan"
+            })
         
         # Fallback to NSE API if Dhan not available
         if not fno_list:
@@ -13419,7 +13370,7 @@ async def get_nse_fii_dii_direct():
 
 # ==================== MARKET PULSE SCANNER ====================
 
-@api_router.get("/scanners/market-pulse")
+@scanner_pipeline.scanner(api_router, "/scanners/market-pulse")
 async def get_market_pulse():
     """
     Market Pulse - Real-time momentum scanner for day trading
@@ -17265,6 +17216,178 @@ async def websocket_status():
         "symbols": list(ws_manager.get_all_subscribed_symbols())
     }
 
+# ==================== MARKET SCHEDULER ====================
+# Every periodic refresh runs here, timed by NSE session phase. Cadences are
+# seconds between runs; phases left out do not run at all, so upstream
+# traffic stops when the market is closed.
+
+MARKET_FRAME_CADENCE = {Phase.PRE_OPEN: 60, Phase.LIVE: 30, Phase.POST_CLOSE: 300}
+UNIFIED_CACHE_CADENCE = {Phase.LIVE: 180, Phase.POST_CLOSE: 900}
+PRICE_BROADCAST_CADENCE = {Phase.PRE_OPEN: 10, Phase.LIVE: 3, Phase.POST_CLOSE: 30}
+HOLIDAY_CALENDAR_CADENCE = {phase: 24 * 3600 for phase in Phase}
+# Age at which readers refetch cached data when no refresh is scheduled
+CLOSED_MAX_AGE_SECONDS = 6 * 3600
+
+market_scheduler = get_market_scheduler()
+market_scheduler.calendar.set_holidays(parse_holidays(MARKET_HOLIDAYS))
+
+
+async def refresh_market_holidays():
+    """Replace the local holiday list with NSE's holiday master when available"""
+    holidays = parse_holidays(await NSEIndia.get_market_holidays())
+    if holidays:
+        market_scheduler.calendar.set_holidays(holidays)
+
+
+def apply_market_phase(phase: Phase):
+    """Match cache max-ages to the phase cadence so readers do not refetch between scheduled runs"""
+    frame_cadence = MARKET_FRAME_CADENCE.get(phase)
+    frame_max_age = frame_cadence * 2 if frame_cadence else CLOSED_MAX_AGE_SECONDS
+    get_market_frame_ingestor().interval = frame_max_age
+    scanner_pipeline.max_age = max(SCANNER_MAX_AGE_SECONDS, frame_max_age)
+    if unified_service:
+        cache_cadence = UNIFIED_CACHE_CADENCE.get(phase)
+        unified_service.max_age_seconds = cache_cadence * 2 if cache_cadence else CLOSED_MAX_AGE_SECONDS
+
+
+def start_market_scheduler():
+    market_scheduler.register("market-frame", get_market_frame_ingestor().refresh, MARKET_FRAME_CADENCE)
+    if unified_service:
+        # Startup already filled the cache
+        market_scheduler.register("unified-cache", unified_service.refresh, UNIFIED_CACHE_CADENCE, run_at_start=False)
+    market_scheduler.register("price-broadcast", broadcast_prices_once, PRICE_BROADCAST_CADENCE, jitter=0.05)
+    market_scheduler.register("holiday-calendar", refresh_market_holidays, HOLIDAY_CALENDAR_CADENCE)
+    market_scheduler.add_phase_listener(apply_market_phase)
+    ws_manager.is_running = True
+    market_scheduler.start()
+
+
+class SchedulerCadenceUpdate(BaseModel):
+    cadence: Dict[Phase, Optional[float]]
+
+
+@api_router.get("/scheduler/status")
+async def get_market_scheduler_status():
+    """Current market phase, next phase change and every job's cadence and run history"""
+    return market_scheduler.get_status()
+
+
+@api_router.post("/scheduler/jobs/{name}/{action}")
+async def control_scheduler_job(name: str, action: str, admin: User = Depends(get_admin_user)):
+    """Run now, pause or resume a scheduler job - Admin only"""
+    actions = {"run": market_scheduler.trigger, "pause": market_scheduler.pause, "resume": market_scheduler.resume}
+    if action not in actions:
+        raise HTTPException(status_code=400, detail=f"Unknown action '{action}' (use run, pause or resume)")
+    try:
+        job = actions[action](name)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"job": name, "action": action, **job.to_dict()}
+
+
+@api_router.put("/scheduler/jobs/{name}/cadence")
+async def update_scheduler_cadence(name: str, update: SchedulerCadenceUpdate, admin: User = Depends(get_admin_user)):
+    """Change a job's interval (seconds, null = skip) for the given phases - Admin only"""
+    try:
+        job = market_scheduler.set_cadence(name, update.cadence)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"job": name, **job.to_dict()}
+
+
+# ==================== BOT SCHEDULER ====================
+@api_router.get("/admin/bot-scheduler")
+async def get_bot_scheduler_status(admin: User = Depends(get_admin_user)):
+    """Running bot cycles, queue depth, overruns and cycle-time histograms per bot - Admin only"""
+    return get_bot_scheduler().get_status()
+
+
+# ==================== BOT STATE JOURNAL ====================
+@api_router.get("/admin/bot-state-journal")
+async def get_bot_state_journal_status(admin: User = Depends(get_admin_user)):
+    """Journaled bot streams, pending snapshots and batched Firestore flushes - Admin only"""
+    return get_bot_state_journal().get_status()
+
+
+# ==================== ORDER EXECUTION ====================
+@api_router.get("/admin/order-execution")
+async def get_order_execution_status(admin: User = Depends(get_admin_user)):
+    """Order outcomes and submit / fill / leg-skew latency per broker - Admin only"""
+    return get_execution_metrics().get_status()
+
+
+BROKER_POSTBACK_SECRET = os.environ.get("BROKER_POSTBACK_SECRET", "")
+
+@api_router.post("/broker/postback/{broker}")
+async def broker_order_postback(broker: str, request: Request):
+    """
+    Order update postback from Dhan / Upstox. Only wakes the fill tracker
+    of that order, which then reads the status back from the broker, so
+    the payload itself is never trusted.
+    
+    The endpoint is public, so cached account state is only refreshed for
+    a verified postback: with BROKER_POSTBACK_SECRET set, the postback URL
+    must carry it (?secret=... or X-Postback-Secret); without it, the
+    postback must name an order being tracked or a client id with a cached
+    account. Refreshes are debounced per account (see account_state).
+    """
+    try:
+        payload = await request.json()
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid JSON")
+    if BROKER_POSTBACK_SECRET:
+        supplied = request.query_params.get("secret") or request.headers.get("X-Postback-Secret") or ""
+        if not secrets.compare_digest(supplied, BROKER_POSTBACK_SECRET):
+            raise HTTPException(status_code=403, detail="Invalid postback secret")
+    if not isinstance(payload, dict):
+        payload = {}
+    broker = broker.lower()
+    order_id = postback_order_id(payload)
+    client_id = payload.get("dhanClientId") or payload.get("user_id")
+    tracked = bool(order_id) and notify_order_update(order_id)
+    
+    state = get_account_state()
+    refreshed = 0
+    if BROKER_POSTBACK_SECRET or tracked or state.has_client(broker, client_id):
+        refreshed = state.on_order_event(broker, client_id=client_id, order_id=order_id)
+    return {"broker": broker, "order_id": order_id, "tracked": tracked, "accounts_refreshed": refreshed}
+
+
+# ==================== LLM DECISION CACHE ====================
+@api_router.get("/admin/llm-decision-cache")
+async def get_llm_decision_cache_status(admin: User = Depends(get_admin_user)):
+    """Cached LLM decisions, hit / coalesced / stale-served counts - Admin only"""
+    return get_llm_decision_cache().get_status()
+
+
+# ==================== LLM GATEWAY ====================
+@api_router.get("/admin/llm-gateway")
+async def get_llm_gateway_status(admin: User = Depends(get_admin_user)):
+    """Per-provider LLM latency percentiles, circuit states and hedge counts - Admin only"""
+    return get_llm_gateway().get_status()
+
+
+# ==================== ACCOUNT STATE ====================
+@api_router.get("/admin/account-state")
+async def get_account_state_status(admin: User = Depends(get_admin_user)):
+    """Cached broker accounts: section versions, ages, hit rate and order events - Admin only"""
+    return get_account_state().get_status()
+
+
+# ==================== JSON RESPONSE PATH ====================
+@api_router.get("/json-responses/status")
+async def get_json_response_status():
+    """Whether /api responses are serialized by the orjson fast path"""
+    return {"fast_json": fast_json_enabled(), "orjson": ORJSON_AVAILABLE}
+
+
+@api_router.put("/json-responses/fast-path")
+async def toggle_fast_json(enabled: bool, admin: User = Depends(get_admin_user)):
+    """Switch between orjson and the stdlib json encoder - Admin only"""
+    set_fast_json_enabled(enabled)
+    return {"fast_json": fast_json_enabled(), "orjson": ORJSON_AVAILABLE}
+
+
 # ==================== STARTUP AND SHUTDOWN EVENTS ====================
 # Store for alert broadcaster task
 alert_broadcaster_task = None
@@ -17295,47 +17418,59 @@ async def dhan_token_refresh_loop():
             await asyncio.sleep(1800)  # retry in 30 min
 
 # Lifespan context manager (replaces deprecated on_event)
+# ═══════════════════════════════════════════════════════════════════════════════
+# STARTUP WARM-UPS - Run in the background once the server accepts requests
+# ═══════════════════════════════════════════════════════════════════════════════
+
+async def warm_dhan_token():
+    """Generate a fresh Dhan token via TOTP and start the periodic refresh loop"""
+    global dhan_token_refresh_task
+    from services.dhan_auth_service import get_dhan_auth_service
+    dhan_auth = get_dhan_auth_service()
+    token_ok = await dhan_auth.ensure_fresh_token()
+    if token_ok:
+        logging.info("✅ Dhan token ready on startup")
+    else:
+        logging.warning("⚠️ Dhan token not available - market data may fail")
+    
+    dhan_token_refresh_task = asyncio.create_task(dhan_token_refresh_loop())
+    logging.info("🔄 Dhan token auto-refresh loop started (every 6 hours)")
+
+
+async def warm_database():
+    """Test the Firestore connection"""
+    if db is not None:
+        await db.users.find_one({"test": "connection"})
+        logging.info("✅ Firestore database connection verified")
+
+
+async def warm_unified_cache():
+    """First full stock fetch (DHAN → Yahoo fallback)"""
+    if unified_service:
+        logging.info("📦 Fetching fresh data from NSE India...")
+        await unified_service.fetch_all_stocks(force=True)
+        cache_info = unified_service.get_cache_info()
+        logging.info(f"✅ Fetched {cache_info['stock_count']} stocks from {cache_info['data_source']}")
+
+
+async def warm_market_scheduler():
+    start_market_scheduler()
+
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 503 until the required startup warm-ups have finished"""
+    status = {**startup_manager.get_status(), "lazy_routers": lazy_routers.get_status()}
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage startup and shutdown lifecycle events"""
-    global alert_broadcaster_task, cache_refresh_task, dhan_token_refresh_task
+    global alert_broadcaster_task
     # Startup
     logging.info("Starting Money Saarthi server...")
     
-    # ═══════════════════════════════════════════════════════════════════════════════
-    # DHAN AUTO-TOKEN: Generate fresh token on startup via TOTP
-    # ═══════════════════════════════════════════════════════════════════════════════
-    try:
-        from services.dhan_auth_service import get_dhan_auth_service
-        dhan_auth = get_dhan_auth_service()
-        token_ok = await dhan_auth.ensure_fresh_token()
-        if token_ok:
-            logging.info("✅ Dhan token ready on startup")
-        else:
-            logging.warning("⚠️ Dhan token not available - market data may fail")
-        
-        # Start periodic refresh loop
-        dhan_token_refresh_task = asyncio.create_task(dhan_token_refresh_loop())
-        logging.info("🔄 Dhan token auto-refresh loop started (every 6 hours)")
-    except Exception as e:
-        logging.error(f"Dhan auto-token startup error: {e}")
-    
-    try:
-        # Test Firestore connection
-        if db is not None:
-            # For Firestore, just try to access a collection
-            test = await db.users.find_one({"test": "connection"})
-            logging.info("✅ Firestore database connection verified")
-    except Exception as e:
-        logging.warning(f"Database not available (will retry on requests): {e}")
-    
-    # Start the price broadcast loop with error handling
-    try:
-        ws_manager.broadcast_task = asyncio.create_task(price_broadcast_loop())
-        logging.info("Price broadcast loop started")
-    except Exception as e:
-        logging.error(f"Failed to start price broadcast: {e}")
-    
     # Start the alert broadcaster with error handling
     try:
         alert_broadcaster_task = asyncio.create_task(alert_broadcaster())
@@ -17344,37 +17479,60 @@ async def lifespan(app: FastAPI):
         logging.error(f"Failed to start alert broadcaster: {e}")
     
     # ═══════════════════════════════════════════════════════════════════════════════
-    # UNIFIED DATA SERVICE - Primary Data Source (DHAN → Yahoo fallback)
+    # MARKET FRAME - Columnar universe shared by all scanners
     # ═══════════════════════════════════════════════════════════════════════════════
     try:
-        if unified_service:
-            # Force fresh data fetch (no cache)
-            cache_info = unified_service.get_cache_info()
-            logging.info("📦 Fetching fresh data from NSE India...")
-            await unified_service.fetch_all_stocks(force=True)
-            cache_info = unified_service.get_cache_info()
-            logging.info(f"✅ Fetched {cache_info['stock_count']} stocks from {cache_info['data_source']}")
-            
-            # Start auto-refresh (every 3 minutes)
-            unified_service.start_auto_refresh()
-            logging.info(f"🔄 Unified auto-refresh started (NSE primary)")
+        market_frame_ingestor = get_market_frame_ingestor()
+        market_frame_ingestor.configure(
+            symbols=FNO_STOCKS,
+            sectors={s: sector for sector, stocks in FNO_STOCKS_BY_SECTOR.items() for s in stocks},
+        )
+        
+        # Every registered scanner reruns once per published frame
+        market_frame_ingestor.add_listener(scanner_pipeline.on_frame)
+        logging.info(f"✅ Scanner pipeline subscribed ({len(scanner_pipeline.names)} scanners)")
     except Exception as e:
-        logging.error(f"Failed to initialize unified service: {e}")
+        logging.error(f"Failed to configure market frame ingestor: {e}")
+    
+    # ═══════════════════════════════════════════════════════════════════════════════
+    # WARM-UPS - Dhan token, first stock fetch, router imports and the market
+    # scheduler (every periodic refresh) start in the background; /ready
+    # reports when they are done
+    # ═══════════════════════════════════════════════════════════════════════════════
+    startup_manager.register("dhan-token", warm_dhan_token)
+    startup_manager.register("database", warm_database, required=False)
+    startup_manager.register("unified-cache", warm_unified_cache, after=["dhan-token"])
+    startup_manager.register("routers", lazy_routers.preload)
+    startup_manager.register("market-scheduler", warm_market_scheduler, after=["unified-cache"])
+    startup_manager.start()
     
     yield  # Server is running
     
     # Shutdown
+    await startup_manager.stop()
     ws_manager.is_running = False
-    if ws_manager.broadcast_task:
-        ws_manager.broadcast_task.cancel()
-        try:
-            await ws_manager.broadcast_task
-        except asyncio.CancelledError:
-            pass
+    await market_scheduler.stop()
+    await get_bot_scheduler().stop()
+    await get_bot_state_journal().stop()  # final flush of pending bot state
+    
+    # Stop backtest worker pool
+    try:
+        from services.backtest_jobs import get_backtest_job_manager
+        get_backtest_job_manager().shutdown()
+    except Exception as e:
+        logging.error(f"Error stopping backtest workers: {e}")
+    
+    # Stop scanner pipeline
+    await scanner_pipeline.stop()
     
-    # Stop unified service auto-refresh
+    # Persist incremental indicator state
+    try:
+        get_indicator_store().save()
+    except Exception as e:
+        logging.error(f"Error saving indicator state: {e}")
+    
+    # Release unified service HTTP client
     if unified_service:
-        unified_service.stop_auto_refresh()
         await unified_service.close()
     
     # Cancel Dhan token refresh task
@@ -17393,6 +17551,12 @@ async def lifespan(app: FastAPI):
     except Exception:
         pass
     
+    # Close shared HTTP client pools
+    try:
+        await get_http_client_registry().close()
+    except Exception as e:
+        logging.error(f"Error closing HTTP clients: {e}")
+    
     # Close database connection safely
     try:
         if client:
@@ -17426,6 +17590,9 @@ else:
 # Log CORS origins for debugging
 print(f"🌐 CORS Origins: {cors_origins}")
 
+# ETag / 304 and Brotli/gzip for JSON GET responses (inside CORS, which is added last)
+app.add_middleware(HTTPCacheMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -17446,7 +17613,7 @@ logger = logging.getLogger(__name__)
 
 # ==================== PROMPT 5: COMPREHENSIVE OPTION CHAIN ====================
 import math
-from scipy.stats import norm
+norm = lazy_attr("scipy.stats", "norm")  # ~0.7s to import: loaded on first use
 
 def black_scholes_greeks(S, K, T, r, sigma, option_type='call'):
     """
@@ -21927,155 +22094,15 @@ class BacktestRequest(BaseModel):
 
 @api_router.post("/tools/backtest")
 async def run_backtest(request: BacktestRequest):
-    """Run a backtest on historical data"""
+    """Run a backtest on historical data (executed in the backtest worker pool)"""
+    if request.strategy not in ("ma_crossover", "rsi", "breakout"):
+        raise HTTPException(status_code=400, detail=f"Unknown strategy: {request.strategy}")
     try:
-        symbol = request.symbol if '.NS' in request.symbol else f"{request.symbol}.NS"
-        ticker = yf.Ticker(symbol)
-        
-        # Get historical data
-        if request.start_date and request.end_date:
-            hist = ticker.history(start=request.start_date, end=request.end_date)
-        else:
-            hist = ticker.history(period="1y")
-        
-        if hist.empty or len(hist) < 50:
+        from services.backtest_jobs import get_backtest_job_manager
+        return await get_backtest_job_manager().run("tools", request.model_dump())
+    except RuntimeError as e:
+        if "Insufficient historical data" in str(e):
             raise HTTPException(status_code=400, detail="Insufficient historical data")
-        
-        capital = request.capital
-        position = 0
-        shares = 0
-        trades = []
-        equity_curve = []
-        
-        # Calculate indicators based on strategy
-        if request.strategy == "ma_crossover":
-            fast = request.params.get("fast", 10)
-            slow = request.params.get("slow", 20)
-            hist['fast_ma'] = hist['Close'].rolling(fast).mean()
-            hist['slow_ma'] = hist['Close'].rolling(slow).mean()
-            
-            for i in range(slow, len(hist)):
-                date = hist.index[i]
-                price = hist['Close'].iloc[i]
-                
-                # Buy signal: fast crosses above slow
-                if hist['fast_ma'].iloc[i] > hist['slow_ma'].iloc[i] and hist['fast_ma'].iloc[i-1] <= hist['slow_ma'].iloc[i-1]:
-                    if position == 0:
-                        shares = int(capital / price)
-                        capital -= shares * price
-                        position = 1
-                        trades.append({"date": str(date.date()), "action": "BUY", "price": round(price, 2), "shares": shares})
-                
-                # Sell signal: fast crosses below slow
-                elif hist['fast_ma'].iloc[i] < hist['slow_ma'].iloc[i] and hist['fast_ma'].iloc[i-1] >= hist['slow_ma'].iloc[i-1]:
-                    if position == 1:
-                        capital += shares * price
-                        trades.append({"date": str(date.date()), "action": "SELL", "price": round(price, 2), "shares": shares})
-                        shares = 0
-                        position = 0
-                
-                equity = capital + (shares * price)
-                equity_curve.append({"date": str(date.date()), "equity": round(equity, 2)})
-        
-        elif request.strategy == "rsi":
-            oversold = request.params.get("oversold", 30)
-            overbought = request.params.get("overbought", 70)
-            
-            delta = hist['Close'].diff()
-            gain = (delta.where(delta > 0, 0)).rolling(14).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
-            rs = gain / loss
-            hist['rsi'] = 100 - (100 / (1 + rs))
-            
-            for i in range(14, len(hist)):
-                date = hist.index[i]
-                price = hist['Close'].iloc[i]
-                rsi = hist['rsi'].iloc[i]
-                
-                if rsi < oversold and position == 0:
-                    shares = int(capital / price)
-                    capital -= shares * price
-                    position = 1
-                    trades.append({"date": str(date.date()), "action": "BUY", "price": round(price, 2), "shares": shares, "rsi": round(rsi, 2)})
-                
-                elif rsi > overbought and position == 1:
-                    capital += shares * price
-                    trades.append({"date": str(date.date()), "action": "SELL", "price": round(price, 2), "shares": shares, "rsi": round(rsi, 2)})
-                    shares = 0
-                    position = 0
-                
-                equity = capital + (shares * price)
-                equity_curve.append({"date": str(date.date()), "equity": round(equity, 2)})
-        
-        elif request.strategy == "breakout":
-            period = request.params.get("period", 20)
-            hist['high_20'] = hist['High'].rolling(period).max()
-            hist['low_20'] = hist['Low'].rolling(period).min()
-            
-            for i in range(period, len(hist)):
-                date = hist.index[i]
-                price = hist['Close'].iloc[i]
-                
-                if price > hist['high_20'].iloc[i-1] and position == 0:
-                    shares = int(capital / price)
-                    capital -= shares * price
-                    position = 1
-                    trades.append({"date": str(date.date()), "action": "BUY", "price": round(price, 2), "shares": shares})
-                
-                elif price < hist['low_20'].iloc[i-1] and position == 1:
-                    capital += shares * price
-                    trades.append({"date": str(date.date()), "action": "SELL", "price": round(price, 2), "shares": shares})
-                    shares = 0
-                    position = 0
-                
-                equity = capital + (shares * price)
-                equity_curve.append({"date": str(date.date()), "equity": round(equity, 2)})
-        
-        # Close any open position
-        if position == 1:
-            final_price = hist['Close'].iloc[-1]
-            capital += shares * final_price
-            trades.append({"date": str(hist.index[-1].date()), "action": "SELL (Close)", "price": round(final_price, 2), "shares": shares})
-        
-        # Calculate metrics
-        final_equity = capital
-        total_return = ((final_equity - request.capital) / request.capital) * 100
-        
-        # Calculate max drawdown
-        equity_vals = [e["equity"] for e in equity_curve]
-        peak = equity_vals[0]
-        max_drawdown = 0
-        for val in equity_vals:
-            if val > peak:
-                peak = val
-            drawdown = (peak - val) / peak * 100
-            max_drawdown = max(max_drawdown, drawdown)
-        
-        # Win rate
-        buy_prices = [t["price"] for t in trades if t["action"] == "BUY"]
-        sell_prices = [t["price"] for t in trades if "SELL" in t["action"]]
-        wins = sum(1 for b, s in zip(buy_prices, sell_prices) if s > b)
-        win_rate = (wins / len(buy_prices) * 100) if buy_prices else 0
-        
-        # Buy and hold comparison
-        bh_return = ((hist['Close'].iloc[-1] - hist['Close'].iloc[0]) / hist['Close'].iloc[0]) * 100
-        
-        return {
-            "symbol": request.symbol,
-            "strategy": request.strategy,
-            "period": f"{hist.index[0].date()} to {hist.index[-1].date()}",
-            "initial_capital": request.capital,
-            "final_equity": round(final_equity, 2),
-            "total_return_pct": round(total_return, 2),
-            "buy_hold_return_pct": round(bh_return, 2),
-            "outperformance": round(total_return - bh_return, 2),
-            "max_drawdown_pct": round(max_drawdown, 2),
-            "total_trades": len(trades),
-            "win_rate_pct": round(win_rate, 2),
-            "trades": trades,
-            "equity_curve": equity_curve[::5]  # Sample every 5 points
-        }
-    except Exception as e:
         logging.error(f"Backtest error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -22117,12 +22144,13 @@ async def execute_paper_trade(trade: PaperTrade):
         
         clean_sym = trade.symbol.replace('.NS', '')
         trade_value = trade.quantity * trade.price
+        charges = order_charges(trade.action, trade.quantity, trade.price, "equity_delivery")
         
         if trade.action == "BUY":
-            if portfolio["cash"] < trade_value:
+            if portfolio["cash"] < trade_value + charges["total"]:
                 raise HTTPException(status_code=400, detail="Insufficient funds")
             
-            portfolio["cash"] -= trade_value
+            portfolio["cash"] -= trade_value + charges["total"]
             current_holding = portfolio["holdings"].get(clean_sym, {"quantity": 0, "avg_price": 0})
             
             # Calculate new average price
@@ -22140,7 +22168,7 @@ async def execute_paper_trade(trade: PaperTrade):
             if current_holding["quantity"] < trade.quantity:
                 raise HTTPException(status_code=400, detail="Insufficient shares")
             
-            portfolio["cash"] += trade_value
+            portfolio["cash"] += trade_value - charges["total"]
             new_qty = current_holding["quantity"] - trade.quantity
             
             if new_qty == 0:
@@ -22156,6 +22184,7 @@ async def execute_paper_trade(trade: PaperTrade):
             "quantity": trade.quantity,
             "price": round(trade.price, 2),
             "value": round(trade_value, 2),
+            "charges": charges["total"],
             "timestamp": datetime.now().isoformat()
         }
         portfolio["trades"].append(trade_record)
@@ -22486,7 +22515,15 @@ async def calculate_tax(trades: list):
         processed_trades = []
         today = datetime.now()
         
-        for trade in trades:
+        # Delivery charges for every buy and sell leg in one call. Transfer
+        # expenses are deductible from capital gains; STT is not (Sec 48).
+        quantities = [trade.get("quantity", 0) for trade in trades]
+        buy_charges = calculate_charges("BUY", quantities, [t.get("buy_price", 0) for t in trades], "equity_delivery")
+        sell_charges = calculate_charges("SELL", quantities, [t.get("sell_price", 0) for t in trades], "equity_delivery")
+        trade_charges = buy_charges["total"] + sell_charges["total"]
+        trade_stt = buy_charges["stt"] + sell_charges["stt"]
+        
+        for i, trade in enumerate(trades):
             buy_date = datetime.strptime(trade.get("buy_date"), "%Y-%m-%d")
             sell_date = datetime.strptime(trade.get("sell_date", today.strftime("%Y-%m-%d")), "%Y-%m-%d")
             buy_price = trade.get("buy_price", 0)
@@ -22494,7 +22531,7 @@ async def calculate_tax(trades: list):
             quantity = trade.get("quantity", 0)
             
             holding_days = (sell_date - buy_date).days
-            profit_loss = (sell_price - buy_price) * quantity
+            profit_loss = (sell_price - buy_price) * quantity - float(trade_charges[i] - trade_stt[i])
             
             is_ltcg = holding_days > 365
             
@@ -22518,6 +22555,7 @@ async def calculate_tax(trades: list):
                 "quantity": quantity,
                 "holding_days": holding_days,
                 "profit_loss": round(profit_loss, 2),
+                "charges": round(float(trade_charges[i]), 2),
                 "type": "LTCG" if is_ltcg else "STCG"
             })
         
@@ -22548,7 +22586,9 @@ async def calculate_tax(trades: list):
                 "net_stcg": round(net_stcg, 2),
                 "ltcg_profit": round(ltcg_profit, 2),
                 "ltcg_loss": round(ltcg_loss, 2),
-                "net_ltcg": round(net_ltcg, 2)
+                "net_ltcg": round(net_ltcg, 2),
+                "total_charges": round(float(trade_charges.sum()), 2),
+                "stt_paid": round(float(trade_stt.sum()), 2)
             },
             "tax_calculation": {
                 "stcg_tax_rate": "20%",
@@ -23342,94 +23382,40 @@ async def get_index_contribution(index: str = "NIFTY50"):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-# ==================== DHAN API SCANNER ROUTES ====================
-# Import and include the new Dhan-powered scanner routes
-try:
-    from routes.scanner_routes import router as scanner_router
-    from routes.dhan_routes import router as dhan_router
-    api_router.include_router(scanner_router)
-    api_router.include_router(dhan_router)
-    logging.info("✅ Dhan API scanner routes loaded successfully")
-except ImportError as e:
-    logging.warning(f"⚠️ Dhan scanner routes not loaded: {e}")
-except Exception as e:
-    logging.error(f"❌ Error loading Dhan scanner routes: {e}")
-
-# ==================== UPSTOX API ROUTES ====================
-try:
-    from routes.upstox_routes import router as upstox_router
-    api_router.include_router(upstox_router)
-    logging.info("✅ Upstox API routes loaded successfully")
-except ImportError as e:
-    logging.warning(f"⚠️ Upstox routes not loaded: {e}")
-except Exception as e:
-    logging.error(f"❌ Error loading Upstox routes: {e}")
-
-
-# ==================== TRADE ALGO ROUTES ====================
-try:
-    from routes.trade_algo_routes import router as trade_algo_router, public_router as trade_algo_public_router
-    api_router.include_router(trade_algo_router)
-    api_router.include_router(trade_algo_public_router)
-    logging.info("✅ Trade Algo routes loaded successfully")
-except ImportError as e:
-    logging.warning(f"⚠️ Trade Algo routes not loaded: {e}")
-except Exception as e:
-    logging.error(f"❌ Error loading Trade Algo routes: {e}")
-
-# ==================== DELTA NEUTRAL STRATEGY ROUTES ====================
-try:
-    from routes.strategy_routes import router as strategy_router
-    api_router.include_router(strategy_router)
-    logging.info("✅ Delta Neutral Strategy routes loaded successfully")
-except ImportError as e:
-    logging.warning(f"⚠️ Strategy routes not loaded: {e}")
-except Exception as e:
-    logging.error(f"❌ Error loading strategy routes: {e}")
-
-# ==================== NIFTY TRADING STRATEGIES ROUTES ====================
-try:
-    from routes.strategies import router as nifty_strategies_router
-    app.include_router(nifty_strategies_router)
-    logging.info("✅ Nifty Trading Strategies routes loaded successfully")
-except ImportError as e:
-    logging.warning(f"⚠️ Nifty Strategies routes not loaded: {e}")
-except Exception as e:
-    logging.error(f"❌ Error loading Nifty Strategies routes: {e}")
-
-# ==================== AI ADVISOR & TOKEN ROUTES ====================
-try:
-    from routes.ai_routes import router as ai_advisor_router
-    app.include_router(ai_advisor_router)
-    logging.info("✅ AI Advisor & Token routes loaded successfully")
-except ImportError as e:
-    logging.warning(f"⚠️ AI Advisor routes not loaded: {e}")
-except Exception as e:
-    logging.error(f"❌ Error loading AI Advisor routes: {e}")
-
-# ==================== AI AUTONOMOUS AGENT ROUTES ====================
-try:
-    from routes.ai_agent_routes import router as ai_agent_router
-    app.include_router(ai_agent_router)
-    logging.info("✅ AI Autonomous Agent routes loaded successfully")
-except ImportError as e:
-    logging.warning(f"⚠️ AI Agent routes not loaded: {e}")
-except Exception as e:
-    logging.error(f"❌ Error loading AI Agent routes: {e}")
-
-# ==================== TRADEFINDER ADVANCED ROUTES ====================
-try:
-    from routes.tradefinder_routes import router as tradefinder_router
-    app.include_router(tradefinder_router)
-    logging.info("✅ TradeFinder Advanced routes loaded successfully")
-except ImportError as e:
-    logging.warning(f"⚠️ TradeFinder routes not loaded: {e}")
-except Exception as e:
-    logging.error(f"❌ Error loading TradeFinder routes: {e}")
-
-# Include the router in the main app (MUST be after all routes are defined)
-app.include_router(api_router)
+# ==================== LAZY ROUTERS ====================
+# Feature routers are imported on the first request under their paths, or by
+# the "routers" startup warm-up, whichever comes first. Registration order
+# is route precedence, the same as the eager include_router calls it
+# replaces: app-level routers first, then /api (server routes before the
+# feature routers mounted under it). LAZY_ROUTERS=0 imports them all here.
+lazy_routers.register("Nifty Trading Strategies", "routes.strategies", paths=["/api/strategies"])
+lazy_routers.register("AI Advisor & Token", "routes.ai_routes", paths=["/ai"])
+lazy_routers.register("AI Autonomous Agent", "routes.ai_agent_routes", paths=["/api/ai-agent"])
+lazy_routers.register("TradeFinder Advanced", "routes.tradefinder_routes", paths=["/api/tradefinder"])
+
+# Add the /api routes to the main app (MUST be after all routes are defined).
+# Their paths already carry the prefix and nothing is inherited from the app,
+# so they are appended as they are: include_router would rebuild all of them
+# (~0.3s of cold start).
+app.router.routes.extend(api_router.routes)
+
+API_ROUTER_INCLUDE = {"prefix": "/api", "default_response_class": FastJSONResponse}
+lazy_routers.register("Dhan API scanner", "routes.scanner_routes", paths=["/api/v2/scanners"], **API_ROUTER_INCLUDE)
+lazy_routers.register("Dhan API", "routes.dhan_routes", paths=["/api/v2/dhan"], **API_ROUTER_INCLUDE)
+lazy_routers.register("Upstox API", "routes.upstox_routes", paths=["/api/v2/upstox"], **API_ROUTER_INCLUDE)
+lazy_routers.register(
+    "Trade Algo", "routes.trade_algo_routes", paths=["/api/trade-algo"],
+    attrs=("router", "public_router"), **API_ROUTER_INCLUDE,
+)
+lazy_routers.register(
+    "Delta Neutral Strategy", "routes.strategy_routes", paths=["/api/strategy/delta-neutral"], **API_ROUTER_INCLUDE
+)
+lazy_routers.register("Backtest job", "routes.backtest_job_routes", paths=["/api/backtest/jobs"], attrs=("router", "ws_router"), **API_ROUTER_INCLUDE)
+lazy_routers.register(
+    "Backtest result store", "routes.backtest_store_routes", paths=["/api/backtest/results"], **API_ROUTER_INCLUDE
+)
 
+startup_manager.mark("imported")
 
 if __name__ == "__main__":
     import uvicorn
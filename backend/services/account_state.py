@@ -0,0 +1,490 @@
+"""
+Account State
+=============
+In-memory positions / funds / orders per broker account, kept fresh in
+the background and served to dashboards without a broker call.
+
+Every dashboard load used to hit the broker APIs: the trade-algo
+dashboard fetched Dhan and then Upstox positions, funds and orders one
+after another, and /api/dhan/positions, /funds and /orders opened a new
+client per request.
+
+    state = get_account_state()
+    account = state.register("dhan", access_token, {"positions": load_positions, ...},
+                             client_id=client_id)
+    view = await state.read(account, "positions")   # SectionView
+    snapshot = await state.snapshot(account)         # all sections, loaded concurrently
+
+- An account is one broker token (key "<broker>:<sha1(token)[:12]>"), so
+  users never share state. Loaders are plain coroutines supplied by the
+  caller; register() replaces them, so a refreshed token takes effect.
+- Each section has its own TTL (positions / orders 5s, funds 30s) and a
+  version that only moves when the data actually changed; the account
+  version moves with any of its sections. Clients can skip re-rendering
+  when the version is unchanged.
+- Concurrent reads of a due section share one broker call. A failed
+  refresh keeps serving the last good data, flagged stale with the error,
+  and is retried after RETRY_SECONDS. 401 / 403 drops the cached data and
+  is raised as AccountFetchError.
+- Order events (broker postbacks, the Dhan order-update websocket,
+  multi-leg executions) mark positions / orders / funds dirty; accounts
+  read in the last WATCH_SECONDS are refreshed at once, others on their
+  next read. A dirty section is refetched at most once per
+  ORDER_EVENT_MIN_INTERVAL_SECONDS and failure backoff still applies, so
+  a burst of events (or forged postbacks) cannot hammer the broker.
+- A background task refreshes watched accounts whose sections are due and
+  evicts accounts not read for EVICT_SECONDS.
+
+Cached data is shared between readers - do not mutate what read() returns.
+Status is served at /api/admin/account-state.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+from .startup import lazy_import
+
+websockets = lazy_import("websockets")  # only when an order-update stream starts
+
+logger = logging.getLogger(__name__)
+
+SECTION_TTL_SECONDS = {"positions": 5.0, "orders": 5.0, "funds": 30.0}
+DEFAULT_TTL_SECONDS = 10.0
+ORDER_EVENT_SECTIONS = ("positions", "orders", "funds")
+ORDER_EVENT_MIN_INTERVAL_SECONDS = 2.0  # per section: debounces bursts of order events
+LOAD_TIMEOUT_SECONDS = 15.0
+RETRY_SECONDS = 10.0
+WATCH_SECONDS = 120.0       # accounts read this recently are refreshed in the background
+EVICT_SECONDS = 1800.0
+REFRESH_TICK_SECONDS = 1.0
+ORDER_STREAMS = os.getenv("ACCOUNT_ORDER_STREAMS", "true").lower() == "true"
+DHAN_ORDER_STREAM_URL = "wss://api-order-update.dhan.co"
+STREAM_MAX_BACKOFF_SECONDS = 60.0
+
+Loader = Callable[[], Awaitable[Any]]
+
+
+class AccountFetchError(Exception):
+    """A broker call for account state failed with an HTTP status"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+    @property
+    def auth_failed(self) -> bool:
+        return self.status_code in (401, 403)
+
+
+def account_key(broker: str, token: str) -> str:
+    """Cache key of a broker token; the token itself is never stored as a key"""
+    return f"{broker}:{hashlib.sha1((token or '').encode()).hexdigest()[:12]}"
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SECTIONS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@dataclass
+class SectionView:
+    """What a read returns: the data plus how fresh it is"""
+    data: Any
+    version: int
+    account_version: int
+    updated_at: Optional[str]
+    age_seconds: Optional[float]
+    cached: bool
+    stale: bool = False
+    error: Optional[str] = None
+
+    def meta(self) -> Dict:
+        return {
+            "version": self.version,
+            "account_version": self.account_version,
+            "updated_at": self.updated_at,
+            "age_seconds": self.age_seconds,
+            "cached": self.cached,
+            "stale": self.stale,
+            "error": self.error,
+        }
+
+
+@dataclass
+class Section:
+    name: str
+    ttl: float
+    data: Any = None
+    version: int = 0
+    loaded: bool = False
+    fetched_at: float = 0.0        # monotonic
+    updated_at: Optional[datetime] = None
+    failed_at: float = 0.0
+    error: Optional[str] = None
+    dirty: bool = False            # order event since the last fetch
+    loads: int = 0
+    failures: int = 0
+    inflight: Optional[asyncio.Task] = field(default=None, repr=False)
+
+    def due(self, now: float, max_age: Optional[float] = None) -> bool:
+        if self.failed_at and now - self.failed_at < RETRY_SECONDS:
+            return False
+        age = now - self.fetched_at
+        ttl = self.ttl if max_age is None else max_age
+        return not self.loaded or age >= ttl or (self.dirty and age >= ORDER_EVENT_MIN_INTERVAL_SECONDS)
+
+    def view(self, account: "Account", now: float, cached: bool) -> SectionView:
+        return SectionView(
+            data=self.data,
+            version=self.version,
+            account_version=account.version,
+            updated_at=self.updated_at.isoformat() if self.updated_at else None,
+            age_seconds=round(now - self.fetched_at, 2) if self.loaded else None,
+            cached=cached,
+            stale=self.error is not None or self.dirty,
+            error=self.error,
+        )
+
+    def to_dict(self, now: float) -> Dict:
+        return {
+            "version": self.version,
+            "age_seconds": round(now - self.fetched_at, 1) if self.loaded else None,
+            "ttl_seconds": self.ttl,
+            "dirty": self.dirty,
+            "loads": self.loads,
+            "failures": self.failures,
+            "error": self.error,
+        }
+
+
+class Account:
+    """Cached sections of one broker token"""
+
+    def __init__(self, broker: str, key: str, loaders: Dict[str, Loader], client_id: Optional[str] = None):
+        self.broker = broker
+        self.key = key
+        self.client_id = client_id
+        self.loaders = dict(loaders)
+        self.sections: Dict[str, Section] = {}
+        self.version = 0
+        self.last_read = time.monotonic()
+        self.stream: Optional[asyncio.Task] = None
+        self._add_sections()
+
+    def _add_sections(self):
+        for name in self.loaders:
+            if name not in self.sections:
+                self.sections[name] = Section(name, SECTION_TTL_SECONDS.get(name, DEFAULT_TTL_SECONDS))
+
+    def watched(self, now: float) -> bool:
+        return now - self.last_read <= WATCH_SECONDS
+
+    def to_dict(self, now: float) -> Dict:
+        return {
+            "broker": self.broker,
+            "version": self.version,
+            "last_read_seconds": round(now - self.last_read, 1),
+            "order_stream": self.stream is not None and not self.stream.done(),
+            "sections": {name: s.to_dict(now) for name, s in self.sections.items()},
+        }
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SERVICE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class AccountStateService:
+    """Per-account cache of broker positions / funds / orders"""
+
+    def __init__(self, order_streams: bool = ORDER_STREAMS):
+        self.order_streams = order_streams
+        self._accounts: Dict[str, Account] = {}
+        self._loop = None
+        self._refresher: Optional[asyncio.Task] = None
+        self.stats = {"reads": 0, "hits": 0, "loads": 0, "coalesced": 0, "stale_served": 0,
+                      "failures": 0, "order_events": 0, "evicted": 0}
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._refresher is None or self._refresher.done():
+            if self._loop is not loop:  # tasks of a previous (closed) loop can never finish
+                for account in self._accounts.values():
+                    account.stream = None
+                    for section in account.sections.values():
+                        section.inflight = None
+            self._loop = loop
+            self._refresher = asyncio.create_task(self._refresh_loop())
+
+    def register(self, broker: str, token: str, loaders: Dict[str, Loader], client_id: Optional[str] = None) -> Account:
+        """Account of this token, created on first use; loaders are replaced on every call"""
+        key = account_key(broker, token)
+        account = self._accounts.get(key)
+        if account is None:
+            account = Account(broker, key, loaders, client_id)
+            self._accounts[key] = account
+        else:
+            account.loaders.update(loaders)
+            account._add_sections()
+            account.client_id = client_id or account.client_id
+        if self.order_streams and broker == "dhan" and client_id and token:
+            self._start_stream(account, token)
+        return account
+
+    def accounts(self, broker: Optional[str] = None) -> Iterable[Account]:
+        return [a for a in self._accounts.values() if broker is None or a.broker == broker]
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # READS
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    async def read(self, account: Account, section: str, max_age: Optional[float] = None, force: bool = False) -> SectionView:
+        """
+        Cached section, refreshed first if due (TTL or max_age passed, or an
+        order event since). Raises if the broker call fails and there is no
+        earlier data to fall back on.
+        """
+        self._ensure_started()
+        state = account.sections[section]
+        now = time.monotonic()
+        account.last_read = now
+        self.stats["reads"] += 1
+
+        if not (force or state.due(now, max_age)):
+            self.stats["hits"] += 1
+            if state.error is not None:
+                self.stats["stale_served"] += 1
+            if not state.loaded:
+                raise AccountFetchError(502, state.error or f"{account.broker} {section} unavailable")
+            return state.view(account, now, cached=True)
+
+        try:
+            await self._refresh(account, state)
+        except AccountFetchError as e:
+            if e.auth_failed or not state.loaded:
+                raise
+            self.stats["stale_served"] += 1
+        except Exception:
+            if not state.loaded:
+                raise
+            self.stats["stale_served"] += 1
+        return state.view(account, time.monotonic(), cached=False)
+
+    async def snapshot(self, account: Account, sections: Optional[Iterable[str]] = None, force: bool = False) -> Dict:
+        """All (or the given) sections of an account, due ones loaded concurrently"""
+        names = list(sections or account.sections)
+        views = await asyncio.gather(*(self.read(account, name, force=force) for name in names), return_exceptions=True)
+        result = {"broker": account.broker, "version": account.version, "sections": {}}
+        for name, view in zip(names, views):
+            if isinstance(view, Exception):
+                result["sections"][name] = {"data": None, "error": str(view)}
+            else:
+                result["sections"][name] = {"data": view.data, **view.meta()}
+        return result
+
+    def _start_load(self, account: Account, section: Section) -> asyncio.Task:
+        task = asyncio.create_task(self._load(account, section))
+        # Failures are recorded on the section; background loads have no awaiter
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        section.inflight = task
+        return task
+
+    async def _refresh(self, account: Account, section: Section):
+        task = section.inflight
+        if task is None or task.done():
+            task = self._start_load(account, section)
+        else:
+            self.stats["coalesced"] += 1
+        # A cancelled reader must not cancel the load the others are waiting on
+        await asyncio.shield(task)
+
+    async def _load(self, account: Account, section: Section):
+        section.dirty = False  # an event during the fetch marks it dirty again
+        section.loads += 1
+        self.stats["loads"] += 1
+        try:
+            data = await asyncio.wait_for(account.loaders[section.name](), LOAD_TIMEOUT_SECONDS)
+        except Exception as e:
+            section.failures += 1
+            section.failed_at = time.monotonic()
+            section.error = getattr(e, "detail", None) or str(e) or type(e).__name__
+            self.stats["failures"] += 1
+            if isinstance(e, AccountFetchError) and e.auth_failed and section.loaded:
+                section.data, section.loaded = None, False
+                section.version += 1
+                account.version += 1
+            logger.warning(f"Account state {account.key} {section.name} refresh failed: {section.error}")
+            raise
+
+        if not section.loaded or data != section.data:
+            section.version += 1
+            account.version += 1
+        section.data = data
+        section.loaded = True
+        section.fetched_at = time.monotonic()
+        section.updated_at = datetime.now()
+        section.failed_at = 0.0
+        section.error = None
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # ORDER EVENTS
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    def on_order_event(self, broker: str, client_id: Optional[str] = None, order_id: Optional[str] = None) -> int:
+        """
+        An order of this broker was placed / filled / cancelled. Marks the
+        affected accounts (all of the broker's, or only those registered
+        with client_id) dirty and refreshes the watched ones whose sections
+        are due. Returns the number of accounts marked.
+        """
+        self.stats["order_events"] += 1
+        marked = 0
+        now = time.monotonic()
+        for account in self.accounts(broker):
+            if client_id and str(account.client_id) != str(client_id):
+                continue
+            marked += 1
+            for name in ORDER_EVENT_SECTIONS:
+                section = account.sections.get(name)
+                if section is None:
+                    continue
+                section.dirty = True
+                if account.watched(now) and section.due(now):
+                    self._spawn(account, section)
+        if marked:
+            logger.debug(f"Order event {broker} {order_id or ''}: {marked} account(s) marked dirty")
+        return marked
+
+    def has_client(self, broker: str, client_id: Optional[str]) -> bool:
+        """Whether an account of this broker is registered with client_id"""
+        return bool(client_id) and any(str(a.client_id) == str(client_id) for a in self.accounts(broker))
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # BACKGROUND REFRESH
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    def _spawn(self, account: Account, section: Section):
+        try:
+            self._ensure_started()
+        except RuntimeError:  # no running loop: the next read refreshes it
+            return
+        if section.inflight is None or section.inflight.done():
+            self._start_load(account, section)
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(REFRESH_TICK_SECONDS)
+            try:
+                self.refresh_due()
+            except Exception as e:
+                logger.error(f"Account state refresh error: {e}")
+
+    def refresh_due(self) -> int:
+        """Start refreshes of watched accounts' due sections; evict idle accounts"""
+        now = time.monotonic()
+        started = 0
+        for key, account in list(self._accounts.items()):
+            if now - account.last_read > EVICT_SECONDS:
+                self._evict(key)
+                continue
+            if not account.watched(now):
+                continue
+            for section in account.sections.values():
+                if section.due(now) and (section.inflight is None or section.inflight.done()):
+                    self._spawn(account, section)
+                    started += 1
+        return started
+
+    def _evict(self, key: str):
+        account = self._accounts.pop(key, None)
+        if account is None:
+            return
+        if account.stream is not None:
+            account.stream.cancel()
+        self.stats["evicted"] += 1
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # ORDER-UPDATE STREAMS
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    def _start_stream(self, account: Account, token: str):
+        if account.stream is not None and not account.stream.done():
+            return
+        try:
+            self._ensure_started()
+        except RuntimeError:
+            return
+        account.stream = asyncio.create_task(self._dhan_order_stream(account, token))
+
+    async def _dhan_order_stream(self, account: Account, token: str):
+        """
+        Dhan's live order-update websocket: every order alert is an order
+        event for this account and wakes the order's fill tracker.
+        Reconnects with backoff; ends when the account is evicted.
+        """
+        backoff = 1.0
+        login = json.dumps({"LoginReq": {"MsgCode": 42, "ClientId": str(account.client_id), "Token": token}, "UserType": "SELF"})
+        while account.key in self._accounts:
+            try:
+                async with websockets.connect(DHAN_ORDER_STREAM_URL, ping_interval=30, ping_timeout=10) as ws:
+                    await ws.send(login)
+                    backoff = 1.0
+                    async for message in ws:
+                        self.handle_dhan_order_update(account, message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.debug(f"Dhan order stream {account.key} disconnected: {e}")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, STREAM_MAX_BACKOFF_SECONDS)
+
+    def handle_dhan_order_update(self, account: Account, message: Any) -> Optional[str]:
+        """Order id of a Dhan order alert (also raised as an order event), else None"""
+        try:
+            payload = json.loads(message)
+        except (TypeError, ValueError):
+            return None
+        data = payload.get("Data") if isinstance(payload, dict) else None
+        if payload.get("Type") != "order_alert" or not isinstance(data, dict):
+            return None
+        order_id = str(data.get("OrderNo") or data.get("orderNo") or "") or None
+        self.on_order_event("dhan", client_id=account.client_id, order_id=order_id)
+        if order_id:
+            from .order_execution import notify_order_update
+            notify_order_update(order_id)
+        return order_id
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # STATUS
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    def get_status(self) -> Dict:
+        now = time.monotonic()
+        reads = self.stats["reads"]
+        return {
+            **self.stats,
+            "hit_rate": round(self.stats["hits"] / reads, 3) if reads else None,
+            "order_streams": self.order_streams,
+            "accounts": {key: account.to_dict(now) for key, account in self._accounts.items()},
+            "timestamp": datetime.now().isoformat(),
+        }
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SINGLETON
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_account_state: Optional[AccountStateService] = None
+
+
+def get_account_state() -> AccountStateService:
+    global _account_state
+    if _account_state is None:
+        _account_state = AccountStateService()
+    return _account_state
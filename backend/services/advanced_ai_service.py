@@ -12,6 +12,8 @@ import logging
 import json
 import asyncio
 
+from .llm_gateway import LLMRequest, get_llm_gateway
+
 logger = logging.getLogger(__name__)
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -445,49 +447,35 @@ class AdvancedAITradingAdvisor:
             logger.warning("Anthropic API key not configured, using fallback")
             return {"success": False, "error": "Claude API key not configured"}
         
+        result = await get_llm_gateway().complete(
+            LLMRequest(
+                prompt=user_prompt,
+                system=system_prompt,
+                max_tokens=max_tokens,
+                temperature=1.0,
+                api_keys={"claude": self.anthropic_key},
+            ),
+            providers=(f"claude:{self.model}",),
+            timeout=120,  # deep analyses run long; the gateway default is tuned for bot decisions
+        )
+        if result is None:
+            logger.error("Claude API call failed or circuit open")
+            return {"success": False, "error": "Claude API unavailable"}
+        content = result.text
+        
+        # Extract JSON from response
         try:
-            async with httpx.AsyncClient(timeout=120) as client:
-                response = await client.post(
-                    "https://api.anthropic.com/v1/messages",
-                    headers={
-                        "x-api-key": self.anthropic_key,
-                        "Content-Type": "application/json",
-                        "anthropic-version": "2023-06-01"
-                    },
-                    json={
-                        "model": self.model,
-                        "max_tokens": max_tokens,
-                        "system": system_prompt,
-                        "messages": [
-                            {"role": "user", "content": user_prompt}
-                        ]
-                    }
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    content = result["content"][0]["text"]
-                    
-                    # Extract JSON from response
-                    try:
-                        # Try to find JSON in the response
-                        json_start = content.find('{')
-                        json_end = content.rfind('}') + 1
-                        if json_start != -1 and json_end > json_start:
-                            json_str = content[json_start:json_end]
-                            parsed = json.loads(json_str)
-                            return {"success": True, "data": parsed}
-                        else:
-                            return {"success": True, "data": {"raw_analysis": content}}
-                    except json.JSONDecodeError:
-                        return {"success": True, "data": {"raw_analysis": content}}
-                else:
-                    logger.error(f"Claude API error: {response.status_code} - {response.text}")
-                    return {"success": False, "error": f"Claude API error: {response.status_code}"}
-                    
-        except Exception as e:
-            logger.error(f"Claude API call failed: {e}")
-            return {"success": False, "error": str(e)}
+            # Try to find JSON in the response
+            json_start = content.find('{')
+            json_end = content.rfind('}') + 1
+            if json_start != -1 and json_end > json_start:
+                json_str = content[json_start:json_end]
+                parsed = json.loads(json_str)
+                return {"success": True, "data": parsed}
+            else:
+                return {"success": True, "data": {"raw_analysis": content}}
+        except json.JSONDecodeError:
+            return {"success": True, "data": {"raw_analysis": content}}
     
     async def fetch_user_trades(self, access_token: str, from_date: str = None, to_date: str = None) -> Dict[str, Any]:
         """Fetch user's trades from Dhan broker"""
@@ -10,6 +10,8 @@ from datetime import datetime, timedelta
 import logging
 import json
 
+from .llm_gateway import LLMRequest, get_llm_gateway
+
 logger = logging.getLogger(__name__)
 
 # OpenAI Configuration (can also use local LLM or other providers)
@@ -120,48 +122,39 @@ Keep response concise and actionable. Use bullet points.
 Format as JSON with keys: portfolio_analysis, risk_assessment, winning_patterns, losing_patterns, strategy_adjustments, position_sizing, timing_analysis, action_items"""
 
         try:
-            async with httpx.AsyncClient(timeout=60) as client:
-                response = await client.post(
-                    "https://api.openai.com/v1/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {self.openai_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": self.model,
-                        "messages": [
-                            {"role": "system", "content": "You are an expert Indian stock market trading advisor. Respond in JSON format only."},
-                            {"role": "user", "content": prompt}
-                        ],
-                        "temperature": 0.7,
-                        "max_tokens": 1500
-                    }
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    content = result["choices"][0]["message"]["content"]
-                    
-                    # Try to parse as JSON
-                    try:
-                        # Remove markdown code blocks if present
-                        if content.startswith("```"):
-                            content = content.split("```")[1]
-                            if content.startswith("json"):
-                                content = content[4:]
-                        analysis = json.loads(content)
-                    except json.JSONDecodeError:
-                        analysis = {"raw_analysis": content}
-                    
-                    return {
-                        "success": True,
-                        "analysis": analysis,
-                        "model": self.model,
-                        "analyzed_at": datetime.now().isoformat()
-                    }
-                else:
-                    logger.error(f"OpenAI API error: {response.text}")
-                    return self._fallback_analysis(trades_data)
+            result = await get_llm_gateway().complete(
+                LLMRequest(
+                    prompt=prompt,
+                    system="You are an expert Indian stock market trading advisor. Respond in JSON format only.",
+                    temperature=0.7,
+                    max_tokens=1500,
+                    api_keys={"openai": self.openai_key},
+                ),
+                providers=(f"openai:{self.model}",),
+                timeout=60,
+            )
+            if result is None:
+                logger.error("OpenAI API unavailable, using fallback analysis")
+                return self._fallback_analysis(trades_data)
+            content = result.text
+            
+            # Try to parse as JSON
+            try:
+                # Remove markdown code blocks if present
+                if content.startswith("```"):
+                    content = content.split("```")[1]
+                    if content.startswith("json"):
+                        content = content[4:]
+                analysis = json.loads(content)
+            except json.JSONDecodeError:
+                analysis = {"raw_analysis": content}
+            
+            return {
+                "success": True,
+                "analysis": analysis,
+                "model": self.model,
+                "analyzed_at": datetime.now().isoformat()
+            }
                     
         except Exception as e:
             logger.error(f"AI analysis error: {e}")
@@ -266,46 +259,37 @@ Provide:
 Keep response brief and actionable. Format as JSON."""
 
         try:
-            async with httpx.AsyncClient(timeout=30) as client:
-                response = await client.post(
-                    "https://api.openai.com/v1/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {self.openai_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": self.model,
-                        "messages": [
-                            {"role": "system", "content": "You are an expert Indian stock market advisor. Be brief and actionable."},
-                            {"role": "user", "content": prompt}
-                        ],
-                        "temperature": 0.5,
-                        "max_tokens": 500
-                    }
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    content = result["choices"][0]["message"]["content"]
-                    
-                    try:
-                        if content.startswith("```"):
-                            content = content.split("```")[1]
-                            if content.startswith("json"):
-                                content = content[4:]
-                        suggestion = json.loads(content)
-                    except:
-                        suggestion = {"raw_suggestion": content}
-                    
-                    return {
-                        "success": True,
-                        "suggestion": suggestion
-                    }
-                else:
-                    return {
-                        "success": False,
-                        "error": "AI request failed"
-                    }
+            result = await get_llm_gateway().complete(
+                LLMRequest(
+                    prompt=prompt,
+                    system="You are an expert Indian stock market advisor. Be brief and actionable.",
+                    temperature=0.5,
+                    max_tokens=500,
+                    api_keys={"openai": self.openai_key},
+                ),
+                providers=(f"openai:{self.model}",),
+                timeout=30,
+            )
+            if result is None:
+                return {
+                    "success": False,
+                    "error": "AI request failed"
+                }
+            content = result.text
+            
+            try:
+                if content.startswith("```"):
+                    content = content.split("```")[1]
+                    if content.startswith("json"):
+                        content = content[4:]
+                suggestion = json.loads(content)
+            except:
+                suggestion = {"raw_suggestion": content}
+            
+            return {
+                "success": True,
+                "suggestion": suggestion
+            }
                     
         except Exception as e:
             logger.error(f"Strategy suggestion error: {e}")
@@ -41,21 +41,33 @@ import os
 import math
 import json
 import random
-import hashlib
 import re
-import time as _time
 from typing import Dict, Any, Optional, List, Tuple
-from datetime import datetime, time, timedelta, timezone
+from datetime import datetime, timedelta, timezone
 from dataclasses import dataclass, field
 from enum import Enum
 from collections import deque
 
+from .bot_runtime import get_bot_runtime, subscriber_id, topic
+from .bot_scheduler import Lane, get_bot_scheduler
+from .bot_state_journal import JournalStream, get_bot_state_journal
+from .llm_decision_cache import config_digest, get_llm_decision_cache, market_fingerprint, prompt_key
+from .llm_gateway import LLMRequest, get_llm_gateway
+
 IST = timezone(timedelta(hours=5, minutes=30))
 logger = logging.getLogger(__name__)
 
 # VIX ticker for India VIX
 INDIA_VIX_YF = "^INDIAVIX"
 
+# LLM providers in preference order; each Gemini model has its own quota pool
+AGENT_LLM_PROVIDERS = (
+    "gemini:gemini-2.5-flash",
+    "gemini:gemini-2.0-flash",
+    "gemini:gemini-2.0-flash-lite",
+    "claude:claude-sonnet-4-20250514",
+)
+
 
 def get_ist_now() -> datetime:
     return datetime.now(IST)
@@ -385,16 +397,17 @@ class AutonomousAIAgent:
         self._error_count = 0
         self._consecutive_errors = 0
         
-        # LLM API caching / rate-limiting (works for Gemini or Claude)
-        self._llm_cache: Dict[str, Dict] = {}  # hash -> {response, ts}
-        self._llm_cache_ttl = 120  # seconds - skip re-calling if data hasn't changed
+        # LLM rate-limiting (works for Gemini or Claude); responses are cached in the
+        # shared decision cache, keyed on the quantized market state
         self._llm_call_count = 0
         self._llm_daily_limit = 1000  # Gemini free tier is generous
         
         # Dhan market data service (lazy-initialized)
         self._dhan_market: Any = None
         
-        # Firestore persistence (lazy)
+        # Persistence: journal stream opened on start, legacy Firestore doc (lazy)
+        self._journal: Optional[JournalStream] = None
+        self._persisted_fingerprint = None
         self._firestore_col = None
         
         # Event log for frontend
@@ -402,11 +415,11 @@ class AutonomousAIAgent:
         self._add_event("SYSTEM", "Agent initialized", f"Config: {self.config.underlying}, Risk: {self.config.risk_level.value}, Mock: {self.config.use_mock}")
     
     # ═════════════════════════════════════════════════════════════════════════
-    # PERSISTENCE — Firestore
+    # PERSISTENCE — bot state journal (local log + batched Firestore snapshots)
     # ═════════════════════════════════════════════════════════════════════════
 
     def _get_firestore(self):
-        """Lazy-init Firestore collection"""
+        """Lazy-init the legacy Firestore state collection (read-only fallback)"""
         if self._firestore_col is None:
             try:
                 from services.firestore_db import FirestoreCollection
@@ -415,45 +428,42 @@ class AutonomousAIAgent:
                 logger.warning("Firestore unavailable for agent persistence: %s", e)
         return self._firestore_col
 
-    async def _persist_state(self):
-        """Save current agent state to Firestore (non-blocking, best-effort)"""
+    def _persist_state(self):
+        """Record current agent state in the journal. Only changed keys are
+        logged; the journal flushes them to Firestore in the background, right
+        away when positions or trades changed."""
+        if self._journal is None:
+            return
         try:
-            col = self._get_firestore()
-            if not col:
-                return
-            doc_id = self.config.user_id or "default"
-            state_doc = {
-                "user_id": doc_id,
+            fingerprint = ([p.get("id") for p in self.active_positions], self.performance.total_trades)
+            urgent = fingerprint != self._persisted_fingerprint
+            self._journal.update({
                 "state": self.state.value,
                 "cycle_count": self._cycle_count,
                 "performance": self.performance.to_dict(),
                 "evolved_params": self.evolved_params,
                 "active_positions": self.active_positions,
-                "recent_decisions": [d.to_dict() for d in list(self.decisions)[-10:]],
+                "recent_decisions": [d.to_dict() for d in list(self.decisions)[:10]],
                 "config": {
                     "underlying": self.config.underlying,
                     "risk_level": self.config.risk_level.value,
                     "max_capital": self.config.max_capital,
                     "use_mock": self.config.use_mock,
                 },
-                "updated_at": get_ist_now().isoformat(),
-            }
-            await col.update_one(
-                {"user_id": doc_id},
-                {"$set": state_doc},
-                upsert=True,
-            )
+            }, urgent=urgent)
+            self._persisted_fingerprint = fingerprint
         except Exception as e:
-            logger.debug("Agent persistence write failed (non-critical): %s", e)
+            logger.debug("Agent journal write failed (non-critical): %s", e)
 
     async def _load_persisted_state(self):
-        """Load previous agent state from Firestore on start"""
+        """Recover previous agent state from the journal on start, falling back
+        to the legacy ai_agent_state document"""
         try:
-            col = self._get_firestore()
-            if not col:
-                return
-            doc_id = self.config.user_id or "default"
-            doc = await col.find_one({"user_id": doc_id})
+            self._journal = await get_bot_state_journal().open("ai_agent", self.config.user_id)
+            doc = self._journal.state
+            if not doc:
+                col = self._get_firestore()
+                doc = await col.find_one({"user_id": self.config.user_id or "default"}) if col else None
             if doc:
                 # Restore performance
                 perf = doc.get("performance", {})
@@ -466,7 +476,11 @@ class AutonomousAIAgent:
                 ep = doc.get("evolved_params")
                 if ep:
                     self.evolved_params.update(ep)
-                self._add_event("SYSTEM", "State restored", f"Loaded history: {self.performance.total_trades} trades, P&L ₹{self.performance.total_pnl:,.0f}")
+                # Resume tracking positions that were open when the process died
+                if not self.active_positions and doc.get("active_positions"):
+                    self.active_positions = list(doc["active_positions"])
+                self._persisted_fingerprint = ([p.get("id") for p in self.active_positions], self.performance.total_trades)
+                self._add_event("SYSTEM", "State restored", f"Loaded history: {self.performance.total_trades} trades, P&L ₹{self.performance.total_pnl:,.0f}, {len(self.active_positions)} open positions")
         except Exception as e:
             logger.debug("Agent persistence load failed (non-critical): %s", e)
 
@@ -487,6 +501,9 @@ class AutonomousAIAgent:
         
         # Restore previous session state (non-blocking)
         await self._load_persisted_state()
+        get_bot_runtime().subscribe(
+            subscriber_id(self), topic("quote", self.config.underlying, "dhan"), topic("vix", "INDIAVIX")
+        )
         
         self._monitoring_task = asyncio.create_task(self._agent_loop())
         return {"status": "started", "state": self.state.value}
@@ -495,6 +512,7 @@ class AutonomousAIAgent:
         """Stop the agent and close all positions"""
         self._add_event("STOP", "Agent stopping", "Closing all positions and shutting down...")
         self.state = AgentState.STOPPED
+        get_bot_runtime().unsubscribe(subscriber_id(self))
         
         if self._monitoring_task:
             self._monitoring_task.cancel()
@@ -509,8 +527,8 @@ class AutonomousAIAgent:
         
         self._add_event("STOP", "Agent stopped", f"Final P&L: ₹{self.performance.daily_pnl:,.0f}")
         
-        # Persist final state to Firestore
-        await self._persist_state()
+        # Record final state (flushed by the journal)
+        self._persist_state()
         
         return {"status": "stopped", "final_pnl": self.performance.daily_pnl}
     
@@ -534,89 +552,19 @@ class AutonomousAIAgent:
     # ═════════════════════════════════════════════════════════════════════════
     
     async def _agent_loop(self):
-        """Main autonomous loop - runs continuously during market hours"""
+        """Main autonomous loop - runs continuously during market hours, ticked by the bot scheduler"""
         logger.info(f"Agent loop started for {self.config.user_id}")
         
         # Start a keep-alive self-pinger for Cloud Run (prevents instance freeze)
         keepalive_task = asyncio.create_task(self._keepalive_ping())
         
         try:
-            while self.state not in [AgentState.STOPPED]:
-                try:
-                    if self.state == AgentState.PAUSED:
-                        await asyncio.sleep(10)
-                        continue
-                    
-                    now = get_ist_now()
-                    hour, minute = now.hour, now.minute
-                    is_weekday = now.weekday() < 5
-                    time_in_mins = hour * 60 + minute
-                    
-                    # Market hours check (9:15 AM - 3:30 PM IST)
-                    market_open = is_weekday and 555 <= time_in_mins <= 930
-                    
-                    if not market_open:
-                        # Outside market hours - minimal checking
-                        if self.active_positions and is_weekday and time_in_mins > 930:
-                            await self._exit_all_positions("Market closed")
-                        self._add_event("IDLE", "Market closed", "Waiting for market to open...")
-                        await asyncio.sleep(300)  # Check every 5 min outside hours
-                        continue
-                    
-                    # === OBSERVE ===
-                    self.state = AgentState.OBSERVING
-                    snapshot = await self._observe_market()
-                    if not snapshot:
-                        self._consecutive_errors += 1
-                        if self._consecutive_errors > 5:
-                            self._add_event("ERROR", "Too many observation errors", "Pausing agent")
-                            self.state = AgentState.PAUSED
-                        await asyncio.sleep(30)
-                        continue
-                    self._consecutive_errors = 0
-                    
-                    # === SAFETY CHECKS ===
-                    should_continue = self._safety_checks()
-                    if not should_continue:
-                        await asyncio.sleep(60)
-                        continue
-                    
-                    # === THINK (LLM Reasoning) ===
-                    self.state = AgentState.THINKING
-                    decision = await self._think_and_decide(snapshot)
-                    
-                    if decision:
-                        self.decisions.appendleft(decision)
-                        
-                        # === ACT ===
-                        if decision.action != "WAIT" and decision.confidence_score >= self.evolved_params["confidence_threshold"]:
-                            self.state = AgentState.ACTING
-                            await self._execute_decision(decision)
-                        
-                        # === REFLECT ===
-                        self.state = AgentState.REFLECTING
-                        await self._reflect_on_positions(snapshot)
-                    
-                    # === ADAPT ===
-                    if self.config.adapt_enabled and self._cycle_count % 10 == 0:
-                        self._self_adapt()
-                    
-                    self._cycle_count += 1
-                    self.state = AgentState.OBSERVING
-                    
-                    # Persist state every 5 cycles
-                    if self._cycle_count % 5 == 0:
-                        await self._persist_state()
-                    
-                    await asyncio.sleep(self.config.think_interval)
-                    
-                except asyncio.CancelledError:
-                    break
-                except Exception as e:
-                    self._error_count += 1
-                    self._add_event("ERROR", "Agent loop error", str(e)[:200])
-                    logger.error(f"Agent loop error: {e}", exc_info=True)
-                    await asyncio.sleep(30)
+            await get_bot_scheduler().run(
+                subscriber_id(self), self._agent_cycle,
+                interval=lambda: self.config.think_interval,
+                lane=lambda: Lane.RISK if self.active_positions else Lane.ENTRY,
+                active=lambda: self.state != AgentState.STOPPED,
+            )
         finally:
             keepalive_task.cancel()
             try:
@@ -624,6 +572,77 @@ class AutonomousAIAgent:
             except asyncio.CancelledError:
                 pass
 
+    async def _agent_cycle(self) -> Optional[float]:
+        """One OBSERVE → THINK → DECIDE → ACT → REFLECT pass; returns seconds until the next one"""
+        try:
+            if self.state == AgentState.PAUSED:
+                return 10
+            
+            now = get_ist_now()
+            hour, minute = now.hour, now.minute
+            is_weekday = now.weekday() < 5
+            time_in_mins = hour * 60 + minute
+            
+            # Market hours check (9:15 AM - 3:30 PM IST)
+            market_open = is_weekday and 555 <= time_in_mins <= 930
+            
+            if not market_open:
+                # Outside market hours - minimal checking
+                if self.active_positions and is_weekday and time_in_mins > 930:
+                    await self._exit_all_positions("Market closed")
+                    self._persist_state()
+                self._add_event("IDLE", "Market closed", "Waiting for market to open...")
+                return 300  # Check every 5 min outside hours
+            
+            # === OBSERVE ===
+            self.state = AgentState.OBSERVING
+            snapshot = await self._observe_market()
+            if not snapshot:
+                self._consecutive_errors += 1
+                if self._consecutive_errors > 5:
+                    self._add_event("ERROR", "Too many observation errors", "Pausing agent")
+                    self.state = AgentState.PAUSED
+                return 30
+            self._consecutive_errors = 0
+            
+            # === SAFETY CHECKS ===
+            should_continue = self._safety_checks()
+            if not should_continue:
+                return 60
+            
+            # === THINK (LLM Reasoning) ===
+            self.state = AgentState.THINKING
+            decision = await self._think_and_decide(snapshot)
+            
+            if decision:
+                self.decisions.appendleft(decision)
+                
+                # === ACT ===
+                if decision.action != "WAIT" and decision.confidence_score >= self.evolved_params["confidence_threshold"]:
+                    self.state = AgentState.ACTING
+                    await self._execute_decision(decision)
+                
+                # === REFLECT ===
+                self.state = AgentState.REFLECTING
+                await self._reflect_on_positions(snapshot)
+            
+            # === ADAPT ===
+            if self.config.adapt_enabled and self._cycle_count % 10 == 0:
+                self._self_adapt()
+            
+            self._cycle_count += 1
+            self.state = AgentState.OBSERVING
+            
+            # Journal state changes every cycle (written to Firestore in batches)
+            self._persist_state()
+            
+            return self.config.think_interval
+        except Exception as e:
+            self._error_count += 1
+            self._add_event("ERROR", "Agent loop error", str(e)[:200])
+            logger.error(f"Agent loop error: {e}", exc_info=True)
+            return 30
+
     async def _keepalive_ping(self):
         """Self-ping to keep Cloud Run instance alive while agent is running.
         Cloud Run freezes CPU when no requests are in-flight; this HTTP self-ping
@@ -790,10 +809,17 @@ class AutonomousAIAgent:
             if not sec_id:
                 return False
 
-            # ── 1. Real-time LTP quote ──
-            result = await dhan.get_market_quote({"NSE_EQ": [sec_id]})
-            if result.get("status") != "success":
-                return False
+            runtime = get_bot_runtime()
+            underlying = self.config.underlying
+
+            async def fetch_quote():
+                result = await dhan.get_market_quote({"NSE_EQ": [sec_id]})
+                if result.get("status") != "success":
+                    raise ValueError(f"Dhan quote failed: {result.get('message', result.get('status'))}")
+                return result
+
+            # ── 1. Real-time LTP quote (shared with every agent on this underlying) ──
+            result = await runtime.get(topic("quote", underlying, "dhan"), fetch_quote)
 
             quote = next(iter(result.get("data", {}).values()), None)
             if not quote or not quote.get("ltp"):
@@ -813,11 +839,20 @@ class AutonomousAIAgent:
             from datetime import date
             today_str = date.today().strftime("%Y-%m-%d")
             instrument = "INDEX" if self.config.underlying in ["NIFTY", "BANKNIFTY", "FINNIFTY", "SENSEX"] else "EQUITY"
-            try:
-                intra = await dhan.get_historical_data(
+
+            async def fetch_candles(from_date: str, interval: str):
+                candles = await dhan.get_historical_data(
                     security_id=sec_id, exchange="NSE_EQ",
-                    from_date=today_str, to_date=today_str,
-                    interval="5", instrument=instrument
+                    from_date=from_date, to_date=today_str,
+                    interval=interval, instrument=instrument
+                )
+                if candles.get("status") != "success" or not candles.get("candles"):
+                    raise ValueError(f"No {interval} candles from Dhan")
+                return candles
+
+            try:
+                intra = await runtime.get(
+                    topic("bars", underlying, "dhan", "5", today_str), lambda: fetch_candles(today_str, "5")
                 )
                 if intra.get("status") == "success" and intra.get("candles"):
                     bars = pd.DataFrame(intra["candles"])
@@ -834,10 +869,8 @@ class AutonomousAIAgent:
             from datetime import timedelta as _td
             hist_from = (date.today() - _td(days=45)).strftime("%Y-%m-%d")
             try:
-                daily = await dhan.get_historical_data(
-                    security_id=sec_id, exchange="NSE_EQ",
-                    from_date=hist_from, to_date=today_str,
-                    interval="D", instrument=instrument
+                daily = await runtime.get(
+                    topic("history", underlying, "dhan", "D", today_str), lambda: fetch_candles(hist_from, "D")
                 )
                 if daily.get("status") == "success" and daily.get("candles"):
                     dhist = pd.DataFrame(daily["candles"])
@@ -890,10 +923,18 @@ class AutonomousAIAgent:
                 hist = ticker.history(period="30d")
                 return intraday, hist
 
-            intraday, hist = await asyncio.to_thread(_sync_fetch)
+            async def fetch_history():
+                intraday, hist = await asyncio.to_thread(_sync_fetch)
+                if hist is None or hist.empty:
+                    raise ValueError(f"yfinance returned empty for {yf_symbol}")
+                return intraday, hist
 
-            if hist is None or hist.empty:
-                self._add_event("WARN", "No market data", f"yfinance returned empty for {yf_symbol}")
+            try:
+                intraday, hist = await get_bot_runtime().get(
+                    topic("bars", self.config.underlying, "yfinance"), fetch_history
+                )
+            except ValueError as e:
+                self._add_event("WARN", "No market data", str(e))
                 return False
 
             self._intraday_bars = intraday
@@ -939,13 +980,12 @@ class AutonomousAIAgent:
 
             def _sync_vix():
                 t = yf.Ticker(INDIA_VIX_YF)
-                return t.history(period="5d")
+                vix_hist = t.history(period="5d")
+                if vix_hist is None or vix_hist.empty:
+                    raise ValueError("yfinance returned no India VIX history")
+                return float(vix_hist['Close'].iloc[-1])
 
-            vix_hist = await asyncio.to_thread(_sync_vix)
-            if vix_hist is not None and not vix_hist.empty:
-                snap.vix = float(vix_hist['Close'].iloc[-1])
-            else:
-                snap.vix = snap.rv if snap.rv > 0 else 14.0
+            snap.vix = await get_bot_runtime().get(topic("vix", "INDIAVIX"), lambda: asyncio.to_thread(_sync_vix))
         except Exception as e:
             snap.vix = snap.rv if snap.rv > 0 else 14.0
             logger.debug(f"VIX fetch fallback: {e}")
@@ -985,9 +1025,13 @@ class AutonomousAIAgent:
                 days_ahead = 7
             expiry = (today + timedelta(days=days_ahead)).strftime("%Y-%m-%d")
 
-            chain = await dhan.get_option_chain(sec_id, expiry)
-            if chain.get("status") != "success" or not chain.get("strikes"):
-                raise ValueError("Empty chain")
+            async def fetch_chain():
+                chain = await dhan.get_option_chain(sec_id, expiry)
+                if chain.get("status") != "success" or not chain.get("strikes"):
+                    raise ValueError("Empty chain")
+                return chain
+
+            chain = await get_bot_runtime().get(topic("chain", self.config.underlying, "feed", expiry), fetch_chain)
 
             total_call_oi = 0
             total_put_oi = 0
@@ -1052,8 +1096,8 @@ class AutonomousAIAgent:
             # Build the context prompt for Claude
             context = self._build_thinking_context(snapshot)
             
-            # Get Claude's reasoning
-            llm_response = await self._call_llm(context)
+            # Get Claude's reasoning (shared with any agent in the same market state)
+            llm_response = await self._call_llm(context, self._decision_fingerprint(snapshot))
             
             if not llm_response:
                 # Fallback to rule-based thinking
@@ -1315,147 +1359,70 @@ STYLE
 - Always be explicit about what could go wrong and how hedges address that.
 - Never output anything except the JSON object described above."""
     
-    async def _call_llm(self, prompt: str) -> Optional[str]:
-        """Call LLM API (Gemini primary, Claude fallback) with caching and rate-limiting."""
-
-        # --- rate-limit guard ---
+    def _decision_fingerprint(self, snap: MarketSnapshot) -> str:
+        """Decision-cache key: quantized spot / IV / time plus this agent's positions and settings"""
+        positions = []
+        for pos in self.active_positions[:5]:
+            strikes = "/".join(str(int(leg.get("strike", 0))) for leg in pos.get("legs", []))
+            target = abs(pos.get("target_pnl", 0)) or 1
+            # P&L in quarters of the target, so a position drifting toward target or stop re-asks
+            positions.append(f"{pos.get('strategy', '')}:{strikes}:{round(pos.get('current_pnl', 0) / target * 4)}")
+        settings = (
+            self.config.risk_level.value, self.config.num_lots, self.config.min_confidence,
+            tuple(self.config.allowed_strategies), self.config.use_mock,
+            self.evolved_params.get("confidence_threshold"),
+        )
+        return market_fingerprint(
+            f"ai_agent:{config_digest(settings)}",
+            snap.symbol or self.config.underlying,
+            snap.spot_price,
+            snap.atm_iv or snap.iv,
+            position=",".join(positions) or "flat",
+        ).key
+
+    async def _call_llm(self, prompt: str, cache_key: Optional[str] = None) -> Optional[str]:
+        """Call LLM API (Gemini primary, Claude fallback) through the decision cache, with rate-limiting."""
+        cache = get_llm_decision_cache()
+        cache_key = cache_key or prompt_key("ai_agent", prompt)
+
+        # --- rate-limit guard: serve a recent decision for this state before going rule-based ---
         if self._llm_call_count >= self._llm_daily_limit:
             logger.warning("LLM daily call limit reached (%s)", self._llm_daily_limit)
+            stale = cache.get_stale(cache_key)
+            if stale:
+                self._add_event("THINK", "LLM daily limit reached – reusing recent decision for this market state")
+                return stale
             self._add_event("WARNING", "LLM daily limit reached – falling back to rule-based")
             return None
 
-        # --- cache check ---
-        cache_key = hashlib.md5(prompt.encode()).hexdigest()
-        now = _time.time()
-        cached = self._llm_cache.get(cache_key)
-        if cached and (now - cached["ts"]) < self._llm_cache_ttl:
-            logger.info("LLM cache HIT (age %.0fs)", now - cached["ts"])
-            return cached["response"]
-
-        # --- Try Gemini first ---
-        gemini_key = os.environ.get('GEMINI_API_KEY', '')
-        if gemini_key:
-            result = await self._call_gemini(prompt, gemini_key)
-            if result:
-                self._llm_cache[cache_key] = {"response": result, "ts": now}
-                self._llm_call_count += 1
-                self._evict_stale_cache(now)
-                return result
-
-        # --- Fallback: Claude (if key available) ---
-        anthropic_key = os.environ.get('ANTHROPIC_API_KEY', '')
-        if anthropic_key:
-            result = await self._call_claude_api(prompt, anthropic_key)
-            if result:
-                self._llm_cache[cache_key] = {"response": result, "ts": now}
-                self._llm_call_count += 1
-                self._evict_stale_cache(now)
-                return result
-
-        return None
-
-    def _evict_stale_cache(self, now: float):
-        """Remove old cache entries to keep memory bounded."""
-        stale = [k for k, v in self._llm_cache.items() if (now - v["ts"]) > self._llm_cache_ttl * 5]
-        for k in stale:
-            del self._llm_cache[k]
-
-    async def _call_gemini(self, prompt: str, api_key: str) -> Optional[str]:
-        """Call Google Gemini API via REST. Tries multiple models for quota resilience."""
-        # Try models in order — each has its own quota pool
-        models = ["gemini-2.5-flash", "gemini-2.0-flash", "gemini-2.0-flash-lite"]
-
-        payload = {
-            "systemInstruction": {
-                "parts": [{"text": self._get_system_prompt()}]
-            },
-            "contents": [
-                {"role": "user", "parts": [{"text": prompt}]}
-            ],
-            "generationConfig": {
-                "temperature": 0.2,
-                "maxOutputTokens": 2000,
-                "responseMimeType": "application/json",
-            },
-        }
-
-        for model in models:
-            url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent?key={api_key}"
-            last_err = None
-            for attempt in range(2):
-                try:
-                    async with httpx.AsyncClient(timeout=60) as client:
-                        response = await client.post(url, json=payload)
-
-                    if response.status_code == 200:
-                        data = response.json()
-                        candidates = data.get("candidates", [])
-                        if candidates:
-                            parts = candidates[0].get("content", {}).get("parts", [])
-                            text = parts[0].get("text", "") if parts else ""
-                            if text:
-                                self._add_event("THINK", "Gemini responded",
-                                    f"Model: {model} | Length: {len(text)} chars")
-                                return text
-
-                    if response.status_code == 429:
-                        logger.info("Gemini %s quota exhausted, trying next model", model)
-                        break  # try next model
-
-                    logger.warning("Gemini %s returned %s: %s",
-                        model, response.status_code, response.text[:200])
-                    break  # non-retryable error, try next model
-
-                except Exception as e:
-                    last_err = e
-                    logger.error("Gemini %s error (attempt %d): %s", model, attempt + 1, e)
-                    if attempt < 1:
-                        await asyncio.sleep(3)
-
-        logger.error("All Gemini models failed. Last error: %s", last_err)
-        return None
-
-    async def _call_claude_api(self, prompt: str, api_key: str) -> Optional[str]:
-        """Call Claude API (fallback if Gemini unavailable)."""
-        last_err = None
-        for attempt in range(3):
-            try:
-                async with httpx.AsyncClient(timeout=45) as client:
-                    response = await client.post(
-                        "https://api.anthropic.com/v1/messages",
-                        headers={
-                            "x-api-key": api_key,
-                            "anthropic-version": "2023-06-01",
-                            "content-type": "application/json",
-                        },
-                        json={
-                            "model": "claude-sonnet-4-20250514",
-                            "max_tokens": 2000,
-                            "temperature": 0.2,
-                            "system": self._get_system_prompt(),
-                            "messages": [{"role": "user", "content": prompt}],
-                        },
-                    )
-
-                if response.status_code == 200:
-                    data = response.json()
-                    return data.get("content", [{}])[0].get("text", "")
-
-                if response.status_code == 429:
-                    wait = min(2 ** attempt * 5, 30)
-                    await asyncio.sleep(wait)
-                    continue
-
-                logger.warning("Claude API returned %s", response.status_code)
-                return None
-
-            except Exception as e:
-                last_err = e
-                if attempt < 2:
-                    await asyncio.sleep(2 ** attempt * 2)
-
-        logger.error("Claude API failed after 3 attempts: %s", last_err)
-        return None
+        result, source = await cache.get_or_compute(cache_key, lambda: self._call_llm_providers(prompt))
+        if source == "computed" and result:
+            self._llm_call_count += 1
+        elif result:
+            logger.info("LLM decision cache %s", source.upper())
+        else:
+            result = cache.get_stale(cache_key)
+        return result
+
+    async def _call_llm_providers(self, prompt: str) -> Optional[str]:
+        """One LLM request through the gateway: Gemini models first, Claude as hedge / fallback"""
+        result = await get_llm_gateway().complete(
+            LLMRequest(
+                prompt=prompt,
+                system=self._get_system_prompt(),
+                max_tokens=2000,
+                temperature=0.2,
+                json_mode=True,
+            ),
+            providers=AGENT_LLM_PROVIDERS,
+        )
+        if result is None:
+            logger.error("All LLM providers failed or unavailable")
+            return None
+        self._add_event("THINK", f"{result.provider.split(':')[0].title()} responded",
+            f"Model: {result.model} | {result.latency_ms:.0f}ms"
+            f"{' (hedged)' if result.hedged else ''} | Length: {len(result.text)} chars")
+        return result.text
     
     def _parse_llm_decision(self, llm_text: str, snap: MarketSnapshot, decision_id: str) -> AgentDecision:
         """Parse LLM response into a structured decision with robust JSON extraction"""
@@ -1808,6 +1775,7 @@ STYLE
         """Execute via Dhan broker API"""
         try:
             from services.broker_integration import DhanBroker, OrderRequest
+            from services.order_execution import LegOrder
             broker = DhanBroker()
             if not broker.is_configured():
                 self._add_event("ERROR", "Broker not configured",
@@ -1822,43 +1790,37 @@ STYLE
             orders_placed = []
 
             if decision.action == "ENTER":
+                legs = []
                 if decision.strategy in [StrategyType.SHORT_STRANGLE, StrategyType.IRON_CONDOR]:
-                    # Sell CE leg
-                    ce_order = OrderRequest(
-                        symbol=f"{self.config.underlying} CE {params.get('strike_ce', spot + 150)}",
-                        exchange="NFO",
-                        transaction_type="SELL",
-                        order_type="MARKET",
-                        product_type="INTRADAY",
-                        quantity=lot_size,
-                    )
-                    ce_result = await broker.place_order(ce_order)
-                    orders_placed.append({"leg": "SELL_CE", "result": ce_result.message, "success": ce_result.success})
-
-                    # Sell PE leg
-                    pe_order = OrderRequest(
-                        symbol=f"{self.config.underlying} PE {params.get('strike_pe', spot - 150)}",
-                        exchange="NFO",
-                        transaction_type="SELL",
-                        order_type="MARKET",
-                        product_type="INTRADAY",
-                        quantity=lot_size,
-                    )
-                    pe_result = await broker.place_order(pe_order)
-                    orders_placed.append({"leg": "SELL_PE", "result": pe_result.message, "success": pe_result.success})
+                    # Sell CE and PE legs in parallel
+                    for option_type, strike in (("CE", params.get('strike_ce', spot + 150)),
+                                                ("PE", params.get('strike_pe', spot - 150))):
+                        legs.append(LegOrder(f"SELL_{option_type}", OrderRequest(
+                            symbol=f"{self.config.underlying} {option_type} {strike}",
+                            exchange="NFO",
+                            transaction_type="SELL",
+                            order_type="MARKET",
+                            product_type="INTRADAY",
+                            quantity=lot_size,
+                        )))
 
                 elif decision.strategy in [StrategyType.LONG_CE, StrategyType.LONG_PE]:
                     direction = "CE" if decision.strategy == StrategyType.LONG_CE else "PE"
-                    order = OrderRequest(
+                    legs.append(LegOrder(f"BUY_{direction}", OrderRequest(
                         symbol=f"{self.config.underlying} {direction} {params.get('atm_strike', spot)}",
                         exchange="NFO",
                         transaction_type="BUY",
                         order_type="MARKET",
                         product_type="INTRADAY",
                         quantity=lot_size,
-                    )
-                    result = await broker.place_order(order)
-                    orders_placed.append({"leg": f"BUY_{direction}", "result": result.message, "success": result.success})
+                    )))
+
+                report = await broker.place_legs(legs)
+                orders_placed = [
+                    {"leg": name, "result": fill.message or fill.state.value, "success": fill.ok,
+                     "order_id": fill.order_id, "filled_qty": fill.executed_qty}
+                    for name, fill in report.legs.items()
+                ]
 
                 self._add_event("ACT", "Live orders placed", json.dumps(orders_placed, default=str)[:300])
                 return {"status": "placed", "orders": orders_placed}
@@ -17,11 +17,22 @@ import logging
 import json
 import os
 import httpx
-from datetime import datetime, time, timedelta, timezone
+import time as time_module
+from datetime import datetime, time, timedelta
 from dataclasses import dataclass, field, asdict
 from typing import Dict, List, Optional, Any, Tuple
 from enum import Enum
 
+from .market_replay import ist_now, is_replay_active
+from .http_clients import get_http_client
+from .rate_limiter import Priority, account_key, get_rate_limiter
+from .bot_runtime import get_bot_runtime, subscriber_id, topic
+from .bot_state_journal import JournalStream, get_bot_state_journal
+from .broker_integration import OrderRequest, ServiceBroker
+from .order_execution import ExecutionReport, LegOrder, OrderState
+from .llm_decision_cache import config_digest, get_llm_decision_cache, market_fingerprint
+from .llm_gateway import LLMRequest, get_llm_gateway
+
 logger = logging.getLogger(__name__)
 
 
@@ -56,6 +67,11 @@ DHAN_SECURITY_IDS = {
 # Default Dhan API base
 DHAN_API_BASE = "https://api.dhan.co/v2"
 
+CLAUDE_MODEL = "claude-sonnet-4-20250514"
+
+# Rule-based exits / adjustments must be decided within this budget, whatever the LLM is doing
+RISK_PATH_BUDGET_MS = 1.0
+
 
 # ============================================
 # ENUMS
@@ -155,6 +171,33 @@ class StranglePosition:
         if self.put_leg:
             delta += self.put_leg.greeks.delta * self.put_leg.quantity
         return delta
+    
+    def to_dict(self) -> Dict:
+        """JSON-safe form for the state journal"""
+        data = asdict(self)
+        data["status"] = self.status.value
+        data["entry_time"] = self.entry_time.isoformat() if self.entry_time else None
+        return data
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> "StranglePosition":
+        """Rebuild a position recorded with to_dict"""
+        def leg(leg_data: Optional[Dict]) -> Optional[OptionLeg]:
+            if not leg_data:
+                return None
+            leg_data = dict(leg_data)
+            leg_data["greeks"] = OptionGreeks(**(leg_data.get("greeks") or {}))
+            return OptionLeg(**leg_data)
+        
+        return cls(
+            call_leg=leg(data.get("call_leg")),
+            put_leg=leg(data.get("put_leg")),
+            status=PositionStatus(data.get("status", PositionStatus.NONE.value)),
+            entry_time=datetime.fromisoformat(data["entry_time"]) if data.get("entry_time") else None,
+            entry_credit=data.get("entry_credit", 0.0),
+            num_adjustments=data.get("num_adjustments", 0),
+            adjustment_history=list(data.get("adjustment_history") or []),
+        )
 
 
 @dataclass
@@ -229,6 +272,16 @@ class DeltaStrangleConfig:
     check_interval_seconds: int = 30
 
 
+@dataclass
+class AIAdvice:
+    """An LLM decision requested on one snapshot; applied only while its fingerprint still matches"""
+    snapshot_version: int
+    fingerprint: str
+    requested_at: float
+    decision: Optional[Dict] = None
+    received_at: Optional[float] = None
+
+
 # ============================================
 # CLAUDE AI PROMPTS - QUANTSTRANGLE AI
 # ============================================
@@ -631,10 +684,12 @@ class AIDeltaStrangleBot:
         broker_service: Any,
         access_token: str,
         broker: str = "dhan",
+        user_id: str = "default",
     ):
         self.broker_service = broker_service
         self.access_token = access_token
         self.broker = broker.lower()
+        self.user_id = user_id
         self.claude_api_key = os.environ.get('ANTHROPIC_API_KEY', '')
         
         # State
@@ -653,6 +708,18 @@ class AIDeltaStrangleBot:
         
         # HTTP client for API calls
         self._http_client: Optional[httpx.AsyncClient] = None
+        
+        # Crash-recoverable state (journal stream opened on start)
+        self._journal: Optional[JournalStream] = None
+        
+        # Scan pipeline: rule-based risk path inline, LLM advice in the background
+        self._snapshot_version = 0
+        self._advice: Optional[AIAdvice] = None
+        self._advice_task: Optional[asyncio.Task] = None
+        self.pipeline_stats = {
+            "scans": 0, "risk_path_ms_last": 0.0, "risk_path_ms_max": 0.0, "risk_budget_overruns": 0,
+            "advice_requested": 0, "advice_applied": 0, "advice_stale": 0,
+        }
     
     def _log(self, message: str, level: str = "INFO"):
         """Add log entry"""
@@ -668,9 +735,8 @@ class AIDeltaStrangleBot:
             logger.info(message)
     
     async def _get_http_client(self) -> httpx.AsyncClient:
-        """Get or create HTTP client"""
-        if self._http_client is None or self._http_client.is_closed:
-            self._http_client = httpx.AsyncClient(timeout=30.0)
+        """Shared broker client (pooled; owned by the HTTP client registry)"""
+        self._http_client = get_http_client("dhan")
         return self._http_client
     
     # ============================================
@@ -683,7 +749,8 @@ class AIDeltaStrangleBot:
         expiry: Optional[str] = None
     ) -> Dict:
         """
-        Fetch live option chain with Greeks from broker service
+        Live option chain with Greeks, shared with every bot on the same
+        broker, symbol and expiry through the bot runtime
         
         Returns unified format:
         {
@@ -698,59 +765,66 @@ class AIDeltaStrangleBot:
         symbol = symbol or self.config.underlying
         
         try:
-            # Use broker_service if available (preferred method)
-            if hasattr(self.broker_service, 'get_option_chain'):
-                self._log(f"Fetching option chain via broker_service for {symbol}")
-                
-                # Get expiry if not provided
-                if not expiry:
-                    expiry = await self._get_nearest_expiry(symbol)
-                
-                raw_chain = await self.broker_service.get_option_chain(symbol, expiry)
-                return self._transform_broker_option_chain(raw_chain, symbol, expiry)
-            
-            # Fallback to direct API call
-            self._log(f"Fetching option chain via direct API for {symbol}")
-            
-            # Get spot price first
-            spot_price = await self._get_spot_price(symbol)
+            return await get_bot_runtime().get(
+                topic("chain", symbol, self.broker, expiry or "nearest"),
+                lambda: self._fetch_option_chain(symbol, expiry),
+            )
+        except Exception as e:
+            self._log(f"Error fetching option chain: {e}", "ERROR")
+            # Return mock data for development, around the last live spot if any
+            last_spot = get_bot_runtime().peek(topic("spot", symbol))
+            spot = last_spot.data if last_spot else (25000 if symbol == "NIFTY" else 52000)
+            return self._generate_mock_option_chain(symbol, spot, expiry or "2025-02-20")
+    
+    async def _fetch_option_chain(self, symbol: str, expiry: Optional[str]) -> Dict:
+        """Fetch the option chain from broker service or Dhan. Raises on failure."""
+        # Use broker_service if available (preferred method)
+        if hasattr(self.broker_service, 'get_option_chain'):
+            self._log(f"Fetching option chain via broker_service for {symbol}")
             
             # Get expiry if not provided
             if not expiry:
                 expiry = await self._get_nearest_expiry(symbol)
             
-            # Fetch option chain from Dhan
-            client = await self._get_http_client()
-            
-            security_id = DHAN_SECURITY_IDS.get(symbol, 13)
-            
-            response = await client.post(
-                f"{DHAN_API_BASE}/optionchain",
-                headers={
-                    "access-token": self.access_token,
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "UnderlyingScrip": security_id,
-                    "Expiry": expiry
-                }
-            )
-            
-            if response.status_code != 200:
-                self._log(f"Dhan option chain error: {response.text}", "ERROR")
-                # Return simulated data for testing
-                return self._generate_mock_option_chain(symbol, spot_price, expiry)
-            
-            data = response.json()
-            
-            # Parse and structure the data
-            return self._parse_dhan_option_chain(data, spot_price, expiry)
-            
-        except Exception as e:
-            self._log(f"Error fetching option chain: {e}", "ERROR")
-            # Return mock data for development
-            spot = 25000 if symbol == "NIFTY" else 52000
-            return self._generate_mock_option_chain(symbol, spot, expiry or "2025-02-20")
+            raw_chain = await self.broker_service.get_option_chain(symbol, expiry)
+            return self._transform_broker_option_chain(raw_chain, symbol, expiry)
+        
+        # Fallback to direct API call
+        self._log(f"Fetching option chain via direct API for {symbol}")
+        
+        # Get spot price first
+        spot_price = await self._get_spot_price(symbol)
+        
+        # Get expiry if not provided
+        if not expiry:
+            expiry = await self._get_nearest_expiry(symbol)
+        
+        # Fetch option chain from Dhan
+        client = await self._get_http_client()
+        
+        security_id = DHAN_SECURITY_IDS.get(symbol, 13)
+        
+        await get_rate_limiter().acquire("dhan.option_chain", Priority.HIGH, account=account_key(self.access_token))
+        response = await client.post(
+            f"{DHAN_API_BASE}/optionchain",
+            headers={
+                "access-token": self.access_token,
+                "Content-Type": "application/json"
+            },
+            json={
+                "UnderlyingScrip": security_id,
+                "Expiry": expiry
+            }
+        )
+        
+        if response.status_code != 200:
+            raise ValueError(f"Dhan option chain error: {response.text}")
+        
+        data = response.json()
+        
+        # Parse and structure the data
+        return self._parse_dhan_option_chain(data, spot_price, expiry)
+
     
     def _transform_broker_option_chain(self, raw_chain: Dict, symbol: str, expiry: str) -> Dict:
         """Transform broker_service option chain format to bot's expected format"""
@@ -964,41 +1038,54 @@ class AIDeltaStrangleBot:
         return result
     
     async def _get_spot_price(self, symbol: str) -> float:
-        """Get live spot price from Dhan"""
+        """Live spot price (shared "spot" topic), hardcoded fallback if unavailable"""
         try:
-            client = await self._get_http_client()
-            
-            # Dhan index quote endpoint
-            security_id = DHAN_SECURITY_IDS.get(symbol, 13)
-            
-            response = await client.post(
-                f"{DHAN_API_BASE}/marketfeed/ltp",
-                headers={
-                    "access-token": self.access_token,
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "NSE_INDEX": [security_id]
-                }
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                if "data" in data and "NSE_INDEX" in data["data"]:
-                    return float(data["data"]["NSE_INDEX"].get(str(security_id), {}).get("last_price", 0))
-            
-            # Fallback hardcoded
-            return 25900.0 if symbol == "NIFTY" else 52000.0
-            
+            return await get_bot_runtime().get(topic("spot", symbol), lambda: self._fetch_spot_price(symbol))
         except Exception as e:
             self._log(f"Error getting spot price: {e}", "ERROR")
             return 25900.0 if symbol == "NIFTY" else 52000.0
     
+    async def _fetch_spot_price(self, symbol: str) -> float:
+        """Get live spot price from Dhan. Raises if no price is returned."""
+        client = await self._get_http_client()
+        
+        # Dhan index quote endpoint
+        security_id = DHAN_SECURITY_IDS.get(symbol, 13)
+        
+        await get_rate_limiter().acquire("dhan.quote", Priority.HIGH, account=account_key(self.access_token))
+        response = await client.post(
+            f"{DHAN_API_BASE}/marketfeed/ltp",
+            headers={
+                "access-token": self.access_token,
+                "Content-Type": "application/json"
+            },
+            json={
+                "NSE_INDEX": [security_id]
+            }
+        )
+        
+        price = 0.0
+        if response.status_code == 200:
+            data = response.json()
+            if "data" in data and "NSE_INDEX" in data["data"]:
+                price = float(data["data"]["NSE_INDEX"].get(str(security_id), {}).get("last_price", 0))
+        if price <= 0:
+            raise ValueError(f"No {symbol} spot from Dhan (HTTP {response.status_code})")
+        return price
+    
     async def _get_nearest_expiry(self, symbol: str) -> str:
         """Get nearest weekly expiry date"""
         try:
+            # A market replay serves the recorded expiries through its broker;
+            # live trading keeps Dhan's expiry list
+            if is_replay_active() and hasattr(self.broker_service, 'get_expiry_list'):
+                expiries = await self.broker_service.get_expiry_list(symbol)
+                if expiries:
+                    return expiries[0]
+            
             client = await self._get_http_client()
             
+            await get_rate_limiter().acquire("dhan.option_chain", Priority.HIGH, account=account_key(self.access_token))
             response = await client.get(
                 f"{DHAN_API_BASE}/expirylist/{symbol}",
                 headers={"access-token": self.access_token}
@@ -1135,27 +1222,18 @@ class AIDeltaStrangleBot:
             }
         
         try:
-            import anthropic
-            
-            client = anthropic.Anthropic(api_key=self.claude_api_key)
-            
             # Build user prompt with all position data
             pos = position or self.position
             user_prompt = self._build_claude_prompt(option_chain, pos)
             
-            # Call Claude with QuantStrangleAI system prompt
-            message = client.messages.create(
-                model="claude-sonnet-4-20250514",
-                max_tokens=4000,  # Increased for detailed response
-                temperature=0.3,  # Lower temperature for consistent decisions
-                system=STRANGLE_BOT_SYSTEM_PROMPT,
-                messages=[
-                    {"role": "user", "content": user_prompt}
-                ]
+            # Bots in the same quantized market / position state share one Claude call
+            response, source = await get_llm_decision_cache().get_or_compute(
+                self._decision_fingerprint(option_chain, pos),
+                lambda: self._request_claude(user_prompt)
             )
-            
-            # Parse response
-            response_text = message.content[0].text
+            if response is None:
+                raise RuntimeError("No response from the shared Claude request")
+            response_text, usage, model = response
             
             # Extract JSON from response
             try:
@@ -1177,11 +1255,9 @@ class AIDeltaStrangleBot:
             # Add metadata
             decision["ai_available"] = True
             decision["api_call_timestamp"] = datetime.now().isoformat()
-            decision["model_used"] = "claude-sonnet-4-20250514"
-            decision["tokens_used"] = {
-                "input": message.usage.input_tokens,
-                "output": message.usage.output_tokens
-            }
+            decision["model_used"] = model
+            decision["tokens_used"] = usage if source == "computed" else {"input": 0, "output": 0}
+            decision["cache"] = source
             decision["raw_response"] = response_text[:1000]
             
             # Store in decision history
@@ -1202,7 +1278,8 @@ class AIDeltaStrangleBot:
             action = decision.get("decision", {}).get("action", "UNKNOWN")
             confidence = decision.get("decision", {}).get("confidence_score", 0)
             urgency = decision.get("decision", {}).get("urgency", "LOW")
-            self._log(f"🤖 AI Decision: {action} | Urgency: {urgency} | Confidence: {confidence}%")
+            cached = "" if source == "computed" else f" ({source})"
+            self._log(f"🤖 AI Decision: {action} | Urgency: {urgency} | Confidence: {confidence}%{cached}")
             
             return decision
             
@@ -1215,6 +1292,41 @@ class AIDeltaStrangleBot:
                 "error": str(e)
             }
     
+    async def _request_claude(self, user_prompt: str) -> Tuple[str, Dict, str]:
+        """One Claude call with the QuantStrangleAI system prompt: (response text, token usage, model)"""
+        result = await get_llm_gateway().complete(
+            LLMRequest(
+                prompt=user_prompt,
+                system=STRANGLE_BOT_SYSTEM_PROMPT,
+                max_tokens=4000,  # Increased for detailed response
+                temperature=0.3,  # Lower temperature for consistent decisions
+                api_keys={"claude": self.claude_api_key},
+            ),
+            providers=(f"claude:{CLAUDE_MODEL}",),
+        )
+        if result is None:
+            raise RuntimeError("Claude unavailable (request failed or circuit open)")
+        return result.text, result.usage, result.model
+    
+    def _decision_fingerprint(self, option_chain: Dict, position: StranglePosition) -> str:
+        """Decision-cache key: quantized spot / ATM IV / time, position state and bot settings"""
+        legs = []
+        for leg in (position.call_leg, position.put_leg):
+            if leg:
+                # Delta in 5-point steps: an approaching adjustment trigger asks again
+                legs.append(f"{leg.option_type}{leg.strike:g}d{round(leg.greeks.delta / 5)}")
+        state = position.status.value
+        if legs:
+            pnl_step = round(position.total_pnl / position.entry_credit * 10) if position.entry_credit else 0
+            state = f"{state}:{'/'.join(legs)}:a{position.num_adjustments}:p{pnl_step}"
+        return market_fingerprint(
+            f"delta_strangle:{config_digest(self.config)}",
+            self.config.underlying,
+            option_chain.get("underlying_price", 0),
+            self.get_atm_iv(option_chain),
+            position=state,
+        ).key
+    
     def _create_fallback_decision(self, response_text: str) -> Dict:
         """Create fallback decision when JSON parsing fails"""
         return {
@@ -1482,35 +1594,34 @@ class AIDeltaStrangleBot:
             lot_size = LOT_SIZES.get(self.config.underlying, 65)
             quantity = lot_size * self.config.num_lots
             
-            # Place orders (SELL)
-            call_order = await self._place_order(
-                strike=call_data["strike"],
-                option_type="CE",
-                quantity=quantity,
-                side="SELL",
-                price=call_data["price"],
-                security_id=call_data.get("security_id", ""),
-                instrument_key=call_data.get("instrument_key", "")
-            )
-            
-            put_order = await self._place_order(
-                strike=put_data["strike"],
-                option_type="PE",
-                quantity=quantity,
-                side="SELL",
-                price=put_data["price"],
-                security_id=put_data.get("security_id", ""),
-                instrument_key=put_data.get("instrument_key", "")
-            )
+            # Place orders (SELL), both legs in parallel
+            expiry = await self._get_nearest_expiry(self.config.underlying)
+            report = await self._execute_legs([
+                self._leg("call", call_data["strike"], "CE", quantity, "SELL", call_data["price"], expiry,
+                          call_data.get("security_id", ""), call_data.get("instrument_key", "")),
+                self._leg("put", put_data["strike"], "PE", quantity, "SELL", put_data["price"], expiry,
+                          put_data.get("security_id", ""), put_data.get("instrument_key", "")),
+            ])
+            call_order, put_order = report.result("call"), report.result("put")
+            if not report.any_ok:
+                return {"success": False, "error": f"Strangle orders failed: {report.summary()}",
+                        "call_order": call_order, "put_order": put_order}
+            if not report.success:
+                self._log("Only one strangle leg was placed; managing the filled leg alone", "WARNING")
+            
+            call_price = call_order.get("price") or call_data["price"]
+            put_price = put_order.get("price") or put_data["price"]
+            call_qty = report.legs["call"].executed_qty
+            put_qty = report.legs["put"].executed_qty
             
             # Update position
             self.position = StranglePosition(
                 call_leg=OptionLeg(
                     option_type="CE",
                     strike=call_data["strike"],
-                    entry_price=call_data["price"],
-                    current_price=call_data["price"],
-                    quantity=quantity,
+                    entry_price=call_price,
+                    current_price=call_price,
+                    quantity=call_qty,
                     greeks=OptionGreeks(
                         delta=call_data["delta"],
                         gamma=call_data["gamma"],
@@ -1521,13 +1632,13 @@ class AIDeltaStrangleBot:
                     order_id=call_order.get("order_id", ""),
                     security_id=call_data.get("security_id", ""),
                     instrument_key=call_data.get("instrument_key", "")
-                ),
+                ) if call_qty else None,
                 put_leg=OptionLeg(
                     option_type="PE",
                     strike=put_data["strike"],
-                    entry_price=put_data["price"],
-                    current_price=put_data["price"],
-                    quantity=quantity,
+                    entry_price=put_price,
+                    current_price=put_price,
+                    quantity=put_qty,
                     greeks=OptionGreeks(
                         delta=put_data["delta"],
                         gamma=put_data["gamma"],
@@ -1538,16 +1649,18 @@ class AIDeltaStrangleBot:
                     order_id=put_order.get("order_id", ""),
                     security_id=put_data.get("security_id", ""),
                     instrument_key=put_data.get("instrument_key", "")
-                ),
+                ) if put_qty else None,
                 status=PositionStatus.OPEN,
                 entry_time=datetime.now(),
-                entry_credit=(call_data["price"] + put_data["price"]) * quantity
+                entry_credit=call_price * call_qty + put_price * put_qty
             )
+            self._journal_state(urgent=True)
             
             return {
                 "success": True,
                 "call_order": call_order,
                 "put_order": put_order,
+                "execution": report.to_dict(),
                 "position": {
                     "call_strike": call_data["strike"],
                     "call_delta": call_data["delta"],
@@ -1613,31 +1726,25 @@ class AIDeltaStrangleBot:
             lot_size = LOT_SIZES.get(self.config.underlying, 65)
             quantity = lot_size * self.config.num_lots
             
-            # Place 4 orders: SELL short legs, BUY long (wing) legs
-            sc_order = await self._place_order(
-                strike=short_call["strike"], option_type="CE", quantity=quantity,
-                side="SELL", price=short_call["price"],
-                security_id=short_call.get("security_id", ""),
-                instrument_key=short_call.get("instrument_key", "")
-            )
-            lc_order = await self._place_order(
-                strike=long_call["strike"], option_type="CE", quantity=quantity,
-                side="BUY", price=long_call.get("price", 0),
-                security_id=long_call.get("security_id", ""),
-                instrument_key=long_call.get("instrument_key", "")
-            )
-            sp_order = await self._place_order(
-                strike=short_put["strike"], option_type="PE", quantity=quantity,
-                side="SELL", price=short_put["price"],
-                security_id=short_put.get("security_id", ""),
-                instrument_key=short_put.get("instrument_key", "")
-            )
-            lp_order = await self._place_order(
-                strike=long_put["strike"], option_type="PE", quantity=quantity,
-                side="BUY", price=long_put.get("price", 0),
-                security_id=long_put.get("security_id", ""),
-                instrument_key=long_put.get("instrument_key", "")
-            )
+            # Place 4 orders: BUY long (wing) legs first, then SELL short legs
+            expiry = await self._get_nearest_expiry(self.config.underlying)
+            specs = [
+                ("long_call", long_call["strike"], "CE", quantity, "BUY", long_call.get("price", 0), expiry,
+                 long_call.get("security_id", ""), long_call.get("instrument_key", "")),
+                ("long_put", long_put["strike"], "PE", quantity, "BUY", long_put.get("price", 0), expiry,
+                 long_put.get("security_id", ""), long_put.get("instrument_key", "")),
+                ("short_call", short_call["strike"], "CE", quantity, "SELL", short_call["price"], expiry,
+                 short_call.get("security_id", ""), short_call.get("instrument_key", "")),
+                ("short_put", short_put["strike"], "PE", quantity, "SELL", short_put["price"], expiry,
+                 short_put.get("security_id", ""), short_put.get("instrument_key", "")),
+            ]
+            report = await self._execute_legs([self._leg(*spec) for spec in specs])
+            if not report.success:
+                return await self._abandon_entry("Iron Condor", report, specs)
+            sc_order, lc_order = report.result("short_call"), report.result("long_call")
+            sp_order, lp_order = report.result("short_put"), report.result("long_put")
+            quantity = min(fill.executed_qty for fill in report.legs.values())
+            trim = await self._trim_to_quantity(report, specs, quantity)
             
             # Net credit = (short premiums sold) - (long premiums paid)
             net_credit = (
@@ -1680,6 +1787,7 @@ class AIDeltaStrangleBot:
                 entry_time=datetime.now(),
                 entry_credit=net_credit
             )
+            self._journal_state(urgent=True)
             
             self._log(f"✅ Iron Condor entered! Net credit: ₹{net_credit:.2f}, Max loss: ₹{max_loss:.2f}")
             
@@ -1690,6 +1798,8 @@ class AIDeltaStrangleBot:
                     "short_call": sc_order, "long_call": lc_order,
                     "short_put": sp_order, "long_put": lp_order
                 },
+                "execution": report.to_dict(),
+                "trim": trim.to_dict() if trim else None,
                 "position": {
                     "short_call_strike": short_call["strike"],
                     "long_call_strike": long_call["strike"],
@@ -1759,31 +1869,25 @@ class AIDeltaStrangleBot:
             lot_size = LOT_SIZES.get(self.config.underlying, 65)
             quantity = lot_size * self.config.num_lots
             
-            # Place 4 orders
-            sc_order = await self._place_order(
-                strike=atm_strike, option_type="CE", quantity=quantity,
-                side="SELL", price=atm_call.get("price", 0),
-                security_id=atm_call.get("security_id", ""),
-                instrument_key=atm_call.get("instrument_key", "")
-            )
-            sp_order = await self._place_order(
-                strike=atm_strike, option_type="PE", quantity=quantity,
-                side="SELL", price=atm_put.get("price", 0),
-                security_id=atm_put.get("security_id", ""),
-                instrument_key=atm_put.get("instrument_key", "")
-            )
-            lc_order = await self._place_order(
-                strike=long_call_strike, option_type="CE", quantity=quantity,
-                side="BUY", price=long_call.get("price", 0),
-                security_id=long_call.get("security_id", ""),
-                instrument_key=long_call.get("instrument_key", "")
-            )
-            lp_order = await self._place_order(
-                strike=long_put_strike, option_type="PE", quantity=quantity,
-                side="BUY", price=long_put.get("price", 0),
-                security_id=long_put.get("security_id", ""),
-                instrument_key=long_put.get("instrument_key", "")
-            )
+            # Place 4 orders: wings first, then the ATM shorts
+            expiry = await self._get_nearest_expiry(self.config.underlying)
+            specs = [
+                ("long_call", long_call_strike, "CE", quantity, "BUY", long_call.get("price", 0), expiry,
+                 long_call.get("security_id", ""), long_call.get("instrument_key", "")),
+                ("long_put", long_put_strike, "PE", quantity, "BUY", long_put.get("price", 0), expiry,
+                 long_put.get("security_id", ""), long_put.get("instrument_key", "")),
+                ("short_call", atm_strike, "CE", quantity, "SELL", atm_call.get("price", 0), expiry,
+                 atm_call.get("security_id", ""), atm_call.get("instrument_key", "")),
+                ("short_put", atm_strike, "PE", quantity, "SELL", atm_put.get("price", 0), expiry,
+                 atm_put.get("security_id", ""), atm_put.get("instrument_key", "")),
+            ]
+            report = await self._execute_legs([self._leg(*spec) for spec in specs])
+            if not report.success:
+                return await self._abandon_entry("Iron Butterfly", report, specs)
+            sc_order, lc_order = report.result("short_call"), report.result("long_call")
+            sp_order, lp_order = report.result("short_put"), report.result("long_put")
+            quantity = min(fill.executed_qty for fill in report.legs.values())
+            trim = await self._trim_to_quantity(report, specs, quantity)
             
             net_credit = (
                 (atm_call.get("price", 0) + atm_put.get("price", 0)) -
@@ -1802,6 +1906,7 @@ class AIDeltaStrangleBot:
                         theta=atm_call.get("theta", 0), vega=atm_call.get("vega", 0),
                         iv=atm_call.get("iv", 0)
                     ),
+                    order_id=sc_order.get("order_id", ""),
                     security_id=atm_call.get("security_id", ""),
                     instrument_key=atm_call.get("instrument_key", "")
                 ),
@@ -1814,6 +1919,7 @@ class AIDeltaStrangleBot:
                         theta=atm_put.get("theta", 0), vega=atm_put.get("vega", 0),
                         iv=atm_put.get("iv", 0)
                     ),
+                    order_id=sp_order.get("order_id", ""),
                     security_id=atm_put.get("security_id", ""),
                     instrument_key=atm_put.get("instrument_key", "")
                 ),
@@ -1821,6 +1927,7 @@ class AIDeltaStrangleBot:
                 entry_time=datetime.now(),
                 entry_credit=net_credit
             )
+            self._journal_state(urgent=True)
             
             self._log(f"✅ Iron Butterfly entered! Net credit: ₹{net_credit:.2f}, Max loss: ₹{max_loss:.2f}")
             
@@ -1831,6 +1938,8 @@ class AIDeltaStrangleBot:
                     "short_call": sc_order, "short_put": sp_order,
                     "long_call": lc_order, "long_put": lp_order
                 },
+                "execution": report.to_dict(),
+                "trim": trim.to_dict() if trim else None,
                 "position": {
                     "atm_strike": atm_strike,
                     "long_call_strike": long_call_strike,
@@ -1924,36 +2033,31 @@ class AIDeltaStrangleBot:
             
             self.position.status = PositionStatus.ADJUSTING
             
-            # Close current leg (BUY)
-            # Close current leg (BUY to close)
-            close_order = await self._place_order(
-                strike=current_leg.strike,
-                option_type=leg_to_adjust,
-                quantity=current_leg.quantity,
-                side="BUY",
-                price=current_leg.current_price,
-                security_id=current_leg.security_id,
-                instrument_key=current_leg.instrument_key
-            )
-            
-            # Open new leg (SELL)
-            open_order = await self._place_order(
-                strike=new_strike_data["strike"],
-                option_type=leg_to_adjust,
-                quantity=current_leg.quantity,
-                side="SELL",
-                price=new_strike_data["price"],
-                security_id=new_strike_data.get("security_id", ""),
-                instrument_key=new_strike_data.get("instrument_key", "")
-            )
+            # Close current leg (BUY to close), then open the new leg (SELL) once the close has filled
+            expiry = await self._get_nearest_expiry(self.config.underlying)
+            report = await self._execute_legs([
+                self._leg("close", current_leg.strike, leg_to_adjust, current_leg.quantity, "BUY",
+                          current_leg.current_price, expiry, current_leg.security_id, current_leg.instrument_key),
+                self._leg("open", new_strike_data["strike"], leg_to_adjust, current_leg.quantity, "SELL",
+                          new_strike_data["price"], expiry, new_strike_data.get("security_id", ""),
+                          new_strike_data.get("instrument_key", "")),
+            ])
+            close_order, open_order = report.result("close"), report.result("open")
+            if not report.legs["close"].ok:
+                self.position.status = PositionStatus.OPEN
+                return {"success": False, "error": f"Close of {leg_to_adjust} {current_leg.strike} failed: "
+                        f"{close_order.get('error')}", "close_order": close_order}
+            if not open_order["success"]:
+                self._log(f"Rolled-to {leg_to_adjust} leg was not placed; {leg_to_adjust} side is now flat", "WARNING")
+            open_price = open_order.get("price") or new_strike_data["price"]
             
             # Update leg
             new_leg = OptionLeg(
                 option_type=leg_to_adjust,
                 strike=new_strike_data["strike"],
-                entry_price=new_strike_data["price"],
-                current_price=new_strike_data["price"],
-                quantity=current_leg.quantity,
+                entry_price=open_price,
+                current_price=open_price,
+                quantity=report.legs["open"].executed_qty,
                 greeks=OptionGreeks(
                     delta=new_strike_data["delta"],
                     gamma=new_strike_data["gamma"],
@@ -1964,7 +2068,7 @@ class AIDeltaStrangleBot:
                 order_id=open_order.get("order_id", ""),
                 security_id=new_strike_data.get("security_id", ""),
                 instrument_key=new_strike_data.get("instrument_key", "")
-            )
+            ) if open_order["success"] else None
             
             if leg_to_adjust == "CE":
                 self.position.call_leg = new_leg
@@ -1981,9 +2085,10 @@ class AIDeltaStrangleBot:
             })
             self.position.status = PositionStatus.OPEN
             self.last_adjustment_time = datetime.now()
+            self._journal_state(urgent=True)
             
             return {
-                "success": True,
+                "success": bool(open_order["success"]),
                 "close_order": close_order,
                 "open_order": open_order,
                 "old_strike": current_leg.strike,
@@ -2006,36 +2111,36 @@ class AIDeltaStrangleBot:
             
             results = {"call_close": None, "put_close": None}
             
-            # Close call leg
-            if self.position.call_leg:
-                results["call_close"] = await self._place_order(
-                    strike=self.position.call_leg.strike,
-                    option_type="CE",
-                    quantity=self.position.call_leg.quantity,
-                    side="BUY",
-                    price=self.position.call_leg.current_price,
-                    security_id=self.position.call_leg.security_id,
-                    instrument_key=self.position.call_leg.instrument_key
-                )
-            
-            # Close put leg
-            if self.position.put_leg:
-                results["put_close"] = await self._place_order(
-                    strike=self.position.put_leg.strike,
-                    option_type="PE",
-                    quantity=self.position.put_leg.quantity,
-                    side="BUY",
-                    price=self.position.put_leg.current_price,
-                    security_id=self.position.put_leg.security_id,
-                    instrument_key=self.position.put_leg.instrument_key
-                )
+            # Close both legs in parallel
+            expiry = await self._get_nearest_expiry(self.config.underlying)
+            legs = [
+                self._leg(name, leg.strike, leg.option_type, leg.quantity, "BUY", leg.current_price, expiry,
+                          leg.security_id, leg.instrument_key)
+                for name, leg in (("call_close", self.position.call_leg), ("put_close", self.position.put_leg))
+                if leg
+            ]
+            report = await self._execute_legs(legs)
+            for name in report.legs:
+                results[name] = report.result(name)
             
             final_pnl = self.position.total_pnl
             
+            if not report.success:
+                # Keep managing the legs that are still open; the next cycle retries the exit
+                if results["call_close"] and results["call_close"]["success"]:
+                    self.position.call_leg = None
+                if results["put_close"] and results["put_close"]["success"]:
+                    self.position.put_leg = None
+                self.position.status = PositionStatus.OPEN
+                self._journal_state(urgent=True)
+                self._log(f"Position close incomplete: {report.summary()}", "ERROR")
+                return {"success": False, "error": "Not all legs closed", "results": results}
+            
             self._log(f"Position closed. Final P&L: ₹{final_pnl:.2f}")
             
             # Reset position
             self.position.status = PositionStatus.CLOSED
+            self._journal_state(urgent=True)
             
             return {
                 "success": True,
@@ -2055,21 +2160,25 @@ class AIDeltaStrangleBot:
         side: str,
         price: float,
         security_id: str = "",
-        instrument_key: str = ""
+        instrument_key: str = "",
+        expiry: Optional[str] = None
     ) -> Dict:
         """Place order via broker"""
         try:
-            # Get expiry
-            expiry = await self._get_nearest_expiry(self.config.underlying)
+            # Get expiry (multi-leg orders resolve it once for all legs)
+            expiry = expiry or await self._get_nearest_expiry(self.config.underlying)
             
             if self.broker == "upstox":
-                return await self._place_upstox_order(
+                result = await self._place_upstox_order(
                     strike, option_type, quantity, side, price, expiry, instrument_key
                 )
             else:
-                return await self._place_dhan_order(
+                result = await self._place_dhan_order(
                     strike, option_type, quantity, side, price, expiry, security_id
                 )
+            
+            self._journal_fill(result, strike=strike, option_type=option_type, quantity=quantity, side=side, price=price)
+            return result
                 
         except Exception as e:
             self._log(f"Order placement error: {e}", "ERROR")
@@ -2099,6 +2208,7 @@ class AIDeltaStrangleBot:
             
             client = await self._get_http_client()
             
+            await get_rate_limiter().acquire("upstox.orders", account=account_key(self.access_token))
             response = await client.post(
                 "https://api.upstox.com/v2/order/place",
                 headers={
@@ -2154,22 +2264,29 @@ class AIDeltaStrangleBot:
             underlying_key = underlying_map.get(self.config.underlying, f"NSE_INDEX|{self.config.underlying}")
             url = f"https://api.upstox.com/v2/option/contract?instrument_key={underlying_key}"
             
-            client = await self._get_http_client()
-            response = await client.get(
-                url,
-                headers={
-                    "Authorization": f"Bearer {self.access_token}",
-                    "Accept": "application/json"
-                }
-            )
+            async def fetch_contracts() -> List[Dict]:
+                client = await self._get_http_client()
+                await get_rate_limiter().acquire("upstox.data", account=account_key(self.access_token))
+                response = await client.get(
+                    url,
+                    headers={
+                        "Authorization": f"Bearer {self.access_token}",
+                        "Accept": "application/json"
+                    }
+                )
+                if response.status_code != 200:
+                    raise RuntimeError(f"Upstox contract API error: {response.status_code}")
+                return response.json().get("data", [])
             
-            if response.status_code != 200:
-                self._log(f"Upstox contract API error: {response.status_code}", "ERROR")
+            # The contract list only changes day to day; fetched once and shared by every leg and bot
+            try:
+                contracts = await get_bot_runtime().get(
+                    topic("contracts", self.config.underlying, "upstox"), fetch_contracts
+                )
+            except Exception as e:
+                self._log(str(e), "ERROR")
                 return None
             
-            data = response.json()
-            contracts = data.get("data", [])
-            
             # Parse expiry to match format
             exp_date = datetime.strptime(expiry, "%Y-%m-%d")
             expiry_str = exp_date.strftime("%Y-%m-%d")
@@ -2251,6 +2368,7 @@ class AIDeltaStrangleBot:
             
             self._log(f"Placing Dhan order directly: {transaction_type} {quantity} x {strike}{option_type}")
             
+            await get_rate_limiter().acquire("dhan.orders", account=account_key(self.access_token))
             response = await client.post(
                 f"{DHAN_API_BASE}/orders",
                 headers={
@@ -2293,6 +2411,125 @@ class AIDeltaStrangleBot:
             self._log(f"Dhan order exception: {e}", "ERROR")
             return {"success": False, "error": str(e), "broker": "dhan"}
     
+    # ============================================
+    # MULTI-LEG EXECUTION
+    # ============================================
+    
+    def _leg(
+        self,
+        name: str,
+        strike: float,
+        option_type: str,
+        quantity: int,
+        side: str,
+        price: float,
+        expiry: str,
+        security_id: str = "",
+        instrument_key: str = ""
+    ) -> LegOrder:
+        """One leg for the execution pipeline, placed through _place_order"""
+        async def submit(qty: int) -> Dict:
+            return await self._place_order(
+                strike, option_type, qty, side, price, security_id, instrument_key, expiry=expiry
+            )
+        
+        request = OrderRequest(
+            symbol=f"{self.config.underlying} {strike:g}{option_type}",
+            exchange="NFO",
+            transaction_type=side,
+            quantity=quantity,
+            order_type="MARKET",
+            price=price,
+            tag="delta_strangle"
+        )
+        return LegOrder(name, request, submit=submit)
+    
+    async def _execute_legs(self, legs: List[LegOrder]) -> ExecutionReport:
+        """Place legs through the shared pipeline: BUY legs first, each group in parallel, fills tracked"""
+        report = await ServiceBroker(self.broker_service, self.broker).place_legs(legs)
+        self._log(f"Orders: {report.summary()}", "INFO" if report.success else "WARNING")
+        return report
+    
+    async def _trim_to_quantity(self, report: ExecutionReport, specs: List[Tuple], quantity: int) -> Optional[ExecutionReport]:
+        """Square off what each leg filled above the booked quantity, so no untracked lots stay open"""
+        trim = []
+        for name, strike, option_type, _, side, price, expiry, security_id, instrument_key in specs:
+            excess = report.legs[name].executed_qty - quantity
+            if excess > 0:
+                trim.append(self._leg(
+                    f"trim_{name}", strike, option_type, excess,
+                    "SELL" if side == "BUY" else "BUY", price, expiry, security_id, instrument_key
+                ))
+        if not trim:
+            return None
+        self._log(f"Legs filled unevenly; squaring off the excess of {len(trim)} legs above {quantity}", "WARNING")
+        return await self._execute_legs(trim)
+    
+    async def _abandon_entry(self, strategy: str, report: ExecutionReport, specs: List[Tuple]) -> Dict:
+        """Flatten the filled legs of an incomplete multi-leg entry (buy back shorts, then sell wings).
+        While any leg's status is unknown the wings are kept, as that leg may be a filled short."""
+        lost = [name for name, fill in report.legs.items() if fill.state == OrderState.UNKNOWN]
+        unwind = []
+        for name, strike, option_type, _, side, price, expiry, security_id, instrument_key in specs:
+            fill = report.legs.get(name)
+            if lost and side == "BUY":
+                continue
+            if fill and fill.ok and fill.executed_qty:
+                unwind.append(self._leg(
+                    f"unwind_{name}", strike, option_type, fill.executed_qty,
+                    "SELL" if side == "BUY" else "BUY", price, expiry, security_id, instrument_key
+                ))
+        self._log(f"{strategy} entry incomplete ({report.summary()}); unwinding {len(unwind)} filled legs", "ERROR")
+        if lost:
+            self._log(f"{strategy} legs {', '.join(lost)} have no order status; reconcile them with the broker", "ERROR")
+        unwound = await self._execute_legs(unwind) if unwind else None
+        return {
+            "success": False,
+            "error": f"{strategy} entry incomplete: {report.aborted or 'not all legs filled'}",
+            "execution": report.to_dict(),
+            "unwind": unwound.to_dict() if unwound else None,
+            "unreconciled": lost,
+        }
+    
+    # ============================================
+    # STATE JOURNAL (crash recovery)
+    # ============================================
+    
+    async def _restore_state(self):
+        """Open this bot's state journal and resume tracking a position left open by a restart"""
+        self._journal = await get_bot_state_journal().open("delta_strangle", self.user_id)
+        saved = self._journal.get("position")
+        if self.position.status != PositionStatus.NONE or not saved:
+            return
+        if saved.get("status") in (PositionStatus.OPEN.value, PositionStatus.ADJUSTING.value):
+            self.position = StranglePosition.from_dict(saved)
+            if saved["status"] == PositionStatus.ADJUSTING.value:
+                self._log("Recovered position was mid-adjustment; verify legs against broker fills", "WARNING")
+                self.position.status = PositionStatus.OPEN
+            self._log(f"♻️ Recovered open position from journal (credit ₹{self.position.entry_credit:.2f}, "
+                      f"{self.position.num_adjustments} adjustments)")
+    
+    def _journal_state(self, urgent: bool = False):
+        """Record the position in the state journal (urgent after orders)"""
+        if self._journal is None:
+            return
+        self._journal.update({
+            "position": self.position.to_dict(),
+            "underlying": self.config.underlying,
+            "strategy_mode": self.config.strategy_mode,
+        }, urgent=urgent)
+    
+    def _journal_fill(self, order: Dict, **details):
+        """Append an order result to the journaled fill history"""
+        if self._journal is None:
+            return
+        self._journal.append("fills", {
+            **details,
+            "order_id": order.get("order_id", ""),
+            "success": bool(order.get("success")),
+            "time": datetime.now().isoformat(),
+        }, limit=100, urgent=True)
+    
     # ============================================
     # BOT CONTROL METHODS
     # ============================================
@@ -2314,6 +2551,11 @@ class AIDeltaStrangleBot:
             
             self.status = BotStatus.RUNNING
             self._running = True
+            await self._restore_state()
+            symbol = self.config.underlying
+            get_bot_runtime().subscribe(
+                subscriber_id(self), topic("spot", symbol), topic("chain", symbol, self.broker, "nearest")
+            )
             
             # Fetch initial option chain
             option_chain = await self.fetch_option_chain()
@@ -2350,6 +2592,10 @@ class AIDeltaStrangleBot:
         """Stop the bot"""
         self._running = False
         self.status = BotStatus.STOPPED
+        get_bot_runtime().unsubscribe(subscriber_id(self))
+        if self._advice_task is not None:
+            self._advice_task.cancel()
+            self._advice_task = None
         
         close_result = None
         if close_positions and self.position.status == PositionStatus.OPEN:
@@ -2367,11 +2613,21 @@ class AIDeltaStrangleBot:
         """
         Perform one scan iteration - use this for serverless execution
         
+        Two paths per scan:
+        - risk path: profit target, stop loss and delta breach on the fresh
+          snapshot, decided without awaiting anything
+        - advisory path: the Claude decision runs in the background and is
+          applied on a later scan, only if the market / position fingerprint
+          it was asked on still matches the current snapshot
+        
+        In a market replay the advice is awaited inline so runs stay reproducible.
+        
         Returns:
             {
                 "option_chain": snapshot,
                 "position": current position,
-                "ai_decision": Claude's recommendation,
+                "ai_decision": Claude's latest recommendation,
+                "advisory": whether it was applied, pending or stale,
                 "action_taken": any adjustments made
             }
         """
@@ -2384,12 +2640,24 @@ class AIDeltaStrangleBot:
             # Update current prices and Greeks
             if self.position.status == PositionStatus.OPEN:
                 await self._update_position_greeks(option_chain)
+            self._snapshot_version += 1
+            
+            # ── Risk path: rule-based checks, no I/O ──
+            started = time_module.perf_counter()
+            risk_action = self._risk_check()
+            self._record_risk_path((time_module.perf_counter() - started) * 1000)
             
-            # Get AI decision
+            # ── Advisory path: apply finished advice that is still valid ──
+            ai_enabled = bool(self.config.use_ai_decisions and self.claude_api_key)
+            replay = is_replay_active()
             ai_decision = None
-            if self.config.use_ai_decisions and self.claude_api_key:
-                ai_decision = await self.get_claude_decision(option_chain, self.position)
-                self.last_ai_decision = ai_decision
+            advice_state = "disabled" if not ai_enabled else "none"
+            if ai_enabled and risk_action is None:
+                fingerprint = self._decision_fingerprint(option_chain, self.position)
+                if replay:
+                    self._request_advice(option_chain, fingerprint)
+                    await asyncio.wait({self._advice_task})
+                ai_decision, advice_state = self._take_advice(fingerprint)
             
             action_taken = None
             
@@ -2400,25 +2668,20 @@ class AIDeltaStrangleBot:
             
             # Check if action needed
             if self.position.status == PositionStatus.OPEN:
-                # Check profit target
-                if self._check_profit_target():
+                if risk_action == "profit_target":
                     action_taken = await self.close_position()
                     action_taken["reason"] = "profit_target"
                     action_taken["trigger"] = "50% profit target reached"
                 
-                # Check stop loss
-                elif self._check_stop_loss():
+                elif risk_action == "stop_loss":
                     action_taken = await self.close_position()
                     action_taken["reason"] = "stop_loss"
                     action_taken["trigger"] = "200% max loss breached"
                 
-                # Check delta breach (rule-based)
-                elif self._should_adjust():
-                    leg = self._get_breach_leg()
-                    if leg:
-                        action_taken = await self.adjust_position(option_chain, leg)
-                        action_taken["reason"] = "delta_breach"
-                        action_taken["trigger"] = f"{leg} delta exceeded {self.config.adjustment_trigger_delta}"
+                elif risk_action in ("CE", "PE"):
+                    action_taken = await self.adjust_position(option_chain, risk_action)
+                    action_taken["reason"] = "delta_breach"
+                    action_taken["trigger"] = f"{risk_action} delta exceeded {self.config.adjustment_trigger_delta}"
                 
                 # Check AI recommendation with CRITICAL urgency (immediate action)
                 elif ai_decision and ai_urgency == "CRITICAL":
@@ -2441,19 +2704,34 @@ class AIDeltaStrangleBot:
                     action_taken["reason"] = "ai_new_entry"
                     action_taken["trigger"] = f"AI recommended new entry ({self.config.strategy_mode})"
             
+            # Ask for advice on the state after this scan's actions; it is applied on a later scan
+            if ai_enabled and not replay and self._advice_task is None:
+                self._request_advice(option_chain, self._decision_fingerprint(option_chain, self.position))
+            if advice_state == "none" and self._advice_task is not None:
+                advice_state = "pending"
+            
+            # Marks and Greeks only; orders were journaled as they happened
+            self._journal_state()
+            
+            latest = self.last_ai_decision
             return {
                 "spot_price": option_chain.get("underlying_price"),
                 "expiry": option_chain.get("expiry"),
                 "atm_iv": self.get_atm_iv(option_chain),
                 "position": self._get_position_summary(),
-                "ai_decision": ai_decision,
+                "ai_decision": latest,
                 "ai_summary": {
                     "action": ai_action,
                     "confidence": ai_confidence,
                     "urgency": ai_urgency
                 },
+                "advisory": {
+                    "state": advice_state,
+                    "snapshot_version": self._snapshot_version,
+                    "risk_path_ms": self.pipeline_stats["risk_path_ms_last"],
+                },
                 "action_taken": action_taken,
-                "monitoring_alerts": ai_decision.get("monitoring_alerts", []) if ai_decision else [],
+                "monitoring_alerts": latest.get("monitoring_alerts", []) if latest else [],
                 "scan_time": self.last_scan_time.isoformat()
             }
             
@@ -2461,6 +2739,70 @@ class AIDeltaStrangleBot:
             self._log(f"Scan error: {e}", "ERROR")
             return {"error": str(e)}
     
+    def _risk_check(self) -> Optional[str]:
+        """
+        Rule-based risk path on the current snapshot: "profit_target",
+        "stop_loss", the breached leg ("CE" / "PE") or None. Pure computation,
+        so stop-loss latency never depends on the LLM.
+        """
+        if self.position.status != PositionStatus.OPEN:
+            return None
+        if self._check_profit_target():
+            return "profit_target"
+        if self._check_stop_loss():
+            return "stop_loss"
+        if self._should_adjust():
+            return self._get_breach_leg()
+        return None
+    
+    def _record_risk_path(self, elapsed_ms: float):
+        stats = self.pipeline_stats
+        stats["scans"] += 1
+        stats["risk_path_ms_last"] = round(elapsed_ms, 3)
+        stats["risk_path_ms_max"] = max(stats["risk_path_ms_max"], stats["risk_path_ms_last"])
+        if elapsed_ms > RISK_PATH_BUDGET_MS:
+            stats["risk_budget_overruns"] += 1
+            logger.warning("Risk path took %.2fms (budget %.1fms)", elapsed_ms, RISK_PATH_BUDGET_MS)
+    
+    def _request_advice(self, option_chain: Dict, fingerprint: str):
+        """Start a background Claude decision for this snapshot"""
+        advice = AIAdvice(self._snapshot_version, fingerprint, time_module.monotonic())
+        position = StranglePosition.from_dict(self.position.to_dict())  # later scans mutate the live position
+        
+        async def run():
+            advice.decision = await self.get_claude_decision(option_chain, position)
+            advice.received_at = time_module.monotonic()
+            return advice
+        
+        self._advice_task = asyncio.create_task(run())
+        self.pipeline_stats["advice_requested"] += 1
+    
+    def _take_advice(self, fingerprint: str) -> Tuple[Optional[Dict], str]:
+        """
+        Finished advice if it is still valid for the current snapshot:
+        (decision, "applied"), or (None, "pending" / "stale" / "none")
+        """
+        task = self._advice_task
+        if task is None:
+            return None, "none"
+        if not task.done():
+            return None, "pending"
+        self._advice_task = None
+        if task.cancelled() or task.exception() is not None:
+            return None, "none"
+        advice = task.result()
+        self._advice = advice
+        decision = advice.decision
+        if not decision or not decision.get("ai_available"):
+            return None, "none"
+        if advice.fingerprint != fingerprint:
+            self.pipeline_stats["advice_stale"] += 1
+            self._log(f"AI advice from snapshot {advice.snapshot_version} is stale "
+                      f"(now {self._snapshot_version}), not applied")
+            return None, "stale"
+        self.pipeline_stats["advice_applied"] += 1
+        return decision, "applied"
+    
     async def _execute_ai_decision(self, action: str, option_chain: Dict) -> Optional[Dict]:
         """Execute an AI decision action"""
         if action == "ADJUST_CALL":
@@ -2541,10 +2883,8 @@ class AIDeltaStrangleBot:
         return None
     
     def _is_trading_hours(self) -> bool:
-        """Check if within trading hours (IST)"""
-        # IST is UTC+5:30
-        IST = timezone(timedelta(hours=5, minutes=30))
-        now = datetime.now(IST)
+        """Check if within trading hours (IST, simulated during a market replay)"""
+        now = ist_now()
         
         # Weekend check
         if now.weekday() >= 5:
@@ -2606,6 +2946,11 @@ class AIDeltaStrangleBot:
             "last_ai_decision": self.last_ai_decision,
             "decision_history": self.decision_history[-10:],  # Last 10 decisions
             "total_decisions": len(self.decision_history),
+            "pipeline": {
+                **self.pipeline_stats,
+                "snapshot_version": self._snapshot_version,
+                "advice_pending": self._advice_task is not None and not self._advice_task.done(),
+            },
             "logs": self.logs[-20:]
         }
     
@@ -2653,7 +2998,7 @@ def get_or_create_delta_strangle_bot(
             broker_service=broker_service,
             access_token=access_token,
             broker=broker,
-            claude_api_key=claude_api_key
+            user_id=user_id,
         )
     return _bot_registry[user_id]
 
@@ -35,7 +35,6 @@ RISK MANAGEMENT:
 
 import asyncio
 import logging
-import httpx
 from typing import Dict, Any, Optional, List
 from datetime import datetime, time, timedelta, timezone
 from dataclasses import dataclass, field
@@ -45,12 +44,19 @@ import math
 # IST timezone (UTC+5:30)
 IST = timezone(timedelta(hours=5, minutes=30))
 
-def get_ist_now() -> datetime:
-    """Get current time in IST"""
-    return datetime.now(IST)
-
 # Import mock data service for testing
 from .mock_data_service import get_mock_service, MarketScenario
+from .market_replay import ist_now, is_replay_active
+from .http_clients import get_http_client
+from .bot_runtime import get_bot_runtime, subscriber_id, topic
+from .bot_scheduler import Lane, get_bot_scheduler
+from .bot_state_journal import JournalStream, get_bot_state_journal
+from .broker_integration import OrderRequest, ServiceBroker
+from .order_execution import ExecutionReport, LegOrder
+
+def get_ist_now() -> datetime:
+    """Get current time in IST (simulated time while a market replay is running)"""
+    return ist_now()
 
 logger = logging.getLogger(__name__)
 
@@ -160,6 +166,16 @@ class StranglePosition:
             "adjustment_history": self.adjustment_history,
             "last_adjustment_time": self.last_adjustment_time.isoformat() if self.last_adjustment_time else None
         }
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> "StranglePosition":
+        """Rebuild a position recorded with to_dict"""
+        fields = {k: v for k, v in data.items() if k in cls.__dataclass_fields__}
+        for key in ("entry_time", "last_adjustment_time"):
+            if fields.get(key):
+                fields[key] = datetime.fromisoformat(fields[key])
+        fields["adjustment_history"] = list(fields.get("adjustment_history") or [])
+        return cls(**fields)
 
 
 @dataclass
@@ -229,10 +245,11 @@ class AIStrangleBot:
         "event": 15
     }
     
-    def __init__(self, broker_service, access_token: str, broker: str = "dhan"):
+    def __init__(self, broker_service, access_token: str, broker: str = "dhan", user_id: str = "default"):
         self.broker_service = broker_service
         self.access_token = access_token
         self.broker = broker
+        self.user_id = user_id
         self.state = AIStrangleBotState()
         self.config = AIStrangleConfig()
         self._running = False
@@ -243,6 +260,9 @@ class AIStrangleBot:
         self.mock_mode = False
         self.mock_scenario = MarketScenario.RANDOM
         self.mock_service = None
+        
+        # Crash-recoverable state (journal stream opened on start, live mode only)
+        self._journal: Optional[JournalStream] = None
     
     def enable_mock_mode(self, scenario: str = "random") -> Dict:
         """Enable mock mode for testing without real market data"""
@@ -270,17 +290,8 @@ class AIStrangleBot:
         return {"status": "success", "message": "Mock mode disabled", "mock_mode": False}
     
     async def _get_http_client(self):
-        """Get or create HTTP client with NSE headers"""
-        if self._http_client is None:
-            self._http_client = httpx.AsyncClient(
-                headers={
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-                    "Accept": "application/json",
-                    "Accept-Language": "en-US,en;q=0.9",
-                },
-                timeout=30.0,
-                follow_redirects=True
-            )
+        """Shared HTTP client with NSE headers (owned by the HTTP client registry)"""
+        self._http_client = get_http_client("nse")
         return self._http_client
     
     # ========================================
@@ -466,8 +477,11 @@ class AIStrangleBot:
     # ========================================
     
     async def _get_spot_price(self) -> float:
-        """Get current NIFTY spot price - Primary: Dhan, Fallback: Upstox"""
-        import httpx
+        """Get current NIFTY spot price, shared with the other bots through the "spot" topic"""
+        return await get_bot_runtime().get(topic("spot", "NIFTY"), self._fetch_spot_price)
+    
+    async def _fetch_spot_price(self) -> float:
+        """Fetch NIFTY spot price - Primary: Dhan, Fallback: Upstox"""
         import os
         
         # Method 1: Try Dhan API first (most reliable)
@@ -483,29 +497,31 @@ class AIStrangleBot:
                     "UnderlyingScrip": 26000,  # NIFTY security_id
                     "ExchangeSegment": "NSE_FNO"
                 }
-                async with httpx.AsyncClient(timeout=15.0) as client:
-                    # First get expiry list
-                    resp = await client.post(
-                        "https://api.dhan.co/v2/optionchain/expirylist",
-                        headers=headers,
-                        json=data
-                    )
-                    if resp.status_code == 200:
-                        expiries = resp.json().get("data", [])
-                        if expiries:
-                            # Get option chain for nearest expiry
-                            data["Expiry"] = expiries[0]
-                            resp = await client.post(
-                                "https://api.dhan.co/v2/optionchain",
-                                headers=headers,
-                                json=data
-                            )
-                            if resp.status_code == 200:
-                                chain_data = resp.json().get("data", {})
-                                underlying_price = chain_data.get("UnderlyingPrice", 0)
-                                if underlying_price > 0:
-                                    logger.info(f"📊 NIFTY Spot from Dhan: {underlying_price}")
-                                    return float(underlying_price)
+                client = get_http_client("dhan")
+                # First get expiry list
+                resp = await client.post(
+                    "https://api.dhan.co/v2/optionchain/expirylist",
+                    headers=headers,
+                    json=data,
+                    timeout=15.0
+                )
+                if resp.status_code == 200:
+                    expiries = resp.json().get("data", [])
+                    if expiries:
+                        # Get option chain for nearest expiry
+                        data["Expiry"] = expiries[0]
+                        resp = await client.post(
+                            "https://api.dhan.co/v2/optionchain",
+                            headers=headers,
+                            json=data,
+                            timeout=15.0
+                        )
+                        if resp.status_code == 200:
+                            chain_data = resp.json().get("data", {})
+                            underlying_price = chain_data.get("UnderlyingPrice", 0)
+                            if underlying_price > 0:
+                                logger.info(f"📊 NIFTY Spot from Dhan: {underlying_price}")
+                                return float(underlying_price)
         except Exception as e:
             logger.warning(f"Dhan spot price failed: {e}")
         
@@ -517,14 +533,13 @@ class AIStrangleBot:
                     "Accept": "application/json"
                 }
                 url = "https://api.upstox.com/v2/market-quote/ltp?instrument_key=NSE_INDEX|Nifty%2050"
-                async with httpx.AsyncClient(timeout=15.0) as client:
-                    response = await client.get(url, headers=headers)
-                    if response.status_code == 200:
-                        data = response.json()
-                        ltp = data.get("data", {}).get("NSE_INDEX:Nifty 50", {}).get("last_price", 0)
-                        if ltp > 0:
-                            logger.info(f"📊 NIFTY Spot from Upstox: {ltp}")
-                            return float(ltp)
+                response = await get_http_client("upstox").get(url, headers=headers, timeout=15.0)
+                if response.status_code == 200:
+                    data = response.json()
+                    ltp = data.get("data", {}).get("NSE_INDEX:Nifty 50", {}).get("last_price", 0)
+                    if ltp > 0:
+                        logger.info(f"📊 NIFTY Spot from Upstox: {ltp}")
+                        return float(ltp)
         except Exception as e:
             logger.warning(f"Upstox spot price failed: {e}")
         
@@ -563,21 +578,12 @@ class AIStrangleBot:
             # Get current expiry
             expiry = self._get_current_expiry()
             
-            # Place SELL PUT order
-            put_result = await self._place_sell_order(
-                strike=put_strike,
-                option_type="PE",
-                quantity=quantity,
-                expiry=expiry
-            )
-            
-            # Place SELL CALL order
-            call_result = await self._place_sell_order(
-                strike=call_strike,
-                option_type="CE",
-                quantity=quantity,
-                expiry=expiry
-            )
+            # SELL PUT and SELL CALL in parallel
+            report = await self._execute_legs([
+                self._leg("put", put_strike, "PE", quantity, "SELL", expiry),
+                self._leg("call", call_strike, "CE", quantity, "SELL", expiry),
+            ])
+            put_result, call_result = report.result("put"), report.result("call")
             
             # Track if at least one leg succeeded - to prevent duplicate entries
             put_success = put_result.get("success", False)
@@ -598,11 +604,14 @@ class AIStrangleBot:
                     status=status
                 )
                 self.state.position.total_premium = (
-                    (self.state.position.put_premium if put_success else 0) + 
-                    (self.state.position.call_premium if call_success else 0)
-                ) * quantity
+                    self.state.position.put_premium * report.legs["put"].executed_qty +
+                    self.state.position.call_premium * report.legs["call"].executed_qty
+                )
                 
                 self.state.trades_today += 1
+                self._journal_fill("SELL", put_strike, "PE", quantity, put_result)
+                self._journal_fill("SELL", call_strike, "CE", quantity, call_result)
+                self._journal_state(urgent=True)
                 
                 if put_success and call_success:
                     return {
@@ -632,6 +641,7 @@ class AIStrangleBot:
                     spot_at_entry=spot,
                     status="failed"
                 )
+                self._journal_state(urgent=True)
                 return {
                     "success": False,
                     "error": "Failed to place both legs",
@@ -651,19 +661,13 @@ class AIStrangleBot:
             
             quantity = self.config.num_lots * self.config.lot_size
             
-            # Buy back PUT
-            put_result = await self._place_buy_order(
-                strike=self.state.position.put_strike,
-                option_type="PE",
-                quantity=quantity
-            )
-            
-            # Buy back CALL
-            call_result = await self._place_buy_order(
-                strike=self.state.position.call_strike,
-                option_type="CE",
-                quantity=quantity
-            )
+            # Buy back PUT and CALL in parallel
+            expiry = self._get_current_expiry()
+            report = await self._execute_legs([
+                self._leg("put", self.state.position.put_strike, "PE", quantity, "BUY", expiry),
+                self._leg("call", self.state.position.call_strike, "CE", quantity, "BUY", expiry),
+            ])
+            put_result, call_result = report.result("put"), report.result("call")
             
             # Calculate P&L
             exit_premium = (put_result.get("price", 0) + call_result.get("price", 0)) * quantity
@@ -672,6 +676,9 @@ class AIStrangleBot:
             self.state.position.status = "closed"
             self.state.position.current_pnl = pnl
             self.state.daily_pnl += pnl
+            self._journal_fill("BUY", self.state.position.put_strike, "PE", quantity, put_result)
+            self._journal_fill("BUY", self.state.position.call_strike, "CE", quantity, call_result)
+            self._journal_state(urgent=True)
             
             return {
                 "success": True,
@@ -893,7 +900,8 @@ class AIStrangleBot:
     def _is_market_hours(self) -> bool:
         """Check if current time is within market hours (IST)"""
         # In mock mode, always return True to allow testing anytime
-        if self.mock_mode:
+        # (a market replay runs on its own simulated clock instead)
+        if self.mock_mode and not is_replay_active():
             return True
         now = get_ist_now().time()
         market_open = time(9, 15)
@@ -905,7 +913,7 @@ class AIStrangleBot:
     def _is_entry_time(self) -> bool:
         """Check if it's entry time (9:20 AM onwards until 2:30 PM)"""
         # In mock mode, always return True to allow testing anytime
-        if self.mock_mode:
+        if self.mock_mode and not is_replay_active():
             return True
         now = get_ist_now().time()
         entry_h, entry_m = map(int, self.config.entry_time.split(":"))
@@ -916,12 +924,86 @@ class AIStrangleBot:
     def _is_exit_time(self) -> bool:
         """Check if it's exit time (3:15 PM) (IST)"""
         # In mock mode, never auto-exit by time (let user control)
-        if self.mock_mode:
+        if self.mock_mode and not is_replay_active():
             return False
         now = get_ist_now().time()
         exit_h, exit_m = map(int, self.config.exit_time.split(":"))
         return now >= time(exit_h, exit_m)
     
+    # ========================================
+    # MULTI-LEG EXECUTION
+    # ========================================
+    
+    def _leg(self, name: str, strike: float, option_type: str, quantity: int, side: str, expiry: str) -> LegOrder:
+        """One leg for the execution pipeline, placed through _place_sell_order / _place_buy_order"""
+        async def submit(qty: int) -> Dict:
+            if side == "SELL":
+                return await self._place_sell_order(strike=strike, option_type=option_type, quantity=qty, expiry=expiry)
+            return await self._place_buy_order(strike=strike, option_type=option_type, quantity=qty, expiry=expiry)
+        
+        request = OrderRequest(
+            symbol=f"{self.config.underlying}{int(strike)}{option_type}",
+            exchange="NFO",
+            transaction_type=side,
+            quantity=quantity,
+            order_type="MARKET",
+            product_type="INTRADAY",
+            tag="ai_strangle"
+        )
+        return LegOrder(name, request, submit=submit)
+    
+    async def _execute_legs(self, legs: List[LegOrder]) -> ExecutionReport:
+        """Place legs through the shared pipeline: BUY legs first, each group in parallel, fills tracked"""
+        # Mock orders have no broker-side status to follow
+        service = None if self.mock_mode else self.broker_service
+        report = await ServiceBroker(service, self.broker).place_legs(legs)
+        if not report.success:
+            logger.warning(f"Strangle orders incomplete: {report.summary()}")
+        return report
+    
+    # ========================================
+    # STATE JOURNAL (crash recovery)
+    # ========================================
+    
+    async def _restore_state(self):
+        """Open this bot's state journal and resume today's position and counters after a restart"""
+        self._journal = await get_bot_state_journal().open("ai_strangle", self.user_id)
+        if self._journal.get("day") != get_ist_now().date().isoformat():
+            return
+        self.state.trades_today = self._journal.get("trades_today", 0)
+        self.state.daily_pnl = self._journal.get("daily_pnl", 0.0)
+        saved = self._journal.get("position")
+        if saved and not self.state.position:
+            self.state.position = StranglePosition.from_dict(saved)
+            logger.info(f"♻️ Recovered {self.state.position.status} strangle from journal: "
+                        f"{self.state.position.put_strike} PE / {self.state.position.call_strike} CE")
+    
+    def _journal_state(self, urgent: bool = False):
+        """Record today's position and counters in the state journal (urgent after orders)"""
+        if self._journal is None:
+            return
+        self._journal.update({
+            "day": get_ist_now().date().isoformat(),
+            "position": self.state.position.to_dict() if self.state.position else None,
+            "trades_today": self.state.trades_today,
+            "daily_pnl": self.state.daily_pnl,
+        }, urgent=urgent)
+    
+    def _journal_fill(self, side: str, strike: float, option_type: str, quantity: int, result: Dict):
+        """Append an order result to the journaled fill history"""
+        if self._journal is None:
+            return
+        self._journal.append("fills", {
+            "side": side,
+            "strike": strike,
+            "option_type": option_type,
+            "quantity": quantity,
+            "price": result.get("price"),
+            "order_id": result.get("order_id", ""),
+            "success": bool(result.get("success")),
+            "time": get_ist_now().isoformat(),
+        }, limit=100, urgent=True)
+    
     # ========================================
     # BOT CONTROL
     # ========================================
@@ -943,6 +1025,10 @@ class AIStrangleBot:
         self.state.errors = []
         self.state.trades_today = 0
         self.state.daily_pnl = 0.0
+        self._journal = None
+        if not self.mock_mode:
+            await self._restore_state()
+        get_bot_runtime().subscribe(subscriber_id(self), topic("spot", "NIFTY"))
         
         # Try immediate entry if conditions are favorable
         initial_scan = None
@@ -1003,6 +1089,7 @@ class AIStrangleBot:
         
         self._running = False
         self.state.is_running = False
+        get_bot_runtime().unsubscribe(subscriber_id(self))
         
         # Exit any open position
         if self.state.position and self.state.position.status == "active":
@@ -1050,7 +1137,7 @@ class AIStrangleBot:
                 "action": score.action.value,
                 "range_prob": score.range_prob,
                 "trend_strength": score.trend_strength,
-                "volatility": score.volatility_regime,
+                "volatility": score.regime.value,
                 "trade_executed": False,
                 "position_active": self.state.position is not None and self.state.position.status == "active",
                 "mock_mode": self.mock_mode,
@@ -1083,6 +1170,7 @@ class AIStrangleBot:
             if self.state.position:
                 result["position"] = self.state.position.to_dict()
             
+            self._journal_state()
             return result
             
         except Exception as e:
@@ -1090,55 +1178,67 @@ class AIStrangleBot:
             return {"status": "error", "message": str(e)}
     
     async def _monitoring_loop(self):
-        """Main monitoring loop for AI analysis and auto-trading"""
-        while self._running:
-            try:
-                self.state.last_check = datetime.now()
-                
-                # Fetch market data
-                market_data = await self.fetch_market_data()
-                
-                # Calculate AI score
-                score = self.calculate_regime_score(market_data)
-                self.state.last_score = score
-                
-                logger.info(f"AI Score: {score.total_score}%, Action: {score.action.value}")
+        """Main monitoring loop for AI analysis and auto-trading, ticked by the bot scheduler"""
+        await get_bot_scheduler().run(
+            subscriber_id(self), self._monitoring_cycle,
+            interval=lambda: self.config.check_interval,
+            lane=self._cycle_lane, active=lambda: self._running,
+        )
+    
+    def _cycle_lane(self) -> Lane:
+        """Open positions are risk-managed ahead of new-entry scans"""
+        if self.state.position and self.state.position.status == "active":
+            return Lane.RISK
+        return Lane.ENTRY
+    
+    async def _monitoring_cycle(self) -> Optional[float]:
+        """One monitoring pass; returns seconds until the next one"""
+        try:
+            self.state.last_check = datetime.now()
+            
+            # Fetch market data
+            market_data = await self.fetch_market_data()
+            
+            # Calculate AI score
+            score = self.calculate_regime_score(market_data)
+            self.state.last_score = score
+            
+            logger.info(f"AI Score: {score.total_score}%, Action: {score.action.value}")
+            
+            # Check if we should trade
+            if self.config.auto_enter and self._is_market_hours():
                 
-                # Check if we should trade
-                if self.config.auto_enter and self._is_market_hours():
-                    
-                    # Entry logic - only if no position at all (active, partial, or failed)
-                    if (score.action == TradeAction.SELL and 
-                        self.state.position is None and 
-                        self._is_entry_time()):
-                        
-                        spot = market_data.get("spot", 24000)
-                        result = await self.enter_strangle(spot)
-                        logger.info(f"Auto-enter result: {result}")
+                # Entry logic - only if no position at all (active, partial, or failed)
+                if (score.action == TradeAction.SELL and 
+                    self.state.position is None and 
+                    self._is_entry_time()):
                     
-                    # Exit logic (time-based) - only for active positions
-                    elif self.state.position and self.state.position.status == "active":
-                        if self._is_exit_time():
-                            result = await self.exit_strangle("time_exit")
-                            logger.info(f"Time exit result: {result}")
-                        else:
-                            # Check stop loss / target
-                            await self._check_position_exits()
-                            
-                            # Check auto adjustment (if position still active)
-                            if self.state.position and self.state.position.status == "active":
-                                adjustment = await self._check_auto_adjustment()
-                                if adjustment:
-                                    logger.info(f"Auto adjustment: {adjustment}")
-                
-                await asyncio.sleep(self.config.check_interval)
+                    spot = market_data.get("spot", 24000)
+                    result = await self.enter_strangle(spot)
+                    logger.info(f"Auto-enter result: {result}")
                 
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                logger.error(f"Monitoring loop error: {e}")
-                self.state.errors.append(str(e))
-                await asyncio.sleep(10)
+                # Exit logic (time-based) - only for active positions
+                elif self.state.position and self.state.position.status == "active":
+                    if self._is_exit_time():
+                        result = await self.exit_strangle("time_exit")
+                        logger.info(f"Time exit result: {result}")
+                    else:
+                        # Check stop loss / target
+                        await self._check_position_exits()
+                        
+                        # Check auto adjustment (if position still active)
+                        if self.state.position and self.state.position.status == "active":
+                            adjustment = await self._check_auto_adjustment()
+                            if adjustment:
+                                logger.info(f"Auto adjustment: {adjustment}")
+            
+            self._journal_state()
+            return self.config.check_interval
+            
+        except Exception as e:
+            logger.error(f"Monitoring loop error: {e}")
+            self.state.errors.append(str(e))
+            return 10
     
     async def _check_position_exits(self):
         """Check if position should be exited due to SL or target"""
@@ -1229,6 +1329,13 @@ class AIStrangleBot:
             logger.warning(f"🔴 CE BREACH! Spot {spot} near CE strike {call_strike}")
             adjustment_result = await self._roll_call_up(spot, call_strike, roll_pts)
         
+        if adjustment_result:
+            option_type = "PE" if adjustment_result.get("type") == "roll_put_down" else "CE"
+            for order in adjustment_result.get("orders", []):
+                self._journal_fill(order["action"], order["strike"], option_type,
+                                   adjustment_result.get("quantity", 0), order.get("result") or {})
+            self._journal_state(urgent=True)
+        
         return adjustment_result
     
     async def _roll_put_down(self, spot: float, current_strike: float, roll_points: int) -> Dict:
@@ -1254,13 +1361,13 @@ class AIStrangleBot:
         }
         
         try:
-            # Step 1: BUY back current PE (close short position)
-            buy_result = await self._place_buy_order(
-                strike=current_strike,
-                option_type="PE",
-                quantity=quantity,
-                expiry=expiry
-            )
+            # Step 1: BUY back current PE (close short position), Step 2: SELL new PE at lower strike
+            # (the SELL is only sent once the BUY has filled)
+            report = await self._execute_legs([
+                self._leg("close", current_strike, "PE", quantity, "BUY", expiry),
+                self._leg("open", new_strike, "PE", quantity, "SELL", expiry),
+            ])
+            buy_result, sell_result = report.result("close"), report.result("open")
             adjustment["orders"].append({"action": "BUY", "strike": current_strike, "result": buy_result})
             
             if not buy_result.get("success"):
@@ -1269,13 +1376,6 @@ class AIStrangleBot:
                 logger.error(f"❌ Failed to BUY back PE {current_strike}")
                 return adjustment
             
-            # Step 2: SELL new PE at lower strike
-            sell_result = await self._place_sell_order(
-                strike=new_strike,
-                option_type="PE",
-                quantity=quantity,
-                expiry=expiry
-            )
             adjustment["orders"].append({"action": "SELL", "strike": new_strike, "result": sell_result})
             
             if sell_result.get("success"):
@@ -1323,13 +1423,13 @@ class AIStrangleBot:
         }
         
         try:
-            # Step 1: BUY back current CE (close short position)
-            buy_result = await self._place_buy_order(
-                strike=current_strike,
-                option_type="CE",
-                quantity=quantity,
-                expiry=expiry
-            )
+            # Step 1: BUY back current CE (close short position), Step 2: SELL new CE at higher strike
+            # (the SELL is only sent once the BUY has filled)
+            report = await self._execute_legs([
+                self._leg("close", current_strike, "CE", quantity, "BUY", expiry),
+                self._leg("open", new_strike, "CE", quantity, "SELL", expiry),
+            ])
+            buy_result, sell_result = report.result("close"), report.result("open")
             adjustment["orders"].append({"action": "BUY", "strike": current_strike, "result": buy_result})
             
             if not buy_result.get("success"):
@@ -1338,13 +1438,6 @@ class AIStrangleBot:
                 logger.error(f"❌ Failed to BUY back CE {current_strike}")
                 return adjustment
             
-            # Step 2: SELL new CE at higher strike
-            sell_result = await self._place_sell_order(
-                strike=new_strike,
-                option_type="CE",
-                quantity=quantity,
-                expiry=expiry
-            )
             adjustment["orders"].append({"action": "SELL", "strike": new_strike, "result": sell_result})
             
             if sell_result.get("success"):
@@ -1369,9 +1462,19 @@ class AIStrangleBot:
         
         return adjustment
     
-    async def _place_buy_order(self, strike: float, option_type: str, quantity: int, expiry: str) -> Dict:
-        """Place BUY order to close short position (for adjustment)"""
+    async def _place_buy_order(self, strike: float, option_type: str, quantity: int, expiry: str = None) -> Dict:
+        """Place BUY order to close short position (exits and adjustments)"""
         try:
+            # In mock mode, always use simulated orders
+            if self.mock_mode:
+                symbol = f"{self.config.underlying}{int(strike)}{option_type}"
+                return {
+                    "success": True,
+                    "order_id": f"MOCK_BUY_{symbol}_{datetime.now().strftime('%H%M%S')}",
+                    "price": 40 if option_type == "PE" else 45,
+                    "message": "Mock order placed"
+                }
+            
             if self.broker == "upstox" and self.access_token:
                 # Get instrument key
                 instrument_key = await self._get_upstox_instrument_key(
@@ -1637,7 +1740,7 @@ _ai_strangle_bots: Dict[str, AIStrangleBot] = {}
 def get_or_create_ai_strangle_bot(user_id: str, broker_service, access_token: str, broker: str) -> AIStrangleBot:
     """Get existing bot or create new one, always update broker service"""
     if user_id not in _ai_strangle_bots:
-        _ai_strangle_bots[user_id] = AIStrangleBot(broker_service, access_token, broker)
+        _ai_strangle_bots[user_id] = AIStrangleBot(broker_service, access_token, broker, user_id=user_id)
     else:
         # Always update broker service with new token
         bot = _ai_strangle_bots[user_id]
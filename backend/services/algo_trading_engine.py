@@ -10,10 +10,22 @@ from typing import Dict, Any, Optional, List
 from datetime import datetime, timedelta
 from dataclasses import dataclass, field
 from enum import Enum
-import math
+
+from .bot_runtime import get_bot_runtime, subscriber_id, topic
+from .bot_scheduler import Lane, get_bot_scheduler
+from .http_clients import get_http_client_registry
+from .portfolio_greeks import BookGreeks, BookLeg, OptionBook, bs_greeks, plan_hedges
+from .rate_limiter import Priority, get_rate_limiter
 
 logger = logging.getLogger(__name__)
 
+# Greeks assumptions for broker positions without their own (weekly options)
+HEDGE_EXPIRY_YEARS = 0.02
+HEDGE_VOLATILITY = 0.15
+# Hedge search grid: strikes either side of ATM, and lot counts up to this
+HEDGE_STRIKE_STEPS = 6
+HEDGE_MAX_LOTS = 10
+
 
 class OrderType(Enum):
     MARKET = "MARKET"
@@ -265,47 +277,33 @@ class AlgoTradingEngine:
         """
         Calculate option delta using Black-Scholes approximation
         """
-        if time_to_expiry <= 0:
-            # At expiry
-            if option_type == "CE":
-                return 1.0 if spot_price > strike else 0.0
-            else:
-                return -1.0 if spot_price < strike else 0.0
-        
-        # Simplified delta calculation
-        d1 = (math.log(spot_price / strike) + (risk_free_rate + 0.5 * volatility ** 2) * time_to_expiry) / (volatility * math.sqrt(time_to_expiry))
-        
-        from math import erf
-        def norm_cdf(x):
-            return (1.0 + erf(x / math.sqrt(2.0))) / 2.0
-        
-        if option_type == "CE":
-            return norm_cdf(d1)
-        else:
-            return norm_cdf(d1) - 1.0
+        return float(bs_greeks(spot_price, strike, time_to_expiry, volatility, option_type == "CE", risk_free_rate)["delta"])
+    
+    def portfolio_book(self, positions: List[Position]) -> OptionBook:
+        """Option positions as an OptionBook (quantity in underlying units)"""
+        return OptionBook([
+            BookLeg(
+                strike=pos.strike,
+                option_type=pos.option_type,
+                quantity=pos.quantity * self.config.lot_size,
+                expiry_years=HEDGE_EXPIRY_YEARS,
+                iv=HEDGE_VOLATILITY,
+                label=pos.symbol,
+            )
+            for pos in positions if pos.option_type
+        ])
+    
+    def calculate_portfolio_greeks(self, positions: List[Position], spot_price: float) -> BookGreeks:
+        """Aggregate option Greeks of all positions in one vectorized call"""
+        return self.portfolio_book(positions).greeks(spot_price)
     
     def calculate_portfolio_delta(self, positions: List[Position], spot_price: float) -> float:
         """
         Calculate total portfolio delta
         """
-        total_delta = 0.0
-        
-        for pos in positions:
-            if pos.option_type:
-                # Option position
-                delta = self.calculate_option_delta(
-                    spot_price=spot_price,
-                    strike=pos.strike,
-                    time_to_expiry=0.02,  # ~1 week
-                    volatility=0.15,
-                    option_type=pos.option_type
-                )
-                total_delta += delta * pos.quantity * self.config.lot_size
-            else:
-                # Futures/Equity position
-                total_delta += pos.quantity
-        
-        return total_delta
+        # Futures/Equity positions count one delta per unit
+        underlying_delta = sum(pos.quantity for pos in positions if not pos.option_type)
+        return self.calculate_portfolio_greeks(positions, spot_price).delta + underlying_delta
     
     async def check_and_adjust_delta(self) -> Dict[str, Any]:
         """
@@ -359,14 +357,33 @@ class AlgoTradingEngine:
         if hedge_quantity == 0:
             return {"success": True, "adjusted": False, "message": "No adjustment needed"}
         
-        # Determine transaction type
-        transaction_type = TransactionType.BUY if hedge_quantity > 0 else TransactionType.SELL
+        # Bought puts take delta off, bought calls add it
+        transaction_type = TransactionType.BUY
         quantity = abs(hedge_quantity)
         
         if self.config.hedge_with_options:
-            # Hedge with ATM options
+            # Pick strike and size from a grid of option hedges, scored in one vectorized pass
             atm_strike = round(spot_price / 50) * 50  # Round to nearest 50
             option_type = "PE" if current_delta > 0 else "CE"
+            lot = self.config.lot_size
+            book = self.portfolio_book(self.state.positions)
+            # Futures / equity delta is outside the book; the options have to offset it too
+            underlying_delta = current_delta - book.greeks(spot_price).delta
+            max_lots = min(HEDGE_MAX_LOTS, max(1, 2 * quantity // lot))
+            plans = plan_hedges(
+                book,
+                spot_price,
+                strikes=[atm_strike + 50 * i for i in range(-HEDGE_STRIKE_STEPS, HEDGE_STRIKE_STEPS + 1)],
+                actions=("buy_put",) if option_type == "PE" else ("buy_call",),
+                target_delta=-underlying_delta,
+                sizes=[lot * n for n in range(1, max_lots + 1)],
+                expiry_years=HEDGE_EXPIRY_YEARS,
+                top=1,
+            )
+            hedge_plan = plans[0] if plans else None
+            if hedge_plan:
+                atm_strike = int(hedge_plan.strike)
+                quantity = int(hedge_plan.quantity)
             
             # Get option security ID (simplified - would need actual lookup)
             security_id = f"{self.config.underlying}{atm_strike}{option_type}"
@@ -389,7 +406,9 @@ class AlgoTradingEngine:
                 "success": result.get("success"),
                 "adjusted": True,
                 "hedge_type": "option",
+                "strike": atm_strike,
                 "quantity": quantity,
+                "hedge_plan": hedge_plan.to_dict() if hedge_plan else None,
                 "order_result": result
             }
         
@@ -546,41 +565,43 @@ class AlgoTradingEngine:
         return {"can_enter": can_enter, "reasons": reasons}
 
     async def _get_spot_price(self) -> Optional[float]:
-        """Get current spot price of underlying from broker or market data"""
+        """Get current spot price of the underlying (shared "spot" topic), estimated if unavailable"""
         try:
-            # Try fetching from broker service
-            if self.broker_service and hasattr(self.broker_service, 'get_ltp'):
-                ltp_data = await self.broker_service.get_ltp(self.config.underlying)
-                if ltp_data and ltp_data.get("success"):
-                    return ltp_data.get("ltp", ltp_data.get("last_price"))
-            
-            # Try fetching from broker positions/funds as fallback
-            if self.broker_service and hasattr(self.broker_service, 'get_positions'):
-                positions = await self.broker_service.get_positions()
-                if positions.get("success"):
-                    for pos in positions.get("data", {}).get("positions", []):
-                        symbol = pos.get("tradingSymbol", pos.get("trading_symbol", ""))
-                        if self.config.underlying in symbol and not any(x in symbol for x in ["CE", "PE"]):
-                            return float(pos.get("lastPrice", pos.get("last_price", 0)))
-            
-            # Try external API as last resort
-            import aiohttp
-            async with aiohttp.ClientSession() as session:
-                # Use a simple market data endpoint
-                nse_url = f"https://www.nseindia.com/api/equity-stockIndices?index={'NIFTY 50' if self.config.underlying == 'NIFTY' else 'NIFTY BANK'}"
-                headers = {"User-Agent": "Mozilla/5.0", "Accept": "application/json"}
-                async with session.get(nse_url, headers=headers, timeout=aiohttp.ClientTimeout(total=5)) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        if data.get("data"):
-                            return float(data["data"][0].get("lastPrice", 0))
-            
-            # Mock fallback with realistic default
-            logger.warning(f"Using estimated spot price for {self.config.underlying}")
-            return 24000.0 if self.config.underlying == "NIFTY" else 52000.0
+            return await get_bot_runtime().get(topic("spot", self.config.underlying), self._fetch_spot_price)
         except Exception as e:
-            logger.error(f"Error getting spot price: {e}")
+            # Mock fallback with realistic default
+            logger.warning(f"Using estimated spot price for {self.config.underlying}: {e}")
             return 24000.0 if self.config.underlying == "NIFTY" else 52000.0
+
+    async def _fetch_spot_price(self) -> float:
+        """Fetch spot price from broker or market data. Raises if no source has it."""
+        # Try fetching from broker service
+        if self.broker_service and hasattr(self.broker_service, 'get_ltp'):
+            ltp_data = await self.broker_service.get_ltp(self.config.underlying)
+            if ltp_data and ltp_data.get("success"):
+                ltp = ltp_data.get("ltp", ltp_data.get("last_price"))
+                if ltp:
+                    return float(ltp)
+        
+        # Try fetching from broker positions/funds as fallback
+        if self.broker_service and hasattr(self.broker_service, 'get_positions'):
+            positions = await self.broker_service.get_positions()
+            if positions.get("success"):
+                for pos in positions.get("data", {}).get("positions", []):
+                    symbol = pos.get("tradingSymbol", pos.get("trading_symbol", ""))
+                    if self.config.underlying in symbol and not any(x in symbol for x in ["CE", "PE"]):
+                        return float(pos.get("lastPrice", pos.get("last_price", 0)))
+        
+        # Try external API as last resort (pooled NSE session)
+        index = 'NIFTY 50' if self.config.underlying == 'NIFTY' else 'NIFTY BANK'
+        await get_rate_limiter().acquire("nse", Priority.HIGH)
+        resp = await get_http_client_registry().nse_get("/api/equity-stockIndices", params={"index": index})
+        if resp.status_code == 200:
+            data = resp.json()
+            if data.get("data"):
+                return float(data["data"][0].get("lastPrice", 0))
+        
+        raise ValueError(f"No live spot price for {self.config.underlying}")
     
     def _parse_positions(self, raw_positions: List[Dict]) -> List[Position]:
         """Parse raw position data into Position objects"""
@@ -627,6 +648,7 @@ class AlgoTradingEngine:
         self._mock_mode = mock_mode
         self.state.is_running = True
         self.state.errors = []
+        get_bot_runtime().subscribe(subscriber_id(self), topic("spot", self.config.underlying))
         
         # Start the monitoring loop
         self._task = asyncio.create_task(self._monitoring_loop())
@@ -661,6 +683,7 @@ class AlgoTradingEngine:
         
         self._running = False
         self.state.is_running = False
+        get_bot_runtime().unsubscribe(subscriber_id(self))
         
         if self._task:
             self._task.cancel()
@@ -679,21 +702,27 @@ class AlgoTradingEngine:
         }
     
     async def _monitoring_loop(self):
-        """Main monitoring loop for auto-adjustments"""
-        while self._running:
-            try:
-                if self.config.auto_adjust:
-                    result = await self.check_and_adjust_delta()
-                    logger.info(f"Delta check: {result}")
-                
-                await asyncio.sleep(self.config.adjustment_interval_seconds)
-                
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                logger.error(f"Monitoring loop error: {e}")
-                self.state.errors.append(str(e))
-                await asyncio.sleep(10)
+        """Main monitoring loop for auto-adjustments, ticked by the bot scheduler"""
+        # Delta checks manage open positions, so they always run in the risk lane
+        await get_bot_scheduler().run(
+            subscriber_id(self), self._monitoring_cycle,
+            interval=lambda: self.config.adjustment_interval_seconds,
+            lane=Lane.RISK, active=lambda: self._running,
+        )
+    
+    async def _monitoring_cycle(self) -> Optional[float]:
+        """One delta check; returns seconds until the next one"""
+        try:
+            if self.config.auto_adjust:
+                result = await self.check_and_adjust_delta()
+                logger.info(f"Delta check: {result}")
+            
+            return self.config.adjustment_interval_seconds
+            
+        except Exception as e:
+            logger.error(f"Monitoring loop error: {e}")
+            self.state.errors.append(str(e))
+            return 10
     
     def get_status(self) -> Dict[str, Any]:
         """Get current bot status"""
@@ -0,0 +1,786 @@
+"""
+Backtest Job Service
+====================
+Runs heavy backtests outside the request handler.
+
+Jobs are executed in a process pool so the event loop (and live market-data
+requests) never waits on backtest CPU work. Each job gets an ID, emits
+progress and partial equity-curve events, can be cancelled, and its final
+result is cached by request parameters.
+
+Job kinds:
+- strategy      - single Nifty strategy backtest on supplied candles
+- strategy_all  - all Nifty strategies on supplied candles
+- tools         - MA crossover / RSI / breakout backtest on Yahoo history
+- vwap          - ChartInk VWAP backtest on Dhan 5-min candles
+
+Workers report events through a Manager queue; a drain thread in the API
+process fans them out to SSE / WebSocket subscribers.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from cachetools import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════════════════
+
+BACKTEST_WORKERS = int(os.environ.get("BACKTEST_WORKERS", "2"))
+RESULT_CACHE_TTL = int(os.environ.get("BACKTEST_CACHE_TTL", "3600"))
+RESULT_CACHE_SIZE = 64
+MAX_RETAINED_JOBS = 200
+MAX_EVENT_HISTORY = 500
+
+
+class JobStatus:
+    PENDING = "pending"
+    LOADING = "loading"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+FINISHED_STATUSES = {JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED}
+
+
+class BacktestCancelled(BaseException):
+    """
+    Raised inside a worker when its job has been cancelled.
+
+    Derives from BaseException (like asyncio.CancelledError) so the broad
+    ``except Exception`` blocks in the backtest loops do not swallow it.
+    """
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# WORKER SIDE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_worker_events = None
+_worker_cancelled = None
+
+
+def _init_worker(events, cancelled):
+    """Process pool initializer - keep handles to the shared queue and cancel map"""
+    global _worker_events, _worker_cancelled
+    _worker_events = events
+    _worker_cancelled = cancelled
+
+
+class JobReporter:
+    """Progress callback handed to backtest code running in a worker"""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+
+    def is_cancelled(self) -> bool:
+        try:
+            return bool(_worker_cancelled is not None and _worker_cancelled.get(self.job_id))
+        except Exception:
+            return False
+
+    def __call__(self, event: str, data: Dict[str, Any]):
+        if self.is_cancelled():
+            raise BacktestCancelled(self.job_id)
+        if _worker_events is None:
+            return
+        try:
+            _worker_events.put({"job_id": self.job_id, "type": event, "data": data})
+        except Exception as e:
+            logger.debug(f"Backtest event dropped for {self.job_id}: {e}")
+
+    def flush(self):
+        """Mark the end of this job's event stream"""
+        if _worker_events is not None:
+            _worker_events.put({"job_id": self.job_id, "type": "_flushed", "data": {}})
+
+
+def get_backtest_recommendation(result) -> str:
+    """Generate recommendation based on Nifty strategy backtest results"""
+    if result.total_trades == 0:
+        return "⚠️ No trades generated - check data quality or strategy parameters"
+
+    if result.win_rate >= 55 and result.profit_factor >= 1.5:
+        return f"✅ RECOMMENDED: Strong performance with {result.win_rate}% win rate and {result.profit_factor:.2f} profit factor"
+
+    elif result.win_rate >= 50 and result.profit_factor >= 1.2:
+        return "⚠️ MODERATE: Acceptable performance - consider combining with other confirmations"
+
+    else:
+        return "❌ CAUTION: Below average performance - optimize parameters or use different strategy"
+
+
+def _store_run(save: Callable[..., str], *args, **kwargs) -> Optional[str]:
+    """Persist a finished run in the result store; storage errors never fail the job"""
+    try:
+        return save(*args, **kwargs)
+    except Exception as e:
+        logger.warning(f"Could not store backtest run: {e}")
+        return None
+
+
+def _store_params(params: Dict) -> Dict:
+    """Run parameters without the (large) candle payloads"""
+    return {k: v for k, v in params.items() if k not in ("candles", "candles_5min")}
+
+
+def _run_strategy_backtest(params: Dict, report: JobReporter) -> Dict:
+    """Single Nifty strategy backtest (POST /api/strategies/backtest)"""
+    import pandas as pd
+    from services.nifty_strategies import NiftyTradingStrategies, StrategyBacktester, StrategyName
+
+    strategy = StrategyName(params["strategy"])
+    candles = params["candles"]
+    capital = params.get("capital", 100000)
+    lot_size = params.get("lot_size", 50)
+
+    backtester = StrategyBacktester(NiftyTradingStrategies(symbol=params.get("symbol", "NIFTY")))
+    result = backtester.backtest_strategy(
+        pd.DataFrame(candles), strategy, capital, lot_size, progress_callback=report
+    )
+
+    from services.backtest_store import get_backtest_store
+    run_id = _store_run(
+        get_backtest_store().save_result, result, source="strategy",
+        symbol=params.get("symbol", "NIFTY"), params=_store_params(params), initial_capital=capital
+    )
+
+    return {
+        "run_id": run_id,
+        "strategy": result.strategy_name,
+        "symbol": params.get("symbol", "NIFTY"),
+        "capital": capital,
+        "lot_size": lot_size,
+        "period": f"{len(candles)} candles",
+        "results": {
+            "total_trades": result.total_trades,
+            "winning_trades": result.winning_trades,
+            "losing_trades": result.losing_trades,
+            "win_rate": result.win_rate,
+            "total_pnl": result.total_pnl,
+            "total_pnl_percent": result.total_pnl_percent,
+            "avg_profit": result.avg_profit,
+            "avg_loss": result.avg_loss,
+            "max_profit": result.max_profit,
+            "max_loss": result.max_loss,
+            "max_drawdown": result.max_drawdown,
+            "profit_factor": result.profit_factor,
+            "sharpe_ratio": result.sharpe_ratio
+        },
+        "trades": [
+            {
+                "entry_date": t.entry_date,
+                "entry_price": t.entry_price,
+                "exit_date": t.exit_date,
+                "exit_price": t.exit_price,
+                "pnl": t.pnl,
+                "pnl_percent": t.pnl_percent,
+                "exit_reason": t.exit_reason
+            }
+            for t in result.trades[:50]  # Limit to 50 trades in response
+        ],
+        "equity_curve": result.equity_curve[:100] if result.equity_curve else [],
+        "recommendation": get_backtest_recommendation(result)
+    }
+
+
+def _run_all_strategies_backtest(params: Dict, report: JobReporter) -> Dict:
+    """All Nifty strategies comparison (POST /api/strategies/backtest/all)"""
+    import pandas as pd
+    from services.nifty_strategies import NiftyTradingStrategies, StrategyBacktester
+
+    candles = params["candles"]
+    capital = params.get("capital", 100000)
+    lot_size = params.get("lot_size", 50)
+
+    backtester = StrategyBacktester(NiftyTradingStrategies(symbol=params.get("symbol", "NIFTY")))
+    results = backtester.run_all_backtests(pd.DataFrame(candles), capital, lot_size, progress_callback=report)
+    report_data = backtester.generate_backtest_report(results)
+
+    from services.backtest_store import get_backtest_store
+    store = get_backtest_store()
+    run_ids = {
+        name: _store_run(
+            store.save_result, result, source="strategy_all",
+            symbol=params.get("symbol", "NIFTY"), params=_store_params(params), initial_capital=capital
+        )
+        for name, result in results.items()
+    }
+
+    strategy_results = {}
+    for name, result in results.items():
+        strategy_results[name] = {
+            "total_trades": result.total_trades,
+            "win_rate": result.win_rate,
+            "total_pnl": result.total_pnl,
+            "profit_factor": result.profit_factor,
+            "max_drawdown": result.max_drawdown,
+            "sharpe_ratio": result.sharpe_ratio
+        }
+
+    return {
+        "run_ids": run_ids,
+        "symbol": params.get("symbol", "NIFTY"),
+        "capital": capital,
+        "lot_size": lot_size,
+        "period": f"{len(candles)} candles",
+        "strategy_results": strategy_results,
+        "summary": report_data["summary"],
+        "best_strategy": report_data["best_strategy"],
+        "total_combined_pnl": report_data["total_combined_pnl"],
+        "average_win_rate": report_data["average_win_rate"],
+        "recommendations": report_data["recommendations"]
+    }
+
+
+def _run_tools_backtest(params: Dict, report: JobReporter) -> Dict:
+    """MA crossover / RSI / breakout backtest on Yahoo history (POST /api/tools/backtest)"""
+    import yfinance as yf
+
+    symbol = params["symbol"] if '.NS' in params["symbol"] else f"{params['symbol']}.NS"
+    strategy = params["strategy"]
+    initial_capital = params.get("capital", 100000)
+    strategy_params = params.get("params") or {}
+
+    ticker = yf.Ticker(symbol)
+    if params.get("start_date") and params.get("end_date"):
+        hist = ticker.history(start=params["start_date"], end=params["end_date"])
+    else:
+        hist = ticker.history(period="1y")
+
+    if hist.empty or len(hist) < 50:
+        raise ValueError("Insufficient historical data")
+
+    capital = initial_capital
+    position = 0
+    shares = 0
+    trades = []
+    equity_curve = []
+    equity_sent = 0
+
+    # Entry/exit rules per strategy, evaluated bar by bar
+    if strategy == "ma_crossover":
+        fast = strategy_params.get("fast", 10)
+        slow = strategy_params.get("slow", 20)
+        hist['fast_ma'] = hist['Close'].rolling(fast).mean()
+        hist['slow_ma'] = hist['Close'].rolling(slow).mean()
+        start = slow
+
+        def entry(i):
+            return hist['fast_ma'].iloc[i] > hist['slow_ma'].iloc[i] and hist['fast_ma'].iloc[i-1] <= hist['slow_ma'].iloc[i-1]
+
+        def exit_(i):
+            return hist['fast_ma'].iloc[i] < hist['slow_ma'].iloc[i] and hist['fast_ma'].iloc[i-1] >= hist['slow_ma'].iloc[i-1]
+
+    elif strategy == "rsi":
+        oversold = strategy_params.get("oversold", 30)
+        overbought = strategy_params.get("overbought", 70)
+        delta = hist['Close'].diff()
+        gain = (delta.where(delta > 0, 0)).rolling(14).mean()
+        loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
+        rs = gain / loss
+        hist['rsi'] = 100 - (100 / (1 + rs))
+        start = 14
+
+        def entry(i):
+            return hist['rsi'].iloc[i] < oversold
+
+        def exit_(i):
+            return hist['rsi'].iloc[i] > overbought
+
+    elif strategy == "breakout":
+        period = strategy_params.get("period", 20)
+        hist['high_20'] = hist['High'].rolling(period).max()
+        hist['low_20'] = hist['Low'].rolling(period).min()
+        start = period
+
+        def entry(i):
+            return hist['Close'].iloc[i] > hist['high_20'].iloc[i-1]
+
+        def exit_(i):
+            return hist['Close'].iloc[i] < hist['low_20'].iloc[i-1]
+
+    else:
+        raise ValueError(f"Unknown strategy: {strategy}")
+
+    total_bars = len(hist) - start
+    for i in range(start, len(hist)):
+        date = hist.index[i]
+        price = hist['Close'].iloc[i]
+        trade = {"date": str(date.date()), "price": round(price, 2)}
+        if strategy == "rsi":
+            trade["rsi"] = round(hist['rsi'].iloc[i], 2)
+
+        if position == 0 and entry(i):
+            shares = int(capital / price)
+            capital -= shares * price
+            position = 1
+            trades.append({**trade, "action": "BUY", "shares": shares})
+        elif position == 1 and exit_(i):
+            capital += shares * price
+            trades.append({**trade, "action": "SELL", "shares": shares})
+            shares = 0
+            position = 0
+
+        equity = capital + (shares * price)
+        equity_curve.append({"date": str(date.date()), "equity": round(equity, 2)})
+
+        if len(equity_curve) - equity_sent >= 50:
+            report("equity", {"offset": equity_sent, "points": equity_curve[equity_sent:]})
+            equity_sent = len(equity_curve)
+            report("progress", {"percent": round((i - start + 1) / total_bars * 100, 1), "trades": len(trades)})
+
+    if len(equity_curve) > equity_sent:
+        report("equity", {"offset": equity_sent, "points": equity_curve[equity_sent:]})
+
+    # Close any open position
+    if position == 1:
+        final_price = hist['Close'].iloc[-1]
+        capital += shares * final_price
+        trades.append({"date": str(hist.index[-1].date()), "action": "SELL (Close)", "price": round(final_price, 2), "shares": shares})
+
+    final_equity = capital
+    total_return = ((final_equity - initial_capital) / initial_capital) * 100
+
+    equity_vals = [e["equity"] for e in equity_curve]
+    peak = equity_vals[0]
+    max_drawdown = 0
+    for val in equity_vals:
+        if val > peak:
+            peak = val
+        drawdown = (peak - val) / peak * 100
+        max_drawdown = max(max_drawdown, drawdown)
+
+    buy_prices = [t["price"] for t in trades if t["action"] == "BUY"]
+    sell_prices = [t["price"] for t in trades if "SELL" in t["action"]]
+    wins = sum(1 for b, s in zip(buy_prices, sell_prices) if s > b)
+    win_rate = (wins / len(buy_prices) * 100) if buy_prices else 0
+
+    bh_return = ((hist['Close'].iloc[-1] - hist['Close'].iloc[0]) / hist['Close'].iloc[0]) * 100
+
+    from services.backtest_store import get_backtest_store
+    run_id = _store_run(
+        get_backtest_store().save_run, source="tools", strategy=strategy, symbol=params["symbol"],
+        trades=trades, equity_curve=equity_curve, params=_store_params(params),
+        initial_capital=initial_capital,
+        metrics={"total_return_pct": round(total_return, 2), "buy_hold_return_pct": round(bh_return, 2)}
+    )
+
+    return {
+        "run_id": run_id,
+        "symbol": params["symbol"],
+        "strategy": strategy,
+        "period": f"{hist.index[0].date()} to {hist.index[-1].date()}",
+        "initial_capital": initial_capital,
+        "final_equity": round(final_equity, 2),
+        "total_return_pct": round(total_return, 2),
+        "buy_hold_return_pct": round(bh_return, 2),
+        "outperformance": round(total_return - bh_return, 2),
+        "max_drawdown_pct": round(max_drawdown, 2),
+        "total_trades": len(trades),
+        "win_rate_pct": round(win_rate, 2),
+        "trades": trades,
+        "equity_curve": equity_curve[::5]  # Sample every 5 points
+    }
+
+
+def _run_vwap_backtest(params: Dict, report: JobReporter) -> Dict:
+    """ChartInk VWAP backtest on pre-fetched Dhan candles (POST /api/trade-algo/vwap-bot/backtest)"""
+    from services.vwap_trading_bot import VWAPTradingBot
+
+    bot = VWAPTradingBot()
+    return bot.run_vwap_backtest_on_candles(
+        params["candles_5min"],
+        symbol=params["symbol"],
+        from_date=params["from_date"],
+        to_date=params["to_date"],
+        capital=params.get("capital", 100000),
+        risk_per_trade=params.get("risk_per_trade", 2.0),
+        target_rr=params.get("target_rr", 2.0),
+        progress_callback=report,
+        save_to_store=True
+    )
+
+
+BACKTEST_RUNNERS: Dict[str, Callable[[Dict, JobReporter], Dict]] = {
+    "strategy": _run_strategy_backtest,
+    "strategy_all": _run_all_strategies_backtest,
+    "tools": _run_tools_backtest,
+    "vwap": _run_vwap_backtest,
+}
+
+
+def _execute_job(job_id: str, kind: str, params: Dict) -> Dict:
+    """Worker entry point - returns {"result": ...} or {"cancelled": True}"""
+    report = JobReporter(job_id)
+    try:
+        report("progress", {"stage": "started", "percent": 0})
+        return {"result": BACKTEST_RUNNERS[kind](params, report)}
+    except BacktestCancelled:
+        return {"cancelled": True}
+    finally:
+        report.flush()
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# API PROCESS SIDE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@dataclass
+class BacktestJob:
+    """A submitted backtest and its streamed events"""
+    job_id: str
+    kind: str
+    params: Dict[str, Any]
+    cache_key: str
+    status: str = JobStatus.PENDING
+    progress: float = 0.0
+    result: Optional[Dict] = None
+    error: Optional[str] = None
+    cached: bool = False
+    created_at: str = field(default_factory=lambda: datetime.now().isoformat())
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    events: List[Dict] = field(default_factory=list)
+    subscribers: Set[asyncio.Queue] = field(default_factory=set)
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+    flushed: asyncio.Event = field(default_factory=asyncio.Event)
+    future: Any = None
+    owners: Set[Optional[str]] = field(default_factory=set)  # submitters (None: an internal run)
+
+    def to_dict(self, include_result: bool = False) -> Dict:
+        data = {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": self.progress,
+            "cached": self.cached,
+            "error": self.error,
+            "created_at": self.created_at,
+            "duration_ms": round((self.finished_at - self.started_at) * 1000, 1)
+            if self.started_at and self.finished_at else None,
+        }
+        if include_result:
+            data["result"] = self.result
+        return data
+
+
+def make_cache_key(kind: str, params: Dict) -> str:
+    """Stable key for a backtest request - identical parameters share one result"""
+    payload = json.dumps(params, sort_keys=True, default=str)
+    return f"{kind}:{hashlib.sha1(payload.encode()).hexdigest()}"
+
+
+class BacktestJobManager:
+    """
+    Owns the process pool, job registry, event fan-out and result cache.
+
+    Use ``submit`` for fire-and-forget jobs (poll or stream events), or
+    ``run`` to await the final result from an existing endpoint.
+    """
+
+    def __init__(self, max_workers: int = BACKTEST_WORKERS):
+        self.max_workers = max_workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._mp_manager = None
+        self._events = None
+        self._cancelled = None
+        self._drain_thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._jobs: "OrderedDict[str, BacktestJob]" = OrderedDict()
+        self._inflight: Dict[str, str] = {}  # cache_key -> job_id
+        self._cache: TTLCache = TTLCache(maxsize=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL)
+        self._lock = threading.Lock()
+
+    # ── pool lifecycle ────────────────────────────────────────────────────
+
+    def _ensure_pool(self):
+        """Start the worker pool lazily on first submission"""
+        if self._pool is not None:
+            return
+        # spawn: forking a process that runs uvicorn's event loop and threads is unsafe
+        ctx = multiprocessing.get_context("spawn")
+        self._mp_manager = ctx.Manager()
+        self._events = self._mp_manager.Queue()
+        self._cancelled = self._mp_manager.dict()
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(self._events, self._cancelled),
+        )
+        self._loop = asyncio.get_running_loop()
+        self._drain_thread = threading.Thread(target=self._drain_events, name="backtest-events", daemon=True)
+        self._drain_thread.start()
+        logger.info(f"✅ Backtest process pool started ({self.max_workers} workers)")
+
+    def _drain_events(self):
+        """Forward worker events to the event loop"""
+        while self._events is not None:
+            try:
+                event = self._events.get(timeout=1)
+            except Exception:
+                continue
+            if event is None:
+                break
+            try:
+                self._loop.call_soon_threadsafe(self._dispatch, event)
+            except RuntimeError:
+                break
+
+    def shutdown(self):
+        """Stop workers and the event drain (called from server lifespan)"""
+        if self._pool is None:
+            return
+        for job in self._jobs.values():
+            if job.status not in FINISHED_STATUSES:
+                self._cancelled[job.job_id] = True
+        try:
+            self._events.put(None)
+        except Exception:
+            pass
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._events = None
+        try:
+            self._mp_manager.shutdown()
+        except Exception:
+            pass
+        self._pool = None
+        logger.info("Backtest process pool stopped")
+
+    # ── events ────────────────────────────────────────────────────────────
+
+    def _publish(self, job: BacktestJob, event_type: str, data: Dict):
+        event = {"type": event_type, "job_id": job.job_id, "data": data, "ts": time.time()}
+        job.events.append(event)
+        if len(job.events) > MAX_EVENT_HISTORY:
+            # Only other events are trimmed, oldest first and never the one
+            # just published: late subscribers rebuild the whole equity curve
+            # from the equity chunks
+            others = [e for e in job.events if e["type"] != "equity"][:-1]
+            dropped = {id(e) for e in others[:len(job.events) - MAX_EVENT_HISTORY]}
+            job.events = [e for e in job.events if id(e) not in dropped]
+        for queue in list(job.subscribers):
+            queue.put_nowait(event)
+
+    def _dispatch(self, event: Dict):
+        job = self._jobs.get(event["job_id"])
+        if job is None or job.status in FINISHED_STATUSES:
+            return
+        if event["type"] == "_flushed":
+            job.flushed.set()
+            return
+        if event["type"] == "progress":
+            if job.status in (JobStatus.PENDING, JobStatus.LOADING):
+                job.status = JobStatus.RUNNING
+            percent = event["data"].get("percent")
+            if percent is not None:
+                job.progress = percent
+        self._publish(job, event["type"], event["data"])
+
+    async def subscribe(self, job_id: str):
+        """
+        Async iterator of job events. Replays history first, then streams
+        live events until the job finishes.
+        """
+        job = self._jobs.get(job_id)
+        if job is None:
+            return
+        queue: asyncio.Queue = asyncio.Queue()
+        for event in list(job.events):
+            queue.put_nowait(event)
+        if job.status in FINISHED_STATUSES:
+            while not queue.empty():
+                yield queue.get_nowait()
+            return
+        job.subscribers.add(queue)
+        try:
+            while True:
+                event = await queue.get()
+                yield event
+                if event["type"] in FINISHED_STATUSES:
+                    break
+        finally:
+            job.subscribers.discard(queue)
+
+    # ── jobs ──────────────────────────────────────────────────────────────
+
+    def _register(self, job: BacktestJob):
+        self._jobs[job.job_id] = job
+        while len(self._jobs) > MAX_RETAINED_JOBS:
+            oldest_id, oldest = next(iter(self._jobs.items()))
+            if oldest.status not in FINISHED_STATUSES:
+                break
+            self._jobs.pop(oldest_id)
+
+    def _finish(self, job: BacktestJob, status: str, result: Optional[Dict] = None, error: Optional[str] = None):
+        if job.status in FINISHED_STATUSES:
+            return
+        job.status = status
+        job.result = result
+        job.error = error
+        job.finished_at = time.time()
+        if status == JobStatus.COMPLETED:
+            job.progress = 100.0
+            self._cache[job.cache_key] = result
+        self._inflight.pop(job.cache_key, None)
+        if self._cancelled is not None:
+            self._cancelled.pop(job.job_id, None)
+        self._publish(job, status, {"error": error} if error else {"duration_ms": job.to_dict()["duration_ms"]})
+        job.done.set()
+
+    async def submit(
+        self,
+        kind: str,
+        params: Dict[str, Any],
+        loader: Optional[Callable[[], Awaitable[Dict[str, Any]]]] = None,
+        owner: Optional[str] = None,
+    ) -> BacktestJob:
+        """
+        Submit a backtest job.
+
+        ``loader`` is an optional coroutine run in this process before the job
+        is handed to a worker (e.g. fetching candles with the shared Dhan
+        session). Its output is merged into the worker params but is not part
+        of the cache key. ``owner`` (a user id) may later cancel the job.
+        """
+        if kind not in BACKTEST_RUNNERS:
+            raise ValueError(f"Unknown backtest kind: {kind}")
+
+        cache_key = make_cache_key(kind, params)
+        job = BacktestJob(job_id=uuid.uuid4().hex[:12], kind=kind, params=params, cache_key=cache_key)
+        job.owners.add(owner)
+
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            job.cached = True
+            job.started_at = time.time()
+            self._register(job)
+            self._finish(job, JobStatus.COMPLETED, result=cached)
+            return job
+
+        # Identical request already running - share it
+        inflight_id = self._inflight.get(cache_key)
+        if inflight_id and inflight_id in self._jobs:
+            shared = self._jobs[inflight_id]
+            shared.owners.add(owner)
+            return shared
+
+        self._ensure_pool()
+        self._register(job)
+        self._inflight[cache_key] = job.job_id
+        asyncio.create_task(self._run_job(job, loader))
+        return job
+
+    async def _run_job(self, job: BacktestJob, loader):
+        job.started_at = time.time()
+        try:
+            worker_params = dict(job.params)
+            if loader is not None:
+                job.status = JobStatus.LOADING
+                self._publish(job, "progress", {"stage": "loading"})
+                worker_params.update(await loader())
+                if self._cancelled.get(job.job_id):
+                    self._finish(job, JobStatus.CANCELLED)
+                    return
+                job.status = JobStatus.PENDING  # queued for a worker; RUNNING once it starts
+
+            job.future = self._pool.submit(_execute_job, job.job_id, job.kind, worker_params)
+            outcome = await asyncio.wrap_future(job.future)
+
+            # Results and events travel on different channels - let trailing
+            # equity chunks reach subscribers before the terminal event
+            try:
+                await asyncio.wait_for(job.flushed.wait(), timeout=2)
+            except asyncio.TimeoutError:
+                pass
+
+            result = outcome.get("result")
+            if outcome.get("cancelled"):
+                self._finish(job, JobStatus.CANCELLED)
+            elif isinstance(result, dict) and result.get("status") == "error":
+                # The runner reported a failure in its result: not a result to cache
+                self._finish(job, JobStatus.FAILED, error=result.get("message") or "Backtest failed")
+            else:
+                self._finish(job, JobStatus.COMPLETED, result=result)
+        except asyncio.CancelledError:
+            self._finish(job, JobStatus.CANCELLED)
+        except Exception as e:
+            logger.error(f"Backtest job {job.job_id} ({job.kind}) failed: {e}")
+            self._finish(job, JobStatus.FAILED, error=str(e))
+
+    async def run(self, kind: str, params: Dict[str, Any], loader=None) -> Dict:
+        """Submit and wait for the result - for endpoints that keep a synchronous contract"""
+        job = await self.submit(kind, params, loader)
+        await job.done.wait()
+        if job.status == JobStatus.FAILED:
+            raise RuntimeError(job.error)
+        if job.status == JobStatus.CANCELLED:
+            raise RuntimeError("Backtest cancelled")
+        return job.result
+
+    def cancel(self, job_id: str, owner: Optional[str] = None) -> bool:
+        """Cancel a pending or running job. Given an owner, only that owner's
+        interest is dropped: a job another submitter shares keeps running."""
+        job = self._jobs.get(job_id)
+        if job is None or job.status in FINISHED_STATUSES:
+            return False
+        if owner is not None:
+            job.owners.discard(owner)
+            if job.owners:
+                return False
+        if self._cancelled is not None:
+            self._cancelled[job_id] = True
+        if job.future is not None and job.future.cancel():
+            # Never reached a worker
+            self._finish(job, JobStatus.CANCELLED)
+        return True
+
+    def get_job(self, job_id: str) -> Optional[BacktestJob]:
+        return self._jobs.get(job_id)
+
+    def list_jobs(self) -> List[Dict]:
+        return [job.to_dict() for job in reversed(self._jobs.values())]
+
+    def get_stats(self) -> Dict:
+        statuses: Dict[str, int] = {}
+        for job in self._jobs.values():
+            statuses[job.status] = statuses.get(job.status, 0) + 1
+        return {
+            "workers": self.max_workers,
+            "pool_started": self._pool is not None,
+            "jobs": statuses,
+            "cached_results": len(self._cache),
+        }
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SINGLETON
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_backtest_job_manager: Optional[BacktestJobManager] = None
+
+
+def get_backtest_job_manager() -> BacktestJobManager:
+    """Get singleton instance of BacktestJobManager"""
+    global _backtest_job_manager
+    if _backtest_job_manager is None:
+        _backtest_job_manager = BacktestJobManager()
+    return _backtest_job_manager
@@ -0,0 +1,461 @@
+"""
+Backtest Result Store
+=====================
+Persists backtest runs in columnar form so they can be listed, filtered and
+compared later without rerunning anything.
+
+Layout (BACKTEST_STORE_DIR, default backend/backtest_store/):
+- index.sqlite      - one row per run: strategy, symbol, source, params,
+                      date range and headline metrics, indexed by strategy,
+                      params hash and date range
+- runs/<run_id>.npz - numpy arrays for the run:
+                        equity, equity_dates          equity curve
+                        daily_dates, daily_pnl        daily P&L
+                        trade__<column>               one array per trade field
+
+Results come in many shapes (BacktestResult, StrategyBacktestResult,
+VWAPBacktestResult, the run_* script dicts); save_result() normalises any of
+them - dataclass or dict, trades as dataclasses or dicts, equity as floats or
+{"date", "equity"} points.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import asdict, is_dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BACKTEST_STORE_DIR = os.environ.get(
+    "BACKTEST_STORE_DIR",
+    str(Path(__file__).resolve().parent.parent / "backtest_store"),
+)
+ARRAY_CACHE_SIZE = 32
+TRADE_PREFIX = "trade__"
+
+# Keys that hold arrays rather than headline metrics
+_SERIES_KEYS = {"trades", "equity_curve", "daily_pnl", "monthly_returns"}
+
+
+def params_hash(params: Optional[Dict[str, Any]]) -> str:
+    """Stable hash of run parameters (for exact-match lookups)"""
+    payload = json.dumps(params or {}, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def _to_dict(obj: Any) -> Dict[str, Any]:
+    if is_dataclass(obj):
+        return asdict(obj)
+    return dict(obj)
+
+
+def _date_key(value: Any) -> str:
+    """'2026-01-15 09:20:00' / datetime / date -> '2026-01-15'"""
+    if hasattr(value, "strftime"):
+        return value.strftime("%Y-%m-%d")
+    return str(value)[:10]
+
+
+def _trade_columns(trades: Iterable[Any]) -> Dict[str, np.ndarray]:
+    """List of trade records -> {column: array}; numeric columns become float64"""
+    rows = [_to_dict(t) for t in trades]
+    if not rows:
+        return {}
+    columns: List[str] = []
+    for row in rows:
+        for key in row:
+            if key not in columns:
+                columns.append(key)
+
+    arrays = {}
+    for key in columns:
+        values = [row.get(key) for row in rows]
+        if all(isinstance(v, (int, float, bool, np.number)) or v is None for v in values):
+            arrays[key] = np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+        else:
+            arrays[key] = np.array(["" if v is None else str(v) for v in values], dtype=np.str_)
+    return arrays
+
+
+def _equity_arrays(equity_curve: Iterable[Any]):
+    """Floats or {"date", "equity"} points -> (equity, dates or None)"""
+    points = list(equity_curve or [])
+    if not points:
+        return np.zeros(0, dtype=np.float64), None
+    if isinstance(points[0], dict):
+        equity = np.array([float(p.get("equity", p.get("value", 0))) for p in points], dtype=np.float64)
+        dates = np.array([_date_key(p.get("date", "")) for p in points], dtype=np.str_)
+        return equity, dates
+    return np.asarray(points, dtype=np.float64), None
+
+
+def _daily_from_trades(trades: Dict[str, np.ndarray]):
+    """Sum trade P&L by exit date when a result has no daily series"""
+    pnl = trades.get("pnl")
+    date_col = next((c for c in ("exit_date", "exit_time", "date", "entry_date") if c in trades), None)
+    if pnl is None or date_col is None or pnl.dtype.kind != "f":
+        return None, None
+    days = np.array([_date_key(d) for d in trades[date_col]], dtype=np.str_)
+    unique_days, inverse = np.unique(days, return_inverse=True)
+    return unique_days, np.bincount(inverse, weights=np.nan_to_num(pnl), minlength=len(unique_days))
+
+
+def compute_metrics(arrays: Dict[str, np.ndarray], initial_capital: Optional[float] = None) -> Dict[str, float]:
+    """Headline metrics from stored arrays (vectorised)"""
+    pnl = arrays.get(TRADE_PREFIX + "pnl")
+    equity = arrays.get("equity", np.zeros(0))
+    daily = arrays.get("daily_pnl", np.zeros(0))
+    metrics: Dict[str, float] = {}
+
+    if pnl is not None and pnl.dtype.kind == "f":
+        pnl = np.nan_to_num(pnl)
+        wins, losses = pnl[pnl > 0], pnl[pnl < 0]
+        gross_loss = -losses.sum()
+        metrics.update({
+            "total_trades": int(pnl.size),
+            "winning_trades": int(wins.size),
+            "losing_trades": int(losses.size),
+            "win_rate": round(wins.size / pnl.size * 100, 2) if pnl.size else 0.0,
+            "total_pnl": round(float(pnl.sum()), 2),
+            "avg_win": round(float(wins.mean()), 2) if wins.size else 0.0,
+            "avg_loss": round(float(losses.mean()), 2) if losses.size else 0.0,
+            "max_win": round(float(pnl.max()), 2) if pnl.size else 0.0,
+            "max_loss": round(float(pnl.min()), 2) if pnl.size else 0.0,
+            "profit_factor": round(float(wins.sum() / gross_loss), 2) if gross_loss > 0 else 0.0,
+        })
+
+    if equity.size:
+        start = initial_capital or float(equity[0])
+        peak = np.maximum.accumulate(equity)
+        drawdown = np.where(peak > 0, (peak - equity) / np.where(peak > 0, peak, 1), 0.0)
+        metrics["max_drawdown_pct"] = round(float(drawdown.max()) * 100, 2)
+        metrics["final_equity"] = round(float(equity[-1]), 2)
+        if start:
+            metrics["return_pct"] = round((float(equity[-1]) / start - 1) * 100, 2)
+        metrics.setdefault("total_pnl", round(float(equity[-1] - start), 2))
+
+    if daily.size > 1:
+        base = initial_capital or (float(equity[0]) if equity.size else 0.0)
+        returns = daily / base if base else daily
+        std = returns.std(ddof=1)
+        metrics["sharpe_ratio"] = round(float(returns.mean() / std * np.sqrt(252)), 2) if std > 0 else 0.0
+        metrics["trading_days"] = int(daily.size)
+        metrics["best_day"] = round(float(daily.max()), 2)
+        metrics["worst_day"] = round(float(daily.min()), 2)
+
+    return metrics
+
+
+class BacktestResultStore:
+    """SQLite-indexed, numpy-backed store of backtest runs"""
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = Path(root or BACKTEST_STORE_DIR)
+        self.runs_dir = self.root / "runs"
+        self.runs_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._arrays: "OrderedDict[str, Dict[str, np.ndarray]]" = OrderedDict()
+        self._db = sqlite3.connect(str(self.root / "index.sqlite"), check_same_thread=False, timeout=30)
+        self._db.row_factory = sqlite3.Row
+        with self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS runs (
+                    run_id TEXT PRIMARY KEY,
+                    source TEXT NOT NULL,
+                    strategy TEXT NOT NULL,
+                    symbol TEXT,
+                    params TEXT,
+                    params_hash TEXT,
+                    start_date TEXT,
+                    end_date TEXT,
+                    initial_capital REAL,
+                    metrics TEXT,
+                    created_at TEXT NOT NULL
+                )
+            """)
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_runs_strategy ON runs (strategy, symbol)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_runs_params ON runs (params_hash)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_runs_dates ON runs (start_date, end_date)")
+
+    # ── writing ───────────────────────────────────────────────────────────
+
+    def save_run(
+        self,
+        source: str,
+        strategy: str,
+        trades: Optional[Iterable[Any]] = None,
+        equity_curve: Optional[Iterable[Any]] = None,
+        daily_pnl: Optional[Dict[str, float]] = None,
+        symbol: Optional[str] = None,
+        params: Optional[Dict[str, Any]] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        initial_capital: Optional[float] = None,
+        metrics: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """Persist one run and return its run_id"""
+        run_id = uuid.uuid4().hex[:16]
+        trade_arrays = _trade_columns(trades or [])
+        equity, equity_dates = _equity_arrays(equity_curve)
+
+        if daily_pnl:
+            days = sorted(daily_pnl)
+            daily_dates = np.array([_date_key(d) for d in days], dtype=np.str_)
+            daily_values = np.array([float(daily_pnl[d]) for d in days], dtype=np.float64)
+        elif equity_dates is not None and equity.size > 1:
+            daily_dates, last_idx = np.unique(equity_dates[::-1], return_index=True)
+            closes = equity[::-1][last_idx]
+            daily_values = np.diff(closes, prepend=initial_capital if initial_capital else closes[0])
+        else:
+            daily_dates, daily_values = _daily_from_trades(trade_arrays)
+
+        arrays: Dict[str, np.ndarray] = {"equity": equity}
+        if equity_dates is not None:
+            arrays["equity_dates"] = equity_dates
+        if daily_dates is not None:
+            arrays["daily_dates"] = daily_dates
+            arrays["daily_pnl"] = daily_values
+        arrays.update({TRADE_PREFIX + k: v for k, v in trade_arrays.items()})
+
+        if daily_dates is not None and daily_dates.size:
+            start_date = start_date or str(daily_dates[0])
+            end_date = end_date or str(daily_dates[-1])
+
+        stored_metrics = compute_metrics(arrays, initial_capital)
+        stored_metrics.update(metrics or {})
+
+        path = self.runs_dir / f"{run_id}.npz"
+        np.savez(path, **arrays)
+
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    run_id, source, strategy, symbol,
+                    json.dumps(params or {}, sort_keys=True, default=str), params_hash(params),
+                    _date_key(start_date) if start_date else None,
+                    _date_key(end_date) if end_date else None,
+                    initial_capital,
+                    json.dumps(stored_metrics, default=str),
+                    datetime.now().isoformat(),
+                ),
+            )
+        logger.info(f"Stored backtest run {run_id} ({source}/{strategy}, {len(trade_arrays.get('pnl', []))} trades)")
+        return run_id
+
+    def save_result(self, result: Any, source: str, strategy: Optional[str] = None, **meta) -> str:
+        """
+        Persist any backtest result object or dict.
+
+        Scalar fields become stored metrics; trades / equity_curve / daily_pnl
+        become arrays. Extra keyword args are passed to save_run.
+        """
+        data = _to_dict(result)
+        scalars = {
+            k: v for k, v in data.items()
+            if k not in _SERIES_KEYS and isinstance(v, (int, float)) and not isinstance(v, bool)
+        }
+        nested = data.get("metrics") or data.get("results")
+        if isinstance(nested, dict):
+            scalars.update({k: v for k, v in nested.items() if isinstance(v, (int, float)) and not isinstance(v, bool)})
+
+        return self.save_run(
+            source=source,
+            strategy=strategy or data.get("strategy_name") or data.get("strategy") or source,
+            trades=data.get("trades"),
+            equity_curve=data.get("equity_curve"),
+            daily_pnl=data.get("daily_pnl") if isinstance(data.get("daily_pnl"), dict) else None,
+            metrics=scalars,
+            **meta,
+        )
+
+    def delete_run(self, run_id: str) -> bool:
+        with self._lock, self._db:
+            deleted = self._db.execute("DELETE FROM runs WHERE run_id = ?", (run_id,)).rowcount
+            self._arrays.pop(run_id, None)
+        path = self.runs_dir / f"{run_id}.npz"
+        if path.exists():
+            path.unlink()
+        return bool(deleted)
+
+    # ── reading ───────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        run = dict(row)
+        run["params"] = json.loads(run["params"] or "{}")
+        run["metrics"] = json.loads(run["metrics"] or "{}")
+        return run
+
+    def get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def query(
+        self,
+        strategy: Optional[str] = None,
+        symbol: Optional[str] = None,
+        source: Optional[str] = None,
+        params: Optional[Dict[str, Any]] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """Runs matching all given filters; the date range matches overlapping runs"""
+        clauses, args = [], []
+        for column, value in (("strategy", strategy), ("symbol", symbol), ("source", source)):
+            if value:
+                clauses.append(f"{column} = ?")
+                args.append(value)
+        if params is not None:
+            clauses.append("params_hash = ?")
+            args.append(params_hash(params))
+        if start_date:
+            clauses.append("(end_date IS NULL OR end_date >= ?)")
+            args.append(_date_key(start_date))
+        if end_date:
+            clauses.append("(start_date IS NULL OR start_date <= ?)")
+            args.append(_date_key(end_date))
+
+        sql = "SELECT * FROM runs"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY created_at DESC LIMIT ?"
+        args.append(limit)
+
+        with self._lock:
+            rows = self._db.execute(sql, args).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def load_arrays(self, run_id: str) -> Dict[str, np.ndarray]:
+        """All arrays of a run (small LRU cache keeps dashboards instant)"""
+        with self._lock:
+            if run_id in self._arrays:
+                self._arrays.move_to_end(run_id)
+                return self._arrays[run_id]
+
+        path = self.runs_dir / f"{run_id}.npz"
+        if not path.exists():
+            raise KeyError(f"Unknown backtest run: {run_id}")
+        with np.load(path, allow_pickle=False) as npz:
+            arrays = {key: npz[key] for key in npz.files}
+
+        with self._lock:
+            self._arrays[run_id] = arrays
+            while len(self._arrays) > ARRAY_CACHE_SIZE:
+                self._arrays.popitem(last=False)
+        return arrays
+
+    def get_trades(self, run_id: str, offset: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        arrays = self.load_arrays(run_id)
+        columns = {k[len(TRADE_PREFIX):]: v[offset:offset + limit] for k, v in arrays.items() if k.startswith(TRADE_PREFIX)}
+        if not columns:
+            return []
+        count = len(next(iter(columns.values())))
+        return [{name: values[i].item() for name, values in columns.items()} for i in range(count)]
+
+    def get_series(self, run_id: str) -> Dict[str, List]:
+        arrays = self.load_arrays(run_id)
+        return {
+            "equity": arrays["equity"].tolist(),
+            "equity_dates": arrays["equity_dates"].tolist() if "equity_dates" in arrays else None,
+            "daily_dates": arrays["daily_dates"].tolist() if "daily_dates" in arrays else [],
+            "daily_pnl": arrays["daily_pnl"].tolist() if "daily_pnl" in arrays else [],
+        }
+
+    # ── comparison ────────────────────────────────────────────────────────
+
+    def compare(self, run_ids: List[str], points: int = 200) -> Dict[str, Any]:
+        """
+        Side-by-side metrics and overlaid equity for stored runs.
+
+        When every run has daily P&L the overlay is cumulative P&L on the
+        union of trading dates (carried forward over days a run didn't
+        trade); otherwise each equity curve is resampled to `points` steps
+        on a 0-1 progress axis as % return.
+        """
+        runs, arrays = [], []
+        for run_id in run_ids:
+            run = self.get_run(run_id)
+            if run is None:
+                raise KeyError(f"Unknown backtest run: {run_id}")
+            runs.append(run)
+            arrays.append(self.load_arrays(run_id))
+
+        metrics = {
+            run["run_id"]: compute_metrics(arr, run.get("initial_capital"))
+            for run, arr in zip(runs, arrays)
+        }
+
+        if arrays and all("daily_dates" in arr and arr["daily_dates"].size for arr in arrays):
+            axis = np.unique(np.concatenate([arr["daily_dates"] for arr in arrays]))
+            series = {}
+            for run, arr in zip(runs, arrays):
+                cumulative = np.cumsum(arr["daily_pnl"])
+                idx = np.searchsorted(arr["daily_dates"], axis, side="right") - 1
+                series[run["run_id"]] = np.where(idx >= 0, cumulative[np.maximum(idx, 0)], 0.0)
+            if axis.size > points:
+                keep = np.unique(np.linspace(0, axis.size - 1, points).round().astype(int))
+                axis = axis[keep]
+                series = {k: v[keep] for k, v in series.items()}
+            overlay = {"axis": "date", "unit": "cumulative_pnl", "x": axis.tolist()}
+        else:
+            axis = np.linspace(0.0, 1.0, points)
+            series = {}
+            for run, arr in zip(runs, arrays):
+                equity = arr["equity"]
+                if not equity.size:
+                    series[run["run_id"]] = np.zeros(points)
+                    continue
+                base = run.get("initial_capital") or equity[0] or 1.0
+                returns = (equity / base - 1) * 100
+                series[run["run_id"]] = np.interp(axis, np.linspace(0.0, 1.0, equity.size), returns)
+            overlay = {"axis": "progress", "unit": "return_pct", "x": axis.round(4).tolist()}
+
+        overlay["series"] = {k: np.round(v, 2).tolist() for k, v in series.items()}
+
+        ranking = {}
+        for key in ("total_pnl", "sharpe_ratio", "win_rate", "profit_factor"):
+            values = {rid: m[key] for rid, m in metrics.items() if key in m}
+            if values:
+                ranking[key] = sorted(values, key=values.get, reverse=True)
+        if any("max_drawdown_pct" in m for m in metrics.values()):
+            values = {rid: m["max_drawdown_pct"] for rid, m in metrics.items() if "max_drawdown_pct" in m}
+            ranking["max_drawdown_pct"] = sorted(values, key=values.get)
+
+        return {
+            "runs": [
+                {k: run[k] for k in ("run_id", "source", "strategy", "symbol", "params", "start_date", "end_date", "created_at")}
+                for run in runs
+            ],
+            "metrics": metrics,
+            "ranking": ranking,
+            "equity_overlay": overlay,
+        }
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SINGLETON
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_backtest_store: Optional[BacktestResultStore] = None
+
+
+def get_backtest_store() -> BacktestResultStore:
+    """Get singleton instance of BacktestResultStore"""
+    global _backtest_store
+    if _backtest_store is None:
+        _backtest_store = BacktestResultStore()
+    return _backtest_store
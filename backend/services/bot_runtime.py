@@ -0,0 +1,253 @@
+"""
+Shared Bot Runtime
+==================
+One market-data fan-in for every per-user bot instance.
+
+The delta strangle bot, AI strangle bot, algo engine and AI agent are
+created per user, and each used to fetch the same NIFTY spot, option chain
+and history on its own. Fifty users on NIFTY strangles meant fifty chain
+fetches per cycle.
+
+Bots now read market data through named topics:
+
+    spot:NIFTY                    index spot (any bot's fetcher)
+    chain:NIFTY:dhan:nearest      option chain in the bot format, nearest expiry
+    quote:NIFTY:dhan              full quote from the Dhan market feed
+    bars:NIFTY:dhan:5:<date>      intraday candles
+    vix:INDIAVIX                  India VIX close
+    contracts:NIFTY:upstox        option contract list (instrument keys)
+
+For each topic one fetch is in flight at a time. Concurrent readers join it
+(single flight), and later readers get the published Snapshot until it is
+older than the topic's max age. The fetcher is supplied by the reader, so
+the first bot to find the snapshot stale refreshes it for everyone.
+
+Snapshots are shared between subscribers and must be treated as read-only.
+Fetchers must raise on failure and never return a fallback value: failures
+are never published. Each bot applies its own fallback (mock chain,
+estimated spot) after the shared read fails.
+
+Topics are fetched on demand rather than polled in the background, so a
+topic costs nothing while its subscribers are idle (market closed, bots
+paused). While a market replay is active every read goes straight to the
+caller's fetcher, because the replay swaps in per-bot data sources.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from .market_replay import is_replay_active
+
+logger = logging.getLogger(__name__)
+
+SHARED_MARKET_DATA_ENABLED = os.getenv("BOT_SHARED_MARKET_DATA", "1") != "0"
+
+# Max snapshot age (seconds) per topic kind - the first part of the topic name
+TOPIC_MAX_AGE: Dict[str, float] = {
+    "spot": 3.0,
+    "quote": 3.0,
+    "chain": 10.0,
+    "bars": 60.0,
+    "history": 300.0,
+    "vix": 60.0,
+    "contracts": 3600.0,
+}
+DEFAULT_MAX_AGE = 5.0
+
+Fetcher = Callable[[], Awaitable[Any]]
+
+
+def topic(kind: str, symbol: str, *qualifiers: Any) -> str:
+    """Topic name, e.g. topic("chain", "nifty", "dhan", "nearest") -> "chain:NIFTY:dhan:nearest" """
+    return ":".join([kind, symbol.upper(), *(str(q) for q in qualifiers)])
+
+
+def subscriber_id(bot: Any) -> str:
+    """Stable subscriber name for a bot instance"""
+    return f"{type(bot).__name__}@{id(bot):x}"
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SNAPSHOTS / FEEDS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@dataclass(frozen=True)
+class Snapshot:
+    """One published value of a topic. `data` is shared: do not mutate it."""
+    topic: str
+    version: int
+    data: Any
+    fetched_at: float  # time.monotonic()
+    fetch_ms: float
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.fetched_at
+
+
+class TopicFeed:
+    """Latest snapshot, in-flight fetch, subscribers and counters for one topic"""
+
+    def __init__(self, name: str, max_age: float):
+        self.topic = name
+        self.max_age = max_age
+        self.snapshot: Optional[Snapshot] = None
+        self.subscribers: Set[str] = set()
+        self._inflight: Optional[asyncio.Task] = None
+        self.reads = 0
+        self.fetches = 0
+        self.joined = 0
+        self.served_cached = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+
+    def fresh(self, max_age: float) -> Optional[Snapshot]:
+        snapshot = self.snapshot
+        if snapshot is not None and snapshot.age <= max_age:
+            return snapshot
+        return None
+
+    async def _fetch(self, fetcher: Fetcher) -> Snapshot:
+        started = time.monotonic()
+        self.fetches += 1
+        try:
+            data = await fetcher()
+        except Exception as e:
+            self.failures += 1
+            self.last_error = f"{type(e).__name__}: {e}"[:200]
+            raise
+        version = self.snapshot.version + 1 if self.snapshot else 1
+        now = time.monotonic()
+        self.snapshot = Snapshot(self.topic, version, data, now, round((now - started) * 1000, 1))
+        self.last_error = None
+        return self.snapshot
+
+    async def read(self, fetcher: Fetcher, max_age: float) -> Snapshot:
+        self.reads += 1
+        snapshot = self.fresh(max_age)
+        if snapshot is not None:
+            self.served_cached += 1
+            return snapshot
+
+        task = self._inflight
+        if task is not None and not task.done() and task.get_loop() is asyncio.get_running_loop():
+            self.joined += 1
+        else:
+            task = asyncio.ensure_future(self._fetch(fetcher))
+            self._inflight = task
+            task.add_done_callback(self._clear_inflight)
+        # A cancelled reader must not cancel the fetch the others are waiting on
+        return await asyncio.shield(task)
+
+    def _clear_inflight(self, task: asyncio.Task):
+        if self._inflight is task:
+            self._inflight = None
+        if not task.cancelled():
+            task.exception()  # consumed here; every reader re-raises it
+
+    def get_status(self) -> Dict:
+        snapshot = self.snapshot
+        return {
+            "subscribers": len(self.subscribers),
+            "version": snapshot.version if snapshot else 0,
+            "age_s": round(snapshot.age, 1) if snapshot else None,
+            "fetch_ms": snapshot.fetch_ms if snapshot else None,
+            "max_age_s": self.max_age,
+            "reads": self.reads,
+            "fetches": self.fetches,
+            "shared": self.served_cached + self.joined,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# RUNTIME
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class BotRuntime:
+    """Topic registry shared by all bot instances in the process"""
+
+    def __init__(self, enabled: bool = SHARED_MARKET_DATA_ENABLED, max_age: Dict[str, float] = None):
+        self.enabled = enabled
+        self.max_age = dict(TOPIC_MAX_AGE, **(max_age or {}))
+        self._feeds: Dict[str, TopicFeed] = {}
+        self.bypassed = 0
+
+    def _feed(self, name: str) -> TopicFeed:
+        feed = self._feeds.get(name)
+        if feed is None:
+            kind = name.split(":", 1)[0]
+            feed = self._feeds[name] = TopicFeed(name, self.max_age.get(kind, DEFAULT_MAX_AGE))
+        return feed
+
+    async def read(self, name: str, fetcher: Fetcher, max_age: Optional[float] = None) -> Snapshot:
+        """Latest snapshot of a topic, fetched with `fetcher` if stale. Raises if the fetch fails."""
+        if not self.enabled or is_replay_active():
+            self.bypassed += 1
+            started = time.monotonic()
+            data = await fetcher()
+            now = time.monotonic()
+            return Snapshot(name, 0, data, now, round((now - started) * 1000, 1))
+        feed = self._feed(name)
+        return await feed.read(fetcher, feed.max_age if max_age is None else max_age)
+
+    async def get(self, name: str, fetcher: Fetcher, max_age: Optional[float] = None) -> Any:
+        """Data of the latest snapshot of a topic (see read)"""
+        return (await self.read(name, fetcher, max_age)).data
+
+    def peek(self, name: str) -> Optional[Snapshot]:
+        """Last published snapshot, however old, without fetching"""
+        feed = self._feeds.get(name)
+        return feed.snapshot if feed else None
+
+    def subscribe(self, subscriber: str, *topics: str):
+        """Declare that a bot reads these topics (for status and snapshot lifetime)"""
+        for name in topics:
+            self._feed(name).subscribers.add(subscriber)
+
+    def unsubscribe(self, subscriber: str, *topics: str):
+        """Drop a bot's subscriptions (all of them if no topics given).
+        Topics left without subscribers are forgotten."""
+        for name in list(topics or self._feeds):
+            feed = self._feeds.get(name)
+            if feed is None:
+                continue
+            feed.subscribers.discard(subscriber)
+            if not feed.subscribers and feed._inflight is None:
+                del self._feeds[name]
+
+    def get_status(self) -> Dict:
+        feeds = {name: feed.get_status() for name, feed in sorted(self._feeds.items())}
+        reads = sum(f["reads"] for f in feeds.values())
+        fetches = sum(f["fetches"] for f in feeds.values())
+        return {
+            "enabled": self.enabled,
+            "replay_bypass": is_replay_active(),
+            "topics": len(feeds),
+            "subscribers": len({s for feed in self._feeds.values() for s in feed.subscribers}),
+            "reads": reads,
+            "upstream_fetches": fetches,
+            "fetches_saved": reads - fetches,
+            "bypassed": self.bypassed,
+            "feeds": feeds,
+        }
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SINGLETON
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_bot_runtime: Optional[BotRuntime] = None
+
+
+def get_bot_runtime() -> BotRuntime:
+    """Get or create the process-wide bot runtime"""
+    global _bot_runtime
+    if _bot_runtime is None:
+        _bot_runtime = BotRuntime()
+    return _bot_runtime
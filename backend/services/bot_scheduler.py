@@ -0,0 +1,406 @@
+"""
+Bot Scheduler
+=============
+Owns the ticks of every running bot loop:
+
+    AIStrangleBot._monitoring_loop     AlgoTradingEngine._monitoring_loop
+    VWAPTradingBot._scan_loop          AutonomousAIAgent._agent_loop
+    TradingEngine._trading_loop
+
+A bot no longer sleeps in its own `while` loop. It hands the scheduler one
+cycle coroutine, which returns the seconds until its next tick (None = the
+bot's interval):
+
+    await get_bot_scheduler().run(
+        subscriber_id(self), self._monitoring_cycle,
+        interval=lambda: self.config.check_interval,
+        lane=self._cycle_lane, active=lambda: self._running,
+    )
+
+run() returns once active() turns false. Cancelling it (bot.stop()
+cancelling its task) cancels the in-flight cycle, as before.
+
+- Bounded concurrency: at most max_concurrency cycles run at once; due
+  cycles queue for a slot. risk_slots of them take RISK cycles only, so
+  slow entry scans (LLM calls, fill tracking, rate-limiter waits) cannot
+  hold up every bot's stop-loss check.
+- Deadline-aware ordering: queued cycles start by lane, then by due time.
+  RISK (bots holding positions: exits, stops, adjustments) goes before
+  ENTRY (flat bots scanning for new trades).
+- Overruns: a cycle longer than its SLO (default: the bot's interval) is
+  counted and logged. A cycle that waited longer than LATE_AFTER_SECONDS
+  for a slot is counted as late.
+- Per-bot cycle-time histograms, also aggregated per bot kind.
+
+Ticks follow the replay clock (clock_sleep / ist_now), so bots started
+during a market replay still step with simulated time.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+from collections import OrderedDict
+from enum import IntEnum
+from typing import Awaitable, Callable, Dict, List, Optional, Union
+
+from .market_replay import clock_sleep, ist_now
+
+logger = logging.getLogger(__name__)
+
+MAX_CONCURRENCY = int(os.getenv("BOT_SCHEDULER_CONCURRENCY", "8"))
+# Slots (out of MAX_CONCURRENCY) only RISK cycles may use
+RISK_SLOTS = int(os.getenv("BOT_SCHEDULER_RISK_SLOTS", "2"))
+# Queue wait (seconds) after which a cycle counts as late
+LATE_AFTER_SECONDS = float(os.getenv("BOT_SCHEDULER_LATE_SECONDS", "2"))
+ERROR_DELAY_SECONDS = 10.0
+MAX_IDLE_SECONDS = 60.0
+# Cycle-time histogram upper bounds (ms); the last bucket is open-ended
+HISTOGRAM_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+# Finished bots whose stats are kept for the status endpoint
+FINISHED_JOBS_KEPT = 50
+
+
+class Lane(IntEnum):
+    """Queue priority of a due cycle - lower starts first"""
+    RISK = 0
+    ENTRY = 1
+
+
+Cycle = Callable[[], Awaitable[Optional[float]]]
+Value = Union[float, Callable[[], float]]
+
+
+def _now() -> float:
+    """Scheduler clock (epoch seconds) - simulated while a replay is active"""
+    return ist_now().timestamp()
+
+
+def _resolve(value):
+    return value() if callable(value) else value
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# STATS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class CycleStats:
+    """Cycle-time histogram, overrun / late / error counters"""
+
+    def __init__(self):
+        self.cycles = 0
+        self.errors = 0
+        self.overruns = 0
+        self.late = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms: Optional[float] = None
+        self.max_wait_ms = 0.0
+        self.buckets: List[int] = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+
+    def record(self, duration_ms: float, wait_ms: float, slo_ms: float, failed: bool):
+        self.cycles += 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+        self.last_ms = round(duration_ms, 1)
+        self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+        self.errors += failed
+        self.overruns += duration_ms > slo_ms
+        self.late += wait_ms > LATE_AFTER_SECONDS * 1000
+        index = next((i for i, bound in enumerate(HISTOGRAM_BUCKETS_MS) if duration_ms <= bound), -1)
+        self.buckets[index] += 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th percentile (None = above the last bound)"""
+        if not self.cycles:
+            return None
+        rank = q * self.cycles
+        seen = 0
+        for bound, count in zip(HISTOGRAM_BUCKETS_MS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return float(bound)
+        return None
+
+    def to_dict(self) -> Dict:
+        labels = [f"<={bound}ms" for bound in HISTOGRAM_BUCKETS_MS] + [f">{HISTOGRAM_BUCKETS_MS[-1]}ms"]
+        return {
+            "cycles": self.cycles,
+            "errors": self.errors,
+            "overruns": self.overruns,
+            "late": self.late,
+            "avg_ms": round(self.total_ms / self.cycles, 1) if self.cycles else None,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "max_ms": round(self.max_ms, 1),
+            "last_ms": self.last_ms,
+            "max_wait_ms": round(self.max_wait_ms, 1),
+            "histogram": {label: count for label, count in zip(labels, self.buckets) if count},
+        }
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# JOBS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class BotJob:
+    """One bot's cycle, cadence, lane and SLO"""
+
+    def __init__(
+        self,
+        name: str,
+        cycle: Cycle,
+        interval: Value,
+        lane: Union[Lane, Callable[[], Lane]] = Lane.ENTRY,
+        slo: Optional[Value] = None,
+        active: Optional[Callable[[], bool]] = None,
+    ):
+        self.name = name
+        self.kind = name.split("@", 1)[0]
+        self.cycle = cycle
+        self.interval = interval
+        self.lane = lane
+        self.slo = slo
+        self.active = active or (lambda: True)
+        self.stats = CycleStats()
+        self.due: Optional[float] = None
+        self.removed = False
+        self.last_lane: Optional[Lane] = None
+        self._task: Optional[asyncio.Task] = None
+        self.finished: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def slo_seconds(self) -> float:
+        return float(_resolve(self.slo) if self.slo is not None else _resolve(self.interval))
+
+    def finish(self):
+        if not self.finished.done():
+            self.finished.set_result(None)
+
+    def to_dict(self) -> Dict:
+        return {
+            "kind": self.kind,
+            "lane": self.last_lane.name.lower() if self.last_lane is not None else None,
+            "interval_s": _resolve(self.interval),
+            "slo_s": self.slo_seconds(),
+            "running": self.running,
+            "next_tick_in_s": round(max(0.0, self.due - _now()), 1) if self.due is not None and not self.running else None,
+            **self.stats.to_dict(),
+        }
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SCHEDULER
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class BotScheduler:
+    """Ticks every registered bot cycle through a bounded, lane-ordered worker pool"""
+
+    def __init__(self, max_concurrency: int = MAX_CONCURRENCY, risk_slots: int = RISK_SLOTS):
+        self.max_concurrency = max(1, max_concurrency)
+        # At least one slot stays open to ENTRY cycles
+        self.risk_slots = min(max(0, risk_slots), self.max_concurrency - 1)
+        self._jobs: Dict[str, BotJob] = {}
+        self._finished: "OrderedDict[str, Dict]" = OrderedDict()
+        self._by_kind: Dict[str, CycleStats] = {}
+        self._loop = None
+        self._tasks: List[asyncio.Task] = []
+
+    def _reset(self):
+        """Bind timers, queue and workers to the running event loop"""
+        self._loop = asyncio.get_running_loop()
+        self._jobs.clear()  # jobs of a previous (closed) loop can never tick again
+        self._timers: list = []
+        self._seq = itertools.count()
+        self._ready: list = []  # heap of (lane, due, seq, job)
+        self._work = asyncio.Event()
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._dispatch())]
+        self._tasks += [
+            asyncio.create_task(self._worker(risk_only=slot < self.risk_slots))
+            for slot in range(self.max_concurrency)
+        ]
+
+    def _ensure_started(self):
+        if self._loop is not asyncio.get_running_loop() or any(t.done() for t in self._tasks):
+            self._reset()
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # REGISTRATION
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    async def run(
+        self,
+        name: str,
+        cycle: Cycle,
+        interval: Value,
+        lane: Union[Lane, Callable[[], Lane]] = Lane.ENTRY,
+        slo: Optional[Value] = None,
+        active: Optional[Callable[[], bool]] = None,
+    ):
+        """Tick cycle() until active() is false (or this is cancelled); the first tick is due now"""
+        self._ensure_started()
+        previous = self._jobs.get(name)
+        if previous is not None:  # a restarted bot supersedes its old loop
+            self._remove(previous)
+            previous.finish()
+        job = BotJob(name, cycle, interval, lane, slo, active)
+        self._jobs[name] = job
+        self._schedule(job, _now())
+        try:
+            await job.finished
+        finally:
+            self._remove(job)
+
+    def _schedule(self, job: BotJob, due: float):
+        job.due = due
+        heapq.heappush(self._timers, (due, next(self._seq), job))
+        self._wakeup.set()
+
+    def _remove(self, job: BotJob):
+        job.removed = True
+        if job.running:
+            job._task.cancel()
+        if self._jobs.get(job.name) is job:
+            del self._jobs[job.name]
+        self._finished[job.name] = {**job.to_dict(), "running": False, "next_tick_in_s": None}
+        while len(self._finished) > FINISHED_JOBS_KEPT:
+            self._finished.popitem(last=False)
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # DISPATCH
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    async def _dispatch(self):
+        """Move due cycles onto the ready queue, ordered by (lane, due)"""
+        while True:
+            now = _now()
+            while self._timers and self._timers[0][0] <= now:
+                due, seq, job = heapq.heappop(self._timers)
+                if job.removed or job.due != due:
+                    continue
+                try:
+                    job.last_lane = Lane(_resolve(job.lane))
+                except Exception:
+                    job.last_lane = Lane.ENTRY
+                heapq.heappush(self._ready, (job.last_lane, due, seq, job))
+                self._work.set()
+            wait = self._timers[0][0] - now if self._timers else MAX_IDLE_SECONDS
+            await self._idle(min(max(wait, 0.0), MAX_IDLE_SECONDS))
+
+    async def _idle(self, seconds: float):
+        """Sleep on the (replay-aware) clock until the next due tick or a new job"""
+        self._wakeup.clear()
+        sleeper = asyncio.ensure_future(clock_sleep(seconds))
+        waker = asyncio.ensure_future(self._wakeup.wait())
+        try:
+            await asyncio.wait({sleeper, waker}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            sleeper.cancel()
+            waker.cancel()
+
+    async def _take(self, risk_only: bool):
+        """Next queued cycle this slot may run (RISK first, then by due time)"""
+        while not self._ready or (risk_only and self._ready[0][0] != Lane.RISK):
+            self._work.clear()
+            await self._work.wait()
+        return heapq.heappop(self._ready)
+
+    async def _worker(self, risk_only: bool = False):
+        while True:
+            _, due, _, job = await self._take(risk_only)
+            if not job.removed:
+                await self._run_cycle(job, due)
+
+    async def _run_cycle(self, job: BotJob, due: float):
+        try:
+            if not job.active():
+                job.finish()
+                return
+        except Exception:
+            job.finish()
+            return
+
+        started = _now()
+        started_perf = time.perf_counter()
+        failed = False
+        delay = None
+        job._task = asyncio.ensure_future(job.cycle())
+        try:
+            delay = await job._task
+        except asyncio.CancelledError:
+            if not job.removed:
+                raise  # the worker itself is being cancelled
+            return
+        except Exception as e:
+            failed = True
+            delay = ERROR_DELAY_SECONDS
+            logger.error(f"Bot cycle '{job.name}' failed: {e}", exc_info=True)
+
+        duration_ms = (time.perf_counter() - started_perf) * 1000
+        slo_ms = job.slo_seconds() * 1000
+        wait_ms = max(0.0, started - due) * 1000
+        job.stats.record(duration_ms, wait_ms, slo_ms, failed)
+        self._by_kind.setdefault(job.kind, CycleStats()).record(duration_ms, wait_ms, slo_ms, failed)
+        if duration_ms > slo_ms:
+            logger.warning(f"⏱️ Bot cycle '{job.name}' overran its SLO: {duration_ms:.0f}ms > {slo_ms:.0f}ms")
+
+        if job.removed:
+            return
+        if job.active():
+            self._schedule(job, _now() + (delay if delay is not None else float(_resolve(job.interval))))
+        else:
+            job.finish()
+
+    async def stop(self):
+        """Cancel every bot cycle and the dispatcher / workers"""
+        for job in list(self._jobs.values()):
+            self._remove(job)
+            job.finish()
+        tasks = [t for t in self._tasks if not t.done()]
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        self._loop = None
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # STATUS
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    def get_status(self) -> Dict:
+        jobs = {name: job.to_dict() for name, job in self._jobs.items()}
+        return {
+            "max_concurrency": self.max_concurrency,
+            "risk_slots": self.risk_slots,
+            "running": sum(1 for job in self._jobs.values() if job.running),
+            "queued": len(self._ready) if self._loop is not None else 0,
+            "late_after_s": LATE_AFTER_SECONDS,
+            "bots": jobs,
+            "kinds": {kind: stats.to_dict() for kind, stats in sorted(self._by_kind.items())},
+            "finished": dict(self._finished),
+        }
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SINGLETON
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_bot_scheduler: Optional[BotScheduler] = None
+
+
+def get_bot_scheduler() -> BotScheduler:
+    """Get or create the shared bot scheduler"""
+    global _bot_scheduler
+    if _bot_scheduler is None:
+        _bot_scheduler = BotScheduler()
+    return _bot_scheduler
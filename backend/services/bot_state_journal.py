@@ -0,0 +1,482 @@
+"""
+Bot State Journal
+=================
+Crash-recoverable bot state with write-behind batching.
+
+The AI agent used to upsert its whole state document to Firestore every few
+cycles, while the delta strangle, AI strangle and VWAP bots kept positions
+only in memory - a Cloud Run restart lost track of open positions.
+
+Each bot instance now owns a journal stream, e.g. "delta_strangle:<user>":
+
+    stream = await get_bot_state_journal().open("delta_strangle", user_id)
+    stream.set("position", position.to_dict(), urgent=True)
+    stream.append("fills", fill, limit=50, urgent=True)
+
+Writes are applied in memory and appended to a local log of deltas
+({dir}/{stream}.log, one JSON entry per line). Setting a key to the value it
+already has is a no-op, so bots can record their state every cycle.
+
+A background flusher compacts every changed stream into a local snapshot
+file (truncating its log) and writes the snapshots of all changed streams to
+Firestore in one batched commit - every 30s, or ~2s after an urgent write
+(fills, entries, exits, adjustments). Many cycles and many bots cost one
+Firestore commit per flush instead of one write per bot per cycle.
+
+On open, a stream recovers from the newer of the local and Firestore
+snapshots and replays the local log entries written after it. The local
+files survive a process crash inside the same instance; the Firestore
+snapshot survives a new instance. Nothing is journaled while a market replay
+is active, so replayed trades never overwrite live state.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from .market_replay import is_replay_active
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_ENABLED = os.getenv("BOT_STATE_JOURNAL", "1") != "0"
+JOURNAL_DIR = os.getenv("BOT_JOURNAL_DIR") or os.path.join(tempfile.gettempdir(), "bot_state_journal")
+FLUSH_INTERVAL_SECONDS = float(os.getenv("BOT_JOURNAL_FLUSH_SECONDS", "30"))
+URGENT_FLUSH_SECONDS = 2.0     # Coalesce the writes of one order / exit into a single flush
+COMPACT_AFTER_ENTRIES = 500    # Compact a stream's local log early if it grows past this
+LOAD_TIMEOUT_SECONDS = 5.0
+FIRESTORE_COLLECTION = "bot_state"
+FIRESTORE_BATCH_LIMIT = 400    # Firestore allows 500 writes per batch
+
+
+def stream_name(kind: str, owner: Optional[str] = None) -> str:
+    """Journal stream name for one bot instance, e.g. "vwap:user_123" """
+    return f"{kind}:{owner or 'default'}"
+
+
+def _file_stem(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", name)
+
+
+def _encode(value: Any) -> str:
+    return json.dumps(value, default=str, sort_keys=True, separators=(",", ":"))
+
+
+def _apply(state: Dict[str, Any], entry: Dict):
+    """Apply one journal entry to a state dict (live writes and log replay)"""
+    op, key = entry["op"], entry["key"]
+    if op == "set":
+        state[key] = entry["value"]
+    elif op == "delete":
+        state.pop(key, None)
+    elif op == "append":
+        items = state.get(key)
+        items = items if isinstance(items, list) else []
+        items.append(entry["value"])
+        limit = entry.get("limit")
+        state[key] = items[-limit:] if limit else items
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SNAPSHOT STORE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class FirestoreSnapshotStore:
+    """Durable snapshots in Firestore, one document per stream.
+
+    The state is stored as a JSON string so bot state never runs into
+    Firestore's value restrictions (nested arrays, key characters). Methods
+    are blocking and are run in a worker thread by the journal."""
+
+    def __init__(self, collection: str = FIRESTORE_COLLECTION):
+        self.collection_name = collection
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            from .firestore_db import get_firestore_client
+            self._client = get_firestore_client()
+        return self._client
+
+    @property
+    def collection(self):
+        return self.client.collection(self.collection_name)
+
+    def load(self, name: str) -> Optional[Dict]:
+        doc = self.collection.document(_file_stem(name)).get()
+        if not doc.exists:
+            return None
+        data = doc.to_dict()
+        return {"seq": data.get("seq", 0), "state": json.loads(data.get("state_json") or "{}")}
+
+    def save(self, snapshots: Dict[str, Dict]) -> int:
+        """Write snapshots in batched commits; returns the number of commits"""
+        items = list(snapshots.items())
+        commits = 0
+        for start in range(0, len(items), FIRESTORE_BATCH_LIMIT):
+            batch = self.client.batch()
+            for name, snapshot in items[start:start + FIRESTORE_BATCH_LIMIT]:
+                batch.set(self.collection.document(_file_stem(name)), {
+                    "stream": name,
+                    "seq": snapshot["seq"],
+                    "state_json": _encode(snapshot["state"]),
+                    "updated_at": datetime.now(timezone.utc).isoformat(),
+                })
+            batch.commit()
+            commits += 1
+        return commits
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# STREAMS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class JournalStream:
+    """Journaled key/value state of one bot instance. Read it through `state`
+    or `get`; change it only through set / delete / append / update."""
+
+    def __init__(self, journal: "BotStateJournal", name: str, detached: bool = False):
+        self.journal = journal
+        self.name = name
+        self.detached = detached
+        self.state: Dict[str, Any] = {}
+        self._encoded: Dict[str, str] = {}
+        self.seq = 0
+        self.local_seq = 0   # covered by the local snapshot file
+        self.remote_seq = 0  # covered by the Firestore snapshot
+        self.log_entries = 0
+        self.recovered_from: Optional[str] = None
+        self.replayed = 0
+        self._log_file = None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.state.get(key, default)
+
+    def set(self, key: str, value: Any, urgent: bool = False) -> bool:
+        """Set a key; returns False (and writes nothing) if the value is unchanged"""
+        encoded = _encode(value)
+        if self._encoded.get(key) == encoded and key in self.state:
+            self.journal.entries_unchanged += 1
+            return False
+        if not self._record("set", key, json.loads(encoded), urgent=urgent):
+            return False
+        self._encoded[key] = encoded
+        return True
+
+    def update(self, values: Dict[str, Any], urgent: bool = False) -> bool:
+        """Set several keys; returns True if any of them changed"""
+        changed = False
+        for key, value in values.items():
+            changed = self.set(key, value, urgent=urgent) or changed
+        return changed
+
+    def delete(self, key: str, urgent: bool = False) -> bool:
+        if key not in self.state:
+            return False
+        self._encoded.pop(key, None)
+        return self._record("delete", key, urgent=urgent)
+
+    def append(self, key: str, item: Any, limit: Optional[int] = None, urgent: bool = False) -> bool:
+        """Append to a list-valued key, keeping at most `limit` items"""
+        self._encoded.pop(key, None)
+        return self._record("append", key, json.loads(_encode(item)), limit=limit, urgent=urgent)
+
+    @property
+    def dirty(self) -> bool:
+        return self.seq > self.remote_seq
+
+    def _record(self, op: str, key: str, value: Any = None, limit: Optional[int] = None, urgent: bool = False) -> bool:
+        if is_replay_active():
+            self.journal.replay_skipped += 1
+            return False
+        if self.detached or not self.journal.enabled:
+            return False
+        self.seq += 1
+        entry = {"seq": self.seq, "ts": round(time.time(), 3), "op": op, "key": key}
+        if op != "delete":
+            entry["value"] = value
+        if limit:
+            entry["limit"] = limit
+        _apply(self.state, entry)
+        self.journal._write_log(self, entry)
+        self.journal._mark_dirty(urgent)
+        return True
+
+    def snapshot(self) -> Dict:
+        """Detached copy of the current state and the seq it covers"""
+        return {"seq": self.seq, "state": json.loads(_encode(self.state))}
+
+    def get_status(self) -> Dict:
+        return {
+            "seq": self.seq,
+            "local_seq": self.local_seq,
+            "remote_seq": self.remote_seq,
+            "keys": sorted(self.state),
+            "log_entries": self.log_entries,
+            "recovered_from": self.recovered_from,
+            "replayed": self.replayed,
+        }
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# JOURNAL
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class BotStateJournal:
+    """Local delta logs plus write-behind Firestore snapshots for every bot stream"""
+
+    def __init__(
+        self,
+        directory: str = JOURNAL_DIR,
+        store: Any = None,
+        flush_interval: float = FLUSH_INTERVAL_SECONDS,
+        urgent_delay: float = URGENT_FLUSH_SECONDS,
+        compact_after: int = COMPACT_AFTER_ENTRIES,
+        enabled: bool = JOURNAL_ENABLED,
+    ):
+        self.directory = directory
+        self.store = store if store is not None else FirestoreSnapshotStore()
+        self.flush_interval = flush_interval
+        self.urgent_delay = urgent_delay
+        self.compact_after = compact_after
+        self.enabled = enabled
+        self._streams: Dict[str, JournalStream] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._urgent: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        # Counters
+        self.entries_logged = 0
+        self.entries_unchanged = 0
+        self.replay_skipped = 0
+        self.flushes = 0
+        self.snapshots_written = 0
+        self.batch_commits = 0
+        self.failed_flushes = 0
+        self.compactions = 0
+        self.last_flush_ms: Optional[float] = None
+        self.last_flush_at: Optional[str] = None
+        self.last_error: Optional[str] = None
+
+    # ── Streams / recovery ──────────────────────────────────────────────────
+
+    async def open(self, kind: str, owner: Optional[str] = None) -> JournalStream:
+        """Stream for one bot instance, recovered from snapshot + log on first open"""
+        name = stream_name(kind, owner)
+        stream = self._streams.get(name)
+        if stream is not None:
+            return stream
+        if not self.enabled or is_replay_active():
+            # Bots started for a replay (or with the journal off) get a stream that records nothing
+            return JournalStream(self, name, detached=True)
+        stream = JournalStream(self, name)
+        await self._recover(stream)
+        # Another caller may have opened the stream while we were recovering
+        stream = self._streams.setdefault(name, stream)
+        self._ensure_flusher()
+        return stream
+
+    def _path(self, stream: JournalStream, suffix: str) -> str:
+        return os.path.join(self.directory, f"{_file_stem(stream.name)}{suffix}")
+
+    def _read_local(self, stream: JournalStream) -> Tuple[int, Dict, List[Dict]]:
+        seq, state, entries = 0, {}, []
+        try:
+            with open(self._path(stream, ".snapshot.json"), encoding="utf-8") as f:
+                snapshot = json.load(f)
+            seq, state = snapshot.get("seq", 0), snapshot.get("state", {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning("Journal %s: unreadable local snapshot (%s)", stream.name, e)
+        try:
+            with open(self._path(stream, ".log"), encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        pass  # torn last line from a crash mid-write
+        except FileNotFoundError:
+            pass
+        return seq, state, entries
+
+    async def _load_remote(self, name: str) -> Optional[Dict]:
+        try:
+            return await asyncio.wait_for(asyncio.to_thread(self.store.load, name), timeout=LOAD_TIMEOUT_SECONDS)
+        except Exception as e:
+            self.last_error = f"load {name}: {type(e).__name__}: {e}"[:200]
+            logger.warning("Journal %s: snapshot store unavailable, recovering from local files (%s)", name, e)
+            return None
+
+    async def _recover(self, stream: JournalStream):
+        local_seq, state, entries = self._read_local(stream)
+        remote = await self._load_remote(stream.name)
+        seq, source = local_seq, "local" if (local_seq or entries) else None
+        if remote and remote.get("seq", 0) > local_seq:
+            seq, state, source = remote["seq"], remote.get("state", {}), "firestore"
+        for entry in entries:
+            if entry.get("seq", 0) > seq:
+                _apply(state, entry)
+                seq = entry["seq"]
+                stream.replayed += 1
+
+        stream.state = state
+        stream._encoded = {key: _encode(value) for key, value in state.items()}
+        stream.seq = seq
+        stream.remote_seq = remote.get("seq", 0) if remote else 0
+        stream.recovered_from = source
+        if source:
+            self._compact(stream)
+            logger.info("Journal %s recovered from %s at seq %s (%s log entries replayed)",
+                        stream.name, source, seq, stream.replayed)
+
+    # ── Local log ───────────────────────────────────────────────────────────
+
+    def _write_log(self, stream: JournalStream, entry: Dict):
+        self.entries_logged += 1
+        try:
+            if stream._log_file is None:
+                os.makedirs(self.directory, exist_ok=True)
+                stream._log_file = open(self._path(stream, ".log"), "a", encoding="utf-8")
+            stream._log_file.write(_encode(entry) + "\n")
+            stream._log_file.flush()
+            stream.log_entries += 1
+        except OSError as e:
+            self.last_error = f"log {stream.name}: {e}"[:200]
+            return
+        if stream.log_entries >= self.compact_after:
+            self._compact(stream)
+
+    def _compact(self, stream: JournalStream):
+        """Write the local snapshot atomically, then truncate the log it covers"""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(stream, ".snapshot.json")
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                f.write(_encode(stream.snapshot()))
+            os.replace(path + ".tmp", path)
+            if stream._log_file is not None:
+                stream._log_file.close()
+            stream._log_file = open(self._path(stream, ".log"), "w", encoding="utf-8")
+        except OSError as e:
+            self.last_error = f"compact {stream.name}: {e}"[:200]
+            return
+        stream.local_seq = stream.seq
+        stream.log_entries = 0
+        self.compactions += 1
+
+    # ── Write-behind flush ──────────────────────────────────────────────────
+
+    def _mark_dirty(self, urgent: bool):
+        if urgent and self._urgent is not None:
+            self._urgent.set()
+
+    def _ensure_flusher(self):
+        if not self.enabled:
+            return
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._task.get_loop() is loop:
+            return
+        self._urgent = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = loop.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._urgent.wait(), timeout=self.flush_interval)
+                await asyncio.sleep(self.urgent_delay)
+            except asyncio.TimeoutError:
+                pass
+            self._urgent.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("Journal flush error: %s", e)
+
+    async def flush(self) -> int:
+        """Compact changed streams locally and write their snapshots in one batch.
+        Returns the number of snapshots written to the store."""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            for stream in self._streams.values():
+                if stream.seq > stream.local_seq:
+                    self._compact(stream)
+            dirty = [stream for stream in self._streams.values() if stream.dirty]
+            if not dirty:
+                return 0
+            snapshots = {stream.name: stream.snapshot() for stream in dirty}
+            started = time.monotonic()
+            try:
+                commits = await asyncio.to_thread(self.store.save, snapshots)
+            except Exception as e:
+                self.failed_flushes += 1
+                self.last_error = f"flush: {type(e).__name__}: {e}"[:200]
+                logger.warning("Journal flush of %d streams failed, will retry: %s", len(snapshots), e)
+                return 0
+            for stream in dirty:
+                stream.remote_seq = max(stream.remote_seq, snapshots[stream.name]["seq"])
+            self.flushes += 1
+            self.snapshots_written += len(snapshots)
+            self.batch_commits += commits or 0
+            self.last_flush_ms = round((time.monotonic() - started) * 1000, 1)
+            self.last_flush_at = datetime.now(timezone.utc).isoformat()
+            return len(snapshots)
+
+    async def stop(self):
+        """Stop the flusher and write everything still pending"""
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        if self._streams:
+            await self.flush()
+        for stream in self._streams.values():
+            if stream._log_file is not None:
+                stream._log_file.close()
+                stream._log_file = None
+
+    def get_status(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "directory": self.directory,
+            "flush_interval_s": self.flush_interval,
+            "flusher_running": self._task is not None and not self._task.done(),
+            "pending_streams": sum(1 for stream in self._streams.values() if stream.dirty),
+            "entries_logged": self.entries_logged,
+            "entries_unchanged": self.entries_unchanged,
+            "replay_skipped": self.replay_skipped,
+            "flushes": self.flushes,
+            "snapshots_written": self.snapshots_written,
+            "batch_commits": self.batch_commits,
+            "failed_flushes": self.failed_flushes,
+            "compactions": self.compactions,
+            "last_flush_ms": self.last_flush_ms,
+            "last_flush_at": self.last_flush_at,
+            "last_error": self.last_error,
+            "streams": {name: stream.get_status() for name, stream in sorted(self._streams.items())},
+        }
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SINGLETON
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_bot_state_journal: Optional[BotStateJournal] = None
+
+
+def get_bot_state_journal() -> BotStateJournal:
+    """Get or create the process-wide bot state journal"""
+    global _bot_state_journal
+    if _bot_state_journal is None:
+        _bot_state_journal = BotStateJournal()
+    return _bot_state_journal
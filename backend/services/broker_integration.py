@@ -13,7 +13,6 @@ This module provides unified trading API for:
 """
 
 import aiohttp
-import asyncio
 import os
 import logging
 from typing import Dict, List, Optional, Any
@@ -22,6 +21,8 @@ from datetime import datetime
 from enum import Enum
 import json
 
+from .rate_limiter import Priority, account_key, get_rate_limiter
+
 logger = logging.getLogger(__name__)
 
 
@@ -97,8 +98,6 @@ class BaseBroker:
     
     def __init__(self):
         self.session: Optional[aiohttp.ClientSession] = None
-        self._rate_limit_delay = 0.5
-        self._last_request_time = 0
         
     async def init_session(self):
         if self.session is None or self.session.closed:
@@ -110,13 +109,15 @@ class BaseBroker:
         if self.session and not self.session.closed:
             await self.session.close()
     
-    async def _rate_limit(self):
-        import time
-        current_time = time.time()
-        elapsed = current_time - self._last_request_time
-        if elapsed < self._rate_limit_delay:
-            await asyncio.sleep(self._rate_limit_delay - elapsed)
-        self._last_request_time = time.time()
+    # Prefix of this broker's buckets in the shared rate limiter
+    RATE_LIMIT_PREFIX = ""
+    
+    async def _rate_limit(self, endpoint_class: str = "data", priority: Optional[Priority] = None):
+        """Wait for this account's token bucket of the broker's endpoint class"""
+        await get_rate_limiter().acquire(
+            f"{self.RATE_LIMIT_PREFIX}.{endpoint_class}", priority,
+            account=account_key(getattr(self, "access_token", "")),
+        )
     
     async def place_order(self, order: OrderRequest) -> OrderResponse:
         raise NotImplementedError
@@ -138,6 +139,69 @@ class BaseBroker:
     
     async def get_funds(self) -> Dict:
         raise NotImplementedError
+    
+    # ==================== MULTI-LEG EXECUTION ====================
+    
+    # Broker name used in execution metrics
+    BROKER_NAME = ""
+    
+    def can_track_orders(self) -> bool:
+        """Whether get_order_status can be used to follow fills"""
+        return type(self).get_order_status is not BaseBroker.get_order_status
+    
+    def parse_order_status(self, raw: Any):
+        """Normalize a get_order_status payload (see order_execution.parse_order_status)"""
+        from .order_execution import parse_order_status
+        return parse_order_status(raw)
+    
+    async def place_legs(self, legs: List, **options):
+        """
+        Place a multi-leg order: hedge legs first, independent legs in parallel,
+        each tracked to a fill. Options go to OrderExecutor (poll_interval,
+        fill_timeout, hedge_first). Returns an ExecutionReport. Cached
+        account state of this broker is marked dirty afterwards.
+        """
+        from .account_state import get_account_state
+        from .order_execution import OrderExecutor
+        try:
+            return await OrderExecutor(self, **options).execute(legs)
+        finally:
+            get_account_state().on_order_event(self.BROKER_NAME)
+
+
+class ServiceBroker(BaseBroker):
+    """
+    Adapter for bots that place orders through their own DhanService /
+    UpstoxService: legs bring their own submit callable, status and cancel
+    go through the service.
+    """
+    
+    def __init__(self, service: Any, name: str = ""):
+        super().__init__()
+        self.service = service
+        self.BROKER_NAME = name or type(service).__name__.replace("Service", "").lower()
+    
+    def can_track_orders(self) -> bool:
+        return callable(getattr(self.service, "get_order_status", None))
+    
+    async def place_order(self, order: OrderRequest) -> OrderResponse:
+        return OrderResponse(success=False, message="ServiceBroker legs need a submit callable")
+    
+    async def cancel_order(self, order_id: str) -> OrderResponse:
+        cancel = getattr(self.service, "cancel_order", None)
+        if not callable(cancel):
+            return OrderResponse(success=False, order_id=order_id, message="Cancel not supported")
+        result = await cancel(order_id)
+        return OrderResponse(
+            success=bool(result.get("success")),
+            order_id=order_id,
+            message=result.get("error", ""),
+            broker=self.BROKER_NAME,
+            raw_response=result
+        )
+    
+    async def get_order_status(self, order_id: str) -> Dict:
+        return await self.service.get_order_status(order_id)
 
 
 class DhanBroker(BaseBroker):
@@ -167,6 +231,8 @@ class DhanBroker(BaseBroker):
     """
     
     BASE_URL = "https://api.dhan.co/v2"
+    RATE_LIMIT_PREFIX = "dhan"
+    BROKER_NAME = "dhan"
     
     # Exchange segment mapping
     EXCHANGE_MAP = {
@@ -195,7 +261,6 @@ class DhanBroker(BaseBroker):
         super().__init__()
         self.client_id = client_id or os.environ.get('DHAN_CLIENT_ID', '')
         self.access_token = access_token or os.environ.get('DHAN_ACCESS_TOKEN', '')
-        self._rate_limit_delay = 0.04  # 25 orders/sec
         
     def is_configured(self) -> bool:
         return bool(self.client_id and self.access_token)
@@ -221,7 +286,7 @@ class DhanBroker(BaseBroker):
             )
         
         await self.init_session()
-        await self._rate_limit()
+        await self._rate_limit("orders")
         
         try:
             payload = {
@@ -290,7 +355,7 @@ class DhanBroker(BaseBroker):
             return OrderResponse(success=False, message="Not configured")
         
         await self.init_session()
-        await self._rate_limit()
+        await self._rate_limit("orders")
         
         try:
             payload = {
@@ -334,7 +399,7 @@ class DhanBroker(BaseBroker):
             return OrderResponse(success=False, message="Not configured")
         
         await self.init_session()
-        await self._rate_limit()
+        await self._rate_limit("orders")
         
         try:
             async with self.session.delete(
@@ -450,7 +515,7 @@ class DhanBroker(BaseBroker):
             return {"status": "error", "message": "Not configured"}
         
         await self.init_session()
-        await self._rate_limit()
+        await self._rate_limit("quote", Priority.HIGH)
         
         try:
             async with self.session.post(
@@ -496,6 +561,8 @@ class UpstoxBroker(BaseBroker):
     BASE_URL = "https://api.upstox.com/v2"
     AUTH_URL = "https://api.upstox.com/v2/login/authorization/dialog"
     TOKEN_URL = "https://api.upstox.com/v2/login/authorization/token"
+    RATE_LIMIT_PREFIX = "upstox"
+    BROKER_NAME = "upstox"
     
     # Exchange mapping
     EXCHANGE_MAP = {
@@ -532,7 +599,6 @@ class UpstoxBroker(BaseBroker):
         self.api_secret = api_secret or os.environ.get('UPSTOX_API_SECRET', '')
         self.access_token = access_token or os.environ.get('UPSTOX_ACCESS_TOKEN', '')
         self.redirect_uri = redirect_uri or os.environ.get('UPSTOX_REDIRECT_URI', '')
-        self._rate_limit_delay = 0.1  # 10 orders/sec
         
     def is_configured(self) -> bool:
         return bool(self.api_key and self.access_token)
@@ -603,7 +669,7 @@ class UpstoxBroker(BaseBroker):
             )
         
         await self.init_session()
-        await self._rate_limit()
+        await self._rate_limit("orders")
         
         try:
             # Construct instrument key (e.g., NSE_FO|NIFTY24JAN25000CE)
@@ -669,7 +735,7 @@ class UpstoxBroker(BaseBroker):
             return OrderResponse(success=False, message="Not configured")
         
         await self.init_session()
-        await self._rate_limit()
+        await self._rate_limit("orders")
         
         try:
             payload = {"order_id": order_id}
@@ -710,7 +776,7 @@ class UpstoxBroker(BaseBroker):
             return OrderResponse(success=False, message="Not configured")
         
         await self.init_session()
-        await self._rate_limit()
+        await self._rate_limit("orders")
         
         try:
             async with self.session.delete(
@@ -830,7 +896,7 @@ class UpstoxBroker(BaseBroker):
             return {"status": "error", "message": "Not configured"}
         
         await self.init_session()
-        await self._rate_limit()
+        await self._rate_limit("quote", Priority.HIGH)
         
         try:
             instrument_str = ",".join(instruments)
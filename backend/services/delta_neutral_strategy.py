@@ -43,12 +43,14 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
-import math
 import json
 import os
 
+import numpy as np
+
 # Import broker integration
 from services.broker_integration import BrokerManager, OrderRequest
+from services.portfolio_greeks import bs_greeks, strike_for_delta
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -407,21 +409,7 @@ class DeltaNeutralStrategy:
         option_type: str = "CE"
     ) -> float:
         """Calculate option delta using Black-Scholes"""
-        from scipy.stats import norm
-        
-        if time_to_expiry <= 0:
-            # At expiry
-            if option_type == "CE":
-                return 1.0 if spot > strike else 0.0
-            else:
-                return -1.0 if spot < strike else 0.0
-        
-        d1 = (math.log(spot / strike) + (risk_free_rate + 0.5 * volatility ** 2) * time_to_expiry) / (volatility * math.sqrt(time_to_expiry))
-        
-        if option_type == "CE":
-            return norm.cdf(d1)
-        else:
-            return norm.cdf(d1) - 1
+        return float(bs_greeks(spot, strike, time_to_expiry, volatility, option_type == "CE", risk_free_rate)["delta"])
     
     def find_strike_for_delta(
         self,
@@ -447,27 +435,10 @@ class DeltaNeutralStrategy:
             search_end = spot
             target = -target_delta / 100  # Negative for puts
         
-        # Binary search for the strike
-        best_strike = spot
-        min_diff = float('inf')
-        
-        current_strike = search_start
-        while current_strike <= search_end:
-            # Round to nearest strike interval
-            rounded_strike = round(current_strike / strike_interval) * strike_interval
-            
-            delta = self.calculate_black_scholes_delta(
-                spot, rounded_strike, time_to_expiry, iv, option_type=option_type
-            )
-            
-            diff = abs(delta - target)
-            if diff < min_diff:
-                min_diff = diff
-                best_strike = rounded_strike
-            
-            current_strike += strike_interval
-        
-        return best_strike
+        # Every candidate strike evaluated in one vectorized call
+        steps = np.arange(search_start, search_end + strike_interval * 1e-6, strike_interval)
+        candidates = np.unique(np.round(steps / strike_interval) * strike_interval)
+        return strike_for_delta(spot, target, candidates, time_to_expiry, iv, option_type)
     
     async def get_option_chain(self, underlying: str, expiry: str) -> Dict:
         """Fetch option chain from broker"""
@@ -4,13 +4,17 @@ Dhan API Market Data Service
 Real-time market quotes with batching and rate limiting
 """
 
-import aiohttp
 import asyncio
 from typing import List, Dict, Optional, Any
 from datetime import datetime
 import logging
 import os
 
+from .rate_limiter import Priority, account_key, get_rate_limiter
+from .startup import lazy_import
+
+aiohttp = lazy_import("aiohttp")  # imported when the first session is opened
+
 logger = logging.getLogger(__name__)
 
 class DhanMarketDataService:
@@ -30,8 +34,6 @@ class DhanMarketDataService:
         self.access_token = access_token or os.environ.get('DHAN_ACCESS_TOKEN', '')
         self.client_id = client_id or os.environ.get('DHAN_CLIENT_ID', '')
         self.session: Optional[aiohttp.ClientSession] = None
-        self._last_request_time = 0
-        self._rate_limit_delay = 1.0  # 1 second between requests
         
     async def init_session(self):
         """Initialize aiohttp session"""
@@ -54,14 +56,9 @@ class DhanMarketDataService:
             "Accept": "application/json"
         }
     
-    async def _rate_limit(self):
-        """Enforce rate limiting (1 req/sec)"""
-        import time
-        current_time = time.time()
-        elapsed = current_time - self._last_request_time
-        if elapsed < self._rate_limit_delay:
-            await asyncio.sleep(self._rate_limit_delay - elapsed)
-        self._last_request_time = time.time()
+    async def _rate_limit(self, endpoint_class: str = "quote", priority: Optional[Priority] = None):
+        """Wait for this account's Dhan token bucket for the endpoint class"""
+        await get_rate_limiter().acquire(f"dhan.{endpoint_class}", priority, account=account_key(self.access_token))
     
     async def get_market_quote(self, instruments: Dict[str, List[int]]) -> Dict:
         """
@@ -211,7 +208,7 @@ class DhanMarketDataService:
             Option chain with strikes, premiums, Greeks, OI
         """
         await self.init_session()
-        await self._rate_limit()
+        await self._rate_limit("option_chain")
         
         try:
             payload = {
@@ -307,7 +304,7 @@ class DhanMarketDataService:
             Historical candle data
         """
         await self.init_session()
-        await self._rate_limit()
+        await self._rate_limit("historical")
         
         try:
             payload = {
@@ -22,6 +22,9 @@ import asyncio
 from functools import lru_cache
 import logging
 
+from .http_clients import get_http_client
+from .rate_limiter import Priority, account_key, get_rate_limiter
+
 logger = logging.getLogger(__name__)
 
 # Dhan API Configuration
@@ -114,9 +117,6 @@ class DhanService:
         self.access_token = access_token or DHAN_ACCESS_TOKEN
         self.base_url = DHAN_BASE_URL
         self.client = None
-        self._rate_limit_lock = asyncio.Lock()
-        self._last_option_chain_call = 0
-        self._last_quote_call = 0
     
     def _get_headers(self) -> Dict[str, str]:
         """Get API request headers"""
@@ -126,31 +126,19 @@ class DhanService:
         }
     
     async def _ensure_client(self):
-        """Ensure HTTP client is initialized"""
-        if self.client is None:
-            self.client = httpx.AsyncClient(timeout=30.0)
+        """Use the shared Dhan client for the running event loop"""
+        self.client = get_http_client("dhan")
     
-    async def _rate_limit(self, endpoint_type: str = "quote"):
-        """Enforce rate limits"""
-        async with self._rate_limit_lock:
-            now = datetime.now().timestamp()
-            
-            if endpoint_type == "option_chain":
-                wait_time = 3 - (now - self._last_option_chain_call)
-                if wait_time > 0:
-                    await asyncio.sleep(wait_time)
-                self._last_option_chain_call = datetime.now().timestamp()
-            else:
-                wait_time = 1 - (now - self._last_quote_call)
-                if wait_time > 0:
-                    await asyncio.sleep(wait_time)
-                self._last_quote_call = datetime.now().timestamp()
+    async def _rate_limit(self, endpoint_type: str = "quote", priority: Optional[Priority] = None):
+        """Wait for this account's Dhan token bucket for the endpoint class"""
+        await get_rate_limiter().acquire(f"dhan.{endpoint_type}", priority, account=account_key(self.access_token))
     
     async def _make_request(self, method: str, endpoint: str, data: dict = None, 
-                           rate_limit_type: str = "quote") -> Dict[str, Any]:
+                           rate_limit_type: str = "quote",
+                           priority: Optional[Priority] = None) -> Dict[str, Any]:
         """Make API request with error handling"""
         await self._ensure_client()
-        await self._rate_limit(rate_limit_type)
+        await self._rate_limit(rate_limit_type, priority)
         
         url = f"{self.base_url}{endpoint}"
         
@@ -449,7 +437,7 @@ class DhanService:
             "toDate": to_date
         }
         
-        result = await self._make_request("POST", "/charts/historical", data)
+        result = await self._make_request("POST", "/charts/historical", data, "historical")
         
         candles = []
         raw_data = result.get("data", {})
@@ -505,7 +493,7 @@ class DhanService:
             "toDate": to_date
         }
         
-        result = await self._make_request("POST", "/charts/intraday", data)
+        result = await self._make_request("POST", "/charts/intraday", data, "historical")
         
         candles = []
         raw_data = result.get("data", {})
@@ -623,7 +611,7 @@ class DhanService:
         Note: Dhan has a typo - 'availabelBalance' not 'availableBalance'
         """
         try:
-            result = await self._make_request("GET", "/fundlimit", rate_limit_type="quote")
+            result = await self._make_request("GET", "/fundlimit", rate_limit_type="data")
             logger.info(f"Raw Dhan fundlimit response: {result}")
             
             # Dhan returns data directly without wrapper
@@ -670,7 +658,7 @@ class DhanService:
         Note: Dhan API returns array directly, not wrapped in 'data'
         """
         try:
-            result = await self._make_request("GET", "/positions", rate_limit_type="quote")
+            result = await self._make_request("GET", "/positions", rate_limit_type="data")
             # Dhan returns array directly
             positions = result if isinstance(result, list) else []
             
@@ -704,7 +692,7 @@ class DhanService:
         Note: Dhan API returns array directly, not wrapped in 'data'
         """
         try:
-            result = await self._make_request("GET", "/holdings", rate_limit_type="quote")
+            result = await self._make_request("GET", "/holdings", rate_limit_type="data")
             # Dhan returns array directly
             holdings = result if isinstance(result, list) else []
             
@@ -841,7 +829,7 @@ class DhanService:
         logger.info(f"🔥 Placing order: {transaction_type} {quantity} x {security_id}")
         
         try:
-            result = await self._make_request("POST", "/orders", order_data)
+            result = await self._make_request("POST", "/orders", order_data, "orders")
             
             if result.get("orderId"):
                 logger.info(f"✅ Order placed: {result.get('orderId')}")
@@ -896,7 +884,7 @@ class DhanService:
             modify_data["triggerPrice"] = float(trigger_price)
         
         try:
-            result = await self._make_request("PUT", f"/orders/{order_id}", modify_data)
+            result = await self._make_request("PUT", f"/orders/{order_id}", modify_data, "orders")
             return {
                 "success": True,
                 "order_id": order_id,
@@ -912,6 +900,7 @@ class DhanService:
         
         try:
             # Dhan uses DELETE method for order cancellation
+            await self._rate_limit("orders")
             url = f"{self.base_url}/orders/{order_id}"
             response = await self.client.delete(url, headers=self._get_headers())
             
@@ -935,6 +924,7 @@ class DhanService:
         await self._ensure_client()
         
         try:
+            await self._rate_limit("data")
             url = f"{self.base_url}/orders/{order_id}"
             response = await self.client.get(url, headers=self._get_headers())
             
@@ -959,6 +949,7 @@ class DhanService:
         await self._ensure_client()
         
         try:
+            await self._rate_limit("data")
             url = f"{self.base_url}/orders"
             response = await self.client.get(url, headers=self._get_headers())
             
@@ -980,6 +971,7 @@ class DhanService:
         await self._ensure_client()
         
         try:
+            await self._rate_limit("data")
             url = f"{self.base_url}/trades"
             response = await self.client.get(url, headers=self._get_headers())
             
@@ -997,10 +989,8 @@ class DhanService:
             return {"success": False, "error": str(e), "trades": []}
 
     async def close(self):
-        """Close HTTP client"""
-        if self.client:
-            await self.client.aclose()
-            self.client = None
+        """Release the shared client (the registry closes it on shutdown)"""
+        self.client = None
 
 
 # Singleton instance
@@ -21,9 +21,10 @@ API Endpoints Used:
 
 import os
 import asyncio
-import aiohttp
+import httpx
 import logging
-from datetime import datetime, timedelta
+import time
+from datetime import datetime
 from typing import Dict, List, Optional, Any, Tuple
 from functools import lru_cache
 from pathlib import Path
@@ -32,6 +33,10 @@ import threading
 # Official Dhan library for synchronous operations
 from dhanhq import dhanhq as DhanClient
 
+from .http_clients import get_http_client
+from .rate_limiter import Priority, get_rate_limiter
+from .market_scheduler import Phase, get_market_calendar
+
 try:
     from dotenv import load_dotenv
     load_dotenv(Path(__file__).parent.parent / '.env')
@@ -49,6 +54,9 @@ DHAN_BASE_URL = "https://api.dhan.co/v2"
 DHAN_ACCESS_TOKEN = os.getenv("DHAN_ACCESS_TOKEN", "")
 DHAN_CLIENT_ID = os.getenv("DHAN_CLIENT_ID", "")
 
+# /marketfeed/* accepts up to 1000 instruments (all segments combined) per request
+MAX_INSTRUMENTS_PER_REQUEST = 1000
+
 # Exchange Segments
 EXCHANGE_SEGMENTS = {
     "IDX_I": "IDX_I",           # Index
@@ -171,6 +179,34 @@ FNO_STOCKS = [
 ]
 
 
+def pack_instruments(
+    instruments: Dict[str, List[int]],
+    batch_size: int = MAX_INSTRUMENTS_PER_REQUEST
+) -> List[Dict[str, List[int]]]:
+    """
+    Split {segment: [security_ids]} into as few request payloads as possible,
+    each with at most batch_size instruments. Duplicates are dropped and
+    order is kept.
+    """
+    batches: List[Dict[str, List[int]]] = []
+    current: Dict[str, List[int]] = {}
+    count = 0
+    seen = set()
+    for segment, security_ids in instruments.items():
+        for security_id in security_ids:
+            if (segment, security_id) in seen:
+                continue
+            seen.add((segment, security_id))
+            if count == batch_size:
+                batches.append(current)
+                current, count = {}, 0
+            current.setdefault(segment, []).append(security_id)
+            count += 1
+    if current:
+        batches.append(current)
+    return batches
+
+
 class DhanUnifiedServiceError(Exception):
     """Custom exception for Dhan Unified Service"""
     def __init__(self, message: str, error_code: str = None, status_code: int = None):
@@ -212,18 +248,17 @@ class DhanUnifiedService:
         self.access_token = DHAN_ACCESS_TOKEN
         self.client_id = DHAN_CLIENT_ID
         
-        # Session management
-        self._session: Optional[aiohttp.ClientSession] = None
-        
-        # Rate limiting
-        self._last_quote_time = 0
-        self._last_oc_time = 0
-        self._rate_lock = asyncio.Lock()
+        # Shared pooled client (owned by the HTTP client registry)
+        self._session: Optional[httpx.AsyncClient] = None
         
         # In-memory cache (short lived)
         self._cache: Dict[str, Any] = {}
         self._cache_expiry: Dict[str, float] = {}
         
+        # Latest full quote per security ID, merged from every batched fetch
+        self._quote_snapshot: Dict[str, Dict] = {}
+        self._last_batch_stats: Dict[str, Any] = {}
+        
         self._initialized = True
         logger.info("✅ DhanUnifiedService initialized")
     
@@ -237,34 +272,18 @@ class DhanUnifiedService:
         }
     
     async def _ensure_session(self):
-        """Ensure aiohttp session is initialized"""
-        if self._session is None or self._session.closed:
-            timeout = aiohttp.ClientTimeout(total=30, connect=10)
-            self._session = aiohttp.ClientSession(timeout=timeout)
+        """Get the shared Dhan client for the running event loop"""
+        self._session = get_http_client("dhan")
         return self._session
     
     async def close(self):
-        """Close the session"""
-        if self._session and not self._session.closed:
-            await self._session.close()
-            self._session = None
+        """Release the shared client (the registry closes it on shutdown)"""
+        self._session = None
     
-    async def _rate_limit(self, endpoint_type: str = "quote"):
-        """Enforce rate limits"""
-        async with self._rate_lock:
-            import time
-            now = time.time()
-            
-            if endpoint_type == "option_chain":
-                delay = 3.0 - (now - self._last_oc_time)
-                if delay > 0:
-                    await asyncio.sleep(delay)
-                self._last_oc_time = time.time()
-            else:
-                delay = 1.0 - (now - self._last_quote_time)
-                if delay > 0:
-                    await asyncio.sleep(delay)
-                self._last_quote_time = time.time()
+    async def _rate_limit(self, endpoint_type: str = "quote", priority: Optional[Priority] = None):
+        """Wait for the shared Dhan token bucket for this endpoint class"""
+        bucket = {"option_chain": "dhan.option_chain", "chart": "dhan.historical"}.get(endpoint_type, "dhan.quote")
+        await get_rate_limiter().acquire(bucket, priority)
     
     def _get_cache(self, key: str, max_age: int = 300) -> Optional[Any]:
         """Get from cache if not expired (default 5 minutes)"""
@@ -284,37 +303,38 @@ class DhanUnifiedService:
         self, 
         endpoint: str, 
         data: dict = None, 
-        rate_limit_type: str = "quote"
+        rate_limit_type: str = "quote",
+        priority: Optional[Priority] = None
     ) -> Dict[str, Any]:
         """Make API request with error handling"""
         await self._ensure_session()
-        await self._rate_limit(rate_limit_type)
+        await self._rate_limit(rate_limit_type, priority)
         
         url = f"{self.base_url}{endpoint}"
         
         try:
-            async with self._session.post(
+            response = await self._session.post(
                 url,
                 json=data,
                 headers=self._get_headers()
-            ) as response:
-                response_text = await response.text()
-                
-                if response.status == 200:
-                    import json
-                    return json.loads(response_text)
-                else:
-                    logger.error(f"Dhan API error {response.status}: {response_text}")
-                    return {
-                        "status": "error",
-                        "error_code": f"HTTP_{response.status}",
-                        "message": response_text
-                    }
+            )
+            response_text = response.text
+            
+            if response.status_code == 200:
+                import json
+                return json.loads(response_text)
+            else:
+                logger.error(f"Dhan API error {response.status_code}: {response_text}")
+                return {
+                    "status": "error",
+                    "error_code": f"HTTP_{response.status_code}",
+                    "message": response_text
+                }
                     
-        except asyncio.TimeoutError:
+        except (asyncio.TimeoutError, httpx.TimeoutException):
             logger.error(f"Dhan API timeout: {endpoint}")
             return {"status": "error", "message": "API timeout"}
-        except aiohttp.ClientError as e:
+        except httpx.HTTPError as e:
             logger.error(f"Dhan API client error: {e}")
             return {"status": "error", "message": str(e)}
         except Exception as e:
@@ -370,13 +390,17 @@ class DhanUnifiedService:
         
         return ohlc_data
     
-    async def get_quote(self, instruments: Dict[str, List[int]]) -> Dict[str, Dict]:
+    async def get_quote(
+        self,
+        instruments: Dict[str, List[int]],
+        priority: Optional[Priority] = None
+    ) -> Dict[str, Dict]:
         """
         Get full market quote with depth
         
         Returns complete data: LTP, OHLC, volume, OI, bid/ask, depth
         """
-        result = await self._make_request("/marketfeed/quote", instruments)
+        result = await self._make_request("/marketfeed/quote", instruments, priority=priority)
         
         quotes = {}
         if result.get("status") == "success":
@@ -419,7 +443,70 @@ class DhanUnifiedService:
         
         return quotes
     
-    async def get_quotes_by_symbols(self, symbols: List[str]) -> Dict[str, Dict]:
+    async def get_quotes_batched(
+        self,
+        instruments: Dict[str, List[int]],
+        batch_size: int = MAX_INSTRUMENTS_PER_REQUEST,
+        priority: Optional[Priority] = None
+    ) -> Dict[str, Dict]:
+        """
+        Full quotes for any number of instruments in as few /marketfeed/quote
+        requests as possible (batch_size instruments each, paced by the shared
+        dhan.quote token bucket in the given priority lane). Each batch is
+        merged into the shared quote snapshot as it arrives; per-batch latency
+        is kept in get_batch_stats().
+        
+        Returns:
+            {"1333": {...quote...}, ...} for every instrument Dhan returned
+        """
+        batches = pack_instruments(instruments, batch_size)
+        quotes: Dict[str, Dict] = {}
+        stats = []
+        started = time.perf_counter()
+        
+        for i, batch in enumerate(batches, 1):
+            batch_started = time.perf_counter()
+            batch_quotes = await self.get_quote(batch, priority=priority)
+            quotes.update(batch_quotes)
+            self._quote_snapshot.update(batch_quotes)
+            stats.append({
+                "batch": i,
+                "instruments": sum(len(ids) for ids in batch.values()),
+                "quotes": len(batch_quotes),
+                "latency_ms": round((time.perf_counter() - batch_started) * 1000, 1),
+            })
+        
+        requested = sum(s["instruments"] for s in stats)
+        self._last_batch_stats = {
+            "requests": len(batches),
+            "instruments": requested,
+            "quotes": len(quotes),
+            "total_ms": round((time.perf_counter() - started) * 1000, 1),
+            "batches": stats,
+            "timestamp": datetime.now().isoformat(),
+        }
+        if batches:
+            logger.info(
+                f"📡 Dhan quotes: {len(quotes)}/{requested} instruments in {len(batches)} request(s), "
+                f"{self._last_batch_stats['total_ms']:.0f}ms"
+            )
+        return quotes
+    
+    def get_quote_snapshot(self, security_ids: List[str] = None) -> Dict[str, Dict]:
+        """Latest quotes from the shared snapshot (all, or the given security IDs)"""
+        if security_ids is None:
+            return dict(self._quote_snapshot)
+        return {sid: self._quote_snapshot[sid] for sid in map(str, security_ids) if sid in self._quote_snapshot}
+    
+    def get_batch_stats(self) -> Dict[str, Any]:
+        """Request count and per-batch latency of the last batched quote fetch"""
+        return dict(self._last_batch_stats)
+    
+    async def get_quotes_by_symbols(
+        self,
+        symbols: List[str],
+        priority: Optional[Priority] = None
+    ) -> Dict[str, Dict]:
         """
         Get quotes by symbol names
         
@@ -446,8 +533,8 @@ class DhanUnifiedService:
         if not instruments:
             return {}
         
-        # Fetch quotes
-        quotes = await self.get_quote(instruments)
+        # Fetch quotes (whole universe in one request per 1000 instruments)
+        quotes = await self.get_quotes_batched(instruments, priority=priority)
         
         # Map back to symbols
         result = {}
@@ -765,13 +852,18 @@ class DhanUnifiedService:
     # FNO STOCK DATA - For Scanners (with NSE Fallback)
     # ═══════════════════════════════════════════════════════════════════════════
     
-    async def get_fno_stocks_data(self, symbols: List[str] = None) -> List[Dict]:
+    async def get_fno_stocks_data(
+        self,
+        symbols: List[str] = None,
+        priority: Optional[Priority] = None
+    ) -> List[Dict]:
         """
         Get complete data for FNO stocks
         Primary: Dhan API | Fallback: NSE India API
         
         Args:
             symbols: List of symbols (defaults to FNO_STOCKS)
+            priority: rate limiter lane for the Dhan quote requests
         
         Returns:
             List of stock data with quotes
@@ -782,7 +874,7 @@ class DhanUnifiedService:
         # Try Dhan API first
         stocks = []
         try:
-            quotes = await self.get_quotes_by_symbols(symbols)
+            quotes = await self.get_quotes_by_symbols(symbols, priority)
             
             for symbol in symbols:
                 quote = quotes.get(symbol.upper(), {})
@@ -1025,41 +1117,40 @@ class DhanUnifiedService:
     
     def get_market_status(self) -> Dict:
         """
-        Check if market is open
+        Check if market is open (IST session phases, NSE trading holidays)
         """
-        now = datetime.now()
+        calendar = get_market_calendar()
+        now = calendar.now()
+        phase = calendar.phase(now)
+        market_open = now.replace(hour=9, minute=15, second=0, microsecond=0)
+        market_close = now.replace(hour=15, minute=30, second=0, microsecond=0)
         
-        # Check if weekday
-        if now.weekday() >= 5:  # Saturday or Sunday
+        if not calendar.is_trading_day(now.date()):
+            reason = "Weekend" if now.weekday() >= 5 else "Holiday"
             return {
                 "status": "closed",
-                "message": "Market closed (Weekend)",
+                "message": f"Market closed ({reason})",
                 "next_open": self._get_next_trading_day()
             }
         
-        # Market hours (IST)
-        market_open = now.replace(hour=9, minute=15, second=0, microsecond=0)
-        market_close = now.replace(hour=15, minute=30, second=0, microsecond=0)
-        pre_open = now.replace(hour=9, minute=0, second=0, microsecond=0)
-        
-        if now < pre_open:
-            return {
-                "status": "pre_market",
-                "message": "Pre-market session not started",
-                "market_open": market_open.isoformat()
-            }
-        elif now < market_open:
+        if phase == Phase.PRE_OPEN:
             return {
                 "status": "pre_open",
                 "message": "Pre-open session",
                 "market_open": market_open.isoformat()
             }
-        elif now <= market_close:
+        elif phase == Phase.LIVE:
             return {
                 "status": "open",
                 "message": "Market is open",
                 "market_close": market_close.isoformat()
             }
+        elif now < market_open:
+            return {
+                "status": "pre_market",
+                "message": "Pre-market session not started",
+                "market_open": market_open.isoformat()
+            }
         else:
             return {
                 "status": "closed",
@@ -1068,14 +1159,14 @@ class DhanUnifiedService:
             }
     
     def _get_next_trading_day(self) -> str:
-        """Get next trading day"""
-        now = datetime.now()
-        next_day = now + timedelta(days=1)
-        
-        while next_day.weekday() >= 5:
-            next_day += timedelta(days=1)
-        
-        return next_day.replace(hour=9, minute=15, second=0, microsecond=0).isoformat()
+        """Get next trading day (skips weekends and NSE holidays)"""
+        calendar = get_market_calendar()
+        now = calendar.now()
+        next_day = calendar.next_trading_day(now.date())
+        return now.replace(
+            year=next_day.year, month=next_day.month, day=next_day.day,
+            hour=9, minute=15, second=0, microsecond=0
+        ).isoformat()
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -0,0 +1,262 @@
+"""
+Execution Cost Model
+====================
+What a fill really costs on NSE - statutory charges, slippage and margin -
+in one place, shared by MockDataService, paper trading, the tax calculator
+and the backtesters.
+
+Every function accepts scalars or numpy arrays and broadcasts, so a backtest
+with 100k fills is costed in one call instead of a Python loop per trade.
+
+- calculate_charges - brokerage, STT, exchange, SEBI, GST and stamp duty per fill
+- order_charges     - same, for a single order, as the rounded dict the APIs return
+- fill_price        - executed price from bid/ask + depth, or a moneyness bucket
+- span_margin       - SPAN-like margin for short/long options and futures
+"""
+
+from typing import Dict, Optional, Union
+
+import numpy as np
+
+ArrayLike = Union[float, int, str, np.ndarray, list, tuple]
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CHARGE RATES (Dhan, NSE - revised Oct 2024)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# All rates are fractions of turnover (price x quantity). Options turnover is
+# premium turnover. Brokerage is brokerage_flat per order when set, otherwise
+# min(brokerage_cap, turnover x brokerage_pct).
+CHARGE_RATES: Dict[str, Dict[str, float]] = {
+    "equity_intraday": {
+        "brokerage_flat": 0.0, "brokerage_pct": 0.0003, "brokerage_cap": 20.0,
+        "stt_buy": 0.0, "stt_sell": 0.00025,
+        "exchange": 0.0000345, "sebi": 0.000001, "stamp_buy": 0.00003,
+    },
+    "equity_delivery": {
+        "brokerage_flat": 0.0, "brokerage_pct": 0.0, "brokerage_cap": 0.0,
+        "stt_buy": 0.001, "stt_sell": 0.001,
+        "exchange": 0.0000345, "sebi": 0.000001, "stamp_buy": 0.00015,
+    },
+    "futures": {
+        "brokerage_flat": 0.0, "brokerage_pct": 0.0003, "brokerage_cap": 20.0,
+        "stt_buy": 0.0, "stt_sell": 0.0002,
+        "exchange": 0.0000173, "sebi": 0.000001, "stamp_buy": 0.00002,
+    },
+    "options": {
+        "brokerage_flat": 20.0, "brokerage_pct": 0.0, "brokerage_cap": 0.0,
+        "stt_buy": 0.0, "stt_sell": 0.001,
+        "exchange": 0.0003503, "sebi": 0.000001, "stamp_buy": 0.00003,
+    },
+}
+
+GST_RATE = 0.18  # On brokerage + exchange + SEBI
+
+_SEGMENTS = list(CHARGE_RATES)
+_RATE_KEYS = list(CHARGE_RATES["options"])
+_RATE_TABLE = np.array([[CHARGE_RATES[s][k] for k in _RATE_KEYS] for s in _SEGMENTS])
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SLIPPAGE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# Fallback when there is no bid/ask snapshot: (moneyness upper bound, slippage)
+# where moneyness = |spot - strike| / spot. ATM 0.5%, OTM 1.5%, deep OTM 2.5%.
+MONEYNESS_SLIPPAGE = ((0.01, 0.005), (0.025, 0.015), (np.inf, 0.025))
+
+# Liquid cash equities with no depth snapshot
+MARKET_ORDER_SLIPPAGE = 0.0005
+
+# Orders larger than the visible touch quantity walk the book: each multiple
+# of the touch size beyond the first costs DEPTH_IMPACT spreads, capped.
+DEPTH_IMPACT = 0.5
+MAX_IMPACT_SPREADS = 5.0
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# MARGIN (SPAN-like)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# scan_range: worst-case underlying move SPAN prices the position at
+# exposure: exposure / extreme-loss margin on notional
+# short_option_min: floor for far-OTM shorts, as a fraction of notional
+SPAN_PARAMS = {
+    "index": {"scan_range": 0.07, "exposure": 0.02, "short_option_min": 0.03},
+    "stock": {"scan_range": 0.13, "exposure": 0.035, "short_option_min": 0.05},
+}
+
+
+def _is_buy(side: ArrayLike) -> np.ndarray:
+    return np.char.upper(np.asarray(side, dtype=str)) == "BUY"
+
+
+def _segment_rates(segment: ArrayLike) -> Dict[str, np.ndarray]:
+    """Rate columns for a segment name or an array of names"""
+    segments = np.asarray(segment, dtype=str)
+    if segments.ndim == 0:
+        if str(segments) not in CHARGE_RATES:
+            raise ValueError(f"Unknown segment: {segment} (choose from {', '.join(_SEGMENTS)})")
+        row = _RATE_TABLE[_SEGMENTS.index(str(segments))]
+        return dict(zip(_RATE_KEYS, row))
+
+    unique, inverse = np.unique(segments, return_inverse=True)
+    unknown = [s for s in unique if s not in CHARGE_RATES]
+    if unknown:
+        raise ValueError(f"Unknown segment: {unknown[0]} (choose from {', '.join(_SEGMENTS)})")
+    rows = _RATE_TABLE[[_SEGMENTS.index(s) for s in unique]][inverse.reshape(segments.shape)]
+    return {key: rows[..., i] for i, key in enumerate(_RATE_KEYS)}
+
+
+def calculate_charges(
+    side: ArrayLike,
+    quantity: ArrayLike,
+    price: ArrayLike,
+    segment: ArrayLike = "equity_intraday",
+) -> Dict[str, np.ndarray]:
+    """
+    Charges for one or many fills.
+
+    Args:
+        side: "BUY" / "SELL", or an array of them
+        quantity: Units (shares, or lots x lot size)
+        price: Executed price (premium for options)
+        segment: Key of CHARGE_RATES, or an array of keys
+
+    Returns:
+        Dict of float arrays (unrounded): brokerage, stt, exchange_txn, sebi,
+        gst, stamp_duty, total, turnover. Zero-turnover fills cost nothing.
+    """
+    is_buy = _is_buy(side)
+    turnover = np.asarray(quantity, dtype=float) * np.asarray(price, dtype=float)
+    rates = _segment_rates(segment)
+    traded = turnover > 0
+
+    brokerage = np.where(
+        rates["brokerage_flat"] > 0,
+        rates["brokerage_flat"],
+        np.minimum(rates["brokerage_cap"], turnover * rates["brokerage_pct"]),
+    ) * traded
+    stt = turnover * np.where(is_buy, rates["stt_buy"], rates["stt_sell"])
+    exchange_txn = turnover * rates["exchange"]
+    sebi = turnover * rates["sebi"]
+    gst = (brokerage + exchange_txn + sebi) * GST_RATE
+    stamp_duty = turnover * np.where(is_buy, rates["stamp_buy"], 0.0)
+
+    return {
+        "brokerage": brokerage,
+        "stt": stt,
+        "exchange_txn": exchange_txn,
+        "sebi": sebi,
+        "gst": gst,
+        "stamp_duty": stamp_duty,
+        "total": brokerage + stt + exchange_txn + sebi + gst + stamp_duty,
+        "turnover": turnover,
+    }
+
+
+def order_charges(side: str, quantity: float, price: float, segment: str = "equity_intraday") -> Dict[str, float]:
+    """Charges for a single order, rounded to paise"""
+    return {key: round(float(value), 2) for key, value in calculate_charges(side, quantity, price, segment).items()}
+
+
+def slippage_pct(moneyness: ArrayLike) -> np.ndarray:
+    """Fallback slippage fraction from the MONEYNESS_SLIPPAGE buckets"""
+    bounds = np.array([bound for bound, _ in MONEYNESS_SLIPPAGE])
+    pcts = np.array([pct for _, pct in MONEYNESS_SLIPPAGE])
+    return pcts[np.searchsorted(bounds, np.abs(np.asarray(moneyness, dtype=float)), side="right")]
+
+
+def fill_price(
+    side: ArrayLike,
+    price: ArrayLike,
+    quantity: Optional[ArrayLike] = None,
+    bid: Optional[ArrayLike] = None,
+    ask: Optional[ArrayLike] = None,
+    bid_qty: Optional[ArrayLike] = None,
+    ask_qty: Optional[ArrayLike] = None,
+    moneyness: Optional[ArrayLike] = None,
+    order_type: str = "MARKET",
+) -> np.ndarray:
+    """
+    Executed price for market orders.
+
+    With a valid bid/ask quote, buys lift the ask and sells hit the bid; when
+    quantity exceeds the touch quantity the fill walks the book by
+    DEPTH_IMPACT spreads per extra multiple of the touch size (capped at
+    MAX_IMPACT_SPREADS). Fills without a usable quote fall back to
+    slippage_pct(moneyness) for options, or MARKET_ORDER_SLIPPAGE.
+    LIMIT orders fill at price.
+    """
+    price = np.asarray(price, dtype=float)
+    if order_type != "MARKET":
+        return price.copy()
+
+    is_buy = _is_buy(side)
+    direction = np.where(is_buy, 1.0, -1.0)
+    pct = slippage_pct(moneyness) if moneyness is not None else MARKET_ORDER_SLIPPAGE
+    fill = price * (1 + direction * pct)
+
+    if bid is None or ask is None:
+        return fill
+
+    bid = np.asarray(bid, dtype=float)
+    ask = np.asarray(ask, dtype=float)
+    quoted = (bid > 0) & (ask >= bid)
+    spread = np.where(quoted, ask - bid, 0.0)
+    touch = np.where(is_buy, ask, bid)
+
+    impact = 0.0
+    if quantity is not None and bid_qty is not None and ask_qty is not None:
+        depth = np.where(is_buy, np.asarray(ask_qty, dtype=float), np.asarray(bid_qty, dtype=float))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            overflow = np.where(depth > 0, np.asarray(quantity, dtype=float) / depth - 1, 0.0)
+        impact = spread * np.minimum(np.maximum(overflow, 0.0) * DEPTH_IMPACT, MAX_IMPACT_SPREADS)
+
+    return np.where(quoted, touch + direction * impact, fill)
+
+
+def span_margin(
+    side: ArrayLike,
+    spot: ArrayLike,
+    quantity: ArrayLike,
+    strike: Optional[ArrayLike] = None,
+    option_type: ArrayLike = "FUT",
+    premium: ArrayLike = 0.0,
+    is_index: ArrayLike = True,
+) -> np.ndarray:
+    """
+    SPAN-like initial margin per position.
+
+    Short options: max(scan_range x notional - half the OTM amount,
+    short_option_min x notional) + exposure x notional. Long options: the
+    premium. Futures, either side: (scan_range + exposure) x notional.
+
+    Args:
+        side: "BUY" / "SELL"
+        spot: Underlying price
+        quantity: Units (lots x lot size)
+        strike: Option strike (ignored for futures)
+        option_type: "CE", "PE" or "FUT"
+        premium: Option price, for long option margin
+        is_index: Index underlying (True) or single stock (False)
+    """
+    is_buy = _is_buy(side)
+    kind = np.char.upper(np.asarray(option_type, dtype=str))
+    spot = np.asarray(spot, dtype=float)
+    quantity = np.asarray(quantity, dtype=float)
+    strike = spot if strike is None else np.asarray(strike, dtype=float)
+    notional = spot * quantity
+
+    index = np.asarray(is_index, dtype=bool)
+    scan = np.where(index, SPAN_PARAMS["index"]["scan_range"], SPAN_PARAMS["stock"]["scan_range"])
+    exposure = np.where(index, SPAN_PARAMS["index"]["exposure"], SPAN_PARAMS["stock"]["exposure"])
+    floor = np.where(index, SPAN_PARAMS["index"]["short_option_min"], SPAN_PARAMS["stock"]["short_option_min"])
+
+    otm_points = np.where(kind == "CE", np.maximum(strike - spot, 0.0), np.maximum(spot - strike, 0.0))
+    short_option = np.maximum(scan * notional - 0.5 * otm_points * quantity, floor * notional) + exposure * notional
+    long_option = np.asarray(premium, dtype=float) * quantity
+    futures = (scan + exposure) * notional
+
+    return np.where(kind == "FUT", futures, np.where(is_buy, long_option, short_option))
@@ -0,0 +1,272 @@
+"""
+HTTP Cache Validation & Compression
+===================================
+ASGI middleware for the polled read endpoints (F&O heatmap, NSE indices,
+option chains, courses, scanners...). Their JSON is large and frequently
+unchanged between two polls.
+
+For GET responses with a JSON body it:
+- adds a strong ETag, hashed from the body (or reuses the ETag the endpoint
+  already set, e.g. the scanner pipeline's per-version tag)
+- answers If-None-Match with 304 Not Modified and no body
+- compresses with Brotli or gzip, as negotiated from Accept-Encoding
+
+Compressed bodies are cached by (ETag, encoding). A payload polled by many
+clients is compressed once per change, not once per request.
+
+Compressed representations get the encoding appended to their ETag
+("abc-br", "abc-gzip"), as a strong validator must differ per
+representation. etag_matches() ignores that suffix, so a client holding
+any encoding of unchanged content gets a 304.
+
+Brotli needs the optional brotli package. Without it only gzip is offered.
+"""
+
+import gzip
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+SUPPORTED_ENCODINGS: Tuple[str, ...] = ("br", "gzip") if BROTLI_AVAILABLE else ("gzip",)
+# Bodies smaller than this go out uncompressed (headers would eat the gain)
+MIN_COMPRESS_BYTES = int(os.getenv("HTTP_COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # 10-11 compress slightly better at many times the CPU cost
+ENCODED_CACHE_MAX_ENTRIES = 512
+ENCODED_CACHE_MAX_BYTES = int(os.getenv("HTTP_COMPRESS_CACHE_BYTES", str(32 * 1024 * 1024)))
+
+_VARIANT_SUFFIXES = tuple(f"-{encoding}\"" for encoding in ("br", "gzip"))
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# VALIDATORS / NEGOTIATION
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def content_etag(body: bytes) -> str:
+    """Strong ETag from the body bytes"""
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def _base_etag(tag: str) -> str:
+    tag = tag[2:] if tag.startswith("W/") else tag
+    for suffix in _VARIANT_SUFFIXES:
+        if tag.endswith(suffix):
+            return tag[: -len(suffix)] + '"'
+    return tag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """RFC 7232 weak comparison against an If-None-Match header, ignoring encoding suffixes"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or _base_etag(etag) in [_base_etag(tag) for tag in tags]
+
+
+def negotiate_encoding(accept_encoding: Optional[str], supported: Iterable[str] = None) -> Optional[str]:
+    """Best supported content-coding for an Accept-Encoding header, or None for identity"""
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        weight = 1.0
+        params = params.strip().lower()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[token] = weight
+
+    best, best_weight = None, 0.0
+    for encoding in supported or SUPPORTED_ENCODINGS:  # server preference breaks ties
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    raise ValueError(f"Unsupported content-coding '{encoding}'")
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# PRE-COMPRESSED CACHE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class EncodedBodyCache:
+    """LRU of compressed bodies keyed by (ETag, encoding), bounded by entries and bytes"""
+
+    def __init__(self, max_entries: int = ENCODED_CACHE_MAX_ENTRIES, max_bytes: int = ENCODED_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.responses = 0
+        self.not_modified = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def get(self, etag: str, encoding: str, body: bytes) -> bytes:
+        """Compressed body, compressing (and caching) on first use"""
+        key = (etag, encoding)
+        encoded = self._entries.get(key)
+        if encoded is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return encoded
+
+        self.misses += 1
+        encoded = compress(body, encoding)
+        if len(encoded) <= self.max_bytes:
+            self._entries[key] = encoded
+            self._bytes += len(encoded)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+        return encoded
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def get_status(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "encodings": list(SUPPORTED_ENCODINGS),
+            "brotli": BROTLI_AVAILABLE,
+            "min_compress_bytes": MIN_COMPRESS_BYTES,
+            "entries": len(self._entries),
+            "cached_bytes": self._bytes,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "responses": self.responses,
+            "not_modified": self.not_modified,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "compression_ratio": round(self.bytes_out / self.bytes_in, 3) if self.bytes_in else None,
+        }
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# MIDDLEWARE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _header(headers: list, name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+class HTTPCacheMiddleware:
+    """
+    Pure ASGI middleware: ETag / 304 and negotiated compression for GET
+    responses with an application/json body. Everything else (other methods,
+    streams, websockets, already-encoded bodies) passes through untouched.
+    """
+
+    def __init__(self, app, min_size: int = MIN_COMPRESS_BYTES, cache: EncodedBodyCache = None):
+        self.app = app
+        self.min_size = min_size
+        self.cache = cache or get_encoded_body_cache()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = dict(scope["headers"])
+        if_none_match = request_headers.get(b"if-none-match", b"").decode("latin-1")
+        accept_encoding = request_headers.get(b"accept-encoding", b"").decode("latin-1")
+        start_message = None
+        chunks = []
+
+        async def send_wrapper(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                headers = message.get("headers", [])
+                content_type = _header(headers, b"content-type") or b""
+                if (
+                    message["status"] == 200
+                    and content_type.startswith(b"application/json")
+                    and _header(headers, b"content-encoding") is None
+                ):
+                    start_message = message  # hold until the whole body is in
+                    return
+                await send(message)
+            elif message["type"] == "http.response.body" and start_message is not None:
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    await self._send_buffered(send, start_message, b"".join(chunks), if_none_match, accept_encoding)
+            else:
+                await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def _send_buffered(self, send, start_message, body: bytes, if_none_match: str, accept_encoding: str):
+        headers = [
+            (key, value) for key, value in start_message.get("headers", [])
+            if key.lower() not in (b"content-length", b"etag")
+        ]
+        existing = _header(start_message.get("headers", []), b"etag")
+        etag = existing.decode("latin-1") if existing else content_etag(body)
+        if _header(headers, b"cache-control") is None:
+            headers.append((b"cache-control", b"no-cache"))  # always revalidate; 304s are cheap
+        headers.append((b"vary", b"Accept-Encoding"))
+        cache = self.cache
+        cache.responses += 1
+
+        if etag_matches(if_none_match, etag):
+            cache.not_modified += 1
+            headers = [(key, value) for key, value in headers if key.lower() != b"content-type"]
+            headers.append((b"etag", etag.encode("latin-1")))
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        encoding = negotiate_encoding(accept_encoding) if len(body) >= self.min_size else None
+        cache.bytes_in += len(body)
+        if encoding:
+            body = cache.get(_base_etag(etag), encoding, body)
+            headers.append((b"content-encoding", encoding.encode("latin-1")))
+            etag = _base_etag(etag)[:-1] + f'-{encoding}"'
+        cache.bytes_out += len(body)
+        headers.append((b"etag", etag.encode("latin-1")))
+        headers.append((b"content-length", str(len(body)).encode("latin-1")))
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SINGLETON
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_encoded_body_cache: Optional[EncodedBodyCache] = None
+
+
+def get_encoded_body_cache() -> EncodedBodyCache:
+    """Get or create the shared compressed-body cache"""
+    global _encoded_body_cache
+    if _encoded_body_cache is None:
+        _encoded_body_cache = EncodedBodyCache()
+    return _encoded_body_cache
@@ -0,0 +1,291 @@
+"""
+HTTP Client Registry
+====================
+One shared, pooled httpx.AsyncClient per upstream instead of a new client
+(and a new TCP + TLS handshake) per request or per service instance.
+
+- Per-host connection limits and keep-alive from HOST_LIMITS
+- HTTP/2 when the optional h2 package is installed
+- A pooled cookie jar for NSE, warmed from the homepage and refreshed on
+  401/403 or after NSE_COOKIE_TTL_SECONDS
+- Request, error, latency and pool metrics per client
+
+Clients are bound to the event loop that created them; calling get() from
+another loop (e.g. a worker thread running asyncio.run) gets that loop's own
+client. The registry owns every client: services must not aclose() them.
+Call close() from the application lifespan on shutdown.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from http.cookiejar import CookieJar
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+NSE_BASE_URL = "https://www.nseindia.com"
+NSE_COOKIE_TTL_SECONDS = float(os.getenv("NSE_COOKIE_TTL_SECONDS", "300"))
+
+NSE_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "application/json, text/plain, */*",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Referer": "https://www.nseindia.com/",
+}
+
+# Pool profile per upstream. Unknown names get their own pool with the
+# "default" profile.
+HOST_LIMITS: Dict[str, Dict[str, Any]] = {
+    "dhan": {"max_connections": 10, "max_keepalive_connections": 5, "keepalive_expiry": 60.0, "timeout": 30.0},
+    "upstox": {"max_connections": 10, "max_keepalive_connections": 5, "keepalive_expiry": 60.0, "timeout": 30.0},
+    "nse": {
+        "max_connections": 4, "max_keepalive_connections": 4, "keepalive_expiry": 30.0, "timeout": 30.0,
+        "headers": NSE_HEADERS, "follow_redirects": True,
+    },
+    "llm": {"max_connections": 20, "max_keepalive_connections": 10, "keepalive_expiry": 30.0, "timeout": 120.0},
+    "default": {
+        "max_connections": 50, "max_keepalive_connections": 20, "keepalive_expiry": 30.0, "timeout": 30.0,
+        "follow_redirects": True,
+    },
+}
+
+
+class ClientStats:
+    """Counters for one named client, summed over every event loop"""
+
+    __slots__ = ("requests", "errors", "in_flight", "total_ms", "max_ms", "status")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.status: Dict[str, int] = {}
+
+    def to_dict(self) -> Dict:
+        completed = self.requests - self.in_flight
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "avg_ms": round(self.total_ms / completed, 1) if completed else 0.0,
+            "max_ms": round(self.max_ms, 1),
+            "status": dict(self.status),
+        }
+
+
+class _MeteredTransport(httpx.AsyncBaseTransport):
+    """Wraps the pooled transport to record latency (time to headers) and outcomes"""
+
+    def __init__(self, transport: httpx.AsyncHTTPTransport, stats: ClientStats):
+        self._transport = transport
+        self._stats = stats
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        stats = self._stats
+        stats.requests += 1
+        stats.in_flight += 1
+        started = time.perf_counter()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except Exception:
+            stats.errors += 1
+            raise
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            stats.in_flight -= 1
+            stats.total_ms += elapsed
+            stats.max_ms = max(stats.max_ms, elapsed)
+        bucket = f"{response.status_code // 100}xx"
+        stats.status[bucket] = stats.status.get(bucket, 0) + 1
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+    def pool_info(self) -> Dict[str, int]:
+        # httpcore's pool is private; report what it exposes, if anything
+        connections = getattr(getattr(self._transport, "_pool", None), "connections", None) or []
+        idle = sum(1 for conn in connections if getattr(conn, "is_idle", lambda: False)())
+        return {"connections": len(connections), "idle": idle}
+
+
+class _LoopClient:
+    __slots__ = ("loop", "client", "transport", "lock")
+
+    def __init__(self, loop, client: httpx.AsyncClient, transport: _MeteredTransport):
+        self.loop = loop
+        self.client = client
+        self.transport = transport
+        self.lock = asyncio.Lock()
+
+
+class HTTPClientRegistry:
+    """Named, pooled httpx clients shared across the backend"""
+
+    def __init__(self, limits: Dict[str, Dict[str, Any]] = None, http2: bool = HTTP2_AVAILABLE):
+        self.limits = limits or HOST_LIMITS
+        self.http2 = http2
+        self._clients: Dict[Tuple[str, int], _LoopClient] = {}
+        self._stats: Dict[str, ClientStats] = {}
+        self._cookie_jars: Dict[str, CookieJar] = {}
+        self._nse_warmed_at = 0.0
+        self._nse_warmups = 0
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # CLIENTS
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    def _profile(self, name: str) -> Dict[str, Any]:
+        return self.limits.get(name) or self.limits.get("default") or HOST_LIMITS["default"]
+
+    def _build(self, name: str, loop) -> _LoopClient:
+        profile = self._profile(name)
+        stats = self._stats.setdefault(name, ClientStats())
+        transport = _MeteredTransport(
+            httpx.AsyncHTTPTransport(
+                http2=self.http2,
+                limits=httpx.Limits(
+                    max_connections=profile.get("max_connections"),
+                    max_keepalive_connections=profile.get("max_keepalive_connections"),
+                    keepalive_expiry=profile.get("keepalive_expiry"),
+                ),
+            ),
+            stats,
+        )
+        client = httpx.AsyncClient(
+            transport=transport,
+            timeout=profile.get("timeout", 30.0),
+            headers=profile.get("headers"),
+            follow_redirects=profile.get("follow_redirects", False),
+            # Every loop's client for a name shares one cookie jar
+            cookies=self._cookie_jars.setdefault(name, CookieJar()),
+        )
+        logger.info(f"🌐 HTTP client '{name}' created (http2={self.http2}, max_connections={profile.get('max_connections')})")
+        return _LoopClient(loop, client, transport)
+
+    def _entry(self, name: str) -> _LoopClient:
+        loop = asyncio.get_running_loop()
+        key = (name, id(loop))
+        entry = self._clients.get(key)
+        if entry is None or entry.loop is not loop or entry.client.is_closed:
+            self._prune()
+            entry = self._clients[key] = self._build(name, loop)
+        return entry
+
+    def _prune(self):
+        # Forget clients whose event loop has gone away (their sockets went with it)
+        for key, entry in list(self._clients.items()):
+            if entry.loop.is_closed() or entry.client.is_closed:
+                del self._clients[key]
+
+    def get(self, name: str = "default") -> httpx.AsyncClient:
+        """Shared client for name on the running event loop"""
+        return self._entry(name).client
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # NSE SESSION
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    async def ensure_nse_cookies(self, force: bool = False) -> Dict[str, str]:
+        """
+        Warm the NSE cookie jar from the homepage if it is empty, older than
+        NSE_COOKIE_TTL_SECONDS, or force is set. Concurrent callers share one
+        warm-up. Returns the current cookies.
+        """
+        entry = self._entry("nse")
+        jar = self._cookie_jars["nse"]
+        started = time.monotonic()
+        async with entry.lock:
+            # Another caller may have refreshed while we waited for the lock
+            fresh = len(jar) > 0 and time.monotonic() - self._nse_warmed_at < NSE_COOKIE_TTL_SECONDS
+            if (force and self._nse_warmed_at < started) or not fresh:
+                try:
+                    await entry.client.get(NSE_BASE_URL)
+                    self._nse_warmed_at = time.monotonic()
+                    self._nse_warmups += 1
+                except httpx.HTTPError as e:
+                    logger.warning(f"NSE cookie warm-up failed: {e}")
+        return {cookie.name: cookie.value for cookie in jar}
+
+    async def nse_get(self, url: str, params: Dict = None, headers: Dict = None) -> httpx.Response:
+        """GET an NSE URL (absolute or /api/... path) with a warm session, retrying once on 401/403"""
+        if url.startswith("/"):
+            url = f"{NSE_BASE_URL}{url}"
+        client = self.get("nse")
+        await self.ensure_nse_cookies()
+        response = await client.get(url, params=params, headers=headers)
+        if response.status_code in (401, 403):
+            await self.ensure_nse_cookies(force=True)
+            response = await client.get(url, params=params, headers=headers)
+        return response
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # METRICS / LIFECYCLE
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    def get_metrics(self) -> Dict:
+        self._prune()
+        clients = {}
+        for name, stats in self._stats.items():
+            entries = [entry for (key, _), entry in self._clients.items() if key == name]
+            pools = [entry.transport.pool_info() for entry in entries]
+            profile = self._profile(name)
+            clients[name] = {
+                **stats.to_dict(),
+                "loops": len(entries),
+                "connections": sum(p["connections"] for p in pools),
+                "idle_connections": sum(p["idle"] for p in pools),
+                "max_connections": profile.get("max_connections"),
+                "max_keepalive_connections": profile.get("max_keepalive_connections"),
+            }
+        if "nse" in self._cookie_jars:
+            clients.setdefault("nse", {})["cookies"] = {
+                "count": len(self._cookie_jars["nse"]),
+                "age_seconds": round(time.monotonic() - self._nse_warmed_at, 1) if self._nse_warmed_at else None,
+                "warmups": self._nse_warmups,
+            }
+        return {"http2": self.http2, "clients": clients}
+
+    async def close(self):
+        """Close every client owned by the running loop; forget the rest"""
+        loop = asyncio.get_running_loop()
+        for key, entry in list(self._clients.items()):
+            if entry.loop is loop:
+                try:
+                    await entry.client.aclose()
+                except Exception as e:
+                    logger.warning(f"Error closing HTTP client '{key[0]}': {e}")
+            del self._clients[key]
+        logger.info("🌐 HTTP clients closed")
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SINGLETON
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_http_client_registry: Optional[HTTPClientRegistry] = None
+
+
+def get_http_client_registry() -> HTTPClientRegistry:
+    """Get or create the shared HTTP client registry"""
+    global _http_client_registry
+    if _http_client_registry is None:
+        _http_client_registry = HTTPClientRegistry()
+    return _http_client_registry
+
+
+def get_http_client(name: str = "default") -> httpx.AsyncClient:
+    """Shortcut for get_http_client_registry().get(name)"""
+    return get_http_client_registry().get(name)
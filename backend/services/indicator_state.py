@@ -0,0 +1,471 @@
+"""
+Incremental Indicator State
+===========================
+Per-symbol technical indicator state that updates one bar at a time and is
+persisted to disk, so calculate_technical_indicators no longer rebuilds EMA,
+RSI, ATR, MACD, ADX, Bollinger, Stochastic and OBV from a full history
+DataFrame on every cache miss, and a restart does not need a history reload.
+
+Each indicator follows the recurrence used by the ``ta`` library objects it
+replaces (pandas ewm with adjust=False, Wilder smoothing seeded with a
+simple mean, rolling windows), so values match the DataFrame version.
+
+Re-sending the latest bar (e.g. a partial daily candle refreshed during the
+session) replaces it instead of double counting: the state before the last
+bar is kept and restored first.
+
+Layout (INDICATOR_STATE_DIR, default backend/indicator_state/):
+- <timeframe>.json - {symbol: state} for "1d", "5m", ...
+"""
+
+import copy
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+INDICATOR_STATE_DIR = os.environ.get(
+    "INDICATOR_STATE_DIR",
+    str(Path(__file__).resolve().parent.parent / "indicator_state"),
+)
+SAVE_INTERVAL_SECONDS = 60
+MIN_BARS = 20          # calculate_technical_indicators needs 20 bars
+VOLUME_WINDOW = 63     # ~3 months of daily bars for average volume
+
+# Short yfinance period that catches up a symbol whose state is at most
+# max_age seconds old; older state (or a gap that large between the state and
+# the incoming bars) means a full history reload
+CATCH_UP = {"1d": ("5d", 4 * 86400)}
+
+Bar = Tuple[float, float, float, float, float, float]  # ts, open, high, low, close, volume
+
+_NAN = float("nan")
+
+
+def _ewm(value: Optional[float], x: float, alpha: float) -> float:
+    """One step of pandas ewm(adjust=False)"""
+    if value is None:
+        return x
+    old_wt = 1.0 - alpha
+    return (old_wt * value + alpha * x) / (old_wt + alpha)
+
+
+class IndicatorState:
+    """Indicator state for one symbol and timeframe"""
+
+    __slots__ = (
+        "bars", "first_ts", "last_ts", "last_close", "prev_close", "prev_high", "prev_low",
+        "ema", "ema_count", "macd_signal", "macd_count",
+        "rsi_up", "rsi_down",
+        "tr_seed", "atr",
+        "adx_tr", "adx_pos", "adx_neg", "dx_seed", "adx",
+        "closes", "highs", "lows", "stoch_k", "volumes",
+        "obv", "obv_history", "undo",
+    )
+
+    EMA_PERIODS = (12, 20, 26, 50, 200)
+    RSI_PERIOD = 14
+    ATR_PERIOD = 14
+    ADX_PERIOD = 14
+    MACD_SIGNAL = 9
+    BB_PERIOD = 20
+    BB_DEV = 2
+    STOCH_PERIOD = 14
+    STOCH_SMOOTH = 3
+
+    def __init__(self):
+        self.bars = 0
+        self.first_ts: Optional[float] = None
+        self.last_ts: Optional[float] = None
+        self.last_close = 0.0
+        self.prev_close: Optional[float] = None
+        self.prev_high: Optional[float] = None
+        self.prev_low: Optional[float] = None
+        self.ema: Dict[str, Optional[float]] = {str(p): None for p in self.EMA_PERIODS}
+        self.ema_count = 0
+        self.macd_signal: Optional[float] = None
+        self.macd_count = 0
+        self.rsi_up: Optional[float] = None
+        self.rsi_down: Optional[float] = None
+        self.tr_seed = 0.0
+        self.atr = 0.0
+        self.adx_tr = 0.0
+        self.adx_pos = 0.0
+        self.adx_neg = 0.0
+        self.dx_seed = 0.0
+        self.adx = 0.0
+        self.closes: deque = deque(maxlen=self.BB_PERIOD)
+        self.highs: deque = deque(maxlen=self.STOCH_PERIOD)
+        self.lows: deque = deque(maxlen=self.STOCH_PERIOD)
+        self.stoch_k: deque = deque(maxlen=self.STOCH_SMOOTH)
+        self.volumes: deque = deque(maxlen=VOLUME_WINDOW)
+        self.obv = 0.0
+        self.obv_history: deque = deque(maxlen=5)
+        self.undo: Optional[Dict[str, Any]] = None
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # UPDATE
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    def update(self, ts: float, open_: float, high: float, low: float, close: float, volume: float) -> bool:
+        """
+        Apply one bar. A bar with the same timestamp as the last one replaces
+        it; older bars are ignored. Returns True if the state changed.
+        """
+        if self.last_ts is not None:
+            if ts < self.last_ts:
+                return False
+            if ts == self.last_ts:
+                if self.undo is None:
+                    return False
+                self._restore(self.undo)
+        self.undo = self.to_dict(include_undo=False)
+        self._apply(high, low, close, volume)
+        if self.first_ts is None:
+            self.first_ts = ts
+        self.last_ts = ts
+        return True
+
+    def _apply(self, high: float, low: float, close: float, volume: float):
+        b = self.bars  # index of this bar
+        prev_close = self.prev_close
+
+        # EMAs (ta EMAIndicator / MACD: ewm(span, adjust=False), min_periods=span)
+        for period in self.EMA_PERIODS:
+            key = str(period)
+            self.ema[key] = _ewm(self.ema[key], close, 2.0 / (period + 1))
+        self.ema_count += 1
+        if self.ema_count >= 26:
+            macd = self.ema["12"] - self.ema["26"]
+            self.macd_signal = _ewm(self.macd_signal, macd, 2.0 / (self.MACD_SIGNAL + 1))
+            self.macd_count += 1
+
+        # RSI (ta RSIIndicator: first diff counts as 0 gain / 0 loss)
+        change = close - prev_close if prev_close is not None else 0.0
+        alpha = 1.0 / self.RSI_PERIOD
+        self.rsi_up = _ewm(self.rsi_up, change if change > 0 else 0.0, alpha)
+        self.rsi_down = _ewm(self.rsi_down, -change if change < 0 else 0.0, alpha)
+
+        # ATR (Wilder, seeded with the mean true range of the first period bars)
+        if prev_close is None:
+            true_range = high - low
+        else:
+            true_range = max(high - low, abs(high - prev_close), abs(low - prev_close))
+        n = self.ATR_PERIOD
+        if b < n:
+            self.tr_seed += true_range
+            if b == n - 1:
+                self.atr = self.tr_seed / n
+        else:
+            self.atr = (self.atr * (n - 1) + true_range) / n
+
+        # ADX (Wilder sums seeded over bars 1..n, ADX seeded with the mean of n DX)
+        if prev_close is not None:
+            n = self.ADX_PERIOD
+            dm_range = max(high, prev_close) - min(low, prev_close)
+            up = high - self.prev_high
+            down = self.prev_low - low
+            pos = up if (up > down and up > 0) else 0.0
+            neg = down if (down > up and down > 0) else 0.0
+            if b <= n:
+                self.adx_tr += dm_range
+                self.adx_pos += pos
+                self.adx_neg += neg
+            else:
+                self.adx_tr = self.adx_tr - self.adx_tr / n + dm_range
+                self.adx_pos = self.adx_pos - self.adx_pos / n + pos
+                self.adx_neg = self.adx_neg - self.adx_neg / n + neg
+            if b >= n:
+                di_pos = 100 * self.adx_pos / self.adx_tr if self.adx_tr != 0 else 0.0
+                di_neg = 100 * self.adx_neg / self.adx_tr if self.adx_tr != 0 else 0.0
+                dx = 100 * abs((di_pos - di_neg) / (di_pos + di_neg)) if di_pos + di_neg != 0 else 0.0
+                if b < 2 * n:
+                    self.dx_seed += dx
+                    if b == 2 * n - 1:
+                        self.adx = self.dx_seed / n
+                else:
+                    self.adx = (self.adx * (n - 1) + dx) / n
+
+        # Rolling windows (Bollinger, Stochastic, volume)
+        self.closes.append(close)
+        self.highs.append(high)
+        self.lows.append(low)
+        self.volumes.append(volume)
+        k = _NAN
+        if len(self.highs) == self.STOCH_PERIOD:
+            lowest, highest = min(self.lows), max(self.highs)
+            if highest != lowest:
+                k = 100 * (close - lowest) / (highest - lowest)
+        self.stoch_k.append(k)
+
+        # OBV (ta OnBalanceVolumeIndicator: unchanged close counts as up volume)
+        self.obv += -volume if prev_close is not None and close < prev_close else volume
+        self.obv_history.append(self.obv)
+
+        self.prev_close = close
+        self.prev_high = high
+        self.prev_low = low
+        self.last_close = close
+        self.bars = b + 1
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # SNAPSHOT
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    @property
+    def ready(self) -> bool:
+        return self.bars >= MIN_BARS
+
+    def indicators(self) -> Dict[str, Any]:
+        """Same keys and fallbacks as calculate_technical_indicators ({} until MIN_BARS)"""
+        if not self.ready:
+            return {}
+        close = self.last_close
+        bars = self.bars
+
+        def ema(period: int) -> Optional[float]:
+            return self.ema[str(period)] if bars >= period else None
+
+        rsi = 50.0
+        if bars >= self.RSI_PERIOD:
+            rsi = 100.0 if self.rsi_down == 0 else 100 - (100 / (1 + self.rsi_up / self.rsi_down))
+
+        macd = ema(12) - ema(26) if bars >= 26 else 0.0
+        has_signal = self.macd_count >= self.MACD_SIGNAL
+        macd_signal = self.macd_signal if has_signal else 0.0
+        macd_histogram = macd - self.macd_signal if has_signal else 0.0
+
+        ema_20 = ema(20) if ema(20) is not None else close
+        ema_50 = ema(50) if ema(50) is not None else close
+        ema_200 = ema(200) if bars >= 200 else ema_50
+
+        mean = sum(self.closes) / len(self.closes)
+        std = math.sqrt(sum((c - mean) ** 2 for c in self.closes) / len(self.closes))
+
+        avg_volume = sum(self.volumes) / len(self.volumes)
+        current_volume = self.volumes[-1]
+
+        if len(self.obv_history) >= 5:
+            obv_trend = "bullish" if self.obv_history[-1] > self.obv_history[0] else "bearish"
+        else:
+            obv_trend = "neutral"
+
+        stoch_k = self.stoch_k[-1]
+        stoch_d = sum(self.stoch_k) / len(self.stoch_k) if len(self.stoch_k) == self.STOCH_SMOOTH else _NAN
+
+        return {
+            "rsi": float(rsi),
+            "macd": float(macd),
+            "macd_signal": float(macd_signal),
+            "macd_histogram": float(macd_histogram),
+            "ema_20": float(ema_20),
+            "ema_50": float(ema_50),
+            "ema_200": float(ema_200),
+            "bb_upper": mean + self.BB_DEV * std,
+            "bb_lower": mean - self.BB_DEV * std,
+            "bb_middle": mean,
+            "atr": float(self.atr),
+            "volume_ratio": current_volume / avg_volume if avg_volume > 0 else 1,
+            "avg_volume": avg_volume,
+            "obv_trend": obv_trend,
+            "adx": float(self.adx) if bars >= self.ADX_PERIOD else 0,
+            "bars": bars,
+            "stoch_k": 50 if math.isnan(stoch_k) else stoch_k,
+            "stoch_d": 50 if math.isnan(stoch_d) else stoch_d,
+        }
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # PERSISTENCE
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    def to_dict(self, include_undo: bool = True) -> Dict[str, Any]:
+        data = {}
+        for name in self.__slots__:
+            if name == "undo" and not include_undo:
+                continue
+            value = getattr(self, name)
+            if isinstance(value, deque):
+                value = [None if isinstance(v, float) and math.isnan(v) else v for v in value]
+            elif isinstance(value, dict):
+                value = dict(value)
+            data[name] = value
+        return data
+
+    def _restore(self, data: Dict[str, Any]):
+        for name in self.__slots__:
+            if name not in data:
+                continue
+            value = data[name]
+            current = getattr(self, name)
+            if isinstance(current, deque):
+                value = deque((_NAN if v is None else v for v in value), maxlen=current.maxlen)
+            elif isinstance(value, dict) and name != "undo":
+                value = dict(value)
+            setattr(self, name, value)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "IndicatorState":
+        state = cls()
+        state._restore(data)
+        return state
+
+    def copy(self) -> "IndicatorState":
+        return IndicatorState.from_dict(copy.deepcopy(self.to_dict()))
+
+
+def history_bars(hist) -> Iterable[Bar]:
+    """Bars from a yfinance-style DataFrame (Open/High/Low/Close/Volume columns)"""
+    for ts, o, h, l, c, v in zip(
+        hist.index, hist["Open"], hist["High"], hist["Low"], hist["Close"], hist["Volume"]
+    ):
+        yield ts.timestamp(), float(o), float(h), float(l), float(c), float(v)
+
+
+class IndicatorStore:
+    """
+    Indicator state for every symbol, one JSON file per timeframe.
+    Thread-safe: yfinance fetches update it from executor threads.
+    """
+
+    def __init__(self, root: Optional[str] = None, save_interval: float = SAVE_INTERVAL_SECONDS):
+        self.root = Path(root or INDICATOR_STATE_DIR)
+        self.save_interval = save_interval
+        self._states: Dict[str, Dict[str, IndicatorState]] = {}
+        self._dirty: set = set()
+        self._last_save = time.monotonic()
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _key(symbol: str) -> str:
+        return symbol.upper().replace(".NS", "")
+
+    def _timeframe(self, timeframe: str) -> Dict[str, IndicatorState]:
+        states = self._states.get(timeframe)
+        if states is None:
+            states = {}
+            path = self.root / f"{timeframe}.json"
+            if path.exists():
+                try:
+                    with open(path) as f:
+                        states = {s: IndicatorState.from_dict(d) for s, d in json.load(f).items()}
+                    logger.info(f"📈 Loaded indicator state for {len(states)} symbols ({timeframe})")
+                except Exception as e:
+                    logger.error(f"Could not load indicator state {path}: {e}")
+            self._states[timeframe] = states
+        return states
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # UPDATE / LOOKUP
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    def update_bars(self, symbol: str, bars: Iterable[Bar], timeframe: str = "1d") -> Dict[str, Any]:
+        """
+        Apply bars not seen yet (the latest may be re-sent) and return the
+        indicators. Bars reaching back before the state's first bar, or
+        starting after a gap, rebuild the state from them.
+        """
+        bars = list(bars)
+        with self._lock:
+            states = self._timeframe(timeframe)
+            key = self._key(symbol)
+            state = states.get(key)
+            if state is None or (bars and self._needs_rebuild(state, bars[0][0], timeframe)):
+                state = states[key] = IndicatorState()
+            changed = False
+            for bar in bars:
+                changed |= state.update(*bar)
+            if changed:
+                self._dirty.add(timeframe)
+                self._maybe_save()
+            return state.indicators()
+
+    @staticmethod
+    def _needs_rebuild(state: IndicatorState, first_ts: float, timeframe: str) -> bool:
+        if state.first_ts is None:
+            return False
+        if first_ts < state.first_ts:
+            return True
+        catch_up = CATCH_UP.get(timeframe)
+        return catch_up is not None and first_ts - state.last_ts > catch_up[1]
+
+    def update_history(self, symbol: str, hist, timeframe: str = "1d") -> Dict[str, Any]:
+        """update_bars from a yfinance history DataFrame"""
+        if hist is None or hist.empty:
+            return self.get(symbol, timeframe)
+        return self.update_bars(symbol, history_bars(hist), timeframe)
+
+    def get(self, symbol: str, timeframe: str = "1d") -> Dict[str, Any]:
+        """Latest indicators for symbol ({} if not enough bars)"""
+        with self._lock:
+            state = self._timeframe(timeframe).get(self._key(symbol))
+            return state.indicators() if state else {}
+
+    def get_state(self, symbol: str, timeframe: str = "1d") -> Optional[IndicatorState]:
+        with self._lock:
+            state = self._timeframe(timeframe).get(self._key(symbol))
+            return state.copy() if state else None
+
+    def history_period(self, symbol: str, full_period: str, timeframe: str = "1d") -> str:
+        """yfinance period to request: a short catch-up window if the state is recent"""
+        catch_up = CATCH_UP.get(timeframe)
+        with self._lock:
+            state = self._timeframe(timeframe).get(self._key(symbol))
+            if not catch_up or state is None or not state.ready or state.last_ts is None:
+                return full_period
+            period, max_age = catch_up
+            return period if time.time() - state.last_ts <= max_age else full_period
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # PERSISTENCE
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    def _maybe_save(self):
+        if time.monotonic() - self._last_save >= self.save_interval:
+            self.save()
+
+    def save(self):
+        """Write dirty timeframes atomically"""
+        with self._lock:
+            self.root.mkdir(parents=True, exist_ok=True)
+            for timeframe in list(self._dirty):
+                path = self.root / f"{timeframe}.json"
+                tmp = path.with_suffix(".json.tmp")
+                payload = {s: state.to_dict() for s, state in self._states[timeframe].items()}
+                try:
+                    with open(tmp, "w") as f:
+                        json.dump(payload, f, separators=(",", ":"))
+                    os.replace(tmp, path)
+                    self._dirty.discard(timeframe)
+                except Exception as e:
+                    logger.error(f"Could not save indicator state {path}: {e}")
+            self._last_save = time.monotonic()
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "root": str(self.root),
+                "timeframes": {tf: len(states) for tf, states in self._states.items()},
+                "dirty": sorted(self._dirty),
+            }
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SINGLETON
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_indicator_store: Optional[IndicatorStore] = None
+
+
+def get_indicator_store() -> IndicatorStore:
+    """Get or create the shared indicator state store"""
+    global _indicator_store
+    if _indicator_store is None:
+        _indicator_store = IndicatorStore()
+    return _indicator_store
@@ -0,0 +1,205 @@
+"""
+Fast JSON Responses
+===================
+orjson-based serialization for API responses, with native NumPy, pandas and
+datetime support. Endpoints can return NumPy scalars/arrays, pandas
+Timestamps or NaN values directly: NaN/Inf become null, the same as the old
+convert_numpy_types pass.
+
+FastJSONRoute also skips FastAPI's jsonable_encoder walk for routes without
+a response_model. The endpoint's return value is serialized once, by orjson.
+Set FAST_JSON_RESPONSES=0 (or call set_fast_json_enabled(False)) to switch
+to the stdlib json encoder at runtime; the output is the same, only slower.
+
+    api_router = APIRouter(route_class=FastJSONRoute, default_response_class=FastJSONResponse)
+
+Pre-serialized payloads (e.g. scanner results cached as bytes) are served
+with json_bytes_response(body), which does no work at request time.
+"""
+
+import dataclasses
+import enum
+import functools
+import inspect
+import json
+import logging
+import math
+import os
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Callable, Dict
+
+import numpy as np
+from fastapi.responses import JSONResponse
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.routing import APIRoute
+from starlette.responses import Response
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+_enabled = os.getenv("FAST_JSON_RESPONSES", "1").lower() not in ("0", "false", "no")
+
+
+def fast_json_enabled() -> bool:
+    return _enabled
+
+
+def set_fast_json_enabled(enabled: bool):
+    """Runtime toggle between orjson and the stdlib json encoder"""
+    global _enabled
+    _enabled = bool(enabled)
+    logger.info(f"Fast JSON responses {'enabled' if _enabled else 'disabled'}")
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SERIALIZATION
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _default(obj: Any) -> Any:
+    """Types orjson does not serialize natively"""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if pd is not None:
+        if obj is pd.NaT or obj is pd.NA:
+            return None
+        if isinstance(obj, pd.Timestamp):
+            return obj.isoformat()
+        if isinstance(obj, (pd.Series, pd.Index)):
+            return obj.tolist()
+        if isinstance(obj, pd.DataFrame):
+            return obj.to_dict(orient="records")
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if isinstance(obj, enum.Enum):
+        return obj.value
+    if hasattr(obj, "model_dump"):  # pydantic v2
+        return obj.model_dump(mode="json")
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _clean_floats(obj: Any) -> Any:
+    # Only used on the stdlib fallback path: orjson already writes NaN/Inf as null
+    if isinstance(obj, float):
+        return None if math.isnan(obj) or math.isinf(obj) else obj
+    if isinstance(obj, dict):
+        return {k: _clean_floats(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_clean_floats(v) for v in obj]
+    return obj
+
+
+def _stdlib_default(obj: Any) -> Any:
+    if isinstance(obj, np.generic):
+        value = obj.item()
+        return None if isinstance(value, float) and not math.isfinite(value) else value
+    if isinstance(obj, np.ndarray):
+        return _clean_floats(obj.tolist())
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return _clean_floats(dataclasses.asdict(obj))
+    return _clean_floats(_default(obj))
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Compact UTF-8 JSON bytes. NumPy scalars/arrays, pandas objects,
+    datetimes, Decimals, sets, enums, dataclasses and pydantic models are
+    handled; NaN and Infinity become null.
+    """
+    if ORJSON_AVAILABLE and _enabled:
+        return orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS)
+    return json.dumps(
+        _clean_floats(content), default=_stdlib_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# RESPONSES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with dumps()"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def json_bytes_response(body: bytes, status_code: int = 200, headers: Dict[str, str] = None) -> Response:
+    """Serve an already-serialized JSON payload as is"""
+    return Response(content=body, status_code=status_code, headers=headers, media_type="application/json")
+
+
+def _declares_response(endpoint: Callable) -> bool:
+    # Endpoints that take `response: Response` set headers/cookies on it, and
+    # FastAPI only copies those onto responses it builds itself
+    try:
+        parameters = inspect.signature(endpoint).parameters.values()
+    except (TypeError, ValueError):
+        return True
+    return any(inspect.isclass(p.annotation) and issubclass(p.annotation, Response) for p in parameters)
+
+
+class FastJSONRoute(APIRoute):
+    """
+    APIRoute whose plain return values (dicts, lists, NumPy data...) are
+    wrapped straight into a FastJSONResponse, skipping jsonable_encoder.
+    Routes with a response_model, a non-JSON response_class or a
+    `response: Response` parameter keep FastAPI's normal handling.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        response_class = kwargs.get("response_class")
+        response_class = getattr(response_class, "value", response_class)  # DefaultPlaceholder
+        if (
+            not getattr(endpoint, "_fast_json", False)
+            and response_class is FastJSONResponse
+            and self._response_model(endpoint, kwargs.get("response_model")) is None
+            and not _declares_response(endpoint)
+        ):
+            endpoint = self._wrap(endpoint, kwargs.get("status_code") or 200)
+        super().__init__(path, endpoint, **kwargs)
+
+    @staticmethod
+    def _response_model(endpoint: Callable, response_model: Any) -> Any:
+        # Mirrors APIRoute: an unset response_model is inferred from the return annotation
+        if not isinstance(response_model, DefaultPlaceholder):
+            return response_model
+        annotation = inspect.signature(endpoint).return_annotation
+        if annotation is inspect.Signature.empty or (inspect.isclass(annotation) and issubclass(annotation, Response)):
+            return None
+        return annotation
+
+    @staticmethod
+    def _wrap(endpoint: Callable, status_code: int) -> Callable:
+        def respond(content: Any) -> Any:
+            if isinstance(content, Response):
+                return content
+            return FastJSONResponse(content, status_code=status_code)
+
+        if inspect.iscoroutinefunction(endpoint):
+            @functools.wraps(endpoint)
+            async def wrapper(*args, **kwargs):
+                return respond(await endpoint(*args, **kwargs))
+        else:
+            @functools.wraps(endpoint)
+            def wrapper(*args, **kwargs):
+                return respond(endpoint(*args, **kwargs))
+        wrapper._fast_json = True
+        return wrapper
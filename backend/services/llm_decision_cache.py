@@ -0,0 +1,254 @@
+"""
+LLM Decision Cache
+==================
+Shared cache for LLM trading decisions, keyed on a quantized market state
+instead of the prompt text.
+
+The AI agent used to cache on an MD5 of its prompt. The prompt embeds live
+spot, Greeks and timestamps, so two cycles a minute apart never produced the
+same hash. The delta strangle bot had no cache at all. Both now key on a
+MarketFingerprint:
+
+    namespace   bot kind + the config that shapes the prompt
+    symbol      underlying
+    spot        spot bucket (index step, e.g. 25 pts NIFTY)
+    iv          IV bucket (0.5 vol pts)
+    position    position state summary supplied by the bot
+    time        date + 5-minute bucket of the session
+
+Two tiers:
+
+- fresh (age < ttl, 2 min): served instead of calling the LLM.
+- stale (age < stale_ttl, 15 min): served only when the LLM cannot be
+  called (daily quota reached, providers down). Until now that case fell
+  straight back to the rule-based engine.
+
+Concurrent requests for the same fingerprint are coalesced: one caller runs
+the LLM request, the others await its result. Many per-user bots on the
+same underlying and state therefore cost one call. Failed calls (None) are
+never cached.
+
+Values are shared between callers and must be treated as read-only.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from .market_replay import ist_now, is_replay_active
+
+logger = logging.getLogger(__name__)
+
+DECISION_CACHE_ENABLED = os.getenv("LLM_DECISION_CACHE", "1") != "0"
+FRESH_TTL_SECONDS = float(os.getenv("LLM_DECISION_CACHE_TTL", "120"))
+STALE_TTL_SECONDS = 900.0
+MAX_ENTRIES = 1024
+
+TIME_BUCKET_MINUTES = 5
+IV_STEP = 0.5
+SPOT_STEPS = {"NIFTY": 25, "FINNIFTY": 25, "MIDCPNIFTY": 10, "BANKNIFTY": 50, "SENSEX": 100, "BANKEX": 100}
+DEFAULT_SPOT_STEP_PCT = 0.1
+
+
+@dataclass(frozen=True)
+class MarketFingerprint:
+    """Quantized market state an LLM decision is valid for"""
+    namespace: str
+    symbol: str
+    spot_bucket: int
+    iv_bucket: int
+    position: str
+    time_bucket: str
+
+    @property
+    def key(self) -> str:
+        return "|".join([
+            self.namespace, self.symbol, f"s{self.spot_bucket}", f"iv{self.iv_bucket}",
+            self.position, self.time_bucket,
+        ])
+
+
+def _bucket(value: float, step: float) -> int:
+    return int(round((value or 0.0) / step)) if step > 0 else 0
+
+
+def market_fingerprint(
+    namespace: str,
+    symbol: str,
+    spot: float,
+    iv: float = 0.0,
+    position: str = "flat",
+    now: Optional[datetime] = None,
+    spot_step: Optional[float] = None,
+    iv_step: float = IV_STEP,
+    minutes: int = TIME_BUCKET_MINUTES,
+) -> MarketFingerprint:
+    """Fingerprint of a market state; equal fingerprints may share one LLM decision"""
+    symbol = symbol.upper()
+    step = spot_step or SPOT_STEPS.get(symbol) or max(1.0, round((spot or 0.0) * DEFAULT_SPOT_STEP_PCT / 100))
+    now = now or ist_now()
+    slot = (now.hour * 60 + now.minute) // minutes
+    return MarketFingerprint(
+        namespace=namespace,
+        symbol=symbol,
+        spot_bucket=_bucket(spot, step),
+        iv_bucket=_bucket(iv, iv_step),
+        position=position or "flat",
+        time_bucket=f"{now.date().isoformat()}T{slot}",
+    )
+
+
+def config_digest(config: Any) -> str:
+    """Short stable digest of the bot settings that shape a prompt"""
+    return hashlib.md5(repr(config).encode()).hexdigest()[:8]
+
+
+def prompt_key(namespace: str, prompt: str) -> str:
+    """Exact-prompt key for callers that have no market fingerprint"""
+    return f"{namespace}|prompt|{hashlib.md5(prompt.encode()).hexdigest()}"
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CACHE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class LLMDecisionCache:
+    """TTL cache with request coalescing, shared by every bot instance"""
+
+    def __init__(
+        self,
+        ttl: float = FRESH_TTL_SECONDS,
+        stale_ttl: float = STALE_TTL_SECONDS,
+        max_entries: int = MAX_ENTRIES,
+        enabled: bool = DECISION_CACHE_ENABLED,
+    ):
+        self.ttl = ttl
+        self.stale_ttl = max(stale_ttl, ttl)
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0, "failures": 0, "evictions": 0}
+
+    def _lookup(self, key: str, max_age: float) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        age = time.monotonic() - stored_at
+        if age > self.stale_ttl:
+            del self._entries[key]
+            self.stats["evictions"] += 1
+            return None
+        return value if age <= max_age else None
+
+    def get(self, key: str, ttl: Optional[float] = None) -> Optional[Any]:
+        """Fresh-tier value, or None"""
+        if not self.enabled or is_replay_active():
+            return None
+        return self._lookup(key, self.ttl if ttl is None else ttl)
+
+    def get_stale(self, key: str) -> Optional[Any]:
+        """Stale-tier value for when the LLM cannot be called, or None"""
+        if not self.enabled or is_replay_active():
+            return None
+        value = self._lookup(key, self.stale_ttl)
+        if value is not None:
+            self.stats["stale_hits"] += 1
+        return value
+
+    def put(self, key: str, value: Any):
+        if not self.enabled or value is None or is_replay_active():
+            return
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Optional[Any]]],
+        ttl: Optional[float] = None,
+    ) -> Tuple[Optional[Any], str]:
+        """
+        Cached value for `key`, else the result of `compute()` (cached unless
+        None). Returns (value, source) with source "hit", "coalesced" (joined
+        another caller's request) or "computed".
+        """
+        if not self.enabled or is_replay_active():
+            return await compute(), "computed"
+
+        value = self.get(key, ttl)
+        if value is not None:
+            self.stats["hits"] += 1
+            return value, "hit"
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(inflight), "coalesced"
+
+        self.stats["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await compute()
+        except BaseException:
+            # Waiters fall back like the caller does; the exception stays with the caller
+            future.set_result(None)
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        if value is None:
+            self.stats["failures"] += 1
+        self.put(key, value)
+        if not future.done():
+            future.set_result(value)
+        return value, "computed"
+
+    def prune(self):
+        """Drop entries past the stale tier"""
+        cutoff = time.monotonic() - self.stale_ttl
+        for key in [k for k, (stored_at, _) in self._entries.items() if stored_at < cutoff]:
+            del self._entries[key]
+            self.stats["evictions"] += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def get_status(self) -> Dict:
+        self.prune()
+        lookups = self.stats["hits"] + self.stats["coalesced"] + self.stats["misses"]
+        saved = self.stats["hits"] + self.stats["coalesced"]
+        return {
+            "enabled": self.enabled,
+            "ttl_seconds": self.ttl,
+            "stale_ttl_seconds": self.stale_ttl,
+            "entries": len(self._entries),
+            "inflight": len(self._inflight),
+            **self.stats,
+            "hit_rate": round(saved / lookups, 3) if lookups else None,
+        }
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SINGLETON
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_llm_decision_cache: Optional[LLMDecisionCache] = None
+
+
+def get_llm_decision_cache() -> LLMDecisionCache:
+    """Get or create the process-wide LLM decision cache"""
+    global _llm_decision_cache
+    if _llm_decision_cache is None:
+        _llm_decision_cache = LLMDecisionCache()
+    return _llm_decision_cache
@@ -0,0 +1,530 @@
+"""
+LLM Gateway
+===========
+One entry point for every LLM call made by the bots and advisors.
+
+The AI agent tried three Gemini models one after another and only then
+Claude, each attempt with its own 45-60s client. The advisors made single
+calls with 60-120s timeouts. One slow or rate-limited provider turned a
+bot decision into tens of seconds.
+
+    result = await get_llm_gateway().complete(
+        LLMRequest(prompt=..., system=..., json_mode=True),
+        providers=("gemini:gemini-2.5-flash", "claude:claude-sonnet-4-20250514"),
+    )
+
+- Providers are named "<kind>:<model>" (kinds: gemini, claude, openai).
+  The caller's order is its preference (cost, quality).
+- Latency-aware routing: providers with an open circuit are skipped, and a
+  provider whose p90 is more than SLOW_FACTOR x the fastest candidate's is
+  moved behind the others.
+- Hedged requests: responses are streamed. If the primary has not produced
+  its first token by its own p90 time-to-first-token, the next provider is
+  started too and the first complete response wins; the other is cancelled.
+  A provider that fails is replaced by the next one at once.
+- Circuit breakers: a 429 opens the provider's circuit for 60s; three
+  consecutive errors / timeouts open it for 30s. After the cooldown one
+  probe request is let through (half-open).
+- All requests go through the shared "llm" pool of http_clients.
+
+stream() yields text chunks from the first provider that answers, for
+callers that show partial output. Latency stats (rolling window per
+provider) are served at /api/admin/llm-gateway.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Sequence
+
+import httpx
+
+from .http_clients import get_http_client
+
+logger = logging.getLogger(__name__)
+
+LATENCY_WINDOW = 100
+MIN_SAMPLES = 5                    # samples before a provider's own percentiles are used
+DEFAULT_FIRST_TOKEN_SECONDS = 6.0  # hedge delay until a provider has enough samples
+HEDGE_MIN_SECONDS = 1.0
+HEDGE_MAX_SECONDS = 15.0
+SLOW_FACTOR = 3.0
+FAILURES_TO_OPEN = 3
+ERROR_COOLDOWN_SECONDS = 30.0
+RATE_LIMIT_COOLDOWN_SECONDS = 60.0
+REQUEST_TIMEOUT_SECONDS = float(os.getenv("LLM_REQUEST_TIMEOUT_SECONDS", "45"))
+
+GEMINI_BASE_URL = "https://generativelanguage.googleapis.com/v1beta/models"
+ANTHROPIC_URL = "https://api.anthropic.com/v1/messages"
+OPENAI_URL = "https://api.openai.com/v1/chat/completions"
+
+
+class ProviderError(Exception):
+    """Provider answered with an error (status 0 = transport / protocol error)"""
+
+    def __init__(self, status: int, message: str = ""):
+        super().__init__(f"{status}: {message}" if status else message)
+        self.status = status
+
+
+@dataclass
+class LLMRequest:
+    """Provider-neutral completion request"""
+    prompt: str = ""
+    system: str = ""
+    messages: Optional[List[Dict[str, str]]] = None  # multi-turn; overrides prompt
+    max_tokens: int = 2000
+    temperature: float = 0.2
+    json_mode: bool = False
+    api_keys: Dict[str, str] = field(default_factory=dict)  # per-kind key overrides
+
+    def chat(self) -> List[Dict[str, str]]:
+        return self.messages or [{"role": "user", "content": self.prompt}]
+
+
+@dataclass
+class LLMResult:
+    text: str
+    provider: str
+    latency_ms: float
+    first_token_ms: Optional[float] = None
+    usage: Dict[str, int] = field(default_factory=dict)
+    hedged: bool = False
+
+    @property
+    def model(self) -> str:
+        return self.provider.split(":", 1)[-1]
+
+
+async def _sse_events(response: httpx.Response) -> AsyncIterator[Dict]:
+    """JSON payloads of a server-sent event stream"""
+    async for line in response.aiter_lines():
+        if not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if not data or data == "[DONE]":
+            continue
+        try:
+            yield json.loads(data)
+        except ValueError:
+            continue
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# PROVIDERS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class LLMProvider:
+    """One model of one vendor. Subclasses stream text chunks of a completion."""
+
+    kind = ""
+    key_env = ""
+
+    def __init__(self, model: str):
+        self.model = model
+        self.name = f"{self.kind}:{model}"
+
+    def api_key(self, request: LLMRequest) -> str:
+        return request.api_keys.get(self.kind) or os.environ.get(self.key_env, "")
+
+    def configured(self, request: LLMRequest) -> bool:
+        return bool(self.api_key(request))
+
+    def stream(self, request: LLMRequest, usage: Dict[str, int]) -> AsyncIterator[str]:
+        """Text chunks of the completion; fills `usage` with input / output token counts"""
+        raise NotImplementedError
+
+    async def _post_stream(self, url: str, headers: Dict, payload: Dict) -> AsyncIterator[Dict]:
+        client = get_http_client("llm")
+        async with client.stream("POST", url, headers=headers, json=payload) as response:
+            if response.status_code != 200:
+                body = (await response.aread()).decode(errors="replace")
+                raise ProviderError(response.status_code, body[:200])
+            async for event in _sse_events(response):
+                yield event
+
+
+class GeminiProvider(LLMProvider):
+    kind = "gemini"
+    key_env = "GEMINI_API_KEY"
+
+    async def stream(self, request: LLMRequest, usage: Dict[str, int]) -> AsyncIterator[str]:
+        config: Dict[str, Any] = {"temperature": request.temperature, "maxOutputTokens": request.max_tokens}
+        if request.json_mode:
+            config["responseMimeType"] = "application/json"
+        payload: Dict[str, Any] = {
+            "contents": [
+                {"role": "model" if m["role"] == "assistant" else "user", "parts": [{"text": m["content"]}]}
+                for m in request.chat()
+            ],
+            "generationConfig": config,
+        }
+        if request.system:
+            payload["systemInstruction"] = {"parts": [{"text": request.system}]}
+        url = f"{GEMINI_BASE_URL}/{self.model}:streamGenerateContent?alt=sse&key={self.api_key(request)}"
+        async for event in self._post_stream(url, {"Content-Type": "application/json"}, payload):
+            meta = event.get("usageMetadata") or {}
+            if meta:
+                usage["input"] = meta.get("promptTokenCount", 0)
+                usage["output"] = meta.get("candidatesTokenCount", 0)
+            for candidate in event.get("candidates", [])[:1]:
+                for part in candidate.get("content", {}).get("parts", []):
+                    if part.get("text"):
+                        yield part["text"]
+
+
+class ClaudeProvider(LLMProvider):
+    kind = "claude"
+    key_env = "ANTHROPIC_API_KEY"
+
+    async def stream(self, request: LLMRequest, usage: Dict[str, int]) -> AsyncIterator[str]:
+        headers = {
+            "x-api-key": self.api_key(request),
+            "anthropic-version": "2023-06-01",
+            "content-type": "application/json",
+        }
+        payload: Dict[str, Any] = {
+            "model": self.model,
+            "max_tokens": request.max_tokens,
+            "temperature": request.temperature,
+            "messages": request.chat(),
+            "stream": True,
+        }
+        if request.system:
+            payload["system"] = request.system
+        async for event in self._post_stream(ANTHROPIC_URL, headers, payload):
+            kind = event.get("type")
+            if kind == "content_block_delta":
+                text = event.get("delta", {}).get("text")
+                if text:
+                    yield text
+            elif kind == "message_start":
+                usage["input"] = event.get("message", {}).get("usage", {}).get("input_tokens", 0)
+            elif kind == "message_delta":
+                usage["output"] = event.get("usage", {}).get("output_tokens", 0)
+            elif kind == "error":
+                error = event.get("error", {})
+                raise ProviderError(529 if error.get("type") == "overloaded_error" else 0, error.get("message", ""))
+
+
+class OpenAIProvider(LLMProvider):
+    kind = "openai"
+    key_env = "OPENAI_API_KEY"
+
+    async def stream(self, request: LLMRequest, usage: Dict[str, int]) -> AsyncIterator[str]:
+        headers = {"Authorization": f"Bearer {self.api_key(request)}", "Content-Type": "application/json"}
+        messages = request.chat()
+        if request.system:
+            messages = [{"role": "system", "content": request.system}] + messages
+        payload: Dict[str, Any] = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": request.temperature,
+            "max_tokens": request.max_tokens,
+            "stream": True,
+            "stream_options": {"include_usage": True},
+        }
+        if request.json_mode:
+            payload["response_format"] = {"type": "json_object"}
+        async for event in self._post_stream(OPENAI_URL, headers, payload):
+            if event.get("usage"):
+                usage["input"] = event["usage"].get("prompt_tokens", 0)
+                usage["output"] = event["usage"].get("completion_tokens", 0)
+            for choice in event.get("choices", [])[:1]:
+                text = (choice.get("delta") or {}).get("content")
+                if text:
+                    yield text
+
+
+PROVIDER_KINDS = {cls.kind: cls for cls in (GeminiProvider, ClaudeProvider, OpenAIProvider)}
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# STATS / CIRCUIT BREAKERS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+def _percentile(samples: Sequence[float], q: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class ProviderStats:
+    """Rolling latency window and circuit breaker of one provider"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latency: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.first_token: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.successes = 0
+        self.failures = 0
+        self.rate_limited = 0
+        self.cancelled = 0
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.probing = False
+
+    @property
+    def state(self) -> CircuitState:
+        if self.open_until and time.monotonic() < self.open_until:
+            return CircuitState.OPEN
+        return CircuitState.HALF_OPEN if self.open_until else CircuitState.CLOSED
+
+    def allow(self) -> bool:
+        """Whether a request may be sent (one probe at a time when half-open)"""
+        state = self.state
+        if state == CircuitState.OPEN:
+            return False
+        return state == CircuitState.CLOSED or not self.probing
+
+    def p90(self) -> Optional[float]:
+        return _percentile(self.latency, 0.9) if len(self.latency) >= MIN_SAMPLES else None
+
+    def hedge_delay(self) -> float:
+        """Seconds to wait for the first token before starting a backup request"""
+        if len(self.first_token) >= MIN_SAMPLES:
+            delay = _percentile(self.first_token, 0.9)
+        else:
+            delay = DEFAULT_FIRST_TOKEN_SECONDS
+        return min(max(delay, HEDGE_MIN_SECONDS), HEDGE_MAX_SECONDS)
+
+    def record_success(self, latency: float, first_token: Optional[float]):
+        self.successes += 1
+        self.latency.append(latency)
+        if first_token is not None:
+            self.first_token.append(first_token)
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.probing = False
+
+    def record_failure(self, status: int):
+        self.failures += 1
+        self.probing = False
+        if status == 429:
+            self.rate_limited += 1
+            self._open(RATE_LIMIT_COOLDOWN_SECONDS)
+            return
+        if 400 <= status < 500:
+            return  # the request was bad, not the provider
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= FAILURES_TO_OPEN or self.state == CircuitState.HALF_OPEN:
+            self._open(ERROR_COOLDOWN_SECONDS)
+
+    def _open(self, cooldown: float):
+        self.open_until = time.monotonic() + cooldown
+        logger.warning("LLM provider %s circuit open for %.0fs", self.name, cooldown)
+
+    def to_dict(self) -> Dict:
+        to_ms = lambda value: round(value * 1000) if value is not None else None
+        return {
+            "state": self.state.value,
+            "successes": self.successes,
+            "failures": self.failures,
+            "rate_limited": self.rate_limited,
+            "cancelled": self.cancelled,
+            "p50_ms": to_ms(_percentile(self.latency, 0.5)),
+            "p90_ms": to_ms(_percentile(self.latency, 0.9)),
+            "first_token_p90_ms": to_ms(_percentile(self.first_token, 0.9)),
+            "hedge_after_ms": to_ms(self.hedge_delay()),
+            "samples": len(self.latency),
+        }
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# GATEWAY
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class LLMGateway:
+    """Routes, hedges and meters LLM requests across providers"""
+
+    def __init__(self, timeout: float = REQUEST_TIMEOUT_SECONDS):
+        self.timeout = timeout
+        self._providers: Dict[str, LLMProvider] = {}
+        self._stats: Dict[str, ProviderStats] = {}
+        self.counters = {"requests": 0, "failed": 0, "hedged": 0, "hedge_wins": 0, "failovers": 0}
+
+    def register(self, provider: LLMProvider):
+        self._providers[provider.name] = provider
+        self._stats.setdefault(provider.name, ProviderStats(provider.name))
+
+    def provider(self, name: str) -> LLMProvider:
+        """Provider by "<kind>:<model>" name, created on first use"""
+        if name not in self._providers:
+            kind, _, model = name.partition(":")
+            if kind not in PROVIDER_KINDS or not model:
+                raise ValueError(f"Unknown LLM provider {name!r}")
+            self.register(PROVIDER_KINDS[kind](model))
+        return self._providers[name]
+
+    def stats(self, name: str) -> ProviderStats:
+        self.provider(name)
+        return self._stats[name]
+
+    def route(self, providers: Sequence[str], request: LLMRequest) -> List[str]:
+        """Configured providers with a closed / probing circuit, unusually slow ones last"""
+        usable = [
+            name for name in providers
+            if self.provider(name).configured(request) and self._stats[name].allow()
+        ]
+        p90s = [p for p in (self._stats[name].p90() for name in usable) if p is not None]
+        if not p90s:
+            return usable
+        limit = min(p90s) * SLOW_FACTOR
+        fast = [name for name in usable if (self._stats[name].p90() or 0) <= limit]
+        return fast + [name for name in usable if name not in fast]
+
+    async def _attempt(self, name: str, request: LLMRequest, started: asyncio.Event) -> Optional[LLMResult]:
+        """Run one provider to completion; None on failure. Sets `started` at the first token."""
+        provider, stats = self._providers[name], self._stats[name]
+        if stats.state == CircuitState.HALF_OPEN:
+            stats.probing = True
+        begin = time.monotonic()
+        first_token = None
+        chunks: List[str] = []
+        usage: Dict[str, int] = {}
+        try:
+            async for chunk in provider.stream(request, usage):
+                if first_token is None:
+                    first_token = time.monotonic() - begin
+                    started.set()
+                chunks.append(chunk)
+            if not chunks:
+                raise ProviderError(0, "empty response")
+        except asyncio.CancelledError:
+            stats.cancelled += 1
+            stats.probing = False
+            raise
+        except Exception as e:
+            status = e.status if isinstance(e, ProviderError) else 0
+            logger.warning("LLM provider %s failed after %.1fs: %s", name, time.monotonic() - begin, e)
+            stats.record_failure(status)
+            return None
+        latency = time.monotonic() - begin
+        stats.record_success(latency, first_token)
+        return LLMResult(
+            text="".join(chunks),
+            provider=name,
+            latency_ms=round(latency * 1000, 1),
+            first_token_ms=round(first_token * 1000, 1) if first_token is not None else None,
+            usage=usage,
+        )
+
+    async def complete(
+        self,
+        request: LLMRequest,
+        providers: Sequence[str],
+        timeout: Optional[float] = None,
+        hedge: bool = True,
+    ) -> Optional[LLMResult]:
+        """
+        Completion from the first provider that answers: backup started when the
+        primary has no first token by its p90, next provider on failure.
+        None if every provider failed, is unconfigured or has an open circuit.
+        """
+        self.counters["requests"] += 1
+        queue = self.route(providers, request)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (timeout or self.timeout)
+        pending: Dict[asyncio.Task, str] = {}
+        first_tokens: Dict[str, asyncio.Event] = {}
+        hedged = False
+
+        def launch():
+            name = queue.pop(0)
+            first_tokens[name] = asyncio.Event()
+            pending[asyncio.create_task(self._attempt(name, request, first_tokens[name]))] = name
+
+        try:
+            if queue:
+                launch()
+            while pending:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                wait = remaining
+                primary = next(iter(pending.values()))
+                can_hedge = hedge and queue and len(pending) == 1 and not first_tokens[primary].is_set()
+                if can_hedge:
+                    wait = min(remaining, self._stats[primary].hedge_delay())
+                done, _ = await asyncio.wait(list(pending), timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if can_hedge and not first_tokens[primary].is_set():
+                        hedged = True
+                        self.counters["hedged"] += 1
+                        logger.info("LLM %s slow to respond, hedging with %s", primary, queue[0])
+                        launch()
+                    continue
+                for task in done:
+                    pending.pop(task)
+                    result = task.result()
+                    if result is not None:
+                        result.hedged = hedged
+                        if hedged and result.provider != primary:
+                            self.counters["hedge_wins"] += 1
+                        return result
+                if not pending and queue:
+                    self.counters["failovers"] += 1
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+        self.counters["failed"] += 1
+        return None
+
+    async def stream(self, request: LLMRequest, providers: Sequence[str]) -> AsyncIterator[str]:
+        """Text chunks from the first routed provider that answers (failover before the first chunk only)"""
+        self.counters["requests"] += 1
+        for name in self.route(providers, request):
+            provider, stats = self._providers[name], self._stats[name]
+            begin = time.monotonic()
+            first_token = None
+            try:
+                async for chunk in provider.stream(request, {}):
+                    if first_token is None:
+                        first_token = time.monotonic() - begin
+                    yield chunk
+            except Exception as e:
+                stats.record_failure(e.status if isinstance(e, ProviderError) else 0)
+                if first_token is not None:
+                    raise
+                self.counters["failovers"] += 1
+                continue
+            if first_token is None:
+                stats.record_failure(0)
+                continue
+            stats.record_success(time.monotonic() - begin, first_token)
+            return
+        self.counters["failed"] += 1
+
+    def get_status(self) -> Dict:
+        return {
+            **self.counters,
+            "providers": {name: stats.to_dict() for name, stats in sorted(self._stats.items())},
+        }
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SINGLETON
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_llm_gateway: Optional[LLMGateway] = None
+
+
+def get_llm_gateway() -> LLMGateway:
+    """Get or create the process-wide LLM gateway"""
+    global _llm_gateway
+    if _llm_gateway is None:
+        _llm_gateway = LLMGateway()
+    return _llm_gateway
@@ -0,0 +1,475 @@
+"""
+Market Frame
+============
+Columnar in-memory snapshot of the F&O universe shared by every scanner.
+
+Instead of each endpoint fetching its own list of per-stock dicts and
+normalizing them again, one background ingestor fetches the universe,
+normalizes it once into numpy arrays (one per field, plus a symbol -> row
+index) and publishes the result as an immutable, versioned MarketFrame.
+Readers grab the current frame reference and do pure computation on warm
+arrays; a refresh swaps the reference atomically, so a reader never sees a
+half-updated universe.
+
+    frame = await get_market_frame()           # current snapshot (refreshes if stale)
+    mask = frame.mask(min_price=100)
+    records = frame.filter(mask).to_records()  # scanner-format dicts
+"""
+
+import asyncio
+import inspect
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+REFRESH_SECONDS = float(os.environ.get("MARKET_FRAME_REFRESH_SECONDS", "60"))
+RETRY_SECONDS = 15  # After a failed refresh, readers use the old frame this long before retrying
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# FIELDS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# Scanner record layout (same keys and order as the normalized stock dicts the
+# scanners have always consumed). Numeric columns are float64 except volume
+# (int64); symbol, security_id, sector, name and data_source are object columns.
+RECORD_FIELDS = (
+    "symbol", "security_id", "ltp", "price", "prev_close", "open", "high", "low", "close",
+    "change_percent", "volume", "avg_volume", "volume_ratio", "vwap",
+    "ema8", "ema20", "ema21", "ema50", "ema55", "ema200",
+    "rsi", "adx", "mfi", "atr", "support", "resistance", "sector",
+)
+
+
+def _pick(records: Sequence[Dict], keys: Sequence[str], default: Any = 0.0) -> np.ndarray:
+    """First truthy value among keys for every record, as float64 (NaN if none)"""
+    out = np.full(len(records), np.nan)
+    for i, record in enumerate(records):
+        for key in keys:
+            value = record.get(key)
+            if value:
+                try:
+                    out[i] = float(value)
+                except (TypeError, ValueError):
+                    continue
+                break
+    if default is not None:
+        out = np.where(np.isnan(out), default, out)
+    return out
+
+
+def _chain(records: Sequence[Dict], keys: Sequence[str], fallback: np.ndarray) -> np.ndarray:
+    """`r.get(k1) or ... or r.get(kn, fallback)` for every record, as float64"""
+    out = np.array(fallback, dtype=float)
+    *aliases, last = keys
+    for i, record in enumerate(records):
+        for key in aliases:
+            value = record.get(key)
+            if value:
+                out[i] = float(value)
+                break
+        else:
+            if last in record:
+                out[i] = float(record[last] or 0)
+    return out
+
+
+def _fill(values: np.ndarray, fallback: np.ndarray) -> np.ndarray:
+    """Replace missing / zero values with fallback"""
+    missing = np.isnan(values) | (values == 0)
+    return np.where(missing, fallback, values)
+
+
+class MarketFrame:
+    """
+    Immutable columnar snapshot of the stock universe.
+
+    Attributes:
+        version: Monotonic publish counter (0 for ad-hoc frames)
+        built_at: Wall-clock build time
+        source: Where the data came from (dhan, nse_india, ...)
+        symbols: Row order (object array)
+        index: symbol -> row
+    """
+
+    __slots__ = ("version", "built_at", "built_monotonic", "source", "columns", "symbols", "index")
+
+    def __init__(self, columns: Dict[str, np.ndarray], version: int = 0, source: str = "unknown",
+                 built_at: datetime = None, built_monotonic: float = None):
+        for array in columns.values():
+            array.setflags(write=False)
+        self.columns = columns
+        self.version = version
+        self.source = source
+        self.built_at = built_at or datetime.now()
+        self.built_monotonic = built_monotonic if built_monotonic is not None else time.monotonic()
+        self.symbols = columns["symbol"]
+        self.index = {symbol: row for row, symbol in enumerate(self.symbols.tolist())}
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Construction
+    # ─────────────────────────────────────────────────────────────────────────
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict], version: int = 0, source: str = None,
+                     sectors: Dict[str, str] = None) -> "MarketFrame":
+        """
+        Normalize raw stock dicts (Dhan, NSE, Yahoo or cache layouts) into a frame.
+
+        Field aliases and fallbacks follow the scanners' normalization: missing
+        EMAs are approximated from LTP, VWAP from the day's typical price, ADX
+        from the day range and ATR from high - low. Later duplicates of a
+        symbol replace earlier ones.
+        """
+        by_symbol: Dict[str, Dict] = {}
+        for record in records:
+            if record:
+                by_symbol[str(record.get("symbol", "")).replace(".NS", "")] = record
+        symbols = list(by_symbol)
+        raw = list(by_symbol.values())
+        sectors = sectors or {}
+        if source is None:
+            source = str(raw[0].get("data_source") or raw[0].get("source") or "unknown") if raw else "empty"
+
+        ltp = _pick(raw, ("ltp", "price", "close"))
+        prev_close = _chain(raw, ("prev_close", "previousClose", "prevClose"), ltp)
+
+        change_pct = _pick(raw, ("change_percent", "change_pct"))
+        computed = (prev_close != 0) & (ltp != 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            change_pct = np.where((change_pct == 0) & computed, (ltp - prev_close) / prev_close * 100, change_pct)
+
+        volume = _pick(raw, ("volume",))
+        avg_volume = _chain(raw, ("avg_volume", "averageVolume", "avgVolume"), volume)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            volume_ratio = np.where(avg_volume > 0, volume / avg_volume, 1.0)
+
+        high = _chain(raw, ("high", "dayHigh"), ltp)
+        low = _chain(raw, ("low", "dayLow"), ltp)
+        open_price = _chain(raw, ("open", "openPrice"), ltp)
+        has_range = (high != 0) & (low != 0)
+
+        vwap = _pick(raw, ("vwap",))
+        vwap = np.where((vwap == 0) & has_range & (ltp != 0), (high + low + ltp) / 3, vwap)
+
+        ema8 = _fill(_pick(raw, ("ema8", "ema_8"), default=None), ltp * 0.995)
+        ema21 = _fill(_pick(raw, ("ema21", "ema_21"), default=None), ltp * 0.99)
+        ema55 = _fill(_pick(raw, ("ema55", "ema_55"), default=None), ltp * 0.98)
+        ema20 = _fill(_pick(raw, ("ema20", "ema_20"), default=None), ema21)
+        ema50 = _fill(_pick(raw, ("ema50", "ema_50"), default=None), ema55)
+        ema200 = _fill(_pick(raw, ("ema200", "ema_200"), default=None), ltp * 0.95)
+
+        rsi = np.array([float(r.get("rsi", 50) or r.get("RSI", 50) or 50) for r in raw])
+        adx = _pick(raw, ("adx", "ADX"))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            range_pct = np.where(ltp > 0, (high - low) / ltp * 100, 0.0)
+        adx = np.where((adx == 0) & has_range & (ltp != 0), np.clip(range_pct * 10, 15, 50), adx)
+
+        atr = _pick(raw, ("atr", "ATR"))
+        atr = np.where((atr == 0) & has_range, high - low, atr)
+
+        def objects(values: List[Any]) -> np.ndarray:
+            array = np.empty(len(values), dtype=object)
+            array[:] = values
+            return array
+
+        columns = {
+            "symbol": objects(symbols),
+            "security_id": objects([r.get("security_id") for r in raw]),
+            "ltp": ltp,
+            "price": ltp,
+            "prev_close": prev_close,
+            "open": open_price,
+            "high": high,
+            "low": low,
+            "close": ltp,
+            "change_percent": np.round(change_pct, 2),
+            "volume": volume.astype(np.int64),
+            "avg_volume": avg_volume,
+            "volume_ratio": np.round(volume_ratio, 2),
+            "vwap": np.round(vwap, 2),
+            "ema8": ema8,
+            "ema20": ema20,
+            "ema21": ema21,
+            "ema50": ema50,
+            "ema55": ema55,
+            "ema200": ema200,
+            "rsi": rsi,
+            "adx": adx,
+            "mfi": _pick(raw, ("mfi", "MFI")),
+            "atr": atr,
+            "support": _fill(_pick(raw, ("support",), default=None), low),
+            "resistance": _fill(_pick(raw, ("resistance",), default=None), high),
+            "sector": objects([r.get("sector") or sectors.get(s, "Unknown") for s, r in zip(symbols, raw)]),
+            "name": objects([r.get("name") or s for s, r in zip(symbols, raw)]),
+            "data_source": objects([r.get("data_source") or r.get("source") or source for r in raw]),
+            "oi": _pick(raw, ("oi",)),
+            "oi_change": _pick(raw, ("oi_change",)),
+        }
+        return cls(columns, version=version, source=source)
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Access
+    # ─────────────────────────────────────────────────────────────────────────
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.index
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        return self.columns[field]
+
+    @property
+    def age_seconds(self) -> float:
+        return time.monotonic() - self.built_monotonic
+
+    def rows_for(self, symbols: Iterable[str]) -> Tuple[np.ndarray, List[str]]:
+        """Row indices for the symbols present, and the symbols that are missing"""
+        rows, missing = [], []
+        for symbol in symbols:
+            row = self.index.get(symbol.upper().replace(".NS", ""))
+            if row is None:
+                missing.append(symbol)
+            else:
+                rows.append(row)
+        return np.array(rows, dtype=np.intp), missing
+
+    def mask(self, min_price: float = None, max_price: float = None, min_volume: float = None,
+             sectors: Sequence[str] = None) -> np.ndarray:
+        """Boolean row mask for the common scanner filters"""
+        keep = np.ones(len(self), dtype=bool)
+        if min_price:
+            keep &= self.columns["ltp"] >= min_price
+        if max_price:
+            keep &= self.columns["ltp"] <= max_price
+        if min_volume:
+            keep &= self.columns["volume"] >= min_volume
+        if sectors:
+            keep &= np.isin(self.columns["sector"], list(sectors))
+        return keep
+
+    def filter(self, rows: Union[np.ndarray, Sequence[int]]) -> "MarketFrame":
+        """Sub-frame for a boolean mask or row indices (same version)"""
+        rows = np.asarray(rows)
+        columns = {name: array[rows] for name, array in self.columns.items()}
+        return MarketFrame(columns, version=self.version, source=self.source,
+                           built_at=self.built_at, built_monotonic=self.built_monotonic)
+
+    def to_records(self, rows: Union[np.ndarray, Sequence[int]] = None) -> List[Dict]:
+        """Scanner-format dicts (RECORD_FIELDS) for all rows or the given rows"""
+        return self._materialize(RECORD_FIELDS, rows)
+
+    def to_quotes(self, rows: Union[np.ndarray, Sequence[int]] = None) -> List[Dict]:
+        """Quote dicts in the layout server.fetch_stock_data returns"""
+        fields = ("symbol", "name", "ltp", "change_percent", "volume", "avg_volume", "volume_ratio",
+                  "ema50", "ema200", "prev_close", "oi_change", "high", "low", "open", "data_source")
+        keys = ("symbol", "name", "price", "change_pct", "volume", "avg_volume", "volume_ratio",
+                "ema_50", "ema_200", "prev_close", "oi_change", "high", "low", "open", "source")
+        return [dict(zip(keys, values)) for values in self._values(fields, rows)]
+
+    def to_pandas(self):
+        """All columns as a DataFrame indexed by symbol"""
+        import pandas as pd
+        return pd.DataFrame({name: array for name, array in self.columns.items()}).set_index("symbol", drop=False)
+
+    def _values(self, fields: Sequence[str], rows) -> Iterable[tuple]:
+        columns = [self.columns[f] if rows is None else self.columns[f][np.asarray(rows)] for f in fields]
+        return zip(*(column.tolist() for column in columns))
+
+    def _materialize(self, fields: Sequence[str], rows) -> List[Dict]:
+        return [dict(zip(fields, values)) for values in self._values(fields, rows)]
+
+
+def as_stock_records(stocks: Union["MarketFrame", List[Dict]]) -> List[Dict]:
+    """Scanner input as a list of dicts, whether given a frame or dicts"""
+    if isinstance(stocks, MarketFrame):
+        return stocks.to_records()
+    return stocks or []
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# INGESTOR
+# ═══════════════════════════════════════════════════════════════════════════════
+
+Fetcher = Callable[[Optional[List[str]]], Awaitable[List[Dict]]]
+Listener = Callable[[MarketFrame], Any]
+
+
+class MarketFrameIngestor:
+    """
+    Fetches the universe on a timer and publishes immutable MarketFrames.
+
+    Args:
+        fetcher: async fn(symbols) -> list of stock dicts. Defaults to the Dhan
+            unified service (NSE fallback inside), then the unified cache.
+        interval: Background refresh period in seconds
+    """
+
+    def __init__(self, fetcher: Fetcher = None, interval: float = REFRESH_SECONDS):
+        self.fetcher = fetcher or self._default_fetcher
+        self.interval = interval
+        self.symbols: Optional[List[str]] = None
+        self.sectors: Dict[str, str] = {}
+        self._frame: Optional[MarketFrame] = None
+        self._version = 0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._listeners: List[Listener] = []
+        self.last_error: Optional[str] = None
+        self._last_failure = float("-inf")
+
+    @property
+    def frame(self) -> Optional[MarketFrame]:
+        """Latest published frame (None before the first refresh)"""
+        return self._frame
+
+    def configure(self, symbols: List[str] = None, sectors: Dict[str, str] = None):
+        """Set the universe and symbol -> sector map used by the next refresh"""
+        if symbols is not None:
+            self.symbols = [s.upper().replace(".NS", "") for s in symbols]
+        if sectors is not None:
+            self.sectors = {s.upper().replace(".NS", ""): sector for s, sector in sectors.items()}
+
+    def add_listener(self, listener: Listener):
+        """Call listener(frame) after every publish (sync or async)"""
+        self._listeners.append(listener)
+
+    def is_stale(self, max_age: float = None) -> bool:
+        max_age = self.interval if max_age is None else max_age
+        return self._frame is None or self._frame.age_seconds > max_age
+
+    async def get_frame(self, max_age: float = None) -> MarketFrame:
+        """Current frame, refreshing first if there is none or it is older than max_age"""
+        max_age = self.interval if max_age is None else max_age
+        if self.is_stale(max_age) and time.monotonic() - self._last_failure > RETRY_SECONDS:
+            await self.refresh(max_age=max_age)
+        return self._frame if self._frame is not None else MarketFrame.from_records([], source="empty")
+
+    async def refresh(self, max_age: float = None) -> Optional[MarketFrame]:
+        """
+        Fetch, build and publish a new frame. Concurrent callers share one
+        fetch: whoever waited on the lock returns the frame just published.
+        """
+        async with self._lock:
+            if max_age is not None and not self.is_stale(max_age):
+                return self._frame
+
+            try:
+                records = await self.fetcher(self.symbols)
+            except Exception as e:
+                self.last_error = str(e)
+                self._last_failure = time.monotonic()
+                logger.error(f"Market frame fetch error: {e}")
+                return self._frame
+
+            if not records:
+                self.last_error = "no data"
+                self._last_failure = time.monotonic()
+                logger.warning("Market frame refresh returned no stocks - keeping previous frame")
+                return self._frame
+
+            self._version += 1
+            frame = MarketFrame.from_records(records, version=self._version, sectors=self.sectors)
+            self._frame = frame
+            self.last_error = None
+            logger.info(f"📦 Market frame v{frame.version}: {len(frame)} stocks from {frame.source}")
+
+        await self._notify(frame)
+        return frame
+
+    async def _notify(self, frame: MarketFrame):
+        for listener in self._listeners:
+            try:
+                result = listener(frame)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.error(f"Market frame listener error: {e}", exc_info=True)
+
+    @staticmethod
+    async def _default_fetcher(symbols: Optional[List[str]]) -> List[Dict]:
+        try:
+            from services.dhan_unified_service import get_dhan_unified_service
+            from services.rate_limiter import Priority
+            # Background refresh: yields the quote budget to orders and user requests
+            stocks = await get_dhan_unified_service().get_fno_stocks_data(symbols, Priority.LOW)
+            if stocks:
+                return stocks
+        except Exception as e:
+            logger.warning(f"Market frame: Dhan fetch failed: {e}")
+
+        from services.unified_data_service import get_unified_service
+        unified = get_unified_service()
+        if not unified.get_all_stocks():
+            await unified.fetch_all_stocks()
+        return unified.get_all_stocks()
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Background refresh
+    # ─────────────────────────────────────────────────────────────────────────
+
+    async def _refresh_loop(self):
+        logger.info(f"🔄 Market frame ingestor started (every {self.interval:.0f}s)")
+        while True:
+            try:
+                await self.refresh()
+                await asyncio.sleep(self.interval)
+            except asyncio.CancelledError:
+                logger.info("Market frame ingestor cancelled")
+                break
+            except Exception as e:
+                logger.error(f"Market frame ingestor error: {e}")
+                await asyncio.sleep(30)
+
+    def start(self):
+        """Start the background refresh task"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        """Stop the background refresh task"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def get_status(self) -> Dict:
+        frame = self._frame
+        return {
+            "version": frame.version if frame else 0,
+            "stock_count": len(frame) if frame else 0,
+            "source": frame.source if frame else None,
+            "built_at": frame.built_at.isoformat() if frame else None,
+            "age_seconds": round(frame.age_seconds, 1) if frame else None,
+            "refresh_seconds": self.interval,
+            "running": self._task is not None and not self._task.done(),
+            "last_error": self.last_error,
+        }
+
+
+# Singleton instance
+_ingestor: Optional[MarketFrameIngestor] = None
+
+
+def get_market_frame_ingestor() -> MarketFrameIngestor:
+    """Get or create the market frame ingestor singleton"""
+    global _ingestor
+    if _ingestor is None:
+        _ingestor = MarketFrameIngestor()
+    return _ingestor
+
+
+async def get_market_frame(max_age: float = None) -> MarketFrame:
+    """Current market frame, refreshed first if stale"""
+    return await get_market_frame_ingestor().get_frame(max_age)
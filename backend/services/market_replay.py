@@ -0,0 +1,680 @@
+# backend/services/market_replay.py
+"""
+Market Replay Simulator
+=======================
+Deterministic intraday replay of stored bars / ticks and option-chain
+snapshots for the trading bots.
+
+MockDataService.tick invents random moves, so a mock run never reproduces a
+real session. MarketReplay instead streams a recorded session through the
+same interfaces the bots already consume:
+
+- VWAPTradingBot / AIStrangleBot  -> bot.mock_service  (ReplayDataService)
+- AIDeltaStrangleBot              -> bot.broker_service (ReplayBroker)
+
+Time is taken from a VirtualClock. While a replay is active the bots'
+get_ist_now() returns simulated IST, so _is_market_hours / entry / exit /
+square-off checks follow the replayed session instead of the wall clock.
+
+Speed:
+- speed=0   as fast as possible (clock jumps straight to the next wake-up)
+- speed=N   N x real time (speed=60 -> one market minute per second)
+
+Session format (JSON file):
+    {
+        "date": "2026-01-15",
+        "bars": {"RELIANCE": [{"timestamp": "2026-01-15T09:15:00", "open": .., "high": ..,
+                               "low": .., "close": .., "volume": ..}, ...],
+                 "NIFTY": [...], "BANKNIFTY": [...], "INDIAVIX": [...]},
+        "prev_close": {"RELIANCE": 2440.5},           # optional
+        "avg_volume": {"RELIANCE": 3500000},          # optional
+        "atr_20": {"NIFTY": 210.0},                   # optional
+        "event_day": false,                           # optional
+        "option_chains": [{"timestamp": "...", "symbol": "NIFTY", "expiry": "2026-01-20",
+                           "spot": .., "lot_size": 65,
+                           "strikes": [{"strike": .., "ce_ltp": .., "ce_iv": .., "ce_oi": ..,
+                                        "ce_delta": .., "pe_ltp": .., ...}]}]
+    }
+
+or a directory with one <SYMBOL>.csv per instrument (timestamp,open,high,low,close,volume
+or timestamp,ltp,volume for ticks), an optional option_chains.json list and an
+optional meta.json holding the optional keys above.
+
+Bars are applied when they close (timestamp + bar interval), never earlier,
+so a bot can't see a bar before it would have existed live.
+"""
+
+import asyncio
+import bisect
+import csv
+import heapq
+import itertools
+import json
+import logging
+import math
+import time as time_module
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from .mock_data_service import MockDataService, MarketScenario
+from .streaming_indicators import SessionVWAP
+
+logger = logging.getLogger(__name__)
+
+# IST timezone (UTC+5:30)
+IST = timezone(timedelta(hours=5, minutes=30))
+
+# Instruments treated as indices rather than tradable stocks
+INDEX_SYMBOLS = {"NIFTY", "BANKNIFTY", "FINNIFTY", "MIDCPNIFTY", "SENSEX", "INDIAVIX"}
+
+# Trading minutes per year, used to annualise realised volatility
+MINUTES_PER_YEAR = 252 * 375
+
+
+def _parse_timestamp(value: Union[str, int, float, datetime]) -> datetime:
+    """Parse ISO string / epoch seconds / datetime into an aware IST datetime"""
+    if isinstance(value, datetime):
+        ts = value
+    elif isinstance(value, (int, float)):
+        ts = datetime.fromtimestamp(value, IST)
+    else:
+        ts = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=IST)  # Stored sessions are recorded in exchange time
+    return ts.astimezone(IST)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# VIRTUAL CLOCK
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class VirtualClock:
+    """
+    Simulated IST clock.
+
+    With speed > 0 simulated time runs at a fixed multiple of real time.
+    With speed == 0 time only moves when every sleeper is waiting: the
+    earliest sleeper is woken and the clock jumps to its wake time, so a
+    full session replays as fast as the bots can process it.
+    """
+
+    # Event loop turns to let runnable tasks reach their next sleep before
+    # the clock jumps forward (speed == 0 only)
+    IDLE_YIELDS = 5
+
+    def __init__(self, start: datetime, speed: float = 0.0):
+        self.speed = max(0.0, float(speed))
+        self._now = _parse_timestamp(start)
+        self._real_anchor = time_module.monotonic()
+        self._sleepers: List = []
+        self._seq = itertools.count()
+        self._pump_task: Optional[asyncio.Task] = None
+
+    def now(self) -> datetime:
+        if self.speed > 0:
+            elapsed = (time_module.monotonic() - self._real_anchor) * self.speed
+            return self._now + timedelta(seconds=elapsed)
+        return self._now
+
+    def advance_to(self, ts: datetime):
+        """Move the clock forward to ts (never backwards)"""
+        ts = _parse_timestamp(ts)
+        if ts > self.now():
+            self._now = ts
+            self._real_anchor = time_module.monotonic()
+
+    def rewind(self, ts: datetime):
+        """Reset the clock to ts (used when a replay is restarted)"""
+        self._now = _parse_timestamp(ts)
+        self._real_anchor = time_module.monotonic()
+
+    def advance(self, seconds: float):
+        self.advance_to(self.now() + timedelta(seconds=seconds))
+
+    async def sleep(self, seconds: float):
+        """Sleep for `seconds` of simulated time"""
+        seconds = max(0.0, float(seconds))
+        if self.speed > 0:
+            await asyncio.sleep(seconds / self.speed)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._sleepers, (self.now() + timedelta(seconds=seconds), next(self._seq), future))
+        if self._pump_task is None or self._pump_task.done():
+            self._pump_task = asyncio.create_task(self._pump())
+        await future
+
+    async def _pump(self):
+        """Wake sleepers in wake-time order once the loop has gone idle"""
+        while self._sleepers:
+            for _ in range(self.IDLE_YIELDS):
+                await asyncio.sleep(0)
+            wake_at, _, future = heapq.heappop(self._sleepers)
+            if future.done():
+                continue
+            self.advance_to(wake_at)
+            future.set_result(None)
+
+
+_active_clock: Optional[VirtualClock] = None
+
+
+def set_active_clock(clock: Optional[VirtualClock]):
+    """Install (or clear with None) the process-wide simulated clock"""
+    global _active_clock
+    _active_clock = clock
+
+
+def get_active_clock() -> Optional[VirtualClock]:
+    return _active_clock
+
+
+def is_replay_active() -> bool:
+    return _active_clock is not None
+
+
+def ist_now() -> datetime:
+    """Current IST time - simulated while a replay is active"""
+    if _active_clock is not None:
+        return _active_clock.now()
+    return datetime.now(IST)
+
+
+async def clock_sleep(seconds: float):
+    """asyncio.sleep that follows the simulated clock while a replay is active"""
+    if _active_clock is not None:
+        await _active_clock.sleep(seconds)
+    else:
+        await asyncio.sleep(seconds)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SESSION DATA
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@dataclass
+class ReplayBar:
+    symbol: str
+    start: datetime
+    available_at: datetime
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+
+
+@dataclass
+class ReplaySession:
+    """One recorded trading day"""
+    date: str
+    bars: Dict[str, List[ReplayBar]]
+    option_chains: Dict[str, List[Dict]] = field(default_factory=dict)
+    prev_close: Dict[str, float] = field(default_factory=dict)
+    avg_volume: Dict[str, float] = field(default_factory=dict)
+    atr_20: Dict[str, float] = field(default_factory=dict)
+    event_day: bool = False
+
+    @property
+    def start(self) -> datetime:
+        times = [bars[0].available_at for bars in self.bars.values() if bars]
+        times += [chains[0]["_ts"] for chains in self.option_chains.values() if chains]
+        return min(times)
+
+    @property
+    def end(self) -> datetime:
+        times = [bars[-1].available_at for bars in self.bars.values() if bars]
+        times += [chains[-1]["_ts"] for chains in self.option_chains.values() if chains]
+        return max(times)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ReplaySession":
+        bars = {
+            symbol.upper(): _build_bars(symbol.upper(), rows)
+            for symbol, rows in data.get("bars", {}).items()
+            if rows
+        }
+        if not bars:
+            raise ValueError("Replay session has no bars")
+
+        chains: Dict[str, List[Dict]] = {}
+        for snapshot in data.get("option_chains", []):
+            snapshot = dict(snapshot)
+            snapshot["_ts"] = _parse_timestamp(snapshot["timestamp"])
+            chains.setdefault(snapshot.get("symbol", "NIFTY").upper(), []).append(snapshot)
+        for snapshots in chains.values():
+            snapshots.sort(key=lambda s: s["_ts"])
+
+        session_date = data.get("date")
+        if not session_date:
+            first = min((b[0].start for b in bars.values() if b), default=datetime.now(IST))
+            session_date = first.strftime("%Y-%m-%d")
+
+        return cls(
+            date=session_date,
+            bars=bars,
+            option_chains=chains,
+            prev_close=_symbol_floats(data.get("prev_close")),
+            avg_volume=_symbol_floats(data.get("avg_volume")),
+            atr_20=_symbol_floats(data.get("atr_20")),
+            event_day=bool(data.get("event_day", False)),
+        )
+
+
+def _symbol_floats(values: Optional[Dict[str, Any]]) -> Dict[str, float]:
+    return {symbol.upper(): float(v) for symbol, v in (values or {}).items()}
+
+
+def _build_bars(symbol: str, rows: List[Dict[str, Any]]) -> List[ReplayBar]:
+    """Normalise bar or tick rows; bars become visible when they close"""
+    parsed = []
+    for row in rows:
+        ts = _parse_timestamp(row.get("timestamp") or row.get("time") or row.get("datetime"))
+        if row.get("ltp") not in (None, ""):
+            price = float(row["ltp"])
+            o = h = l = c = price
+            volume = float(row.get("volume") or row.get("qty") or 0)
+        else:
+            o, h, l, c = (float(row[k]) for k in ("open", "high", "low", "close"))
+            volume = float(row.get("volume") or 0)
+        parsed.append((ts, o, h, l, c, volume, row.get("ltp") not in (None, "")))
+    parsed.sort(key=lambda r: r[0])
+
+    # Bar length = smallest gap between bars; ticks are visible immediately
+    gaps = [(b[0] - a[0]).total_seconds() for a, b in zip(parsed, parsed[1:]) if b[0] > a[0]]
+    interval = timedelta(seconds=min(gaps)) if gaps else timedelta(0)
+
+    return [
+        ReplayBar(symbol, ts, ts if is_tick else ts + interval, o, h, l, c, volume)
+        for ts, o, h, l, c, volume, is_tick in parsed
+    ]
+
+
+def load_replay_session(path: Union[str, Path]) -> ReplaySession:
+    """Load a session from a JSON file or a directory of per-symbol CSV files"""
+    path = Path(path)
+    if path.is_file():
+        with open(path) as f:
+            return ReplaySession.from_dict(json.load(f))
+
+    if not path.is_dir():
+        raise FileNotFoundError(f"Replay session not found: {path}")
+
+    data: Dict[str, Any] = {}
+    meta_file = path / "meta.json"
+    if meta_file.exists():
+        with open(meta_file) as f:
+            data.update(json.load(f))
+
+    data["bars"] = {}
+    for csv_file in sorted(path.glob("*.csv")):
+        with open(csv_file, newline="") as f:
+            data["bars"][csv_file.stem] = list(csv.DictReader(f))
+
+    chains_file = path / "option_chains.json"
+    if chains_file.exists():
+        with open(chains_file) as f:
+            data["option_chains"] = json.load(f)
+
+    return ReplaySession.from_dict(data)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# REPLAY DATA SERVICE (drop-in for MockDataService)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class ReplayDataService(MockDataService):
+    """
+    MockDataService whose market state comes from a recorded session.
+
+    Every read first applies all bars that have closed by clock.now(), so
+    quotes, VWAP signals, index data and option chains reflect exactly what
+    was known at that simulated moment. Account, order simulation and
+    brokerage bookkeeping are inherited unchanged.
+    """
+
+    def __init__(self, session: ReplaySession, clock: VirtualClock):
+        self.session = session
+        self.clock = clock
+        super().__init__(MarketScenario.REPLAY)
+        self.vix = session.bars["INDIAVIX"][0].open if session.bars.get("INDIAVIX") else self.vix
+
+    # ─── Event stream ───────────────────────────────────────────────────────
+
+    def _initialize_stocks(self):
+        """Build the merged event stream and empty per-symbol state"""
+        self._events = sorted(
+            (bar for bars in self.session.bars.values() for bar in bars),
+            key=lambda b: (b.available_at, b.symbol),
+        )
+        self._event_times = [bar.available_at for bar in self._events]
+        self._cursor = 0
+        self.stock_states = {}
+        self.index_states: Dict[str, Dict] = {}
+        self._vwaps: Dict[str, SessionVWAP] = {}
+        self._index_closes: Dict[str, List[float]] = {}
+
+    def _new_state(self, bar: ReplayBar) -> Dict:
+        prev_close = self.session.prev_close.get(bar.symbol, bar.open)
+        return {
+            "symbol": bar.symbol,
+            "base_price": prev_close,
+            "volatility": 0.0,
+            "open": bar.open,
+            "high": bar.high,
+            "low": bar.low,
+            "close": bar.close,
+            "prev_close": prev_close,
+            "vwap": bar.close,
+            "volume": 0,
+            "avg_volume": self.session.avg_volume.get(bar.symbol, 0),
+            "trend_direction": 0,
+            "momentum": 0.0,
+            "timestamp": bar.start.isoformat(),
+        }
+
+    def _apply(self, bar: ReplayBar):
+        states = self.index_states if bar.symbol in INDEX_SYMBOLS else self.stock_states
+        state = states.get(bar.symbol)
+        if state is None:
+            state = states[bar.symbol] = self._new_state(bar)
+            self._vwaps[bar.symbol] = SessionVWAP()
+
+        state["high"] = round(max(state["high"], bar.high), 2)
+        state["low"] = round(min(state["low"], bar.low), 2)
+        state["close"] = round(bar.close, 2)
+        state["volume"] += int(bar.volume)
+        state["vwap"] = round(self._vwaps[bar.symbol].update(bar.high, bar.low, bar.close, bar.volume), 2)
+        if not self.session.avg_volume.get(bar.symbol):
+            # No recorded average: volume ratio stays neutral rather than peeking ahead
+            state["avg_volume"] = state["volume"]
+        state["momentum"] = (state["close"] / state["prev_close"] - 1) * 100 if state["prev_close"] else 0.0
+        state["trend_direction"] = 1 if state["momentum"] > 0 else -1 if state["momentum"] < 0 else 0
+        state["timestamp"] = bar.start.isoformat()
+
+        if bar.symbol in INDEX_SYMBOLS:
+            self._index_closes.setdefault(bar.symbol, []).append(bar.close)
+            if bar.symbol == "NIFTY":
+                self.nifty_base = state["prev_close"]
+                self.nifty_current = state["close"]
+            elif bar.symbol == "BANKNIFTY":
+                self.banknifty_base = state["prev_close"]
+                self.banknifty_current = state["close"]
+            elif bar.symbol == "INDIAVIX":
+                self.vix = state["close"]
+
+    def _sync(self) -> int:
+        """Apply every bar visible at clock.now(); returns how many were applied"""
+        end = bisect.bisect_right(self._event_times, self.clock.now())
+        applied = end - self._cursor
+        for bar in self._events[self._cursor:end]:
+            self._apply(bar)
+        self._cursor = max(self._cursor, end)
+        return max(0, applied)
+
+    @property
+    def finished(self) -> bool:
+        return self._cursor >= len(self._events) and self.clock.now() >= self.session.end
+
+    def next_event_time(self) -> Optional[datetime]:
+        return self._event_times[self._cursor] if self._cursor < len(self._events) else None
+
+    # ─── MockDataService interface ──────────────────────────────────────────
+
+    def tick(self) -> Dict[str, Dict]:
+        """Bring state up to the simulated clock (no random moves)"""
+        self.tick_count += 1
+        self._sync()
+        return {symbol: state.copy() for symbol, state in self.stock_states.items()}
+
+    def get_stock_quote(self, symbol: str) -> Optional[Dict]:
+        self._sync()
+        return super().get_stock_quote(symbol)
+
+    def get_all_quotes(self) -> List[Dict]:
+        self._sync()
+        return [self.get_stock_quote(symbol) for symbol in sorted(self.stock_states)]
+
+    def get_vwap_momentum_signals(self, min_score: int = 60) -> Dict[str, List[Dict]]:
+        result = super().get_vwap_momentum_signals(min_score)
+        result["scan_time"] = self.clock.now().isoformat()
+        result["total_scanned"] = len(self.stock_states)
+        return result
+
+    def get_index_data(self) -> Dict:
+        self._sync()
+        return super().get_index_data()
+
+    def get_ai_strangle_conditions(self) -> Dict:
+        """Regime inputs derived from the replayed NIFTY bars, VIX and option chain"""
+        self._sync()
+        chain = self._snapshot("NIFTY")
+
+        pcr = 1.0
+        iv = None
+        if chain and chain.get("strikes"):
+            ce_oi = sum(s.get("ce_oi", 0) for s in chain["strikes"])
+            pe_oi = sum(s.get("pe_oi", 0) for s in chain["strikes"])
+            pcr = pe_oi / ce_oi if ce_oi else 1.0
+            atm = min(chain["strikes"], key=lambda s: abs(s["strike"] - chain.get("spot", self.nifty_current)))
+            iv = (atm.get("ce_iv", 0) + atm.get("pe_iv", 0)) / 2 or None
+
+        closes = self._index_closes.get("NIFTY", [])
+        rv = None
+        if len(closes) >= 10:
+            returns = [math.log(b / a) for a, b in zip(closes, closes[1:]) if a > 0 and b > 0]
+            mean = sum(returns) / len(returns)
+            var = sum((r - mean) ** 2 for r in returns) / max(1, len(returns) - 1)
+            bars_per_year = MINUTES_PER_YEAR / max(1.0, self._bar_minutes("NIFTY"))
+            rv = math.sqrt(var * bars_per_year) * 100
+        iv_rv = (iv / rv) if iv and rv else 1.0
+
+        nifty = self.index_states.get("NIFTY")
+        atr_ratio = 0.8
+        if nifty:
+            atr_20 = self.session.atr_20.get("NIFTY") or nifty["prev_close"] * 0.01
+            atr_ratio = (nifty["high"] - nifty["low"]) / atr_20 if atr_20 else 0.8
+
+        return self._build_strangle_conditions(self.vix, iv_rv, pcr, atr_ratio, self.session.event_day)
+
+    def get_option_chain(self, symbol: str = "NIFTY", expiry: str = None) -> Dict:
+        """Latest recorded snapshot at the simulated time (mock chain format)"""
+        self._sync()
+        snapshot = self._snapshot(symbol, expiry)
+        if not snapshot:
+            spot = self.nifty_current if symbol == "NIFTY" else self.banknifty_current
+            return {"symbol": symbol, "spot": spot, "atm_strike": round(spot / 50) * 50,
+                    "lot_size": 0, "expiry": expiry, "strikes": [], "mock_mode": True}
+        return {
+            "symbol": symbol,
+            "spot": snapshot.get("spot"),
+            "atm_strike": snapshot.get("atm_strike") or round(snapshot.get("spot", 0) / 50) * 50,
+            "lot_size": snapshot.get("lot_size", 0),
+            "expiry": snapshot.get("expiry"),
+            "strikes": snapshot.get("strikes", []),
+            "timestamp": snapshot["_ts"].isoformat(),
+            "mock_mode": True,
+        }
+
+    def get_expiries(self, symbol: str) -> List[str]:
+        return sorted({s["expiry"] for s in self.session.option_chains.get(symbol.upper(), []) if s.get("expiry")})
+
+    def _snapshot(self, symbol: str, expiry: str = None) -> Optional[Dict]:
+        snapshots = self.session.option_chains.get(symbol.upper(), [])
+        now = self.clock.now()
+        latest = None
+        for snapshot in snapshots:
+            if snapshot["_ts"] > now:
+                break
+            if expiry is None or snapshot.get("expiry") == expiry:
+                latest = snapshot
+        return latest
+
+    def _bar_minutes(self, symbol: str) -> float:
+        bars = self.session.bars.get(symbol, [])
+        if not bars:
+            return 1.0
+        return max(1.0, (bars[0].available_at - bars[0].start).total_seconds() / 60)
+
+    def reset(self):
+        """Rewind to the start of the session and clear the mock account"""
+        super().reset()
+        self.clock.rewind(self.session.start)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# REPLAY BROKER (for bots that read through broker_service)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class ReplayBroker:
+    """
+    Minimal broker_service for AIDeltaStrangleBot: option chains come from
+    the recorded snapshots and market orders fill at the snapshot LTP.
+    """
+
+    def __init__(self, data: ReplayDataService):
+        self.data = data
+        self.orders: List[Dict] = []
+        self._order_seq = itertools.count(1)
+        self._fill_prices: Dict[str, float] = {}
+
+    async def get_expiry_list(self, symbol: str) -> List[str]:
+        return self.data.get_expiries(symbol)
+
+    async def get_option_chain(self, symbol: str, expiry: str = None) -> Dict[str, Any]:
+        chain = self.data.get_option_chain(symbol, expiry)
+        strikes = []
+        for row in chain.get("strikes", []):
+            strike = row["strike"]
+            legs = {}
+            for side, key in (("ce", "call"), ("pe", "put")):
+                ltp = row.get(f"{side}_ltp", 0)
+                security_id = row.get(f"{side}_security_id") or f"REPLAY_{symbol}_{int(strike)}_{side.upper()}"
+                self._fill_prices[str(security_id)] = ltp
+                legs[key] = {
+                    "ltp": ltp,
+                    "bid": row.get(f"{side}_bid", ltp),
+                    "ask": row.get(f"{side}_ask", ltp),
+                    "delta": row.get(f"{side}_delta", 0),
+                    "gamma": row.get(f"{side}_gamma", 0),
+                    "theta": row.get(f"{side}_theta", 0),
+                    "vega": row.get(f"{side}_vega", 0),
+                    "iv": row.get(f"{side}_iv", 0),
+                    "oi": row.get(f"{side}_oi", 0),
+                    "volume": row.get(f"{side}_volume", 0),
+                    "security_id": security_id,
+                }
+            strikes.append({"strike_price": strike, **legs})
+        return {"underlying_price": chain.get("spot", 0), "expiry": chain.get("expiry"), "strikes": strikes}
+
+    async def place_order(self, security_id: str, transaction_type: str, quantity: int, **kwargs) -> Dict[str, Any]:
+        order_id = f"REPLAY_{next(self._order_seq):06d}"
+        self.orders.append({
+            "order_id": order_id,
+            "security_id": security_id,
+            "side": transaction_type,
+            "quantity": quantity,
+            "price": self._fill_prices.get(str(security_id), 0),
+            "executed_at": self.data.clock.now().isoformat(),
+            "status": "COMPLETE",
+        })
+        return {"success": True, "order_id": order_id}
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# REPLAY DRIVER
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class MarketReplay:
+    """
+    Replays one session through one or more bots.
+
+    Usage:
+        replay = MarketReplay(load_replay_session("sessions/2026-01-15.json"), speed=0)
+        result = await replay.run([VWAPTradingBot(), AIStrangleBot()], scan_interval=60)
+
+    run() steps the clock by scan_interval and calls each bot's scan_once(),
+    the same entry point the serverless scheduler uses. Bots started
+    normally while a replay is active also follow the clock, because their
+    loops sleep through clock_sleep().
+    """
+
+    def __init__(self, session: ReplaySession, speed: float = 0.0, start: datetime = None):
+        self.session = session
+        self.clock = VirtualClock(start or session.start, speed)
+        self.data = ReplayDataService(session, self.clock)
+        self.broker = ReplayBroker(self.data)
+
+    def activate(self):
+        if _active_clock is not None and _active_clock is not self.clock:
+            raise RuntimeError("Another market replay is already active")
+        set_active_clock(self.clock)
+
+    def deactivate(self):
+        if _active_clock is self.clock:
+            set_active_clock(None)
+
+    def attach(self, bot: Any):
+        """Point a bot at the replayed data instead of mock/live data"""
+        if hasattr(bot, "mock_service"):
+            # VWAPTradingBot / AIStrangleBot consume the MockDataService interface
+            bot.mock_mode = True
+            bot.mock_scenario = MarketScenario.REPLAY
+            bot.mock_service = self.data
+        else:
+            # AIDeltaStrangleBot reads chains and places orders via broker_service
+            bot.broker_service = self.broker
+            bot.broker = "dhan"
+
+        for flag in ("is_running", "_running"):
+            if hasattr(bot, flag):
+                setattr(bot, flag, True)
+        if hasattr(bot, "state") and hasattr(bot.state, "is_running"):
+            bot.state.is_running = True
+
+    async def run(self, bots: List[Any], scan_interval: float = 60, end: datetime = None) -> Dict[str, Any]:
+        """Step through the session calling scan_once() on every bot"""
+        end = _parse_timestamp(end) if end else self.session.end
+        for bot in bots:
+            self.attach(bot)
+
+        scans = 0
+        errors: List[Dict] = []
+        real_start = time_module.perf_counter()
+        self.activate()
+        try:
+            while self.clock.now() <= end:
+                self.data.tick()
+                for bot in bots:
+                    result = await bot.scan_once()
+                    scans += 1
+                    if isinstance(result, dict) and (result.get("error") or result.get("status") == "error"):
+                        errors.append({
+                            "bot": type(bot).__name__,
+                            "time": self.clock.now().isoformat(),
+                            "error": result.get("error") or result.get("message"),
+                        })
+                if self.clock.speed > 0:
+                    await self.clock.sleep(scan_interval)
+                else:
+                    self.clock.advance(scan_interval)
+        finally:
+            self.deactivate()
+
+        return {
+            "session_date": self.session.date,
+            "simulated_start": self.session.start.isoformat(),
+            "simulated_end": end.isoformat(),
+            "scan_interval": scan_interval,
+            "scans": scans,
+            "errors": errors[-50:],
+            "elapsed_seconds": round(time_module.perf_counter() - real_start, 3),
+            "account": self.data.get_funds(),
+            "broker_orders": self.broker.orders,
+            "bots": {
+                type(bot).__name__: bot.get_status() if hasattr(bot, "get_status") else None
+                for bot in bots
+            },
+        }
@@ -0,0 +1,377 @@
+"""
+Market Scheduler
+================
+Owns every periodic market-data refresh and sets its cadence by NSE session
+phase, so live-hour data is fresher and off-hours upstream traffic falls to
+near zero:
+
+    PRE_OPEN    09:00 - 09:15
+    LIVE        09:15 - 15:30
+    POST_CLOSE  15:30 - 16:00
+    CLOSED      everything else, weekends and trading holidays
+
+Each job declares an interval per phase (None = do not run in that phase).
+Runs are jittered so jobs do not hit upstreams in lockstep, and a job whose
+phase has no cadence sleeps until the next phase change. Jobs can be paused,
+resumed, re-timed or run on demand through the control methods.
+
+    scheduler = get_market_scheduler()
+    scheduler.register("market-frame", ingestor.refresh, {Phase.LIVE: 30, Phase.PRE_OPEN: 60})
+    scheduler.start()
+"""
+
+import asyncio
+import logging
+import random
+import time
+from datetime import date, datetime, timedelta
+from datetime import time as dtime
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+from .market_replay import IST
+
+logger = logging.getLogger(__name__)
+
+
+class Phase(str, Enum):
+    PRE_OPEN = "pre_open"
+    LIVE = "live"
+    POST_CLOSE = "post_close"
+    CLOSED = "closed"
+
+
+# (phase, start) for a trading day; the phase lasts until the next start
+SESSION = [
+    (Phase.PRE_OPEN, dtime(9, 0)),
+    (Phase.LIVE, dtime(9, 15)),
+    (Phase.POST_CLOSE, dtime(15, 30)),
+    (Phase.CLOSED, dtime(16, 0)),
+]
+
+DEFAULT_JITTER = 0.1
+# Sleeping jobs re-check at least this often (clock changes, holiday updates)
+MAX_SLEEP_SECONDS = 3600.0
+
+
+def parse_holidays(payload: Any) -> Set[date]:
+    """
+    Trading holidays from the NSE holiday-master response ({"CM": [...],
+    "FO": [...]} with "tradingDate": "26-Jan-2026") or the local
+    MARKET_HOLIDAYS list ({"date": "2026-01-26"}).
+    """
+    if isinstance(payload, dict):
+        entries = [e for key in ("FO", "CM") for e in payload.get(key) or []]
+    else:
+        entries = list(payload or [])
+
+    holidays = set()
+    for entry in entries:
+        raw = entry.get("tradingDate") or entry.get("date") if isinstance(entry, dict) else entry
+        for fmt in ("%d-%b-%Y", "%Y-%m-%d"):
+            try:
+                holidays.add(datetime.strptime(str(raw), fmt).date())
+                break
+            except ValueError:
+                continue
+    return holidays
+
+
+class MarketCalendar:
+    """NSE trading days and session phases in IST"""
+
+    def __init__(self, holidays: Iterable[date] = ()):
+        self.holidays: Set[date] = set(holidays)
+        self.updated_at: Optional[datetime] = None
+
+    def set_holidays(self, holidays: Iterable[date]):
+        self.holidays = set(holidays)
+        self.updated_at = self.now()
+
+    @staticmethod
+    def now() -> datetime:
+        return datetime.now(IST)
+
+    def is_trading_day(self, day: date) -> bool:
+        return day.weekday() < 5 and day not in self.holidays
+
+    def phase(self, now: datetime = None) -> Phase:
+        now = now or self.now()
+        if not self.is_trading_day(now.date()):
+            return Phase.CLOSED
+        current = Phase.CLOSED
+        for phase, start in SESSION:
+            if now.time() >= start:
+                current = phase
+        return current
+
+    def next_trading_day(self, after: date) -> date:
+        day = after + timedelta(days=1)
+        while not self.is_trading_day(day):
+            day += timedelta(days=1)
+        return day
+
+    def next_change(self, now: datetime = None) -> datetime:
+        """When the phase next changes"""
+        now = now or self.now()
+        if self.is_trading_day(now.date()):
+            for _, start in SESSION:
+                boundary = datetime.combine(now.date(), start, tzinfo=now.tzinfo)
+                if boundary > now:
+                    return boundary
+        return datetime.combine(self.next_trading_day(now.date()), SESSION[0][1], tzinfo=now.tzinfo)
+
+
+Job = Callable[[], Awaitable[Any]]
+
+
+class ScheduledJob:
+    """One periodic refresh with its per-phase cadence and run history"""
+
+    def __init__(
+        self,
+        name: str,
+        fn: Job,
+        cadence: Dict[Phase, Optional[float]],
+        jitter: float = DEFAULT_JITTER,
+        run_at_start: bool = True,
+    ):
+        self.name = name
+        self.fn = fn
+        self.cadence: Dict[Phase, Optional[float]] = {Phase(p): s for p, s in cadence.items()}
+        self.jitter = jitter
+        self.paused = False
+        self.force = False
+        self.runs = 0
+        self.failures = 0
+        self.runs_by_phase: Dict[str, int] = {p.value: 0 for p in Phase}
+        self.last_error: Optional[str] = None
+        self.last_run: Optional[datetime] = None
+        self.last_duration_ms: Optional[float] = None
+        self.next_run: Optional[datetime] = None
+        # Without run_at_start the first run waits one interval
+        self._last_run_mono: Optional[float] = None if run_at_start else time.monotonic()
+        self._factor = 1.0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def interval(self, phase: Phase) -> Optional[float]:
+        return None if self.paused else self.cadence.get(phase)
+
+    def seconds_until_due(self, phase: Phase) -> Optional[float]:
+        """0 when the job should run now, None when it does not run in phase"""
+        if self.force:
+            return 0.0
+        interval = self.interval(phase)
+        if interval is None:
+            return None
+        if self._last_run_mono is None:
+            return 0.0
+        return max(0.0, self._last_run_mono + interval * self._factor - time.monotonic())
+
+    def wake(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def to_dict(self) -> Dict:
+        return {
+            "cadence": {p.value: self.cadence.get(p) for p in Phase},
+            "paused": self.paused,
+            "running": self._task is not None and not self._task.done(),
+            "runs": self.runs,
+            "failures": self.failures,
+            "runs_by_phase": dict(self.runs_by_phase),
+            "last_run": self.last_run.isoformat() if self.last_run else None,
+            "last_duration_ms": self.last_duration_ms,
+            "last_error": self.last_error,
+            "next_run": self.next_run.isoformat() if self.next_run else None,
+        }
+
+
+class MarketScheduler:
+    """Runs registered jobs at their cadence for the current market phase"""
+
+    def __init__(self, calendar: MarketCalendar = None):
+        self.calendar = calendar or get_market_calendar()
+        self._jobs: Dict[str, ScheduledJob] = {}
+        self._phase_listeners: List[Callable[[Phase], Any]] = []
+        self._phase_task: Optional[asyncio.Task] = None
+        self.phase: Optional[Phase] = None
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # REGISTRATION
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    def register(
+        self,
+        name: str,
+        fn: Job,
+        cadence: Dict[Phase, Optional[float]],
+        jitter: float = DEFAULT_JITTER,
+        run_at_start: bool = True,
+    ) -> ScheduledJob:
+        """Register an async no-argument job; cadence maps phase -> seconds (missing/None = skip)"""
+        job = ScheduledJob(name, fn, cadence, jitter, run_at_start)
+        self._jobs[name] = job
+        if self._phase_task is not None:
+            self._start_job(job)
+        return job
+
+    def add_phase_listener(self, listener: Callable[[Phase], Any]):
+        """Call listener(phase) now (once started) and on every phase change"""
+        self._phase_listeners.append(listener)
+
+    def job(self, name: str) -> ScheduledJob:
+        if name not in self._jobs:
+            raise KeyError(f"Unknown scheduler job '{name}'")
+        return self._jobs[name]
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # RUN LOOP
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    async def _run_once(self, job: ScheduledJob, phase: Phase):
+        job.force = False
+        started = time.perf_counter()
+        job._last_run_mono = time.monotonic()
+        job._factor = random.uniform(1 - job.jitter, 1 + job.jitter)
+        job.last_run = self.calendar.now()
+        job.runs += 1
+        job.runs_by_phase[phase.value] += 1
+        try:
+            await job.fn()
+            job.last_error = None
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            job.failures += 1
+            job.last_error = str(e) or type(e).__name__
+            logger.warning(f"Scheduler job '{job.name}' failed: {job.last_error}")
+        finally:
+            job.last_duration_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    async def _job_loop(self, job: ScheduledJob):
+        while True:
+            now = self.calendar.now()
+            phase = self.calendar.phase(now)
+            due = job.seconds_until_due(phase)
+            if due == 0:
+                await self._run_once(job, phase)
+                continue
+
+            until_change = (self.calendar.next_change(now) - now).total_seconds()
+            wait = until_change if due is None else min(due, until_change)
+            wait = min(max(wait, 0.05), MAX_SLEEP_SECONDS)
+            job.next_run = None if due is None else now + timedelta(seconds=wait)
+            job._wakeup.clear()
+            try:
+                await asyncio.wait_for(job._wakeup.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _phase_loop(self):
+        while True:
+            now = self.calendar.now()
+            phase = self.calendar.phase(now)
+            if phase != self.phase:
+                logger.info(f"🕘 Market phase: {self.phase.value if self.phase else '-'} → {phase.value}")
+                self.phase = phase
+                for listener in self._phase_listeners:
+                    try:
+                        listener(phase)
+                    except Exception as e:
+                        logger.error(f"Market phase listener error: {e}", exc_info=True)
+            wait = (self.calendar.next_change(now) - now).total_seconds()
+            await asyncio.sleep(min(max(wait, 0.05), MAX_SLEEP_SECONDS))
+
+    def _start_job(self, job: ScheduledJob):
+        if job._task is None or job._task.done():
+            job._wakeup = asyncio.Event()
+            job._task = asyncio.create_task(self._job_loop(job))
+
+    def start(self):
+        """Start the phase watcher and every registered job"""
+        if self._phase_task is None or self._phase_task.done():
+            self._phase_task = asyncio.create_task(self._phase_loop())
+        for job in self._jobs.values():
+            self._start_job(job)
+        logger.info(f"✅ Market scheduler started: {', '.join(self._jobs)} (phase {self.calendar.phase().value})")
+
+    async def stop(self):
+        tasks = [t for t in [self._phase_task] + [j._task for j in self._jobs.values()] if t and not t.done()]
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._phase_task = None
+        for job in self._jobs.values():
+            job._task = None
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # CONTROL
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    def trigger(self, name: str) -> ScheduledJob:
+        """Run the job as soon as possible, whatever the phase"""
+        job = self.job(name)
+        job.force = True
+        job.wake()
+        return job
+
+    def pause(self, name: str) -> ScheduledJob:
+        job = self.job(name)
+        job.paused = True
+        job.wake()
+        return job
+
+    def resume(self, name: str) -> ScheduledJob:
+        job = self.job(name)
+        job.paused = False
+        job.wake()
+        return job
+
+    def set_cadence(self, name: str, cadence: Dict[Phase, Optional[float]]) -> ScheduledJob:
+        """Update the interval of the given phases (None = do not run)"""
+        job = self.job(name)
+        job.cadence.update({Phase(p): s for p, s in cadence.items()})
+        job.wake()
+        return job
+
+    def get_status(self) -> Dict:
+        now = self.calendar.now()
+        return {
+            "phase": self.calendar.phase(now).value,
+            "next_phase_change": self.calendar.next_change(now).isoformat(),
+            "trading_day": self.calendar.is_trading_day(now.date()),
+            "holidays_known": len(self.calendar.holidays),
+            "holidays_updated": self.calendar.updated_at.isoformat() if self.calendar.updated_at else None,
+            "running": self._phase_task is not None and not self._phase_task.done(),
+            "jobs": {name: job.to_dict() for name, job in self._jobs.items()},
+        }
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SINGLETONS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_market_calendar: Optional[MarketCalendar] = None
+_market_scheduler: Optional[MarketScheduler] = None
+
+
+def get_market_calendar() -> MarketCalendar:
+    """Get or create the shared NSE trading calendar"""
+    global _market_calendar
+    if _market_calendar is None:
+        _market_calendar = MarketCalendar()
+    return _market_calendar
+
+
+def get_market_scheduler() -> MarketScheduler:
+    """Get or create the shared market scheduler"""
+    global _market_scheduler
+    if _market_scheduler is None:
+        _market_scheduler = MarketScheduler()
+    return _market_scheduler
@@ -17,6 +17,8 @@ from typing import Dict, List, Any, Optional
 from enum import Enum
 import logging
 
+from .execution_costs import fill_price, order_charges
+
 logger = logging.getLogger(__name__)
 
 
@@ -26,6 +28,7 @@ class MarketScenario(Enum):
     RANGE_BOUND = "range_bound"
     VOLATILE = "volatile"
     RANDOM = "random"
+    REPLAY = "replay"  # Recorded session via market_replay.ReplayDataService
 
 
 class MockDataService:
@@ -390,6 +393,17 @@ class MockDataService:
             atr_ratio = random.uniform(0.6, 1.0)
             is_event = random.random() < 0.1
         
+        return self._build_strangle_conditions(vix, iv_rv, pcr, atr_ratio, is_event)
+    
+    def _build_strangle_conditions(
+        self,
+        vix: float,
+        iv_rv: float,
+        pcr: float,
+        atr_ratio: float,
+        is_event: bool
+    ) -> Dict:
+        """Score regime inputs the same way the AI strangle bot expects"""
         # Calculate scores
         vix_score = max(0, 100 - (vix - 11) * 10) if vix <= 18 else 0
         iv_rv_score = max(0, 100 - (iv_rv - 0.8) * 100) if iv_rv <= 1.2 else 0
@@ -492,47 +506,16 @@ class MockDataService:
         """
         Calculate realistic Dhan brokerage and charges
         
+        Rates per segment live in services/execution_costs.CHARGE_RATES.
         Dhan Intraday Equity Charges:
-        - Brokerage: ₹20 flat per order
+        - Brokerage: ₹20 per order or 0.03%, whichever is lower
         - STT: 0.025% (sell side only)
         - Exchange Txn: 0.00345% (both sides)
         - SEBI: 0.0001% (both sides)
-        - GST: 18% on brokerage
+        - GST: 18% on brokerage + exchange txn + SEBI
         - Stamp Duty: 0.003% (buy side only)
         """
-        turnover = price * quantity
-        
-        # Brokerage (₹20 flat per order, or 0.03% whichever is lower)
-        brokerage = min(20, turnover * 0.0003)
-        
-        # STT - only on sell side for intraday
-        stt = turnover * 0.00025 if side == "SELL" else 0
-        
-        # Exchange Transaction Charges (NSE)
-        exchange_txn = turnover * 0.0000345
-        
-        # SEBI Charges
-        sebi = turnover * 0.000001
-        
-        # GST (18% on brokerage + exchange txn + SEBI)
-        gst = (brokerage + exchange_txn + sebi) * 0.18
-        
-        # Stamp Duty - only on buy side
-        stamp_duty = turnover * 0.00003 if side == "BUY" else 0
-        
-        # Total charges
-        total = brokerage + stt + exchange_txn + sebi + gst + stamp_duty
-        
-        return {
-            "brokerage": round(brokerage, 2),
-            "stt": round(stt, 2),
-            "exchange_txn": round(exchange_txn, 2),
-            "sebi": round(sebi, 2),
-            "gst": round(gst, 2),
-            "stamp_duty": round(stamp_duty, 2),
-            "total": round(total, 2),
-            "turnover": round(turnover, 2)
-        }
+        return order_charges(side, quantity, price, segment)
     
     def simulate_order_execution(
         self, 
@@ -549,12 +532,13 @@ class MockDataService:
         if not quote:
             return {"status": "REJECTED", "reason": "Symbol not found"}
         
-        # Add slippage for market orders
-        slippage = 0.0005 if order_type == "MARKET" else 0
-        if side == "BUY":
-            executed_price = quote["ltp"] * (1 + slippage)
-        else:
-            executed_price = quote["ltp"] * (1 - slippage)
+        # Add slippage for market orders (from the quote's bid/ask when present)
+        executed_price = float(fill_price(
+            side, quote["ltp"], quantity,
+            bid=quote.get("bid"), ask=quote.get("ask"),
+            bid_qty=quote.get("bid_qty"), ask_qty=quote.get("ask_qty"),
+            order_type=order_type,
+        ))
         
         order_id = f"MOCK_{datetime.now().strftime('%Y%m%d%H%M%S')}_{random.randint(1000, 9999)}"
         executed_price = round(executed_price, 2)
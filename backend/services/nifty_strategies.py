@@ -22,7 +22,7 @@ Last Updated: January 2025
 import numpy as np
 import pandas as pd
 from datetime import datetime, time, timedelta
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, List, Optional, Tuple, Any, Callable
 from dataclasses import dataclass, field
 from enum import Enum
 import logging
@@ -30,6 +30,10 @@ import math
 
 logger = logging.getLogger(__name__)
 
+# Optional hook used by long-running backtests to report progress.
+# Called as progress_callback(event, data) where event is "progress" or "equity".
+ProgressCallback = Callable[[str, Dict[str, Any]], None]
+
 
 class SignalType(Enum):
     BUY = "BUY"
@@ -1549,7 +1553,8 @@ class StrategyBacktester:
         data: pd.DataFrame,
         strategy: StrategyName,
         capital: float = 100000,
-        lot_size: int = 50
+        lot_size: int = 50,
+        progress_callback: Optional[ProgressCallback] = None
     ) -> StrategyBacktestResult:
         """
         Backtest a single strategy on historical data
@@ -1559,6 +1564,7 @@ class StrategyBacktester:
         - strategy: Strategy to backtest
         - capital: Starting capital
         - lot_size: Contract/lot size
+        - progress_callback: Optional hook receiving progress and equity-curve chunks
         
         Returns: StrategyBacktestResult with detailed metrics
         """
@@ -1577,6 +1583,13 @@ class StrategyBacktester:
             trades = self._backtest_bollinger(data, lot_size)
         # Add more strategy backtests...
         
+        if progress_callback:
+            progress_callback("progress", {
+                "strategy": strategy.value,
+                "stage": "signals",
+                "trades": len(trades)
+            })
+        
         # Calculate metrics
         if not trades:
             return StrategyBacktestResult(
@@ -1602,6 +1615,15 @@ class StrategyBacktester:
             current_capital += trade.pnl * lot_size
             equity_curve.append(current_capital)
         
+        if progress_callback:
+            chunk_size = 100
+            for offset in range(0, len(equity_curve), chunk_size):
+                progress_callback("equity", {
+                    "strategy": strategy.value,
+                    "offset": offset,
+                    "points": equity_curve[offset:offset + chunk_size]
+                })
+        
         winning_trades = [t for t in trades if t.pnl > 0]
         losing_trades = [t for t in trades if t.pnl <= 0]
         
@@ -1841,7 +1863,8 @@ class StrategyBacktester:
         self,
         data: pd.DataFrame,
         capital: float = 100000,
-        lot_size: int = 50
+        lot_size: int = 50,
+        progress_callback: Optional[ProgressCallback] = None
     ) -> Dict[str, StrategyBacktestResult]:
         """Run backtests on all strategies"""
         results = {}
@@ -1853,13 +1876,20 @@ class StrategyBacktester:
             StrategyName.BOLLINGER_SQUEEZE
         ]
         
-        for strategy in strategies:
+        for idx, strategy in enumerate(strategies):
             try:
                 results[strategy.value] = self.backtest_strategy(
-                    data, strategy, capital, lot_size
+                    data, strategy, capital, lot_size, progress_callback
                 )
             except Exception as e:
                 logger.error(f"Backtest error for {strategy.value}: {e}")
+            
+            if progress_callback:
+                progress_callback("progress", {
+                    "strategy": strategy.value,
+                    "stage": "completed",
+                    "percent": round((idx + 1) / len(strategies) * 100, 1)
+                })
         
         return results
     
@@ -0,0 +1,513 @@
+"""
+Order Execution Pipeline
+========================
+Multi-leg order placement shared by every bot through BaseBroker.place_legs.
+
+Strangle, iron condor and adjustment orders used to go out one leg at a time,
+each followed by its own expiry / instrument lookup, and nothing checked
+whether they filled. On a fast market the legs of one structure filled
+seconds apart.
+
+    report = await broker.place_legs([
+        LegOrder("long_call", OrderRequest(...BUY...)),
+        LegOrder("short_call", OrderRequest(...SELL...)),
+    ])
+
+Execution:
+
+- Hedge-first: hedge legs (BUY legs unless flagged otherwise) are placed and
+  tracked to a fill before the legs they protect. If a hedge is not filled
+  at all, the remaining legs are skipped and the report is aborted, so a
+  short is never left naked. If hedges fill partially, later legs are capped
+  to the smallest hedge fill.
+- Legs in the same group are submitted in parallel.
+- Each accepted order is tracked by polling get_order_status with
+  exponential backoff (0.25s doubling to 2s). A broker postback for the
+  order (notify_order_update) wakes the poller at once; the postback itself
+  is never trusted, the status is always read back from the broker.
+- An order still open at the fill timeout is cancelled; whatever filled by
+  then is reported as a partial fill with its filled quantity.
+- Orders the broker cannot report on by design (paper / mock / replay, no
+  order id) are reported as untracked, which callers treat as placed, as
+  before.
+- An order whose status is lost (status reads keep failing, or none after
+  the timeout cancel) is reported as unknown: it books no quantity and, as a
+  hedge, aborts the remaining legs until it is reconciled with the broker.
+
+Submission, fill latency and the skew between legs of the same group are
+recorded per broker in ExecutionMetrics (see /api/admin/order-execution).
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from .broker_integration import OrderRequest, OrderResponse
+from .market_replay import is_replay_active
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL_SECONDS = 0.25
+MAX_POLL_INTERVAL_SECONDS = 2.0
+FILL_TIMEOUT_SECONDS = float(os.getenv("ORDER_FILL_TIMEOUT_SECONDS", "10"))
+STATUS_FAILURES_BEFORE_UNKNOWN = 3
+LATENCY_SAMPLES = 500
+
+
+class OrderState(str, Enum):
+    SUBMITTED = "submitted"    # accepted by the broker, status not read yet
+    OPEN = "open"
+    PARTIAL = "partial"
+    FILLED = "filled"
+    REJECTED = "rejected"
+    CANCELLED = "cancelled"
+    FAILED = "failed"          # submission failed
+    SKIPPED = "skipped"        # not sent: an earlier hedge leg did not fill
+    UNTRACKED = "untracked"    # placed, but the broker reports no status
+    UNKNOWN = "unknown"        # placed, but its status was lost: reconcile
+
+
+TERMINAL_STATES = {OrderState.FILLED, OrderState.REJECTED, OrderState.CANCELLED}
+
+# Broker status strings (Dhan orderStatus / Upstox status) -> OrderState
+_STATUS_MAP = {
+    "TRADED": OrderState.FILLED,
+    "COMPLETE": OrderState.FILLED,
+    "PART_TRADED": OrderState.PARTIAL,
+    "REJECTED": OrderState.REJECTED,
+    "CANCELLED": OrderState.CANCELLED,
+    "EXPIRED": OrderState.CANCELLED,
+}
+
+
+@dataclass
+class OrderUpdate:
+    """Broker-neutral order status"""
+    state: OrderState
+    filled_qty: int = 0
+    avg_price: float = 0.0
+    message: str = ""
+
+
+def parse_order_status(raw: Any) -> Optional[OrderUpdate]:
+    """Normalize a Dhan or Upstox order-status payload (raw API JSON or the
+    DhanService / UpstoxService wrappers). None if it carries no status."""
+    if not isinstance(raw, dict) or raw.get("success") is False:
+        return None
+    data = raw.get("data") if isinstance(raw.get("data"), (dict, list)) else raw
+    if isinstance(data, list):
+        data = data[0] if data else {}
+    status = str(data.get("orderStatus") or data.get("status") or "").upper()
+    if not status or status in ("ERROR", "SUCCESS", "FAILURE"):
+        return None
+    filled = int(data.get("filledQty") or data.get("filled_quantity") or 0)
+    price = float(data.get("averageTradedPrice") or data.get("average_price") or data.get("averagePrice") or 0)
+    state = _STATUS_MAP.get(status, OrderState.OPEN)
+    if state == OrderState.OPEN and filled > 0:
+        state = OrderState.PARTIAL
+    message = data.get("omsErrorDescription") or data.get("status_message") or ""
+    return OrderUpdate(state, filled, price, str(message or ""))
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# LEGS / REPORTS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@dataclass
+class LegOrder:
+    """One leg of a multi-leg execution.
+
+    `submit(quantity)` overrides broker.place_order for bots that resolve
+    instruments and place orders through their own broker service; it may
+    return an OrderResponse or a {"success", "order_id", "error"} dict."""
+    name: str
+    request: OrderRequest
+    hedge: Optional[bool] = None
+    submit: Optional[Callable[[int], Awaitable[Any]]] = None
+
+    @property
+    def is_hedge(self) -> bool:
+        if self.hedge is not None:
+            return self.hedge
+        return self.request.transaction_type.upper() == "BUY"
+
+
+@dataclass
+class LegFill:
+    """Outcome of one leg"""
+    name: str
+    side: str
+    quantity: int
+    state: OrderState = OrderState.FAILED
+    order_id: str = ""
+    filled_qty: int = 0
+    avg_price: float = 0.0
+    message: str = ""
+    submit_ms: Optional[float] = None
+    fill_ms: Optional[float] = None
+    polls: int = 0
+    response: Dict = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        """Placed and (as far as the broker tells) at least partly filled.
+        An UNKNOWN leg is not: it may have been cancelled or never filled."""
+        return self.state in (OrderState.FILLED, OrderState.UNTRACKED) or (
+            self.state == OrderState.PARTIAL and self.filled_qty > 0
+        )
+
+    @property
+    def executed_qty(self) -> int:
+        """Quantity to book: the filled quantity when known"""
+        if self.state in (OrderState.FILLED, OrderState.PARTIAL) and self.filled_qty:
+            return self.filled_qty
+        return self.quantity if self.ok else 0
+
+    def apply(self, update: OrderUpdate):
+        self.state = update.state
+        self.filled_qty = max(self.filled_qty, update.filled_qty)
+        if update.avg_price:
+            self.avg_price = update.avg_price
+        if update.message:
+            self.message = update.message
+
+    def to_result(self) -> Dict:
+        """Order result in the {"success", "order_id", ...} shape the bots use"""
+        result = dict(self.response)
+        result.update({
+            "success": self.ok,
+            "order_id": self.order_id,
+            "status": self.state.value,
+            "quantity": self.quantity,
+            "filled_quantity": self.executed_qty,
+            "submit_ms": self.submit_ms,
+            "fill_ms": self.fill_ms,
+        })
+        if self.avg_price:
+            result["price"] = self.avg_price
+        if not self.ok:
+            result["error"] = self.message or result.get("error") or self.state.value
+        return result
+
+    def to_dict(self) -> Dict:
+        return {
+            "side": self.side,
+            "quantity": self.quantity,
+            "state": self.state.value,
+            "order_id": self.order_id,
+            "filled_qty": self.filled_qty,
+            "avg_price": self.avg_price,
+            "message": self.message,
+            "submit_ms": self.submit_ms,
+            "fill_ms": self.fill_ms,
+            "polls": self.polls,
+        }
+
+
+@dataclass
+class ExecutionReport:
+    legs: Dict[str, LegFill] = field(default_factory=dict)
+    aborted: Optional[str] = None
+    total_ms: float = 0.0
+    leg_skew_ms: Optional[float] = None
+
+    @property
+    def success(self) -> bool:
+        return self.aborted is None and all(fill.ok for fill in self.legs.values())
+
+    @property
+    def any_ok(self) -> bool:
+        return any(fill.ok for fill in self.legs.values())
+
+    def result(self, name: str) -> Dict:
+        fill = self.legs.get(name)
+        return fill.to_result() if fill else {"success": False, "error": f"unknown leg {name}"}
+
+    def summary(self) -> str:
+        legs = ", ".join(f"{name}={fill.state.value}" for name, fill in self.legs.items())
+        text = f"{legs} in {self.total_ms:.0f}ms"
+        return f"{text} (aborted: {self.aborted})" if self.aborted else text
+
+    def to_dict(self) -> Dict:
+        return {
+            "success": self.success,
+            "aborted": self.aborted,
+            "total_ms": self.total_ms,
+            "leg_skew_ms": self.leg_skew_ms,
+            "legs": {name: fill.to_dict() for name, fill in self.legs.items()},
+        }
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# POSTBACKS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_order_waiters: Dict[str, asyncio.Event] = {}
+
+
+def notify_order_update(order_id: str) -> bool:
+    """Wake the tracker of an order (broker postback / order websocket).
+    Returns False if no execution is waiting on that order."""
+    event = _order_waiters.get(str(order_id))
+    if event is None:
+        return False
+    event.set()
+    return True
+
+
+def postback_order_id(payload: Dict) -> Optional[str]:
+    """Order id from a Dhan or Upstox postback payload"""
+    data = payload.get("data") if isinstance(payload.get("data"), dict) else payload
+    order_id = data.get("orderId") or data.get("order_id")
+    return str(order_id) if order_id else None
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# METRICS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _percentiles(samples: Deque[float]) -> Dict[str, Optional[float]]:
+    if not samples:
+        return {"p50": None, "p95": None, "max": None}
+    ordered = sorted(samples)
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 1)
+    return {"p50": pick(0.5), "p95": pick(0.95), "max": round(ordered[-1], 1)}
+
+
+class ExecutionMetrics:
+    """Per-broker order counters and latency samples"""
+
+    def __init__(self):
+        self._brokers: Dict[str, Dict[str, Any]] = {}
+
+    def _broker(self, name: str) -> Dict[str, Any]:
+        stats = self._brokers.get(name)
+        if stats is None:
+            stats = self._brokers[name] = {
+                "executions": 0,
+                "aborted": 0,
+                "states": {state.value: 0 for state in OrderState},
+                "submit_ms": deque(maxlen=LATENCY_SAMPLES),
+                "fill_ms": deque(maxlen=LATENCY_SAMPLES),
+                "leg_skew_ms": deque(maxlen=LATENCY_SAMPLES),
+            }
+        return stats
+
+    def record(self, broker: str, report: ExecutionReport, skews: List[float]):
+        stats = self._broker(broker or "unknown")
+        stats["executions"] += 1
+        stats["aborted"] += 1 if report.aborted else 0
+        for fill in report.legs.values():
+            stats["states"][fill.state.value] += 1
+            if fill.submit_ms is not None:
+                stats["submit_ms"].append(fill.submit_ms)
+            if fill.fill_ms is not None and fill.state in (OrderState.FILLED, OrderState.PARTIAL):
+                stats["fill_ms"].append(fill.fill_ms)
+        stats["leg_skew_ms"].extend(skews)
+
+    def get_status(self) -> Dict:
+        return {
+            name: {
+                "executions": stats["executions"],
+                "aborted": stats["aborted"],
+                "orders": {state: count for state, count in stats["states"].items() if count},
+                "submit_ms": _percentiles(stats["submit_ms"]),
+                "fill_ms": _percentiles(stats["fill_ms"]),
+                "leg_skew_ms": _percentiles(stats["leg_skew_ms"]),
+            }
+            for name, stats in sorted(self._brokers.items())
+        }
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# EXECUTOR
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _normalize_response(response: Any) -> Tuple[bool, str, str, Dict]:
+    """(success, order_id, message, result dict) from OrderResponse or a bot order dict"""
+    if isinstance(response, OrderResponse):
+        result = {"success": response.success, "order_id": response.order_id,
+                  "message": response.message, "broker": response.broker}
+        return response.success, response.order_id, response.message, result
+    result = dict(response or {})
+    message = result.get("error") or result.get("message") or ""
+    return bool(result.get("success")), str(result.get("order_id") or ""), str(message), result
+
+
+class OrderExecutor:
+    """Runs one multi-leg execution against a BaseBroker"""
+
+    def __init__(
+        self,
+        broker: Any,
+        poll_interval: float = POLL_INTERVAL_SECONDS,
+        max_poll_interval: float = MAX_POLL_INTERVAL_SECONDS,
+        fill_timeout: float = FILL_TIMEOUT_SECONDS,
+        hedge_first: bool = True,
+        metrics: Optional[ExecutionMetrics] = None,
+    ):
+        self.broker = broker
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.fill_timeout = fill_timeout
+        self.hedge_first = hedge_first
+        self.metrics = metrics or get_execution_metrics()
+
+    async def execute(self, legs: List[LegOrder]) -> ExecutionReport:
+        started = time.monotonic()
+        report = ExecutionReport()
+        if self.hedge_first:
+            groups = [[leg for leg in legs if leg.is_hedge], [leg for leg in legs if not leg.is_hedge]]
+        else:
+            groups = [list(legs)]
+        groups = [group for group in groups if group]
+
+        skews: List[float] = []
+        cap: Optional[int] = None
+        for index, group in enumerate(groups):
+            fills = await asyncio.gather(*(self._run_leg(leg, cap) for leg in group))
+            for fill in fills:
+                report.legs[fill.name] = fill
+            done = [fill.fill_ms for fill in fills if fill.fill_ms is not None]
+            if len(done) > 1:
+                skews.append(round(max(done) - min(done), 1))
+
+            remaining = [leg for later in groups[index + 1:] for leg in later]
+            if not remaining:
+                break
+            unfilled = [fill.name for fill in fills if not fill.ok]
+            if unfilled:
+                report.aborted = f"{', '.join(unfilled)} not filled"
+                for leg in remaining:
+                    report.legs[leg.name] = LegFill(
+                        leg.name, leg.request.transaction_type, leg.request.quantity,
+                        state=OrderState.SKIPPED, message=f"skipped: {report.aborted}",
+                    )
+                break
+            partial = [fill.executed_qty for fill in fills if fill.state == OrderState.PARTIAL]
+            if partial:
+                cap = min(partial)
+
+        report.total_ms = round((time.monotonic() - started) * 1000, 1)
+        report.leg_skew_ms = max(skews) if skews else None
+        self.metrics.record(getattr(self.broker, "BROKER_NAME", "") or type(self.broker).__name__, report, skews)
+        if not report.success:
+            logger.warning("Order execution incomplete: %s", report.summary())
+        return report
+
+    async def _run_leg(self, leg: LegOrder, cap: Optional[int]) -> LegFill:
+        quantity = min(leg.request.quantity, cap) if cap else leg.request.quantity
+        fill = LegFill(leg.name, leg.request.transaction_type, quantity)
+        started = time.monotonic()
+        try:
+            if leg.submit is not None:
+                response = await leg.submit(quantity)
+            else:
+                request = leg.request
+                if quantity != request.quantity:
+                    request = OrderRequest(**{**request.to_dict(), "quantity": quantity})
+                response = await self.broker.place_order(request)
+        except Exception as e:
+            response = {"success": False, "error": f"{type(e).__name__}: {e}"}
+        fill.submit_ms = round((time.monotonic() - started) * 1000, 1)
+
+        success, order_id, message, fill.response = _normalize_response(response)
+        if not success:
+            fill.state, fill.message = OrderState.FAILED, message
+            return fill
+        fill.order_id = order_id
+        if not order_id or is_replay_active() or not self.broker.can_track_orders():
+            fill.state = OrderState.UNTRACKED
+            return fill
+
+        fill.state = OrderState.SUBMITTED
+        await self._track(fill, started)
+        fill.fill_ms = round((time.monotonic() - started) * 1000, 1)
+        return fill
+
+    async def _track(self, fill: LegFill, started: float):
+        """Poll the order with backoff (woken early by postbacks) until it is terminal or times out"""
+        deadline = started + self.fill_timeout
+        delay = self.poll_interval
+        failures = 0
+        event = _order_waiters.setdefault(fill.order_id, asyncio.Event())
+        try:
+            while True:
+                event.clear()
+                try:
+                    update = self.broker.parse_order_status(await self.broker.get_order_status(fill.order_id))
+                except Exception as e:
+                    logger.debug("Order status %s failed: %s", fill.order_id, e)
+                    update = None
+                fill.polls += 1
+                if update is None:
+                    failures += 1
+                    if failures >= STATUS_FAILURES_BEFORE_UNKNOWN:
+                        fill.state, fill.message = OrderState.UNKNOWN, "order status unavailable; reconcile with the broker"
+                        return
+                else:
+                    failures = 0
+                    fill.apply(update)
+                    if fill.state in TERMINAL_STATES:
+                        if fill.state == OrderState.CANCELLED and fill.filled_qty:
+                            fill.state = OrderState.PARTIAL
+                        return
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(event.wait(), timeout=min(delay, remaining))
+                except asyncio.TimeoutError:
+                    pass
+                delay = min(delay * 2, self.max_poll_interval)
+        finally:
+            if _order_waiters.get(fill.order_id) is event:
+                del _order_waiters[fill.order_id]
+
+        # Still working at the timeout: cancel the rest so it cannot fill later
+        try:
+            await self.broker.cancel_order(fill.order_id)
+        except Exception as e:
+            logger.warning("Cancel of unfilled order %s failed: %s", fill.order_id, e)
+
+        # It may have filled between the last poll and the cancel: the final
+        # state and quantity come from a read after the cancel
+        update = None
+        for _ in range(STATUS_FAILURES_BEFORE_UNKNOWN):
+            try:
+                update = self.broker.parse_order_status(await self.broker.get_order_status(fill.order_id))
+            except Exception as e:
+                logger.debug("Order status %s failed: %s", fill.order_id, e)
+            fill.polls += 1
+            if update is not None:
+                break
+        if update is None:
+            fill.state, fill.message = OrderState.UNKNOWN, "order status unavailable after cancel; reconcile with the broker"
+            return
+        fill.apply(update)
+        if fill.state == OrderState.FILLED:
+            fill.message = f"filled as the cancel at {self.fill_timeout:.0f}s was sent"
+            return
+        fill.state = OrderState.PARTIAL if fill.filled_qty else OrderState.CANCELLED
+        fill.message = f"not filled within {self.fill_timeout:.0f}s; remainder cancelled"
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SINGLETON
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_execution_metrics: Optional[ExecutionMetrics] = None
+
+
+def get_execution_metrics() -> ExecutionMetrics:
+    """Get or create the process-wide order execution metrics"""
+    global _execution_metrics
+    if _execution_metrics is None:
+        _execution_metrics = ExecutionMetrics()
+    return _execution_metrics
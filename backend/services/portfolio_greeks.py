@@ -0,0 +1,332 @@
+"""
+Portfolio Greeks
+================
+Vectorized Black-Scholes Greeks for option books, and a delta-hedge
+planner that scores a grid of adjustments in one call.
+
+AlgoTradingEngine had its own erf-based delta looped per position,
+DeltaNeutralStrategy used scipy's norm.cdf per strike in a Python loop,
+and neither agreed on units. Both now go through this module:
+
+    book = OptionBook([
+        BookLeg(25300, "CE", -65, expiry_years=0.02, iv=0.14),
+        BookLeg(24700, "PE", -65, expiry_years=0.02, iv=0.15),
+    ])
+    greeks = book.greeks(spot=25180)          # totals + per-leg arrays
+    plans = plan_hedges(book, 25180, strikes=range(24500, 25901, 50))
+
+Conventions:
+    quantity      signed units of the underlying (+ long, - short), i.e.
+                  lots x lot size
+    delta         per unit, -1..1 (bots that use the 0-100 scale multiply)
+    gamma         delta change per 1 point of spot
+    theta         premium change per calendar day
+    vega          premium change per 1 vol point
+    iv            annualized, decimal (0.15 = 15%)
+
+Book totals are quantity-weighted sums, so `greeks.delta` is the
+position's delta in underlying units.
+
+plan_hedges() evaluates every (action, strike, size) alternative in one
+Black-Scholes call:
+
+    roll_call / roll_put           replace the most exposed short leg of that
+                                   side with a short at another OTM strike
+    add_call_wing / add_put_wing   buy protection beyond that side's short
+    buy_call / buy_put             buy options of `sizes` quantity
+
+and ranks them by distance from the target delta, plus weighted gamma
+(delta change for a 1% move) and net premium paid.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .startup import lazy_attr
+
+logger = logging.getLogger(__name__)
+
+ndtr = lazy_attr("scipy.special", "ndtr")  # vectorized standard normal CDF
+
+RISK_FREE_RATE = 0.07
+DAYS_PER_YEAR = 365.0
+INV_SQRT_2PI = 1.0 / np.sqrt(2.0 * np.pi)
+
+HEDGE_ACTIONS = ("roll_call", "roll_put", "add_call_wing", "add_put_wing", "buy_call", "buy_put")
+GAMMA_WEIGHT = 0.5
+COST_WEIGHT = 0.0
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# BLACK-SCHOLES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def bs_greeks(spot, strike, expiry_years, iv, is_call, rate: float = RISK_FREE_RATE) -> Dict[str, np.ndarray]:
+    """
+    Price, delta, gamma, theta and vega per unit. Arguments broadcast, so one
+    call prices a whole book or a whole strike grid. Expired legs (or zero IV)
+    get intrinsic value and delta, and zero gamma / theta / vega.
+    """
+    spot, strike, t, iv = (np.asarray(a, dtype=float) for a in (spot, strike, expiry_years, iv))
+    is_call = np.asarray(is_call, dtype=bool)
+
+    live = (t > 0) & (iv > 0)
+    t_safe = np.where(live, t, 1.0)
+    iv_safe = np.where(live, iv, 1.0)
+    sqrt_t = np.sqrt(t_safe)
+    d1 = (np.log(spot / strike) + (rate + 0.5 * iv_safe ** 2) * t_safe) / (iv_safe * sqrt_t)
+    d2 = d1 - iv_safe * sqrt_t
+    pdf = INV_SQRT_2PI * np.exp(-0.5 * d1 ** 2)
+    discount = strike * np.exp(-rate * t_safe)
+
+    call_delta = ndtr(d1)
+    delta = np.where(is_call, call_delta, call_delta - 1.0)
+    price = np.where(is_call, spot * call_delta - discount * ndtr(d2), discount * ndtr(-d2) - spot * ndtr(-d1))
+    gamma = pdf / (spot * iv_safe * sqrt_t)
+    decay = -spot * pdf * iv_safe / (2.0 * sqrt_t)
+    theta = np.where(is_call, decay - rate * discount * ndtr(d2), decay + rate * discount * ndtr(-d2)) / DAYS_PER_YEAR
+    vega = spot * pdf * sqrt_t / 100.0
+
+    intrinsic = np.where(is_call, np.maximum(spot - strike, 0.0), np.maximum(strike - spot, 0.0))
+    expired_delta = np.where(is_call, (spot > strike).astype(float), -(spot < strike).astype(float))
+    return {
+        "price": np.where(live, price, intrinsic),
+        "delta": np.where(live, delta, expired_delta),
+        "gamma": np.where(live, gamma, 0.0),
+        "theta": np.where(live, theta, 0.0),
+        "vega": np.where(live, vega, 0.0),
+    }
+
+
+def strike_for_delta(
+    spot: float,
+    target_delta: float,
+    strikes: Sequence[float],
+    expiry_years: float,
+    iv: float,
+    option_type: str,
+    rate: float = RISK_FREE_RATE,
+) -> float:
+    """Strike from `strikes` whose delta is closest to target_delta (signed, -1..1)"""
+    strikes = np.asarray(strikes, dtype=float)
+    if strikes.size == 0:
+        return spot
+    delta = bs_greeks(spot, strikes, expiry_years, iv, option_type == "CE", rate)["delta"]
+    return float(strikes[np.argmin(np.abs(delta - target_delta))])
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# OPTION BOOK
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@dataclass
+class BookLeg:
+    """One option position; quantity in signed underlying units"""
+    strike: float
+    option_type: str  # "CE" or "PE"
+    quantity: float
+    expiry_years: float
+    iv: float
+    label: str = ""
+
+    @property
+    def is_call(self) -> bool:
+        return self.option_type == "CE"
+
+
+@dataclass
+class BookGreeks:
+    """Quantity-weighted totals plus per-unit Greeks of every leg"""
+    delta: float
+    gamma: float
+    theta: float
+    vega: float
+    value: float
+    per_leg: Dict[str, np.ndarray]
+
+    def to_dict(self) -> Dict:
+        return {
+            "delta": round(self.delta, 4),
+            "gamma": round(self.gamma, 6),
+            "theta": round(self.theta, 2),
+            "vega": round(self.vega, 2),
+            "value": round(self.value, 2),
+        }
+
+
+class OptionBook:
+    """Option positions held as arrays"""
+
+    def __init__(self, legs: Sequence[BookLeg] = ()):
+        self.legs = list(legs)
+        self.strike = np.array([leg.strike for leg in self.legs], dtype=float)
+        self.is_call = np.array([leg.is_call for leg in self.legs], dtype=bool)
+        self.quantity = np.array([leg.quantity for leg in self.legs], dtype=float)
+        self.expiry_years = np.array([leg.expiry_years for leg in self.legs], dtype=float)
+        self.iv = np.array([leg.iv for leg in self.legs], dtype=float)
+
+    def __len__(self) -> int:
+        return len(self.legs)
+
+    def greeks(self, spot: float, rate: float = RISK_FREE_RATE) -> BookGreeks:
+        per_leg = bs_greeks(spot, self.strike, self.expiry_years, self.iv, self.is_call, rate)
+        total = {name: float(np.dot(values, self.quantity)) for name, values in per_leg.items()}
+        return BookGreeks(
+            delta=total["delta"],
+            gamma=total["gamma"],
+            theta=total["theta"],
+            vega=total["vega"],
+            value=total["price"],
+            per_leg=per_leg,
+        )
+
+    def most_exposed_short(self, is_call: bool, per_leg: Dict[str, np.ndarray]) -> Optional[int]:
+        """Index of the short leg of one side with the largest delta exposure"""
+        side = np.flatnonzero((self.is_call == is_call) & (self.quantity < 0))
+        if side.size == 0:
+            return None
+        return int(side[np.argmax(np.abs(per_leg["delta"][side] * self.quantity[side]))])
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# HEDGE PLANNER
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@dataclass
+class HedgePlan:
+    """One adjustment and the book's Greeks after it"""
+    action: str
+    option_type: str
+    strike: float
+    quantity: float  # signed units of the new leg
+    replaces: Optional[int]  # book index of the leg closed, for rolls
+    delta: float
+    gamma: float
+    theta: float
+    vega: float
+    cost: float  # net premium paid (negative = credit received)
+    score: float
+
+    def to_dict(self) -> Dict:
+        return {
+            "action": self.action,
+            "option_type": self.option_type,
+            "strike": self.strike,
+            "quantity": self.quantity,
+            "replaces": self.replaces,
+            "delta": round(self.delta, 4),
+            "gamma": round(self.gamma, 6),
+            "theta": round(self.theta, 2),
+            "vega": round(self.vega, 2),
+            "cost": round(self.cost, 2),
+            "score": round(self.score, 4),
+        }
+
+
+def plan_hedges(
+    book: OptionBook,
+    spot: float,
+    strikes: Sequence[float],
+    actions: Sequence[str] = HEDGE_ACTIONS,
+    target_delta: float = 0.0,
+    sizes: Optional[Sequence[float]] = None,
+    ivs: Optional[Sequence[float]] = None,
+    expiry_years: Optional[float] = None,
+    gamma_weight: float = GAMMA_WEIGHT,
+    cost_weight: float = COST_WEIGHT,
+    rate: float = RISK_FREE_RATE,
+    top: int = 5,
+) -> List[HedgePlan]:
+    """
+    Best `top` adjustments from the grid actions x strikes (x sizes for
+    buy_call / buy_put), scored in one vectorized pass. `ivs` gives the IV
+    per strike (skew); otherwise new legs take the IV of the leg they relate
+    to. Lower score is better.
+    """
+    strikes = np.asarray(strikes, dtype=float)
+    if strikes.size == 0:
+        return []
+    base = book.greeks(spot, rate)
+    ref_expiry = expiry_years if expiry_years is not None else (
+        float(book.expiry_years.mean()) if len(book) else 7 / DAYS_PER_YEAR
+    )
+    ref_iv = float(book.iv.mean()) if len(book) else 0.15
+    if sizes is None:
+        sizes = [float(np.abs(book.quantity).max())] if len(book) else [1.0]
+
+    columns: Dict[str, list] = {name: [] for name in ("action", "strike", "is_call", "qty", "replace", "expiry", "iv")}
+
+    def add(action: str, mask: np.ndarray, is_call: bool, qty: float, replace: int, expiry: float, iv: float):
+        chosen = strikes[mask]
+        n = chosen.size
+        columns["action"] += [action] * n
+        columns["strike"].append(chosen)
+        columns["is_call"] += [is_call] * n
+        columns["qty"] += [qty] * n
+        columns["replace"] += [replace] * n
+        columns["expiry"] += [expiry] * n
+        columns["iv"].append(np.asarray(ivs, dtype=float)[mask] if ivs is not None else np.full(n, iv))
+
+    for action in actions:
+        is_call = "call" in action
+        if action.startswith(("roll", "add")):
+            index = book.most_exposed_short(is_call, base.per_leg)
+            if index is None:
+                continue
+            leg = book.legs[index]
+            if action.startswith("roll"):
+                otm = strikes > spot if is_call else strikes < spot
+                add(action, otm & (strikes != leg.strike), is_call, leg.quantity, index, leg.expiry_years, leg.iv)
+            else:
+                beyond = strikes > leg.strike if is_call else strikes < leg.strike
+                add(action, beyond, is_call, -leg.quantity, -1, leg.expiry_years, leg.iv)
+        elif action in ("buy_call", "buy_put"):
+            for size in sizes:
+                add(action, np.ones(strikes.size, dtype=bool), is_call, abs(size), -1, ref_expiry, ref_iv)
+        else:
+            raise ValueError(f"Unknown hedge action {action!r}")
+
+    if not columns["action"]:
+        return []
+    strike = np.concatenate(columns["strike"])
+    is_call = np.array(columns["is_call"], dtype=bool)
+    qty = np.array(columns["qty"], dtype=float)
+    replace = np.array(columns["replace"], dtype=int)
+    new = bs_greeks(spot, strike, np.array(columns["expiry"]), np.concatenate(columns["iv"]), is_call, rate)
+
+    rolled = replace >= 0
+    old_index = np.where(rolled, replace, 0)
+    old_qty = np.where(rolled, book.quantity[old_index] if len(book) else 0.0, 0.0)
+    after = {}
+    for name, total in (("delta", base.delta), ("gamma", base.gamma), ("theta", base.theta), ("vega", base.vega)):
+        old = base.per_leg[name][old_index] if len(book) else np.zeros_like(qty)
+        after[name] = total - old * old_qty + new[name] * qty
+    old_price = base.per_leg["price"][old_index] if len(book) else np.zeros_like(qty)
+    cost = new["price"] * qty - old_price * old_qty
+
+    one_pct = spot * 0.01
+    score = (
+        np.abs(after["delta"] - target_delta)
+        + gamma_weight * np.abs(after["gamma"]) * one_pct
+        + cost_weight * np.maximum(cost, 0.0) / one_pct
+    )
+    best = np.argsort(score, kind="stable")[:top]
+    return [
+        HedgePlan(
+            action=columns["action"][i],
+            option_type="CE" if is_call[i] else "PE",
+            strike=float(strike[i]),
+            quantity=float(qty[i]),
+            replaces=int(replace[i]) if rolled[i] else None,
+            delta=float(after["delta"][i]),
+            gamma=float(after["gamma"][i]),
+            theta=float(after["theta"][i]),
+            vega=float(after["vega"][i]),
+            cost=float(cost[i]),
+            score=float(score[i]),
+        )
+        for i in best
+    ]
@@ -0,0 +1,232 @@
+"""
+Upstream Rate Limiter
+=====================
+One token bucket per upstream endpoint class and account, shared by every
+service that calls that upstream. Before, DhanService, DhanUnifiedService,
+DhanMarketDataService and the brokers each paced themselves, so together
+they could exceed Dhan's limits while each under-used its own budget.
+
+Dhan and Upstox enforce their limits per account, so calls made with a
+user's access token use that account's buckets; one user's orders never
+queue behind another's. The app's own feed token (DHAN_ACCESS_TOKEN /
+UPSTOX_ACCESS_TOKEN) and NSE use the global buckets.
+
+Waiters are served by priority lane, then arrival order:
+
+    CRITICAL  order placement / modification / cancellation
+    HIGH      bot risk checks: positions, funds, order status, LTP
+    NORMAL    user-facing API requests (default)
+    LOW       background and dashboard cache refreshes
+
+    await get_rate_limiter().acquire("dhan.quote", Priority.LOW)
+    await get_rate_limiter().acquire("dhan.orders", account=account_key(access_token))
+
+The limiter is thread-safe and works from any event loop (worker threads
+running asyncio.run share the same buckets).
+"""
+
+import asyncio
+import hashlib
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from enum import IntEnum
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    CRITICAL = 0
+    HIGH = 1
+    NORMAL = 2
+    LOW = 3
+
+
+# (tokens per second, burst) per endpoint class, from the brokers' published limits
+RATE_LIMITS: Dict[str, Tuple[float, int]] = {
+    "dhan.quote": (1.0, 1),             # marketfeed: 1 request / second
+    "dhan.option_chain": (1 / 3, 1),    # option chain: 1 request / 3 seconds
+    "dhan.historical": (5.0, 5),        # data APIs: 5 / second
+    "dhan.orders": (4.0, 10),           # order APIs: 25 / second, 250 / minute
+    "dhan.data": (10.0, 10),            # non-trading APIs (positions, funds): 20 / second
+    "upstox.orders": (10.0, 10),        # 10 orders / second
+    "upstox.quote": (10.0, 10),         # quote + data together stay under 25 / second
+    "upstox.data": (15.0, 15),
+    "nse": (1.0, 1),                    # unofficial site API: be polite
+}
+
+# Account buckets idle this long are dropped when new ones are created
+ACCOUNT_BUCKET_IDLE_SECONDS = 3600.0
+
+# Lane used when the caller does not pass one
+DEFAULT_PRIORITY: Dict[str, Priority] = {
+    "orders": Priority.CRITICAL,
+    "data": Priority.HIGH,
+}
+
+
+class LaneStats:
+    __slots__ = ("acquired", "total_wait", "max_wait")
+
+    def __init__(self):
+        self.acquired = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            "acquired": self.acquired,
+            "avg_wait_ms": round(self.total_wait / self.acquired * 1000, 1) if self.acquired else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 1),
+        }
+
+
+class TokenBucket:
+    """Token bucket whose waiters are granted tokens in (priority, arrival) order"""
+
+    def __init__(self, name: str, rate: float, burst: int = 1):
+        self.name = name
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._waiters: List[Tuple[int, int]] = []  # heap of (priority, seq)
+        self._seq = itertools.count()
+        self._lanes: Dict[Priority, LaneStats] = {p: LaneStats() for p in Priority}
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _grant(self, key: Optional[Tuple[int, int]], now: float) -> float:
+        """Take a token if key (or a new arrival, when None) is first in line; else seconds to wait"""
+        self._refill(now)
+        first = self._waiters[0] if self._waiters else None
+        if self._tokens >= 1 and (first is None or first == key):
+            self._tokens -= 1
+            if key is not None:
+                heapq.heappop(self._waiters)
+            return 0.0
+        # Not our turn yet: check again when the next token is due
+        return max((1 - self._tokens) / self.rate, 0.001)
+
+    async def acquire(self, priority: Priority = Priority.NORMAL) -> float:
+        """Wait for a token; returns the seconds spent queued"""
+        started = time.monotonic()
+        with self._lock:
+            delay = self._grant(None, started)
+            key = None
+            if delay:
+                key = (int(priority), next(self._seq))
+                heapq.heappush(self._waiters, key)
+        try:
+            while delay:
+                await asyncio.sleep(delay)
+                with self._lock:
+                    delay = self._grant(key, time.monotonic())
+            key = None
+        finally:
+            if key is not None:  # cancelled while queued
+                with self._lock:
+                    self._waiters.remove(key)
+                    heapq.heapify(self._waiters)
+
+        waited = time.monotonic() - started
+        lane = self._lanes[Priority(priority)]
+        lane.acquired += 1
+        lane.total_wait += waited
+        lane.max_wait = max(lane.max_wait, waited)
+        return waited
+
+    def get_status(self) -> Dict:
+        with self._lock:
+            self._refill(time.monotonic())
+            queued = {p.name.lower(): 0 for p in Priority}
+            for priority, _ in self._waiters:
+                queued[Priority(priority).name.lower()] += 1
+            tokens = self._tokens
+        return {
+            "rate_per_second": round(self.rate, 3),
+            "burst": self.burst,
+            "tokens": round(tokens, 2),
+            "queued": queued,
+            "lanes": {p.name.lower(): self._lanes[p].to_dict() for p in Priority},
+        }
+
+
+def account_key(credential: Optional[str]) -> Optional[str]:
+    """Bucket key of the account a credential (access token) belongs to: a
+    digest, so tokens never show up in the limiter status. None, the global
+    bucket, for the app's own feed tokens or no credential."""
+    if not credential or credential in (os.environ.get("DHAN_ACCESS_TOKEN"), os.environ.get("UPSTOX_ACCESS_TOKEN")):
+        return None
+    return hashlib.sha256(credential.encode()).hexdigest()[:12]
+
+
+class RateLimiter:
+    """Named token buckets for every rate-limited upstream endpoint class,
+    one set globally and one per account"""
+
+    def __init__(self, limits: Dict[str, Tuple[float, int]] = None):
+        self.limits = dict(limits or RATE_LIMITS)
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, name: str, account: Optional[str] = None) -> TokenBucket:
+        key = f"{name}@{account}" if account else name
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if name not in self.limits:
+                raise KeyError(f"No rate limit configured for '{name}'")
+            with self._lock:
+                bucket = self._buckets.get(key)
+                if bucket is None:
+                    if account:
+                        self._drop_idle(time.monotonic())
+                    rate, burst = self.limits[name]
+                    bucket = self._buckets[key] = TokenBucket(key, rate, burst)
+        return bucket
+
+    def _drop_idle(self, now: float):
+        """Forget account buckets that are full, unused and have no waiters"""
+        for key, bucket in list(self._buckets.items()):
+            if "@" in key and not bucket._waiters and now - bucket._updated > ACCOUNT_BUCKET_IDLE_SECONDS:
+                del self._buckets[key]
+
+    async def acquire(self, name: str, priority: Optional[Priority] = None, account: Optional[str] = None) -> float:
+        """Wait for a token from the name bucket, e.g. acquire("dhan.orders");
+        `account` (see account_key) selects that account's bucket"""
+        if priority is None:
+            priority = DEFAULT_PRIORITY.get(name.rsplit(".", 1)[-1], Priority.NORMAL)
+        waited = await self.bucket(name, account).acquire(priority)
+        if waited > 5:
+            logger.warning(f"⏳ Rate limiter '{name}': {Priority(priority).name} request queued {waited:.1f}s")
+        return waited
+
+    def get_status(self) -> Dict:
+        status = {name: self.bucket(name).get_status() for name in self.limits}
+        with self._lock:
+            accounts = sorted((key, bucket) for key, bucket in self._buckets.items() if "@" in key)
+        for key, bucket in accounts:
+            status[key] = bucket.get_status()
+        return status
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SINGLETON
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_rate_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Get or create the shared upstream rate limiter"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = RateLimiter()
+    return _rate_limiter
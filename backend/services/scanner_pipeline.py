@@ -0,0 +1,235 @@
+"""
+Scanner Pipeline
+================
+Runs every registered scanner once per market data refresh and keeps the
+results as versioned, pre-serialized JSON bytes with an ETag. Scanner API
+calls become a dict lookup (or a 304 when the client already has that
+version) instead of fetching and scoring the same inputs for every user.
+
+Scanners register with the pipeline.scanner(router, *paths) decorator; the
+decorated function is the compute step and stays callable directly. The
+pipeline reruns everything when the MarketFrameIngestor publishes a new
+frame, and recomputes a single scanner on request if its result is older
+than MAX_AGE_SECONDS (e.g. when the ingestor is not running).
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import APIRouter, Request, Response
+
+from .http_cache import content_etag, etag_matches
+from .json_response import dumps, json_bytes_response
+
+logger = logging.getLogger(__name__)
+
+# Results older than this are recomputed on request
+MAX_AGE_SECONDS = float(os.getenv("SCANNER_MAX_AGE_SECONDS", "120"))
+# A scanner slower than this is skipped for the refresh (previous result stays)
+SCANNER_TIMEOUT_SECONDS = float(os.getenv("SCANNER_TIMEOUT_SECONDS", "60"))
+
+Compute = Callable[[], Awaitable[Any]]
+
+
+def serialize(payload: Any) -> bytes:
+    """Compact JSON bytes (NumPy/pandas aware, NaN -> null); see json_response.dumps"""
+    return dumps(payload)
+
+
+class ScannerResult:
+    """One scanner's published output"""
+
+    __slots__ = ("name", "version", "body", "etag", "built_at", "built_monotonic", "duration_ms")
+
+    def __init__(self, name: str, version: int, body: bytes, duration_ms: float = 0.0):
+        self.name = name
+        self.version = version
+        self.body = body
+        self.etag = content_etag(body)
+        self.built_at = datetime.now()
+        self.built_monotonic = time.monotonic()
+        self.duration_ms = duration_ms
+
+    @property
+    def age_seconds(self) -> float:
+        return time.monotonic() - self.built_monotonic
+
+    def payload(self) -> Any:
+        return json.loads(self.body)
+
+
+class ScannerPipeline:
+    """Registry of scanners plus their latest published results"""
+
+    def __init__(self, max_age: float = MAX_AGE_SECONDS, timeout: float = SCANNER_TIMEOUT_SECONDS):
+        self.max_age = max_age
+        self.timeout = timeout
+        self._scanners: Dict[str, Compute] = {}
+        self._results: Dict[str, ScannerResult] = {}
+        self._errors: Dict[str, str] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._pending_version: Optional[int] = None
+        self.version = 0
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # REGISTRATION
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    def register(self, name: str, compute: Compute):
+        """Register an async no-argument scanner under name"""
+        self._scanners[name] = compute
+        self._locks[name] = asyncio.Lock()
+
+    def scanner(self, router: APIRouter, *paths: str, name: str = None):
+        """
+        Register the decorated scanner and serve it on router at paths.
+
+            @scanner_pipeline.scanner(api_router, "/scanners/swing")
+            async def get_swing_scanner(): ...
+        """
+        def decorator(compute: Compute) -> Compute:
+            key = name or paths[0].rstrip("/").rsplit("/", 1)[-1]
+            self.register(key, compute)
+
+            async def endpoint(request: Request) -> Response:
+                return await self.respond(key, request)
+
+            endpoint.__name__ = compute.__name__
+            endpoint.__doc__ = compute.__doc__
+            for path in paths:
+                router.add_api_route(path, endpoint, methods=["GET"])
+            return compute
+        return decorator
+
+    @property
+    def names(self):
+        return list(self._scanners)
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # COMPUTE
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    async def _compute(self, name: str, version: int) -> ScannerResult:
+        started = time.perf_counter()
+        payload = await asyncio.wait_for(self._scanners[name](), timeout=self.timeout)
+        result = ScannerResult(name, version, serialize(payload), (time.perf_counter() - started) * 1000)
+        self._results[name] = result
+        self._errors.pop(name, None)
+        return result
+
+    async def run(self, name: str, max_age: float = None) -> ScannerResult:
+        """
+        Compute one scanner, unless a result younger than max_age exists.
+        Concurrent callers share the computation. Errors propagate.
+        """
+        async with self._locks[name]:
+            current = self._results.get(name)
+            if max_age is not None and current is not None and current.age_seconds <= max_age:
+                return current
+            return await self._compute(name, self.version)
+
+    async def run_all(self, version: int = None) -> Dict[str, ScannerResult]:
+        """Run every registered scanner concurrently; failures keep the previous result"""
+        self.version = self.version + 1 if version is None else version
+        started = time.perf_counter()
+
+        async def run_one(name: str):
+            async with self._locks[name]:
+                try:
+                    await self._compute(name, self.version)
+                except Exception as e:
+                    self._errors[name] = str(e) or type(e).__name__
+                    logger.warning(f"Scanner '{name}' failed on refresh v{self.version}: {self._errors[name]}")
+
+        await asyncio.gather(*[run_one(name) for name in self._scanners])
+        logger.info(
+            f"🔎 Scanner pipeline v{self.version}: {len(self._scanners) - len(self._errors)}/{len(self._scanners)} "
+            f"scanners in {(time.perf_counter() - started) * 1000:.0f}ms"
+        )
+        return dict(self._results)
+
+    def on_frame(self, frame):
+        """MarketFrameIngestor listener: rerun the scanners in the background"""
+        self._pending_version = frame.version
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._drain())
+
+    async def _drain(self):
+        # Frames published while a run is in progress collapse into one more run
+        while self._pending_version is not None:
+            version, self._pending_version = self._pending_version, None
+            await self.run_all(version)
+
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    # ═══════════════════════════════════════════════════════════════════════════
+    # SERVE
+    # ═══════════════════════════════════════════════════════════════════════════
+
+    def get(self, name: str) -> Optional[ScannerResult]:
+        return self._results.get(name)
+
+    async def result(self, name: str) -> ScannerResult:
+        """Latest result, recomputed first if missing or older than max_age"""
+        current = self._results.get(name)
+        if current is not None and current.age_seconds <= self.max_age:
+            return current
+        return await self.run(name, max_age=self.max_age)
+
+    async def respond(self, name: str, request: Request) -> Response:
+        """Pre-serialized result, or 304 Not Modified when the client's ETag matches"""
+        result = await self.result(name)
+        headers = {
+            "ETag": result.etag,
+            "Cache-Control": "no-cache",
+            "X-Data-Version": str(result.version),
+        }
+        if etag_matches(request.headers.get("if-none-match"), result.etag):
+            return Response(status_code=304, headers=headers)
+        return json_bytes_response(result.body, headers=headers)
+
+    def get_status(self) -> Dict:
+        return {
+            "version": self.version,
+            "running": self._task is not None and not self._task.done(),
+            "scanners": {
+                name: {
+                    "version": result.version if result else None,
+                    "etag": result.etag if result else None,
+                    "age_seconds": round(result.age_seconds, 1) if result else None,
+                    "bytes": len(result.body) if result else 0,
+                    "duration_ms": round(result.duration_ms, 1) if result else None,
+                    "error": self._errors.get(name),
+                }
+                for name in self._scanners
+                for result in [self._results.get(name)]
+            },
+        }
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SINGLETON
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_scanner_pipeline: Optional[ScannerPipeline] = None
+
+
+def get_scanner_pipeline() -> ScannerPipeline:
+    """Get or create the shared scanner pipeline"""
+    global _scanner_pipeline
+    if _scanner_pipeline is None:
+        _scanner_pipeline = ScannerPipeline()
+    return _scanner_pipeline
@@ -0,0 +1,369 @@
+"""
+Vectorized Scanner Scoring
+==========================
+Array versions of ScannerService's day gainer / day loser / swing / money
+flow scores. Every rule is a boolean mask over the whole universe and point
+tiers are np.select calls, so a 200-stock scan is a handful of numpy ops.
+Only the top-K rows are turned back into Python dicts.
+
+The per-stock ScannerService._calculate_* methods remain the reference
+definitions; tests/test_scanner_scoring.py checks these match them exactly.
+Breakdown values are rounded with Python's round() at materialization, and
+raw passthroughs (rsi, adx) are read from the stock dict, so they are
+exactly what the per-stock path returns.
+"""
+
+from typing import Any, Dict, List, Sequence, Union
+
+import numpy as np
+
+from .market_frame import MarketFrame
+
+Stocks = Union[MarketFrame, Sequence[Dict]]
+Columns = Dict[str, np.ndarray]
+
+
+def column(stocks: Stocks, key: str, default: float = 0.0) -> np.ndarray:
+    """One field for every stock as float64 (dict stocks use default when the key is missing)"""
+    if isinstance(stocks, MarketFrame):
+        return np.asarray(stocks[key], dtype=float)
+    return np.array([stock.get(key, default) for stock in stocks], dtype=float)
+
+
+def top_k(key: np.ndarray, mask: np.ndarray, k: int) -> np.ndarray:
+    """
+    Rows of the k largest key values among masked rows, largest first.
+
+    Same result as a stable descending sort of the masked rows followed by
+    [:k] (ties keep input order), but only the top k are fully sorted.
+    """
+    rows = np.flatnonzero(mask)
+    if k <= 0 or not len(rows):
+        return rows[:0]
+    keys = key[rows]
+    if len(rows) > k:
+        kth = np.partition(keys, len(keys) - k)[len(keys) - k]
+        above = keys > kth
+        ties = np.flatnonzero(keys == kth)[:k - int(above.sum())]
+        keep = np.flatnonzero(above)
+        keep = np.concatenate([keep, ties])
+        rows, keys = rows[keep], keys[keep]
+    order = np.lexsort((rows, -keys))
+    return rows[order]
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray, default: float) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator > 0, numerator / denominator, default)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# DAY GAINERS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def day_gainer_scores(stocks: Stocks, nifty_change: float = 0) -> Columns:
+    """Day gainer score (100 pts) and breakdown columns for every stock"""
+    change_pct = column(stocks, "change_percent")
+    volume = column(stocks, "volume")
+    avg_volume = column(stocks, "avg_volume", 1)
+    ltp = column(stocks, "ltp")
+    open_price = column(stocks, "open")
+    high = column(stocks, "high")
+    low = column(stocks, "low")
+    prev_close = column(stocks, "prev_close")
+    vwap = column(stocks, "vwap")
+    rsi = column(stocks, "rsi", 50)
+    ema8 = column(stocks, "ema8")
+    ema21 = column(stocks, "ema21")
+    ema55 = column(stocks, "ema55")
+
+    relative_strength = change_pct - nifty_change
+    rs_score = np.select([relative_strength >= 2, relative_strength >= 1, relative_strength >= 0.5], [20, 15, 10], 0)
+
+    volume_ratio = _ratio(volume, avg_volume, 0)
+    volume_score = np.select([volume_ratio >= 3, volume_ratio >= 2, volume_ratio >= 1.5], [25, 20, 15], 0)
+
+    range_position = (ltp - low) / np.where(high > low, high - low, 1)
+    range_score = np.select([range_position >= 0.75, range_position >= 0.5], [20, 12], 0)
+
+    short_aligned = (ltp > ema8) & (ema8 > ema21)
+    ema_aligned = (ema8 != 0) & (ema21 != 0) & (ema55 != 0) & short_aligned & (ema21 > ema55)
+    ema_score = np.select([ema_aligned, short_aligned, ltp > ema8], [20, 12, 5], 0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gap_percent = np.where(prev_close > 0, (open_price - prev_close) / prev_close * 100, 0)
+    gap_score = np.select([gap_percent >= 2, gap_percent >= 1, gap_percent >= 0.5], [15, 10, 5], 0)
+
+    above_vwap = np.where(vwap > 0, ltp > vwap, True)
+    rsi_valid = rsi < 70
+
+    score = rs_score + volume_score + range_score + ema_score + gap_score - 10 * ~above_vwap - 5 * ~rsi_valid
+    score = np.maximum(score, 0)
+
+    return {
+        "score": score,
+        "relative_strength": relative_strength,
+        "rs_score": rs_score,
+        "volume_ratio": volume_ratio,
+        "volume_score": volume_score,
+        "range_position": range_position,
+        "range_score": range_score,
+        "ema_aligned": ema_aligned,
+        "ema_score": ema_score,
+        "gap_percent": gap_percent,
+        "gap_score": gap_score,
+        "above_vwap": above_vwap,
+        "rsi_valid": rsi_valid,
+    }
+
+
+def day_gainer_details(cols: Columns, row: int) -> Dict[str, Any]:
+    score = int(cols["score"][row])
+    return {
+        "relative_strength": round(float(cols["relative_strength"][row]), 2),
+        "rs_score": int(cols["rs_score"][row]),
+        "volume_ratio": round(float(cols["volume_ratio"][row]), 2),
+        "volume_score": int(cols["volume_score"][row]),
+        "range_position": round(float(cols["range_position"][row]) * 100, 1),
+        "range_score": int(cols["range_score"][row]),
+        "ema_aligned": bool(cols["ema_aligned"][row]),
+        "ema_score": int(cols["ema_score"][row]),
+        "gap_percent": round(float(cols["gap_percent"][row]), 2),
+        "gap_score": int(cols["gap_score"][row]),
+        "above_vwap": bool(cols["above_vwap"][row]),
+        "rsi_valid": bool(cols["rsi_valid"][row]),
+        "total_score": score,
+    }
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# DAY LOSERS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def day_loser_scores(stocks: Stocks, nifty_change: float = 0) -> Columns:
+    """
+    Day loser score and breakdown columns. "valid" marks the rows the
+    per-stock scanner considers: falling stocks whose score is defined
+    (a support level with a zero LTP cannot be scored).
+    """
+    change_pct = column(stocks, "change_percent")
+    volume = column(stocks, "volume")
+    avg_volume = column(stocks, "avg_volume", 1)
+    ltp = column(stocks, "ltp")
+    vwap = column(stocks, "vwap")
+    rsi = column(stocks, "rsi", 50)
+    support = column(stocks, "support")
+    ema8 = column(stocks, "ema8")
+    ema21 = column(stocks, "ema21")
+
+    relative_weakness = nifty_change - change_pct
+    weakness_score = np.select([relative_weakness >= 2, relative_weakness >= 1], [25, 15], 0)
+
+    below_vwap = np.where(vwap > 0, ltp < vwap, False)
+    ema_bearish = np.where((ema8 != 0) & (ema21 != 0), (ltp < ema8) & (ema8 < ema21), False)
+
+    has_support = support > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        support_distance = np.where(has_support, (ltp - support) / ltp * 100, np.nan)
+    support_score = np.select([has_support & (support_distance <= 1), has_support & (support_distance <= 3)], [20, 10], 0)
+
+    rsi_score = np.select([rsi <= 30, rsi <= 40], [20, 10], 0)
+    rsi_signal = np.select([rsi <= 30, rsi <= 40], ["oversold", "weak"], "neutral")
+
+    volume_ratio = _ratio(volume, avg_volume, 0)
+    volume_score = np.select([volume_ratio >= 2, volume_ratio >= 1.5], [15, 10], 0)
+
+    bounce = (rsi <= 30) & has_support & (support_distance <= 2)
+
+    return {
+        "valid": (change_pct < 0) & ~(has_support & (ltp == 0)),
+        "score": weakness_score + 10 * below_vwap + 10 * ema_bearish + support_score + rsi_score + volume_score,
+        "relative_weakness": relative_weakness,
+        "below_vwap": below_vwap,
+        "ema_bearish": ema_bearish,
+        "has_support": has_support,
+        "support_distance": support_distance,
+        "rsi": rsi,
+        "rsi_signal": rsi_signal,
+        "volume_ratio": volume_ratio,
+        "signal_type": np.where(bounce, "BOUNCE", "SHORT"),
+    }
+
+
+def day_loser_details(cols: Columns, row: int, stock: Dict) -> Dict[str, Any]:
+    details = {
+        "relative_weakness": round(float(cols["relative_weakness"][row]), 2),
+        "below_vwap": bool(cols["below_vwap"][row]),
+        "ema_bearish": bool(cols["ema_bearish"][row]),
+    }
+    if cols["has_support"][row]:
+        details["support_distance"] = round(float(cols["support_distance"][row]), 2)
+    details["rsi"] = stock.get("rsi", 50)
+    details["rsi_signal"] = str(cols["rsi_signal"][row])
+    details["volume_ratio"] = round(float(cols["volume_ratio"][row]), 2)
+    details["signal_type"] = str(cols["signal_type"][row])
+    return details
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SWING
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def swing_scores(stocks: Stocks, direction: str = "bullish") -> Columns:
+    """Swing score (100 pts), trend and breakdown columns for every stock"""
+    ltp = column(stocks, "ltp")
+    ema20 = column(stocks, "ema20")
+    ema50 = column(stocks, "ema50")
+    ema200 = column(stocks, "ema200")
+    adx = column(stocks, "adx")
+    rsi = column(stocks, "rsi", 50)
+    volume = column(stocks, "volume")
+    avg_volume = column(stocks, "avg_volume", 1)
+
+    has_emas = (ema20 != 0) & (ema50 != 0) & (ema200 != 0)
+    partial_bull = (ltp > ema20) & (ema20 > ema50)
+    partial_bear = (ltp < ema20) & (ema20 < ema50)
+    bullish_ema = has_emas & partial_bull & (ema50 > ema200)
+    bearish_ema = has_emas & partial_bear & (ema50 < ema200)
+
+    full_bull = bullish_ema & (direction in ("bullish", "both"))
+    full_bear = bearish_ema & (direction in ("bearish", "both"))
+    alignment = [full_bull, full_bear, partial_bull, partial_bear]
+    ema_score = np.select(alignment, [30, 30, 20, 20], 0)
+    trend = np.select(alignment, ["bullish", "bearish", "bullish", "bearish"], "neutral")
+
+    strength = [adx >= 35, adx >= 25, adx >= 20]
+    adx_score = np.select(strength, [25, 20, 10], 0)
+    trend_strength = np.select(strength, ["very_strong", "strong", "moderate"], "weak")
+
+    momentum = [
+        (trend == "bullish") & (rsi >= 50) & (rsi <= 70),
+        (trend == "bearish") & (rsi >= 30) & (rsi <= 50),
+        (rsi >= 40) & (rsi <= 60),
+    ]
+    rsi_score = np.select(momentum, [20, 20, 10], 0)
+    rsi_position = np.select(momentum, ["ideal_bullish", "ideal_bearish", "neutral"], "")
+
+    volume_ratio = _ratio(volume, avg_volume, 0)
+    volume_score = np.select([volume_ratio >= 1.5, volume_ratio >= 1.2], [15, 10], 0)
+
+    has_ema20 = ema20 > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ema20_distance = np.where(has_ema20, np.abs(ltp - ema20) / ema20 * 100, np.nan)
+    proximity_score = np.select([has_ema20 & (ema20_distance <= 3), has_ema20 & (ema20_distance <= 5)], [10, 5], 0)
+
+    return {
+        "score": ema_score + adx_score + rsi_score + volume_score + proximity_score,
+        "trend": trend,
+        "bullish_ema": bullish_ema,
+        "bearish_ema": bearish_ema,
+        "adx": adx,
+        "trend_strength": trend_strength,
+        "rsi": rsi,
+        "rsi_position": rsi_position,
+        "volume_ratio": volume_ratio,
+        "has_ema20": has_ema20,
+        "ema20_distance": ema20_distance,
+    }
+
+
+def swing_details(cols: Columns, row: int, stock: Dict) -> Dict[str, Any]:
+    details = {
+        "bullish_ema": bool(cols["bullish_ema"][row]),
+        "bearish_ema": bool(cols["bearish_ema"][row]),
+        "adx": stock.get("adx", 0),
+        "trend_strength": str(cols["trend_strength"][row]),
+        "rsi": stock.get("rsi", 50),
+    }
+    if cols["rsi_position"][row]:
+        details["rsi_position"] = str(cols["rsi_position"][row])
+    details["volume_ratio"] = round(float(cols["volume_ratio"][row]), 2)
+    if cols["has_ema20"][row]:
+        details["ema20_distance"] = round(float(cols["ema20_distance"][row]), 2)
+    return details
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# MONEY FLOW
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def money_flow_scores(stocks: Stocks) -> Columns:
+    """Money flow (approximate MFI, A/D, divergence) signal and confidence columns"""
+    volume = column(stocks, "volume")
+    if isinstance(stocks, MarketFrame):
+        avg_volume = column(stocks, "avg_volume")
+    else:
+        avg_volume = np.array([stock.get("avg_volume", stock.get("volume", 0)) for stock in stocks], dtype=float)
+    change_pct = column(stocks, "change_percent")
+    ltp = column(stocks, "ltp")
+    high = column(stocks, "high")
+    low = column(stocks, "low")
+    volume_ratio = column(stocks, "volume_ratio", 1)
+
+    # Approximate MFI from volume ratio and price direction when not provided
+    mfi = column(stocks, "mfi")
+    estimate = (mfi == 0) & (volume != 0) & (avg_volume != 0)
+    estimated = np.clip(50 + (change_pct / 5 * 10) * np.minimum(_ratio(volume, avg_volume, 1), 3), 0, 100)
+    mfi = np.where(estimate, estimated, mfi)
+
+    price_trend = np.select([change_pct > 1, change_pct < -1], ["up", "down"], "neutral")
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ad_line = np.where(high != low, ((ltp - low) - (high - ltp)) / (high - low) * volume, 0)
+
+    bands = [mfi > 80, mfi > 60, mfi < 20, mfi < 40]
+    mfi_signal = np.select(bands, ["strong_accumulation", "quiet_buying", "strong_selling", "quiet_selling"], "neutral")
+    flow_direction = np.select(bands, ["inflow", "inflow", "outflow", "outflow"], "neutral")
+    confidence = np.select(bands, [35, 25, 35, 25], 10)
+
+    ad_signal = np.select([ad_line > 0, ad_line < 0], ["accumulation", "distribution"], "neutral")
+    confidence = confidence + 15 * (ad_line != 0)
+    confidence = confidence + np.select([volume_ratio >= 2, volume_ratio >= 1.5], [20, 10], 0)
+
+    bullish_div = (price_trend == "down") & (mfi > 50)
+    bearish_div = ~bullish_div & (price_trend == "up") & (mfi < 50)
+    divergence = np.select([bullish_div, bearish_div], ["bullish", "bearish"], "")
+    confidence = confidence + 20 * (bullish_div | bearish_div)
+
+    buying = mfi > 60
+    selling = ~buying & (mfi < 40)
+    outcome = [buying & bullish_div, buying, selling & bearish_div, selling]
+    signal = np.select(outcome, ["STRONG_BUY", "BUY", "STRONG_SHORT", "SHORT"], "HOLD")
+    recommendation = np.select(outcome, [
+        "High probability bullish reversal",
+        "Institutional buying detected",
+        "High probability bearish reversal",
+        "Institutional selling detected",
+    ], "No clear institutional activity")
+
+    return {
+        "confidence": confidence,
+        "mfi": mfi,
+        "mfi_signal": mfi_signal,
+        "divergence": divergence,
+        "ad_signal": ad_signal,
+        "signal": signal,
+        "flow_direction": flow_direction,
+        "recommendation": recommendation,
+    }
+
+
+def money_flow_details(cols: Columns, row: int) -> Dict[str, Any]:
+    """Same layout as ScannerService._analyze_money_flow"""
+    return {
+        "mfi": round(float(cols["mfi"][row]), 1),
+        "mfi_signal": str(cols["mfi_signal"][row]),
+        "divergence": str(cols["divergence"][row]) or None,
+        "ad_signal": str(cols["ad_signal"][row]),
+        "signal": str(cols["signal"][row]),
+        "confidence": int(cols["confidence"][row]),
+        "flow_direction": str(cols["flow_direction"][row]),
+        "recommendation": str(cols["recommendation"][row]),
+    }
+
+
+def stock_rows(stocks: Stocks, rows: np.ndarray) -> List[Dict]:
+    """Stock dicts for the given rows only"""
+    if isinstance(stocks, MarketFrame):
+        return stocks.to_records(rows)
+    return [stocks[i] for i in rows.tolist()]
@@ -5,12 +5,15 @@ Day Gainers, Day Losers, Swing, Money Flow, Volume, OI Compass, Trade Signals
 """
 
 import asyncio
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Union
 from datetime import datetime, timedelta
 import logging
 import numpy as np
 import pandas as pd
 
+from .market_frame import MarketFrame, as_stock_records
+from . import scanner_scoring as scoring
+
 logger = logging.getLogger(__name__)
 
 class ScannerService:
@@ -36,7 +39,7 @@ class ScannerService:
     
     async def scan_day_gainers(
         self, 
-        stocks: List[Dict],
+        stocks: Union[MarketFrame, List[Dict]],
         nifty_change: float = 0,
         filters: Dict = None
     ) -> List[Dict]:
@@ -60,9 +63,14 @@ class ScannerService:
         min_score = filters.get("min_score", 75)
         results = []
         
-        for stock in stocks:
+        cols = scoring.day_gainer_scores(stocks, nifty_change)
+        rows = scoring.top_k(cols["score"], cols["score"] >= min_score, filters.get("limit", 50))
+        timestamp = datetime.now().isoformat()
+        
+        for row, stock in zip(rows, scoring.stock_rows(stocks, rows)):
             try:
-                score, details = self._calculate_day_gainer_score(stock, nifty_change)
+                score = int(cols["score"][row])
+                details = scoring.day_gainer_details(cols, row)
                 
                 if score >= min_score:
                     # Calculate targets and stop loss
@@ -85,21 +93,20 @@ class ScannerService:
                         "target_1": round(entry + (1.5 * 1.5 * atr), 2) if atr else round(entry * 1.05, 2),
                         "target_2": round(entry + (2.5 * 1.5 * atr), 2) if atr else round(entry * 1.08, 2),
                         "risk_reward": "1:1.5 / 1:2.5",
-                        "timestamp": datetime.now().isoformat()
+                        "timestamp": timestamp
                     })
             except Exception as e:
                 logger.debug(f"Day gainer calc error for {stock.get('symbol')}: {e}")
         
-        # Sort by score descending
-        results.sort(key=lambda x: x["score"], reverse=True)
-        return results[:filters.get("limit", 50)]
+        # Already sorted by score descending
+        return results
     
     def _calculate_day_gainer_score(
         self, 
         stock: Dict, 
         nifty_change: float
     ) -> tuple:
-        """Calculate day gainer score with detailed breakdown"""
+        """Calculate day gainer score with detailed breakdown (reference for scanner_scoring)"""
         score = 0
         details = {}
         
@@ -208,7 +215,7 @@ class ScannerService:
     
     async def scan_day_losers(
         self,
-        stocks: List[Dict],
+        stocks: Union[MarketFrame, List[Dict]],
         nifty_change: float = 0,
         filters: Dict = None
     ) -> List[Dict]:
@@ -231,19 +238,19 @@ class ScannerService:
         min_score = filters.get("min_score", 50)  # Use filter's min_score
         results = []
         
-        for stock in stocks:
+        # Only stocks with negative change, in the requested mode
+        cols = scoring.day_loser_scores(stocks, nifty_change)
+        mask = cols["valid"] & (cols["score"] >= min_score)
+        if mode != "both":
+            mask &= np.char.lower(cols["signal_type"].astype(str)) == mode.lower()
+        rows = scoring.top_k(cols["score"], mask, filters.get("limit", 50))
+        timestamp = datetime.now().isoformat()
+        
+        for row, stock in zip(rows, scoring.stock_rows(stocks, rows)):
             try:
-                # Only process stocks with negative change
-                change_pct = stock.get("change_percent", 0)
-                if change_pct >= 0:
-                    continue
-                    
-                score, details, signal_type = self._calculate_day_loser_score(
-                    stock, nifty_change
-                )
-                
-                if mode != "both" and signal_type.lower() != mode.lower():
-                    continue
+                score = int(cols["score"][row])
+                details = scoring.day_loser_details(cols, row, stock)
+                signal_type = details["signal_type"]
                 
                 if score >= min_score:
                     atr = stock.get("atr", 0)
@@ -262,20 +269,19 @@ class ScannerService:
                         "entry": entry,
                         "stop_loss": round(entry + (1.5 * atr), 2) if signal_type == "SHORT" and atr else round(entry - (1 * atr), 2) if atr else round(entry * 1.03, 2) if signal_type == "SHORT" else round(entry * 0.97, 2),
                         "target_1": round(entry - (1.5 * atr), 2) if signal_type == "SHORT" and atr else round(entry + (2 * atr), 2) if atr else round(entry * 0.95, 2) if signal_type == "SHORT" else round(entry * 1.05, 2),
-                        "timestamp": datetime.now().isoformat()
+                        "timestamp": timestamp
                     })
             except Exception as e:
                 logger.debug(f"Day loser calc error for {stock.get('symbol')}: {e}")
         
-        results.sort(key=lambda x: x["score"], reverse=True)
-        return results[:filters.get("limit", 50)]
+        return results
     
     def _calculate_day_loser_score(
         self,
         stock: Dict,
         nifty_change: float
     ) -> tuple:
-        """Calculate day loser score and determine signal type"""
+        """Calculate day loser score and determine signal type (reference for scanner_scoring)"""
         score = 0
         details = {}
         
@@ -352,7 +358,7 @@ class ScannerService:
     
     async def scan_swing(
         self,
-        stocks: List[Dict],
+        stocks: Union[MarketFrame, List[Dict]],
         filters: Dict = None
     ) -> List[Dict]:
         """
@@ -376,9 +382,15 @@ class ScannerService:
         min_score = filters.get("min_score", 65)
         results = []
         
-        for stock in stocks:
+        cols = scoring.swing_scores(stocks, direction)
+        rows = scoring.top_k(cols["score"], cols["score"] >= min_score, filters.get("limit", 50))
+        timestamp = datetime.now().isoformat()
+        
+        for row, stock in zip(rows, scoring.stock_rows(stocks, rows)):
             try:
-                score, details, trend = self._calculate_swing_score(stock, direction)
+                score = int(cols["score"][row])
+                details = scoring.swing_details(cols, row, stock)
+                trend = str(cols["trend"][row])
                 
                 if score >= min_score:
                     atr = stock.get("atr", 0)
@@ -398,20 +410,19 @@ class ScannerService:
                         "stop_loss": round(entry - (2 * atr), 2) if trend == "bullish" and atr else round(entry + (2 * atr), 2) if atr else round(entry * 0.95, 2) if trend == "bullish" else round(entry * 1.05, 2),
                         "target": round(entry + (4 * atr), 2) if trend == "bullish" and atr else round(entry - (4 * atr), 2) if atr else round(entry * 1.10, 2) if trend == "bullish" else round(entry * 0.90, 2),
                         "holding_period": "5-10 days",
-                        "timestamp": datetime.now().isoformat()
+                        "timestamp": timestamp
                     })
             except Exception as e:
                 logger.debug(f"Swing calc error for {stock.get('symbol')}: {e}")
         
-        results.sort(key=lambda x: x["score"], reverse=True)
-        return results[:filters.get("limit", 50)]
+        return results
     
     def _calculate_swing_score(
         self,
         stock: Dict,
         direction: str
     ) -> tuple:
-        """Calculate swing trade score"""
+        """Calculate swing trade score (reference for scanner_scoring)"""
         score = 0
         details = {}
         
@@ -498,7 +509,7 @@ class ScannerService:
     
     async def scan_money_flow(
         self,
-        stocks: List[Dict],
+        stocks: Union[MarketFrame, List[Dict]],
         filters: Dict = None
     ) -> List[Dict]:
         """
@@ -522,9 +533,13 @@ class ScannerService:
         min_confidence = filters.get("min_confidence", 60)
         results = []
         
-        for stock in stocks:
+        cols = scoring.money_flow_scores(stocks)
+        rows = scoring.top_k(cols["confidence"], cols["confidence"] >= min_confidence, filters.get("limit", 50))
+        timestamp = datetime.now().isoformat()
+        
+        for row, stock in zip(rows, scoring.stock_rows(stocks, rows)):
             try:
-                analysis = self._analyze_money_flow(stock)
+                analysis = scoring.money_flow_details(cols, row)
                 
                 if analysis["confidence"] >= min_confidence:
                     results.append({
@@ -539,18 +554,18 @@ class ScannerService:
                         "confidence": analysis["confidence"],
                         "smart_money_flow": analysis["flow_direction"],
                         "recommendation": analysis["recommendation"],
-                        "timestamp": datetime.now().isoformat()
+                        "timestamp": timestamp
                     })
             except Exception as e:
                 logger.debug(f"Money flow calc error for {stock.get('symbol')}: {e}")
         
-        results.sort(key=lambda x: x["confidence"], reverse=True)
-        return results[:filters.get("limit", 50)]
+        return results
     
     def _analyze_money_flow(self, stock: Dict) -> Dict:
         """
         Analyze money flow indicators.
         Calculate approximate MFI from available data if not provided.
+        Per-stock reference for scanner_scoring.money_flow_scores.
         """
         # Get available data
         volume = stock.get("volume", 0)
@@ -672,7 +687,7 @@ class ScannerService:
     
     async def scan_high_volume(
         self,
-        stocks: List[Dict],
+        stocks: Union[MarketFrame, List[Dict]],
         filters: Dict = None
     ) -> List[Dict]:
         """
@@ -685,6 +700,7 @@ class ScannerService:
         4. DISTRIBUTION: Vol 2x, price down
         5. VOLUME DIVERGENCE: Vol 1.5x, price flat
         """
+        stocks = as_stock_records(stocks)
         filters = filters or {}
         min_volume_ratio = filters.get("min_volume_ratio", 1.5)
         results = []
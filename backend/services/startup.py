@@ -0,0 +1,378 @@
+"""
+Startup
+=======
+Keeps the server's cold start short. Cloud Run starts a new instance on
+demand, and every second spent in `import server` or in lifespan is
+request latency.
+
+- lazy_import() / lazy_attr(): proxies for heavy libraries (yfinance,
+  scipy.stats) that import on first use instead of at server import
+- LazyRouters: feature routers imported on the first request under their
+  path prefix, or by the background preload, whichever comes first. Their
+  routes are spliced into the route table where the eager include_router
+  used to put them, so route precedence is unchanged.
+- StartupManager: startup work (Dhan token, first stock fetch, router
+  preload) runs as background warm-ups once the server accepts requests.
+  /ready answers 503 until the required ones have finished.
+
+Set LAZY_ROUTERS=0 to import every router at server import, as before.
+run_import_profile.py profiles `import server` with -X importtime.
+"""
+
+import asyncio
+import importlib
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from starlette.routing import BaseRoute, Match, NoMatchFound
+
+logger = logging.getLogger(__name__)
+
+LAZY_ROUTERS_ENABLED = os.getenv("LAZY_ROUTERS", "1").lower() not in ("0", "false", "no")
+
+# Default zero for the startup timeline
+_PROCESS_T0 = time.monotonic()
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# LAZY IMPORTS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class LazyModule:
+    """Stands in for a module; imports it on first attribute access"""
+
+    def __init__(self, name: str):
+        self.__dict__["_lazy_name"] = name
+        self.__dict__["_lazy_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_lazy_module"]
+        if module is None:
+            started = time.perf_counter()
+            module = importlib.import_module(self.__dict__["_lazy_name"])
+            self.__dict__["_lazy_module"] = module
+            logger.info(f"📦 Imported {self._lazy_name} on first use ({(time.perf_counter() - started) * 1000:.0f} ms)")
+        return module
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.__dict__["_lazy_module"] is not None else "not loaded"
+        return f"<lazy module '{self._lazy_name}' ({state})>"
+
+
+class LazyAttribute:
+    """Stands in for module.attr (a class, function or object such as scipy.stats.norm)"""
+
+    def __init__(self, module: str, attr: str):
+        self._module = LazyModule(module)
+        self._attr = attr
+
+    def _resolve(self) -> Any:
+        return getattr(self._module, self._attr)
+
+    def __getattr__(self, attr: str) -> Any:
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+        return getattr(self._resolve(), attr)
+
+    def __call__(self, *args, **kwargs):
+        return self._resolve()(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        return f"<lazy {self._module._lazy_name}.{self._attr}>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    """`yf = lazy_import("yfinance")` instead of `import yfinance as yf`"""
+    return LazyModule(name)
+
+
+def lazy_attr(module: str, attr: str) -> LazyAttribute:
+    """`norm = lazy_attr("scipy.stats", "norm")` instead of `from scipy.stats import norm`"""
+    return LazyAttribute(module, attr)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# LAZY ROUTERS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class _RouteSlot(BaseRoute):
+    """Placeholder in the route table where a lazy router's routes will go; never matches"""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def matches(self, scope) -> Tuple[Match, Dict]:
+        return Match.NONE, {}
+
+    def url_path_for(self, name: str, /, **path_params: Any):
+        raise NoMatchFound(name, path_params)
+
+    async def handle(self, scope, receive, send):  # pragma: no cover - never matched
+        raise RuntimeError(f"Lazy router slot '{self.name}' was routed to")
+
+
+class LazyRouter:
+    """One feature module's router(s), imported on demand"""
+
+    def __init__(self, name: str, module: str, paths: Iterable[str], attrs: Iterable[str], include: Dict[str, Any]):
+        self.name = name
+        self.module = module
+        self.paths = tuple(p.rstrip("/") for p in paths)
+        self.attrs = tuple(attrs)
+        self.include = include
+        self.slot = _RouteSlot(name)
+        self.loaded = False
+        self.error: Optional[str] = None
+        self.load_ms: Optional[float] = None
+        self.lock: Optional[asyncio.Lock] = None
+
+    def serves(self, path: str) -> bool:
+        return any(path == p or path.startswith(p + "/") for p in self.paths)
+
+    def to_dict(self) -> Dict:
+        return {
+            "module": self.module,
+            "paths": list(self.paths),
+            "loaded": self.loaded,
+            "load_ms": round(self.load_ms, 1) if self.load_ms is not None else None,
+            "error": self.error,
+        }
+
+
+class LazyRouters:
+    """
+    Registry of routers included on first use. register() reserves the
+    router's position in app.router.routes; the routes are spliced in there
+    when a request under one of its paths arrives (LazyRouterMiddleware) or
+    when preload() runs.
+    """
+
+    def __init__(self, app, enabled: bool = LAZY_ROUTERS_ENABLED):
+        self.app = app
+        self.enabled = enabled
+        self._routers: Dict[str, LazyRouter] = {}
+
+    @property
+    def pending(self) -> bool:
+        return any(not r.loaded for r in self._routers.values())
+
+    def register(self, name: str, module: str, paths: Iterable[str], attrs: Iterable[str] = ("router",), **include):
+        """
+        Reserve a router at the current end of the route table. paths are the
+        request path prefixes it serves; include is passed to
+        app.include_router (prefix, default_response_class...).
+        """
+        lazy = LazyRouter(name, module, paths, attrs, include)
+        self._routers[name] = lazy
+        self.app.router.routes.append(lazy.slot)
+        if not self.enabled:
+            self._include(lazy, self._import(lazy))
+
+    def _import(self, lazy: LazyRouter):
+        started = time.perf_counter()
+        try:
+            return importlib.import_module(lazy.module)
+        except Exception as e:
+            lazy.error = f"{type(e).__name__}: {e}"
+            logger.warning(f"⚠️ {lazy.name} routes not loaded: {e}")
+            return None
+        finally:
+            lazy.load_ms = (time.perf_counter() - started) * 1000
+
+    def _include(self, lazy: LazyRouter, module):
+        routes = self.app.router.routes
+        added: List[BaseRoute] = []
+        if module is not None:
+            before = len(routes)
+            try:
+                for attr in lazy.attrs:
+                    self.app.include_router(getattr(module, attr), **lazy.include)
+            except Exception as e:
+                lazy.error = f"{type(e).__name__}: {e}"
+                logger.error(f"❌ Error loading {lazy.name} routes: {e}")
+            added = routes[before:]
+            del routes[before:]
+        index = routes.index(lazy.slot)
+        routes[index:index + 1] = added
+        lazy.loaded = True
+        self.app.openapi_schema = None  # regenerate docs with the new routes
+        if lazy.error is None:
+            logger.info(f"✅ {lazy.name} routes loaded ({lazy.load_ms:.0f} ms)")
+
+    async def load(self, name: str):
+        lazy = self._routers[name]
+        if lazy.loaded:
+            return
+        if lazy.lock is None:
+            lazy.lock = asyncio.Lock()
+        async with lazy.lock:
+            if lazy.loaded:
+                return
+            # Import off the event loop; splice the routes in on it
+            module = await asyncio.to_thread(self._import, lazy)
+            self._include(lazy, module)
+
+    async def ensure(self, path: str):
+        """Load every pending router that serves path"""
+        for lazy in list(self._routers.values()):
+            if not lazy.loaded and lazy.serves(path):
+                await self.load(lazy.name)
+
+    async def preload(self):
+        """Load every pending router, one at a time"""
+        for name in list(self._routers):
+            await self.load(name)
+
+    def get_status(self) -> Dict:
+        return {"enabled": self.enabled, "routers": {name: r.to_dict() for name, r in self._routers.items()}}
+
+
+class LazyRouterMiddleware:
+    """Loads lazy routers before the request that needs them is routed"""
+
+    def __init__(self, app, routers: LazyRouters, openapi_url: Optional[str] = "/openapi.json"):
+        self.app = app
+        self.routers = routers
+        self.openapi_url = openapi_url
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] in ("http", "websocket") and self.routers.pending:
+            if scope["path"] == self.openapi_url:
+                await self.routers.preload()
+            else:
+                await self.routers.ensure(scope["path"])
+        await self.app(scope, receive, send)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# WARM-UPS / READINESS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class Warmup:
+    def __init__(self, name: str, fn: Callable[[], Awaitable[Any]], required: bool, after: Iterable[str]):
+        self.name = name
+        self.fn = fn
+        self.required = required
+        self.after = tuple(after)
+        self.status = "pending"  # pending -> running -> done | failed
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.duration: Optional[float] = None
+        self.finished = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    def to_dict(self, origin: float) -> Dict:
+        return {
+            "status": self.status,
+            "required": self.required,
+            "after": list(self.after),
+            "started_at_s": round(self.started_at - origin, 2) if self.started_at else None,
+            "duration_s": round(self.duration, 2) if self.duration is not None else None,
+            "error": self.error,
+        }
+
+
+class StartupManager:
+    """Background warm-ups plus the startup timeline (import, serving, ready)"""
+
+    def __init__(self, origin: float = None):
+        # Timeline zero; server.py sets it to when its own import began
+        self.origin = origin if origin is not None else _PROCESS_T0
+        self._warmups: Dict[str, Warmup] = {}
+        self._marks: Dict[str, float] = {}
+
+    def mark(self, name: str):
+        """Record a startup milestone, in seconds since origin"""
+        self._marks.setdefault(name, time.monotonic() - self.origin)
+        logger.info(f"⏱️ Startup: {name} at {self._marks[name]:.2f}s")
+
+    def register(self, name: str, fn: Callable[[], Awaitable[Any]], required: bool = True, after: Iterable[str] = ()):
+        """
+        Add a warm-up. required ones gate /ready; after names warm-ups that
+        must finish (done or failed) before this one starts.
+        """
+        self._warmups[name] = Warmup(name, fn, required, after)
+
+    def start(self):
+        """Launch every warm-up as a background task"""
+        self.mark("serving")
+        for warmup in self._warmups.values():
+            if warmup.task is None:
+                warmup.task = asyncio.create_task(self._run(warmup))
+        if not any(w.required for w in self._warmups.values()):
+            self.mark("ready")
+
+    async def _run(self, warmup: Warmup):
+        try:
+            for name in warmup.after:
+                await self._warmups[name].finished.wait()
+            warmup.status = "running"
+            warmup.started_at = time.monotonic()
+            await warmup.fn()
+            warmup.status = "done"
+        except asyncio.CancelledError:
+            warmup.status = "cancelled"
+            raise
+        except Exception as e:
+            warmup.status = "failed"
+            warmup.error = str(e)
+            logger.error(f"Startup warm-up '{warmup.name}' failed: {e}")
+        finally:
+            if warmup.started_at is not None:
+                warmup.duration = time.monotonic() - warmup.started_at
+            warmup.finished.set()
+            if self.ready:
+                self.mark("ready")
+
+    @property
+    def ready(self) -> bool:
+        """Every required warm-up has finished; a failed one does not hold the instance back"""
+        return all(w.finished.is_set() for w in self._warmups.values() if w.required)
+
+    async def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        waits = [w.finished.wait() for w in self._warmups.values() if w.required]
+        try:
+            await asyncio.wait_for(asyncio.gather(*waits), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.ready
+
+    async def stop(self):
+        tasks = [w.task for w in self._warmups.values() if w.task and not w.task.done()]
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def get_status(self) -> Dict:
+        return {
+            "ready": self.ready,
+            "timeline_s": {name: round(t, 2) for name, t in self._marks.items()},
+            "warmups": {name: w.to_dict(self.origin) for name, w in self._warmups.items()},
+        }
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SINGLETON
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_startup_manager: Optional[StartupManager] = None
+
+
+def get_startup_manager() -> StartupManager:
+    """Get or create the process-wide startup manager"""
+    global _startup_manager
+    if _startup_manager is None:
+        _startup_manager = StartupManager()
+    return _startup_manager
@@ -0,0 +1,196 @@
+"""
+Streaming Indicators
+====================
+Incremental O(1)-per-bar indicators shared by the live VWAP bot and the
+backtesters.
+
+Recomputing VWAP from the first candle (or RSI / average volume over a
+window) at every index makes a session scan quadratic. These objects keep
+running sums / ring buffers instead, so each new bar costs constant time.
+
+- SessionVWAP   - cumulative VWAP that resets when the session key changes
+- VWAPSeries    - per-symbol VWAP history over a growing candle list
+- WilderRSI     - RSI with Wilder smoothing
+- RollingMean   - fixed-window mean backed by a ring buffer
+"""
+
+from collections import deque
+from typing import Any, Dict, Hashable, List, Optional
+
+
+class SessionVWAP:
+    """
+    Session VWAP from running sums of typical price x volume.
+
+    Args:
+        min_volume: If set, bars with volume <= 0 are counted with this volume
+            (the live bot treats missing volume as 1). If None, zero-volume
+            bars contribute nothing and a session with no volume at all falls
+            back to TWAP (mean typical price).
+    """
+
+    __slots__ = ("min_volume", "session", "sum_tp_vol", "sum_vol", "sum_tp", "count")
+
+    def __init__(self, min_volume: Optional[float] = None):
+        self.min_volume = min_volume
+        self.session: Optional[Hashable] = None
+        self.reset()
+
+    def reset(self, session: Optional[Hashable] = None):
+        self.session = session
+        self.sum_tp_vol = 0.0
+        self.sum_vol = 0.0
+        self.sum_tp = 0.0
+        self.count = 0
+
+    def update(self, high: float, low: float, close: float, volume: float,
+               session: Optional[Hashable] = None) -> float:
+        """Add one bar and return the VWAP including it"""
+        if session is not None and session != self.session:
+            self.reset(session)
+
+        if volume <= 0 and self.min_volume is not None:
+            volume = self.min_volume
+
+        typical_price = (high + low + close) / 3
+        if volume > 0:
+            self.sum_tp_vol += typical_price * volume
+            self.sum_vol += volume
+        self.sum_tp += typical_price
+        self.count += 1
+        return self.value
+
+    def update_candle(self, candle: Dict[str, Any], session: Optional[Hashable] = None) -> float:
+        """Add one candle dict (open/high/low/close/volume keys)"""
+        return self.update(
+            float(candle.get("high", 0)),
+            float(candle.get("low", 0)),
+            float(candle.get("close", 0)),
+            float(candle.get("volume", 1 if self.min_volume is not None else 0)),
+            session,
+        )
+
+    @property
+    def value(self) -> float:
+        if self.sum_vol > 0:
+            return self.sum_tp_vol / self.sum_vol
+        if self.min_volume is None and self.count:
+            return self.sum_tp / self.count
+        return 0.0
+
+
+class VWAPSeries:
+    """
+    VWAP value after each candle of a growing intraday candle list.
+
+    ``extend`` only consumes candles it has not seen yet, so calling it with
+    the full day's candles on every scan costs O(new candles).
+    """
+
+    def __init__(self, min_volume: Optional[float] = 1.0):
+        self._vwap = SessionVWAP(min_volume=min_volume)
+        self.values: List[float] = []
+        self.session: Optional[Hashable] = None
+
+    def extend(self, candles: List[Dict[str, Any]], session: Optional[Hashable] = None) -> List[float]:
+        if session != self.session or len(candles) < len(self.values):
+            # New day, or the candle list was rebuilt shorter - start over
+            self._vwap.reset()
+            self.values = []
+            self.session = session
+        for candle in candles[len(self.values):]:
+            self.values.append(self._vwap.update_candle(candle))
+        return self.values
+
+    def at(self, idx: int) -> float:
+        """VWAP through candle ``idx`` (0 if not available)"""
+        if idx < 0 or idx >= len(self.values):
+            return 0.0
+        return self.values[idx]
+
+
+class WilderRSI:
+    """
+    RSI with Wilder smoothing. Seeds with the simple average of the first
+    ``period`` changes, then avg = (avg * (period - 1) + x) / period.
+    Returns 50.0 until seeded.
+    """
+
+    __slots__ = ("period", "prev_close", "avg_gain", "avg_loss", "_seed_gain", "_seed_loss", "_seen")
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.prev_close: Optional[float] = None
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self._seed_gain = 0.0
+        self._seed_loss = 0.0
+        self._seen = 0
+
+    def update(self, close: float) -> float:
+        if self.prev_close is None:
+            self.prev_close = close
+            return 50.0
+
+        change = close - self.prev_close
+        self.prev_close = close
+        gain = change if change > 0 else 0.0
+        loss = -change if change < 0 else 0.0
+        self._seen += 1
+
+        if self._seen < self.period:
+            self._seed_gain += gain
+            self._seed_loss += loss
+            return 50.0
+        if self._seen == self.period:
+            self.avg_gain = (self._seed_gain + gain) / self.period
+            self.avg_loss = (self._seed_loss + loss) / self.period
+        else:
+            self.avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+            self.avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+        return self.value
+
+    @property
+    def ready(self) -> bool:
+        return self._seen >= self.period
+
+    @property
+    def value(self) -> float:
+        if not self.ready:
+            return 50.0
+        if self.avg_loss == 0:
+            return 100.0
+        rs = self.avg_gain / self.avg_loss
+        return 100 - (100 / (1 + rs))
+
+
+class RollingMean:
+    """Mean of the last ``period`` values using a ring buffer and running sum"""
+
+    __slots__ = ("period", "_buffer", "_sum")
+
+    def __init__(self, period: int = 20):
+        self.period = period
+        self._buffer: deque = deque(maxlen=period)
+        self._sum = 0.0
+
+    def update(self, value: float) -> float:
+        if len(self._buffer) == self.period:
+            self._sum -= self._buffer[0]
+        self._buffer.append(value)
+        self._sum += value
+        return self.value
+
+    @property
+    def full(self) -> bool:
+        return len(self._buffer) == self.period
+
+    @property
+    def value(self) -> float:
+        return self._sum / len(self._buffer) if self._buffer else 0.0
+
+    def ratio(self, value: float, default: float = 1.0) -> float:
+        """value / mean of the window (before adding value), or default if the window is not full"""
+        if not self.full or self.value == 0:
+            return default
+        return value / self.value
@@ -23,6 +23,8 @@ from collections import defaultdict
 import json
 import numpy as np
 
+from .account_state import Account, SectionView, get_account_state
+
 logger = logging.getLogger(__name__)
 
 
@@ -1144,17 +1146,40 @@ class TradeAlgoService:
             "timestamp": datetime.now().isoformat()
         }
     
-    async def fetch_all_positions(self) -> Dict:
-        """Fetch positions from all brokers"""
-        all_positions = []
-        
-        if self.dhan_fetcher.is_configured():
-            dhan_positions = await self.dhan_fetcher.get_positions()
-            all_positions.extend(dhan_positions)
-        
-        if self.upstox_fetcher.is_configured():
-            upstox_positions = await self.upstox_fetcher.get_positions()
-            all_positions.extend(upstox_positions)
+    def _accounts(self) -> Dict[str, Account]:
+        """Account-state accounts of the configured brokers"""
+        state = get_account_state()
+        accounts = {}
+        for broker, fetcher in (("dhan", self.dhan_fetcher), ("upstox", self.upstox_fetcher)):
+            if fetcher.is_configured():
+                accounts[broker] = state.register(
+                    broker,
+                    fetcher.access_token,
+                    {"positions": fetcher.get_positions, "funds": fetcher.get_funds, "orders": self._orders_loader(broker, fetcher)},
+                    client_id=getattr(fetcher, "client_id", None),
+                )
+        return accounts
+    
+    @staticmethod
+    def _orders_loader(broker: str, fetcher):
+        async def load_orders() -> List[Dict]:
+            return [{**order, "broker": broker} for order in await fetcher.get_orders()]
+        return load_orders
+    
+    async def _read_accounts(self, section: str, force_refresh: bool = False) -> Dict[str, Any]:
+        """One section of every configured broker, loaded concurrently (SectionView or the exception)"""
+        state = get_account_state()
+        accounts = self._accounts()
+        views = await asyncio.gather(
+            *(state.read(account, section, force=force_refresh) for account in accounts.values()),
+            return_exceptions=True
+        )
+        return dict(zip(accounts, views))
+    
+    async def fetch_all_positions(self, force_refresh: bool = False) -> Dict:
+        """Fetch positions from all brokers (cached per account, see account_state)"""
+        views = await self._read_accounts("positions", force_refresh)
+        all_positions = [p for view in views.values() if isinstance(view, SectionView) for p in view.data]
         
         self._positions_cache = all_positions
         
@@ -1165,50 +1190,36 @@ class TradeAlgoService:
             "positions": [p.to_dict() for p in all_positions],
             "total_count": len(all_positions),
             "total_pnl": round(total_pnl, 2),
-            "brokers": self._get_broker_status(),
+            "brokers": self._get_broker_status(views),
             "timestamp": datetime.now().isoformat()
         }
     
-    async def fetch_funds(self) -> Dict:
-        """Fetch funds from all brokers"""
+    async def fetch_funds(self, force_refresh: bool = False) -> Dict:
+        """Fetch funds from all brokers (cached per account, see account_state)"""
+        views = await self._read_accounts("funds", force_refresh)
         funds = {"brokers": {}}
         total_available = 0
         
-        if self.dhan_fetcher.is_configured():
-            dhan_funds = await self.dhan_fetcher.get_funds()
-            funds["brokers"]["dhan"] = dhan_funds
-            total_available += dhan_funds.get("available_balance", 0)
-        
-        if self.upstox_fetcher.is_configured():
-            upstox_funds = await self.upstox_fetcher.get_funds()
-            funds["brokers"]["upstox"] = upstox_funds
-            total_available += upstox_funds.get("available_balance", 0)
+        for broker, view in views.items():
+            if isinstance(view, SectionView):
+                funds["brokers"][broker] = view.data
+                total_available += view.data.get("available_balance", 0)
         
         funds["total_available"] = round(total_available, 2)
+        funds["versions"] = {b: v.version for b, v in views.items() if isinstance(v, SectionView)}
         funds["timestamp"] = datetime.now().isoformat()
         
         return funds
     
-    async def fetch_orders(self) -> Dict:
-        """Fetch today's orders from all brokers"""
-        all_orders = []
-        
-        if self.dhan_fetcher.is_configured():
-            dhan_orders = await self.dhan_fetcher.get_orders()
-            for order in dhan_orders:
-                order["broker"] = "dhan"
-                all_orders.append(order)
-        
-        if self.upstox_fetcher.is_configured():
-            upstox_orders = await self.upstox_fetcher.get_orders()
-            for order in upstox_orders:
-                order["broker"] = "upstox"
-                all_orders.append(order)
+    async def fetch_orders(self, force_refresh: bool = False) -> Dict:
+        """Fetch today's orders from all brokers (cached per account, see account_state)"""
+        views = await self._read_accounts("orders", force_refresh)
+        all_orders = [o for view in views.values() if isinstance(view, SectionView) for o in view.data]
         
         return {
             "orders": all_orders,
             "total_count": len(all_orders),
-            "brokers": self._get_broker_status(),
+            "brokers": self._get_broker_status(views),
             "timestamp": datetime.now().isoformat()
         }
     
@@ -1270,9 +1281,9 @@ class TradeAlgoService:
             "timestamp": datetime.now().isoformat()
         }
     
-    def _get_broker_status(self) -> Dict:
-        """Get broker connection status"""
-        return {
+    def _get_broker_status(self, views: Dict[str, Any] = None) -> Dict:
+        """Get broker connection status, with cache freshness of the section just read"""
+        status = {
             "dhan": {
                 "configured": self.dhan_fetcher.is_configured(),
                 "client_id": self.dhan_fetcher.client_id[:4] + "****" if self.dhan_fetcher.client_id else None
@@ -1281,6 +1292,12 @@ class TradeAlgoService:
                 "configured": self.upstox_fetcher.is_configured()
             }
         }
+        for broker, view in (views or {}).items():
+            if isinstance(view, SectionView):
+                status[broker].update(view.meta())
+            else:
+                status[broker]["error"] = getattr(view, "detail", None) or str(view)
+        return status
     
     async def close(self):
         """Cleanup resources"""
@@ -19,6 +19,8 @@ from typing import Dict, List, Optional, Any
 from dataclasses import dataclass, field
 import json
 
+from .bot_scheduler import Lane, get_bot_scheduler
+
 logger = logging.getLogger(__name__)
 
 # IST timezone offset (+5:30)
@@ -115,73 +117,80 @@ class TradingEngine:
         logger.info(f"[{bot_id}] {message}")
     
     async def _trading_loop(self, bot_id: str, strategy: str):
-        """Main trading loop - runs during market hours (IST)"""
+        """Main trading loop - runs during market hours (IST), ticked by the bot scheduler"""
         self._log(bot_id, f"🔄 Trading loop started for strategy: {strategy}")
         
-        while self.bot_states.get(bot_id, BotState(bot_id, "")).status == "running":
-            try:
-                # Check market hours (9:15 AM to 3:30 PM IST)
-                now_ist = datetime.now(IST)
-                market_open = time(9, 15)
-                market_close = time(15, 30)
-                current_time = now_ist.time()
-                
-                # Check if it's a weekday (Monday=0, Sunday=6)
-                is_weekday = now_ist.weekday() < 5
-                
-                if not is_weekday:
-                    self._log(bot_id, f"📅 Weekend - market closed. Waiting...")
-                    await asyncio.sleep(300)  # Check every 5 minutes on weekends
-                    continue
-                
-                if not (market_open <= current_time <= market_close):
-                    self._log(bot_id, f"⏰ Outside market hours (IST: {current_time.strftime('%H:%M')}). Market: 9:15-15:30")
-                    await asyncio.sleep(60)  # Check every minute outside market hours
-                    continue
-                
-                self._log(bot_id, f"📊 Market open. Checking for signals... (IST: {current_time.strftime('%H:%M:%S')})")
-                
-                # Check daily limits
-                bot_state = self.bot_states[bot_id]
-                if bot_state.trades_today >= self.max_trades:
-                    self._log(bot_id, f"📊 Max trades ({self.max_trades}) reached for today")
-                    await asyncio.sleep(60)
-                    continue
-                
-                max_loss = self.capital * (self.max_daily_loss / 100)
-                if bot_state.pnl_today <= -max_loss:
-                    self._log(bot_id, f"❌ Max daily loss (₹{max_loss:.0f}) hit. PnL: ₹{bot_state.pnl_today:.0f}")
-                    await asyncio.sleep(60)
-                    continue
+        def lane() -> Lane:
+            state = self.bot_states.get(bot_id)
+            return Lane.RISK if state and state.positions else Lane.ENTRY
+        
+        await get_bot_scheduler().run(
+            f"TradingEngine@{bot_id}", lambda: self._trading_cycle(bot_id, strategy),
+            interval=30, lane=lane,
+            active=lambda: self.bot_states.get(bot_id, BotState(bot_id, "")).status == "running",
+        )
+        
+        self._log(bot_id, f"🏁 Trading loop ended")
+    
+    async def _trading_cycle(self, bot_id: str, strategy: str) -> Optional[float]:
+        """One signal check; returns seconds until the next one"""
+        try:
+            # Check market hours (9:15 AM to 3:30 PM IST)
+            now_ist = datetime.now(IST)
+            market_open = time(9, 15)
+            market_close = time(15, 30)
+            current_time = now_ist.time()
+            
+            # Check if it's a weekday (Monday=0, Sunday=6)
+            is_weekday = now_ist.weekday() < 5
+            
+            if not is_weekday:
+                self._log(bot_id, f"📅 Weekend - market closed. Waiting...")
+                return 300  # Check every 5 minutes on weekends
+            
+            if not (market_open <= current_time <= market_close):
+                self._log(bot_id, f"⏰ Outside market hours (IST: {current_time.strftime('%H:%M')}). Market: 9:15-15:30")
+                return 60  # Check every minute outside market hours
+            
+            self._log(bot_id, f"📊 Market open. Checking for signals... (IST: {current_time.strftime('%H:%M:%S')})")
+            
+            # Check daily limits
+            bot_state = self.bot_states[bot_id]
+            if bot_state.trades_today >= self.max_trades:
+                self._log(bot_id, f"📊 Max trades ({self.max_trades}) reached for today")
+                return 60
+            
+            max_loss = self.capital * (self.max_daily_loss / 100)
+            if bot_state.pnl_today <= -max_loss:
+                self._log(bot_id, f"❌ Max daily loss (₹{max_loss:.0f}) hit. PnL: ₹{bot_state.pnl_today:.0f}")
+                return 60
+            
+            # Generate signal based on strategy
+            signal = await self._generate_signal(bot_id, strategy)
+            
+            if signal:
+                self._log(bot_id, f"📈 SIGNAL: {signal.action} {signal.symbol} x{signal.quantity} | Reason: {signal.reason}")
                 
-                # Generate signal based on strategy
-                signal = await self._generate_signal(bot_id, strategy)
+                # Execute the trade
+                result = await self._execute_trade(bot_id, signal)
                 
-                if signal:
-                    self._log(bot_id, f"📈 SIGNAL: {signal.action} {signal.symbol} x{signal.quantity} | Reason: {signal.reason}")
-                    
-                    # Execute the trade
-                    result = await self._execute_trade(bot_id, signal)
-                    
-                    if result.get("success"):
-                        bot_state.trades_today += 1
-                        bot_state.last_trade_time = datetime.now(IST)
-                        self._log(bot_id, f"✅ TRADE EXECUTED! Order ID: {result.get('order_id')}")
-                    else:
-                        bot_state.error_count += 1
-                        self._log(bot_id, f"❌ Trade failed: {result.get('error')}")
+                if result.get("success"):
+                    bot_state.trades_today += 1
+                    bot_state.last_trade_time = datetime.now(IST)
+                    self._log(bot_id, f"✅ TRADE EXECUTED! Order ID: {result.get('order_id')}")
                 else:
-                    self._log(bot_id, "🔍 No trading signal at this time")
-                
-                # Sleep between checks (strategy dependent)
-                await asyncio.sleep(30)  # Check every 30 seconds
-                
-            except Exception as e:
-                self._log(bot_id, f"❌ Error: {str(e)}")
-                self.bot_states[bot_id].error_count += 1
-                await asyncio.sleep(10)
-        
-        self._log(bot_id, f"🏁 Trading loop ended")
+                    bot_state.error_count += 1
+                    self._log(bot_id, f"❌ Trade failed: {result.get('error')}")
+            else:
+                self._log(bot_id, "🔍 No trading signal at this time")
+            
+            # Sleep between checks (strategy dependent)
+            return 30  # Check every 30 seconds
+            
+        except Exception as e:
+            self._log(bot_id, f"❌ Error: {str(e)}")
+            self.bot_states[bot_id].error_count += 1
+            return 10
     
     async def _generate_signal(self, bot_id: str, strategy: str) -> Optional[Signal]:
         """Generate trading signal based on strategy"""
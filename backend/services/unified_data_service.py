@@ -19,11 +19,15 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any, Tuple
 from pathlib import Path
 import json
-import httpx
-import yfinance as yf
 from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
+from .http_clients import get_http_client, get_http_client_registry
+from .rate_limiter import Priority, get_rate_limiter
+from .startup import lazy_import
+
+yf = lazy_import("yfinance")  # Yahoo fallback only; imported on first use
+
 # Load .env file to get credentials
 ROOT_DIR = Path(__file__).parent.parent
 load_dotenv(ROOT_DIR / '.env')
@@ -189,13 +193,12 @@ class UnifiedDataService:
         # State tracking
         self._is_fetching = False
         self._fetch_lock = asyncio.Lock()  # Lock for thread-safe fetching
-        self._auto_refresh_task = None
         self._http_client = None
         self._nse_cookies = {}
         
-        # Rate limiting for NSE
-        self._last_nse_call = 0
-        self._nse_rate_limit = asyncio.Lock()
+        # Cache age after which readers refetch; the market scheduler raises
+        # it outside market hours when prices do not move
+        self.max_age_seconds = DATA_REFRESH_MINUTES * 60
         
         self._initialized = True
         logger.info(f"✅ UnifiedDataService initialized with NSE India as primary source (Direct API mode)")
@@ -205,44 +208,29 @@ class UnifiedDataService:
     # ═══════════════════════════════════════════════════════════════════════════
     
     async def _ensure_client(self):
-        """Ensure HTTP client is initialized"""
-        if self._http_client is None:
-            self._http_client = httpx.AsyncClient(timeout=30.0)
+        """Use the shared NSE client (pooled connections and cookie jar)"""
+        self._http_client = get_http_client("nse")
     
     async def close(self):
-        """Close HTTP client"""
-        if self._http_client:
-            await self._http_client.aclose()
-            self._http_client = None
+        """Release the shared client (the registry closes it on shutdown)"""
+        self._http_client = None
     
     # ═══════════════════════════════════════════════════════════════════════════
     # NSE INDIA API METHODS
     # ═══════════════════════════════════════════════════════════════════════════
     
     async def _get_nse_cookies(self) -> Dict[str, str]:
-        """Get session cookies from NSE for API access"""
+        """Refresh the shared NSE cookie jar from the homepage"""
         try:
-            await self._ensure_client()
-            response = await self._http_client.get(
-                NSE_BASE_URL,
-                headers=self.NSE_HEADERS,
-                follow_redirects=True
-            )
-            self._nse_cookies = dict(response.cookies)
+            self._nse_cookies = await get_http_client_registry().ensure_nse_cookies(force=True)
             return self._nse_cookies
         except Exception as e:
             logger.error(f"Error getting NSE cookies: {e}")
             return {}
     
-    async def _nse_rate_limit_wait(self):
-        """Enforce NSE rate limits - 1 request per second"""
-        async with self._nse_rate_limit:
-            now = datetime.now().timestamp()
-            wait_time = 1 - (now - self._last_nse_call)
-            
-            if wait_time > 0:
-                await asyncio.sleep(wait_time)
-            self._last_nse_call = datetime.now().timestamp()
+    async def _nse_rate_limit_wait(self, priority: Optional[Priority] = None):
+        """Wait for the shared NSE token bucket (1 request per second)"""
+        await get_rate_limiter().acquire("nse", priority)
     
     async def _fetch_from_nse(self, index_name: str = "NIFTY 50") -> Tuple[Dict[str, Any], bool]:
         """
@@ -259,7 +247,7 @@ class UnifiedDataService:
                 await self._get_nse_cookies()
             
             # Rate limit
-            await self._nse_rate_limit_wait()
+            await self._nse_rate_limit_wait(Priority.LOW)  # cache refresh
             
             # Fetch index stocks data
             url = f"{NSE_API_URL}/equity-stockIndices"
@@ -267,8 +255,7 @@ class UnifiedDataService:
             response = await self._http_client.get(
                 url,
                 params={"index": index_name},
-                headers=self.NSE_HEADERS,
-                cookies=self._nse_cookies
+                headers=self.NSE_HEADERS
             )
             
             if response.status_code != 200:
@@ -360,8 +347,7 @@ class UnifiedDataService:
             response = await self._http_client.get(
                 endpoint,
                 params={"symbol": symbol.upper()},
-                headers=self.NSE_HEADERS,
-                cookies=self._nse_cookies
+                headers=self.NSE_HEADERS
             )
             
             if response.status_code != 200:
@@ -661,7 +647,7 @@ class UnifiedDataService:
             "last_nse_success": meta.get("last_nse_success"),
             "last_yahoo_success": meta.get("last_yahoo_success"),
             "seconds_since_fetch": round(time_since),
-            "is_stale": time_since > DATA_REFRESH_MINUTES * 60,
+            "is_stale": time_since > self.max_age_seconds,
             "nse_enabled": True,  # NSE is always available (no credentials needed)
             "is_fetching": self._is_fetching,
             "mode": "direct_api",  # Always fetch fresh from API
@@ -673,39 +659,18 @@ class UnifiedDataService:
         }
     
     # ═══════════════════════════════════════════════════════════════════════════
-    # AUTO REFRESH
+    # SCHEDULED REFRESH
     # ═══════════════════════════════════════════════════════════════════════════
     
-    async def _auto_refresh_loop(self):
-        """Background loop that auto-refreshes data every 3 minutes"""
-        logger.info(f"🔄 Auto-refresh loop started (every {DATA_REFRESH_MINUTES} minutes)")
-        
-        while True:
-            try:
-                await asyncio.sleep(DATA_REFRESH_MINUTES * 60)
-                
-                if not self._is_fetching:
-                    logger.info("⏰ Auto-refresh triggered...")
-                    await self.fetch_all_stocks(force=True)
-                    
-            except asyncio.CancelledError:
-                logger.info("Auto-refresh loop cancelled")
-                break
-            except Exception as e:
-                logger.error(f"Auto-refresh error: {e}")
-                await asyncio.sleep(30)
-    
-    def start_auto_refresh(self):
-        """Start auto-refresh background task"""
-        if self._auto_refresh_task is None or self._auto_refresh_task.done():
-            self._auto_refresh_task = asyncio.create_task(self._auto_refresh_loop())
-            logger.info("✅ Auto-refresh started")
-    
-    def stop_auto_refresh(self):
-        """Stop auto-refresh background task"""
-        if self._auto_refresh_task and not self._auto_refresh_task.done():
-            self._auto_refresh_task.cancel()
-            logger.info("Auto-refresh stopped")
+    async def refresh(self):
+        """
+        Periodic cache refresh. Scheduled by the market scheduler (cadence per
+        session phase) rather than a fixed loop here.
+        """
+        if self._is_fetching:
+            return
+        logger.info("⏰ Scheduled refresh triggered...")
+        await self.fetch_all_stocks(force=True)
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -11,6 +11,8 @@ from typing import Dict, Any, Optional, List
 from datetime import datetime
 import os
 
+from .http_clients import get_http_client
+
 logger = logging.getLogger(__name__)
 
 # Upstox API Configuration
@@ -52,9 +54,8 @@ class UpstoxService:
         }
     
     async def _ensure_client(self):
-        """Ensure HTTP client is initialized"""
-        if self.client is None:
-            self.client = httpx.AsyncClient(timeout=30.0)
+        """Use the shared Upstox client for the running event loop"""
+        self.client = get_http_client("upstox")
     
     async def _make_request(self, method: str, endpoint: str, data: dict = None) -> Dict[str, Any]:
         """Make API request with error handling"""
@@ -751,10 +752,8 @@ class UpstoxService:
             return {"success": False, "error": str(e)}
 
     async def close(self):
-        """Close HTTP client"""
-        if self.client:
-            await self.client.aclose()
-            self.client = None
+        """Release the shared client (the registry closes it on shutdown)"""
+        self.client = None
 
 
 # Singleton instance
@@ -36,12 +36,17 @@ import json
 # IST timezone (UTC+5:30)
 IST = timezone(timedelta(hours=5, minutes=30))
 
-def get_ist_now() -> datetime:
-    """Get current time in IST"""
-    return datetime.now(IST)
-
 # Import mock data service for testing
 from .mock_data_service import get_mock_service, MarketScenario
+from .market_replay import ist_now, is_replay_active
+from .streaming_indicators import SessionVWAP, VWAPSeries
+from .bot_runtime import subscriber_id
+from .bot_scheduler import Lane, get_bot_scheduler
+from .bot_state_journal import JournalStream, get_bot_state_journal
+
+def get_ist_now() -> datetime:
+    """Get current time in IST (simulated time while a market replay is running)"""
+    return ist_now()
 
 logger = logging.getLogger(__name__)
 
@@ -152,6 +157,9 @@ class VWAPTradingBot:
         # Pending signals queue
         self.pending_signals: List[Dict] = []
         
+        # Crash-recoverable state (journal stream opened on start, live mode only)
+        self._journal: Optional[JournalStream] = None
+        
         logger.info("VWAP Trading Bot initialized")
     
     def configure(self, config: Dict) -> Dict:
@@ -230,6 +238,9 @@ class VWAPTradingBot:
                 "trades_taken": 0,
                 "trades_skipped": 0,
             }
+            self._journal = None
+            if not self.mock_mode:
+                await self._restore_state()
             
             self.is_running = True
             self.status = BotStatus.RUNNING
@@ -317,6 +328,39 @@ class VWAPTradingBot:
             "timestamp": datetime.now().isoformat()
         }
     
+    # ═══════════════════════════════════════════════════════════════════════════
+    # STATE JOURNAL (crash recovery)
+    # ═══════════════════════════════════════════════════════════════════════════
+    
+    async def _restore_state(self):
+        """Open the state journal and resume today's positions and stats after a restart"""
+        self._journal = await get_bot_state_journal().open("vwap", self.user_id)
+        if self._journal.get("day") != get_ist_now().date().isoformat():
+            return
+        saved_positions = self._journal.get("positions") or {}
+        for symbol, position in saved_positions.items():
+            self.positions.setdefault(symbol, dict(position))
+        if not self.trades:
+            self.trades = [dict(trade) for trade in self._journal.get("trades") or []]
+        saved_stats = self._journal.get("session_stats") or {}
+        for key in ("total_trades", "winning_trades", "losing_trades", "total_pnl", "max_drawdown",
+                    "signals_found", "trades_taken", "trades_skipped"):
+            if key in saved_stats:
+                self.session_stats[key] = saved_stats[key]
+        if saved_positions:
+            logger.info(f"♻️ Recovered {len(saved_positions)} open VWAP positions from journal: {list(saved_positions)}")
+    
+    def _journal_state(self, urgent: bool = False):
+        """Record today's positions, trades and stats in the state journal (urgent after orders)"""
+        if self._journal is None:
+            return
+        self._journal.update({
+            "day": get_ist_now().date().isoformat(),
+            "positions": self.positions,
+            "trades": self.trades[-50:],
+            "session_stats": self.session_stats,
+        }, urgent=urgent)
+    
     async def scan_once(self) -> Dict:
         """
         Run one scan iteration manually.
@@ -344,6 +388,11 @@ class VWAPTradingBot:
             # Manage existing positions
             exits = await self._manage_positions()
             
+            # Square off at EOD, as the background loop does
+            if self._is_square_off_time():
+                await self._square_off_all()
+            
+            self._journal_state()
             return {
                 "status": "success",
                 "signals_found": len(signals),
@@ -360,47 +409,52 @@ class VWAPTradingBot:
             return {"status": "error", "message": str(e)}
     
     async def _scan_loop(self):
-        """Main scanning loop"""
+        """Main scanning loop, ticked by the bot scheduler"""
         logger.info(f"🔍 VWAP scan loop started (mock_mode={self.mock_mode})")
-        
-        while self.is_running:
-            try:
-                # Check market hours (skip in mock mode - allow testing anytime)
-                if not self.mock_mode and not self._is_market_hours():
-                    logger.debug("Outside market hours, waiting...")
-                    await asyncio.sleep(60)
-                    continue
-                
-                # Check if paused
-                if self.status == BotStatus.PAUSED:
-                    await asyncio.sleep(10)
-                    continue
-                
-                # Run VWAP momentum scan
-                signals = await self._scan_vwap_momentum()
-                self.session_stats["last_scan"] = datetime.now().isoformat()
-                self.session_stats["signals_found"] += len(signals)
-                
-                # Process signals
-                for signal in signals:
-                    await self._process_signal(signal)
-                
-                # Check and manage existing positions
-                await self._manage_positions()
-                
-                # Check for square-off time (skip in mock mode)
-                if not self.mock_mode and self._is_square_off_time():
-                    await self._square_off_all()
-                
-                # Wait for next scan
-                await asyncio.sleep(self.config["scan_interval"])
-                
-            except asyncio.CancelledError:
-                logger.info("Scan loop cancelled")
-                break
-            except Exception as e:
-                logger.error(f"Scan loop error: {e}")
-                await asyncio.sleep(30)
+        await get_bot_scheduler().run(
+            subscriber_id(self), self._scan_cycle,
+            interval=lambda: self.config["scan_interval"],
+            lane=lambda: Lane.RISK if self.positions else Lane.ENTRY,
+            active=lambda: self.is_running,
+        )
+        logger.info("Scan loop stopped")
+    
+    async def _scan_cycle(self) -> Optional[float]:
+        """One scan pass; returns seconds until the next one"""
+        try:
+            # Check market hours (always open in mock mode - allow testing anytime)
+            if not self._is_market_hours():
+                logger.debug("Outside market hours, waiting...")
+                return 60
+            
+            # Check if paused
+            if self.status == BotStatus.PAUSED:
+                return 10
+            
+            # Check and manage existing positions before looking for new entries
+            await self._manage_positions()
+            
+            # Run VWAP momentum scan
+            signals = await self._scan_vwap_momentum()
+            self.session_stats["last_scan"] = datetime.now().isoformat()
+            self.session_stats["signals_found"] += len(signals)
+            
+            # Process signals
+            for signal in signals:
+                await self._process_signal(signal)
+            
+            # Check for square-off time (never in plain mock mode)
+            if self._is_square_off_time():
+                await self._square_off_all()
+            
+            self._journal_state()
+            
+            # Wait for next scan
+            return self.config["scan_interval"]
+            
+        except Exception as e:
+            logger.error(f"Scan loop error: {e}")
+            return 30
     
     async def _scan_vwap_momentum(self) -> List[Dict]:
         """Scan for VWAP momentum signals"""
@@ -564,31 +618,6 @@ class VWAPTradingBot:
     # CHARTINK CANDLE-BASED SIGNAL DETECTION
     # ═══════════════════════════════════════════════════════════════════════════
     
-    def _calculate_vwap_from_candles(self, candles: List[Dict], idx: int) -> float:
-        """Calculate VWAP from candle data up to given index"""
-        if idx < 0:
-            return 0
-        
-        total_tp_vol = 0
-        total_vol = 0
-        
-        for i in range(idx + 1):
-            c = candles[i]
-            high = float(c.get("high", 0))
-            low = float(c.get("low", 0))
-            close = float(c.get("close", 0))
-            volume = float(c.get("volume", 1))
-            
-            # Skip if no volume
-            if volume <= 0:
-                volume = 1
-            
-            typical_price = (high + low + close) / 3
-            total_tp_vol += typical_price * volume
-            total_vol += volume
-        
-        return total_tp_vol / total_vol if total_vol > 0 else 0
-    
     def _check_chartink_signal(self, candles: List[Dict]) -> Optional[Dict]:
         """
         Check ChartInk VWAP momentum conditions on candle data
@@ -613,9 +642,12 @@ class VWAPTradingBot:
         prev = candles[-2]      # [-1] - previous candle
         prev2 = candles[-3]     # [-2] - 2 candles ago
         
-        # Calculate VWAP for each candle
-        vwap_prev = self._calculate_vwap_from_candles(candles[:-1], len(candles) - 2)
-        vwap_prev2 = self._calculate_vwap_from_candles(candles[:-2], len(candles) - 3)
+        # VWAP after each completed candle (current candle is still forming)
+        series = VWAPSeries()
+        session = str(candles[0].get("datetime", "")).split(" ")[0]
+        series.extend(candles[:-1], session)
+        vwap_prev = series.at(len(candles) - 2)
+        vwap_prev2 = series.at(len(candles) - 3)
         
         if vwap_prev == 0 or vwap_prev2 == 0:
             return None
@@ -943,11 +975,10 @@ class VWAPTradingBot:
                     symbol=symbol,
                     side="BUY" if direction == "LONG" else "SELL",
                     quantity=quantity,
-                    price=price,
                     order_type="MARKET"
                 )
-                if not mock_order.get("success"):
-                    return {"status": "error", "message": mock_order.get("error", "Mock order failed")}
+                if mock_order.get("status") != "COMPLETE":
+                    return {"status": "error", "message": mock_order.get("reason", "Mock order failed")}
                 order_id = mock_order.get("order_id", order_id)
                 logger.info(f"🧪 [MOCK] Order placed: {direction} {symbol} × {quantity} @ ₹{price:.2f}")
             
@@ -1031,6 +1062,7 @@ class VWAPTradingBot:
                 "pnl": None,
                 "status": "OPEN"
             })
+            self._journal_state(urgent=True)
             
             return {"status": "success", "order_id": order_id}
             
@@ -1176,7 +1208,6 @@ class VWAPTradingBot:
                     symbol=symbol,
                     side="SELL" if direction == "LONG" else "BUY",
                     quantity=quantity,
-                    price=exit_price,
                     order_type="MARKET"
                 )
                 logger.info(f"🧪 [MOCK] Exit order: {symbol} × {quantity} @ ₹{exit_price:.2f}")
@@ -1256,6 +1287,7 @@ class VWAPTradingBot:
             
             # Remove from positions
             del self.positions[symbol]
+            self._journal_state(urgent=True)
             
             emoji = "✅" if pnl > 0 else "❌"
             logger.info(f"{emoji} Closed {symbol}: {reason} | P&L: ₹{pnl:.2f}")
@@ -1281,7 +1313,8 @@ class VWAPTradingBot:
     def _is_market_hours(self) -> bool:
         """Check if within market hours (IST)"""
         # In mock mode, always return True to allow testing anytime
-        if self.mock_mode:
+        # (a market replay runs on its own simulated clock instead)
+        if self.mock_mode and not is_replay_active():
             return True
         now = get_ist_now().time()
         start = time(*map(int, self.config["market_start"].split(":")))
@@ -1292,8 +1325,8 @@ class VWAPTradingBot:
     
     def _is_square_off_time(self) -> bool:
         """Check if it's square-off time (IST)"""
-        # In mock mode, never auto square-off
-        if self.mock_mode:
+        # In mock mode, never auto square-off (replays follow simulated time)
+        if self.mock_mode and not is_replay_active():
             return False
         now = get_ist_now().time()
         square_off = time(*map(int, self.config["square_off_time"].split(":")))
@@ -1428,30 +1461,6 @@ class VWAPTradingBot:
         
         return candles_10min
     
-    def _calculate_vwap_cumulative(self, candles: List[Dict], idx: int) -> float:
-        """Calculate cumulative VWAP from day start to given candle index"""
-        if idx < 0 or not candles:
-            return 0
-        
-        total_tp_vol = 0
-        total_vol = 0
-        
-        for i in range(idx + 1):
-            c = candles[i]
-            high = float(c.get("high", 0))
-            low = float(c.get("low", 0))
-            close = float(c.get("close", 0))
-            volume = float(c.get("volume", 1))
-            
-            if volume <= 0:
-                volume = 1
-            
-            typical_price = (high + low + close) / 3
-            total_tp_vol += typical_price * volume
-            total_vol += volume
-        
-        return total_tp_vol / total_vol if total_vol > 0 else 0
-    
     async def backtest_vwap_strategy(
         self,
         symbol: str,
@@ -1478,27 +1487,47 @@ class VWAPTradingBot:
         try:
             logger.info(f"🔄 Starting VWAP backtest for {symbol} from {from_date} to {to_date}")
             
-            # Use DhanUnifiedService directly for historical data
-            from services.dhan_unified_service import get_dhan_unified_service
-            dhan_service = get_dhan_unified_service()
-            
-            if not dhan_service:
-                return {"status": "error", "message": "Dhan service not available for backtest"}
-            
-            # Fetch 5-minute candles from Dhan
-            from_datetime = f"{from_date} 09:15:00"
-            to_datetime = f"{to_date} 15:30:00"
+            try:
+                candles_5min = await fetch_vwap_backtest_candles(symbol, from_date, to_date)
+            except ValueError as e:
+                return {"status": "error", "message": str(e)}
             
-            candles_5min = await dhan_service.get_historical_intraday(
+            return self.run_vwap_backtest_on_candles(
+                candles_5min,
                 symbol=symbol,
-                from_date=from_datetime,
-                to_date=to_datetime,
-                interval="5"  # 5-minute candles
+                from_date=from_date,
+                to_date=to_date,
+                capital=capital,
+                risk_per_trade=risk_per_trade,
+                target_rr=target_rr
             )
             
-            if not candles_5min:
-                return {"status": "error", "message": f"No data available for {symbol}"}
-            
+        except Exception as e:
+            logger.error(f"Backtest error: {e}")
+            import traceback
+            traceback.print_exc()
+            return {"status": "error", "message": str(e)}
+    
+    def run_vwap_backtest_on_candles(
+        self,
+        candles_5min: List[Dict],
+        symbol: str,
+        from_date: str,
+        to_date: str,
+        capital: float = 100000,
+        risk_per_trade: float = 2.0,
+        target_rr: float = 2.0,
+        progress_callback=None,
+        save_to_store: bool = False
+    ) -> Dict:
+        """
+        Run the VWAP backtest simulation on already-fetched 5-minute candles.
+        
+        Pure CPU work with no I/O, so it can run inside a backtest worker
+        process. progress_callback(event, data) receives per-day progress and
+        equity-curve chunks when provided.
+        """
+        try:
             logger.info(f"📊 Fetched {len(candles_5min)} 5-min candles")
             
             # Aggregate to 10-minute candles
@@ -1520,22 +1549,40 @@ class VWAPTradingBot:
             equity_curve = [capital]
             current_capital = capital
             position = None
+            sorted_dates = sorted(daily_candles.keys())
+            equity_sent = 0
             
-            for date in sorted(daily_candles.keys()):
+            for day_idx, date in enumerate(sorted_dates):
                 day_candles = daily_candles[date]
                 
+                if progress_callback:
+                    progress_callback("progress", {
+                        "date": date,
+                        "percent": round(day_idx / len(sorted_dates) * 100, 1),
+                        "trades": len(trades)
+                    })
+                    if len(equity_curve) > equity_sent:
+                        progress_callback("equity", {
+                            "offset": equity_sent,
+                            "points": equity_curve[equity_sent:]
+                        })
+                        equity_sent = len(equity_curve)
+                
                 if len(day_candles) < 4:  # Need at least 4 candles
                     continue
                 
+                # Cumulative VWAP after each candle of the day, one pass
+                session_vwap = SessionVWAP(min_volume=1)
+                day_vwaps = [session_vwap.update_candle(c) for c in day_candles]
+                
                 # Scan each candle for signals (start from candle 3 to have history)
                 for i in range(3, len(day_candles)):
                     current = day_candles[i]
                     prev = day_candles[i - 1]      # [-1]
                     prev2 = day_candles[i - 2]     # [-2]
                     
-                    # Calculate VWAP for each candle
-                    vwap_prev = self._calculate_vwap_cumulative(day_candles[:i], i - 1)
-                    vwap_prev2 = self._calculate_vwap_cumulative(day_candles[:i-1], i - 2)
+                    vwap_prev = day_vwaps[i - 1]
+                    vwap_prev2 = day_vwaps[i - 2]
                     
                     if vwap_prev == 0 or vwap_prev2 == 0:
                         continue
@@ -1712,6 +1759,12 @@ class VWAPTradingBot:
                     equity_curve.append(current_capital)
                     position = None
             
+            if progress_callback and len(equity_curve) > equity_sent:
+                progress_callback("equity", {
+                    "offset": equity_sent,
+                    "points": equity_curve[equity_sent:]
+                })
+            
             # Calculate metrics
             total_trades = len(trades)
             winning_trades = len([t for t in trades if t["result"] == "WIN"])
@@ -1754,8 +1807,24 @@ class VWAPTradingBot:
             
             logger.info(f"✅ Backtest complete: {total_trades} trades, Win Rate: {win_rate:.1f}%, P&L: ₹{total_pnl:.2f}")
             
+            # Persist full trades / equity before the response is trimmed
+            run_id = None
+            if save_to_store:
+                try:
+                    from .backtest_store import get_backtest_store
+                    run_id = get_backtest_store().save_run(
+                        source="vwap", strategy="vwap_chartink", symbol=symbol,
+                        trades=trades, equity_curve=equity_curve,
+                        params={"symbol": symbol, "from_date": from_date, "to_date": to_date,
+                                "capital": capital, "risk_per_trade": risk_per_trade, "target_rr": target_rr},
+                        start_date=from_date, end_date=to_date, initial_capital=capital
+                    )
+                except Exception as e:
+                    logger.warning(f"Could not store VWAP backtest run: {e}")
+            
             return {
                 "status": "success",
+                "run_id": run_id,
                 "symbol": symbol,
                 "period": f"{from_date} to {to_date}",
                 "candles_analyzed": len(candles_10min),
@@ -1798,6 +1867,33 @@ class VWAPTradingBot:
             return {"status": "error", "message": str(e)}
 
 
+async def fetch_vwap_backtest_candles(symbol: str, from_date: str, to_date: str) -> List[Dict]:
+    """
+    Fetch 5-minute Dhan candles for a VWAP backtest.
+    
+    Raises ValueError when the Dhan service or data is unavailable.
+    """
+    # Use DhanUnifiedService directly for historical data
+    from services.dhan_unified_service import get_dhan_unified_service
+    dhan_service = get_dhan_unified_service()
+    
+    if not dhan_service:
+        raise ValueError("Dhan service not available for backtest")
+    
+    # Fetch 5-minute candles from Dhan
+    candles_5min = await dhan_service.get_historical_intraday(
+        symbol=symbol,
+        from_date=f"{from_date} 09:15:00",
+        to_date=f"{to_date} 15:30:00",
+        interval="5"  # 5-minute candles
+    )
+    
+    if not candles_5min:
+        raise ValueError(f"No data available for {symbol}")
+    
+    return candles_5min
+
+
 # Global bot instance
 _vwap_bot_instance = None
 
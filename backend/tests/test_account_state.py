@@ -0,0 +1,175 @@
+"""
+Tests for account state: concurrent reads share one broker call, versions
+only move when the data changed, failed refreshes serve stale data (auth
+failures do not), order events refresh watched accounts (debounced, and
+only the named client's), and the trade-algo dashboard reads both brokers
+concurrently from the cache.
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from services import account_state, trade_algo_service
+from services.account_state import AccountFetchError, AccountStateService
+from services.trade_algo_service import Position, TradeAlgoService
+
+
+class FakeLoader:
+    """Loader returning `data` after `delay` seconds, or raising `error`"""
+
+    def __init__(self, data, delay=0.0, error=None):
+        self.data = data
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return self.data
+
+
+def test_reads_are_coalesced_cached_and_versioned():
+    async def scenario():
+        state = AccountStateService(order_streams=False)
+        positions = FakeLoader([{"symbol": "NIFTY"}], delay=0.02)
+        funds = FakeLoader({"availabelBalance": 1000}, delay=0.02)
+        account = state.register("dhan", "token-a", {"positions": positions, "funds": funds})
+        assert state.register("dhan", "token-b", {"positions": positions}) is not account
+
+        views = await asyncio.gather(*(state.read(account, "positions") for _ in range(5)))
+        assert positions.calls == 1 and state.stats["coalesced"] == 4
+        assert all(v.data == [{"symbol": "NIFTY"}] and v.version == 1 for v in views)
+
+        cached = await state.read(account, "positions")
+        assert cached.cached and positions.calls == 1 and state.stats["hits"] == 1
+
+        # Same data from the broker: the version does not move
+        forced = await state.read(account, "positions", force=True)
+        assert positions.calls == 2 and forced.version == 1 and not forced.cached
+        positions.data = [{"symbol": "NIFTY"}, {"symbol": "BANKNIFTY"}]
+        changed = await state.read(account, "positions", max_age=0)
+        assert changed.version == 2 and changed.account_version == 2
+
+        started = time.perf_counter()
+        snapshot = await state.snapshot(account, force=True)
+        assert time.perf_counter() - started < 0.035  # sections load concurrently
+        assert snapshot["sections"]["funds"]["data"] == {"availabelBalance": 1000}
+        assert snapshot["version"] == 3 and "dhan:" in next(iter(state.get_status()["accounts"]))
+
+    asyncio.run(scenario())
+
+
+def test_failed_refresh_serves_stale_but_auth_failure_raises(monkeypatch):
+    async def scenario():
+        state = AccountStateService(order_streams=False)
+        orders = FakeLoader([{"orderId": "1"}])
+        account = state.register("upstox", "token", {"orders": orders})
+        await state.read(account, "orders")
+
+        orders.error = AccountFetchError(503, "Upstox API error: unavailable")
+        view = await state.read(account, "orders", force=True)
+        assert view.stale and view.error == "Upstox API error: unavailable"
+        assert view.data == [{"orderId": "1"}] and state.stats["stale_served"] == 1
+
+        # Within the retry window the broker is not called again
+        monkeypatch.setattr(account_state, "RETRY_SECONDS", 60.0)
+        view = await state.read(account, "orders", max_age=0)
+        assert view.stale and orders.calls == 2
+
+        orders.error = None
+        view = await state.read(account, "orders", force=True)
+        assert not view.stale and view.error is None
+
+        orders.error = AccountFetchError(401, "Invalid or expired access token")
+        with pytest.raises(AccountFetchError):
+            await state.read(account, "orders", force=True)
+        assert account.sections["orders"].data is None
+
+        fresh = state.register("upstox", "other", {"orders": FakeLoader(None, error=RuntimeError("down"))})
+        with pytest.raises(RuntimeError):
+            await state.read(fresh, "orders")
+
+    asyncio.run(scenario())
+
+
+def test_order_events_refresh_watched_accounts_and_dashboard_reads_concurrently(monkeypatch):
+    async def scenario():
+        state = AccountStateService(order_streams=False)
+        mine = FakeLoader([])
+        theirs = FakeLoader([])
+        a = state.register("dhan", "token-a", {"positions": mine, "orders": FakeLoader([])}, client_id="1001")
+        b = state.register("dhan", "token-b", {"positions": theirs}, client_id="2002")
+        await asyncio.gather(state.read(a, "positions"), state.read(b, "positions"))
+        assert state.has_client("dhan", "1001") and not state.has_client("dhan", "9999")
+        assert not state.has_client("upstox", "1001") and not state.has_client("dhan", None)
+
+        # Events right after a fetch are debounced: marked dirty, refetched once due
+        mine.data = [{"symbol": "NIFTY"}]
+        alert = json.dumps({"Type": "order_alert", "Data": {"OrderNo": "ORD-7", "Status": "TRADED"}})
+        for _ in range(5):
+            assert state.handle_dhan_order_update(a, alert) == "ORD-7"
+        assert state.handle_dhan_order_update(a, "not json") is None
+        await asyncio.sleep(0.01)
+        assert mine.calls == 1 and a.sections["positions"].dirty
+
+        monkeypatch.setattr(account_state, "ORDER_EVENT_MIN_INTERVAL_SECONDS", 0.0)
+        assert state.refresh_due() == 1 and state.refresh_due() == 0  # positions, once
+        await asyncio.sleep(0.01)
+        assert mine.calls == 2 and theirs.calls == 1  # only the alerted client's account
+        assert a.sections["positions"].data == [{"symbol": "NIFTY"}] and not a.sections["positions"].dirty
+        assert state.on_order_event("upstox") == 0 and state.on_order_event("dhan", client_id="9999") == 0
+        assert state.on_order_event("dhan") == 2
+        await asyncio.sleep(0.01)
+        assert theirs.calls == 2
+
+        # An event does not reset the failure backoff
+        theirs.error = RuntimeError("down")
+        await state.read(b, "positions", force=True)
+        state.on_order_event("dhan", client_id="2002")
+        await asyncio.sleep(0.01)
+        assert theirs.calls == 3 and b.sections["positions"].dirty
+
+        # Idle accounts are only marked; their next read refreshes
+        theirs.error = None
+        b.sections["positions"].failed_at = 0.0
+        b.last_read -= account_state.WATCH_SECONDS + 1
+        state.on_order_event("dhan", client_id="2002")
+        await asyncio.sleep(0.01)
+        assert b.sections["positions"].dirty and state.refresh_due() == 0
+        assert not (await state.read(b, "positions")).cached and theirs.calls == 4
+
+    asyncio.run(scenario())
+
+    async def dashboard():
+        state = AccountStateService(order_streams=False)
+        monkeypatch.setattr(trade_algo_service, "get_account_state", lambda: state)
+        monkeypatch.setattr(TradeAlgoService, "_load_saved_credentials", lambda self: None)
+        service = TradeAlgoService()
+        for name, fetcher in (("dhan", service.dhan_fetcher), ("upstox", service.upstox_fetcher)):
+            fetcher.access_token = f"{name}-token"
+            fetcher.client_id = fetcher.api_key = "1001"
+            fetcher.get_positions = FakeLoader([Position(f"{name.upper()}-SYM", "NSE", "EQ", 50, 100, 110, 500, 10.0, "INTRADAY", name)], delay=0.03)
+            fetcher.get_funds = FakeLoader({"available_balance": 1000}, delay=0.03)
+            fetcher.get_orders = FakeLoader([{"orderId": name}], delay=0.03)
+
+        started = time.perf_counter()
+        positions, funds = await asyncio.gather(service.fetch_all_positions(), service.fetch_funds())
+        assert time.perf_counter() - started < 0.055  # both brokers, both sections at once
+        assert positions["total_count"] == 2 and positions["total_pnl"] == 1000
+        assert positions["brokers"]["dhan"]["version"] == 1 and funds["total_available"] == 2000
+
+        orders = await service.fetch_orders()
+        assert {o["broker"] for o in orders["orders"]} == {"dhan", "upstox"}
+        again = await service.fetch_all_positions()
+        assert again["brokers"]["upstox"]["cached"] and service.dhan_fetcher.get_positions.calls == 1
+
+    asyncio.run(dashboard())
@@ -0,0 +1,164 @@
+"""
+Tests for the backtest job manager: identical requests share one run and
+its cached result, loader jobs move pending -> loading -> running ->
+completed, a shared job is only cancelled once every submitter cancels,
+cancelled and error-result jobs are not cached, and late subscribers
+replay every equity chunk even after the history is trimmed.
+
+Workers run in a thread pool with an in-process queue instead of the
+spawned process pool, so the test runners below can be registered.
+"""
+import asyncio
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import backtest_jobs
+from services.backtest_jobs import BacktestJobManager, JobStatus
+
+runs = []
+release = threading.Event()
+
+
+def fake_backtest(params, report):
+    """Equity chunk + progress per step; waits for `release` if asked to"""
+    runs.append(params["name"])
+    if params.get("hold"):
+        release.wait(timeout=5)
+    for step in range(params.get("steps", 3)):
+        report("equity", {"offset": step, "points": [step]})
+        report("progress", {"percent": round((step + 1) / params.get("steps", 3) * 100, 1)})
+        time.sleep(params.get("delay", 0))
+    if params.get("error"):
+        return {"status": "error", "message": params["error"]}
+    return {"name": params["name"], "steps": params.get("steps", 3), "extra": params.get("extra")}
+
+
+def thread_manager(monkeypatch) -> BacktestJobManager:
+    manager = BacktestJobManager(max_workers=2)
+    monkeypatch.setitem(backtest_jobs.BACKTEST_RUNNERS, "fake", fake_backtest)
+    monkeypatch.setattr(backtest_jobs, "_worker_events", None)
+    monkeypatch.setattr(backtest_jobs, "_worker_cancelled", None)
+
+    def ensure_pool():
+        if manager._pool is not None:
+            return
+        manager._events, manager._cancelled = queue.Queue(), {}
+        backtest_jobs._init_worker(manager._events, manager._cancelled)
+        manager._pool = ThreadPoolExecutor(max_workers=2)
+        manager._loop = asyncio.get_running_loop()
+        manager._drain_thread = threading.Thread(target=manager._drain_events, daemon=True)
+        manager._drain_thread.start()
+
+    monkeypatch.setattr(manager, "_ensure_pool", ensure_pool)
+    runs.clear()
+    release.clear()
+    return manager
+
+
+async def wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached"
+        await asyncio.sleep(0.005)
+
+
+def test_identical_requests_share_a_run_and_its_cached_result(monkeypatch):
+    manager = thread_manager(monkeypatch)
+
+    async def scenario():
+        statuses = []
+
+        async def loader():
+            statuses.append(job.status)
+            return {"extra": "candles"}
+
+        job = await manager.submit("fake", {"name": "a", "hold": True}, loader=loader)
+        same = await manager.submit("fake", {"name": "a", "hold": True})
+        assert same is job
+        await wait_for(lambda: runs == ["a"])
+        assert statuses == [JobStatus.LOADING]
+        await wait_for(lambda: job.status == JobStatus.RUNNING)  # not stuck at "loading"
+
+        release.set()
+        result = await manager.run("fake", {"name": "a", "hold": True})
+        assert result == {"name": "a", "steps": 3, "extra": "candles"}  # loader output is not in the key
+        assert job.status == JobStatus.COMPLETED and job.progress == 100.0
+
+        cached = await manager.submit("fake", {"name": "a", "hold": True})
+        assert cached is not job and cached.cached and cached.status == JobStatus.COMPLETED
+        assert cached.result == result and runs == ["a"]
+        assert manager.get_stats()["cached_results"] == 1
+
+        other = await manager.run("fake", {"name": "b"})
+        assert other["name"] == "b" and runs == ["a", "b"]
+        manager.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_and_error_results_are_not_cached(monkeypatch):
+    manager = thread_manager(monkeypatch)
+
+    async def scenario():
+        job = await manager.submit("fake", {"name": "slow", "steps": 200, "delay": 0.01}, owner="alice")
+        assert await manager.submit("fake", {"name": "slow", "steps": 200, "delay": 0.01}, owner="bob") is job
+        await wait_for(lambda: job.status == JobStatus.RUNNING)
+        assert not manager.cancel(job.job_id, owner="bob")  # alice still wants it
+        assert job.status == JobStatus.RUNNING and job.owners == {"alice"}
+        assert manager.cancel(job.job_id, owner="alice")
+        await asyncio.wait_for(job.done.wait(), timeout=2)
+        assert job.status == JobStatus.CANCELLED and not manager.cancel(job.job_id)
+
+        again = await manager.submit("fake", {"name": "slow", "steps": 200, "delay": 0.01})
+        assert again is not job and not again.cached
+        manager.cancel(again.job_id)
+        await asyncio.wait_for(again.done.wait(), timeout=2)
+
+        failed = await manager.submit("fake", {"name": "bad", "error": "No candles for symbol"})
+        await asyncio.wait_for(failed.done.wait(), timeout=2)
+        assert failed.status == JobStatus.FAILED and failed.error == "No candles for symbol"
+        assert failed.result is None and manager.get_stats()["cached_results"] == 0
+
+        try:
+            await manager.run("fake", {"name": "bad", "error": "No candles for symbol"})
+            assert False, "an error result must raise"
+        except RuntimeError as e:
+            assert str(e) == "No candles for symbol"
+        assert runs.count("bad") == 2
+        manager.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_late_subscribers_replay_every_equity_chunk(monkeypatch):
+    manager = thread_manager(monkeypatch)
+    monkeypatch.setattr(backtest_jobs, "MAX_EVENT_HISTORY", 10)
+
+    async def scenario():
+        job = await manager.submit("fake", {"name": "curve", "steps": 20})
+        live = []
+
+        async def follow():
+            async for event in manager.subscribe(job.job_id):
+                live.append(event["type"])
+
+        follower = asyncio.create_task(follow())
+        await asyncio.wait_for(job.done.wait(), timeout=2)
+        await asyncio.wait_for(follower, timeout=2)
+        assert live[-1] == JobStatus.COMPLETED and live.count("equity") == 20
+
+        replay = [event async for event in manager.subscribe(job.job_id)]
+        equity = [e["data"]["offset"] for e in replay if e["type"] == "equity"]
+        assert equity == list(range(20))  # history trimmed, equity chunks kept
+        assert replay[-1]["type"] == JobStatus.COMPLETED
+        assert len([e for e in replay if e["type"] != "equity"]) <= 10
+        assert [event async for event in manager.subscribe("missing")] == []
+        manager.shutdown()
+
+    asyncio.run(scenario())
@@ -0,0 +1,79 @@
+"""
+Tests for the columnar backtest result store: round-trip of runs, metadata
+queries and comparisons computed from the stored arrays.
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.backtest_store import BacktestResultStore
+from services.nifty_strategies import BacktestTrade, StrategyBacktestResult
+
+
+def make_result(name, pnls, start_month=1):
+    trades, equity = [], [100000.0]
+    for i, pnl in enumerate(pnls):
+        day = f"2025-{start_month + i // 20:02d}-{1 + i % 20:02d}"
+        trades.append(BacktestTrade(day, "09:20", 100.0, day, "15:00", 101.0, "BUY", pnl, pnl / 100, "target"))
+        equity.append(equity[-1] + pnl)
+    wins = [p for p in pnls if p > 0]
+    return StrategyBacktestResult(
+        name, len(pnls), len(wins), len(pnls) - len(wins), len(wins) / len(pnls) * 100, sum(pnls),
+        0, 0, 0, 0, 0, 0, 0, 0, 0, trades=trades, equity_curve=equity,
+    )
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BacktestResultStore(str(tmp_path))
+
+
+def test_round_trip_and_metrics(store):
+    pnls = [500.0, -200.0, 300.0, -100.0]
+    run_id = store.save_result(make_result("orb", pnls), source="test", symbol="NIFTY",
+                               params={"capital": 100000}, initial_capital=100000)
+
+    run = store.get_run(run_id)
+    assert run["strategy"] == "orb"
+    assert run["start_date"] == "2025-01-01" and run["end_date"] == "2025-01-04"
+
+    arrays = store.load_arrays(run_id)
+    np.testing.assert_allclose(arrays["trade__pnl"], pnls)
+    np.testing.assert_allclose(arrays["daily_pnl"], pnls)
+    assert [t["pnl"] for t in store.get_trades(run_id)] == pnls
+
+    metrics = store.compare([run_id])["metrics"][run_id]
+    assert metrics["total_pnl"] == 500.0
+    assert metrics["profit_factor"] == round(800 / 300, 2)
+    assert metrics["max_drawdown_pct"] == round(200 / 100500 * 100, 2)
+
+
+def test_query_indexes(store):
+    a = store.save_result(make_result("orb", [100.0] * 10), source="test", params={"x": 1})
+    b = store.save_result(make_result("vwap", [50.0] * 10, start_month=6), source="test", params={"x": 2})
+
+    assert [r["run_id"] for r in store.query(strategy="orb")] == [a]
+    assert [r["run_id"] for r in store.query(params={"x": 2})] == [b]
+    assert [r["run_id"] for r in store.query(start_date="2025-05-01")] == [b]
+    assert store.query(end_date="2024-12-31") == []
+
+    assert store.delete_run(a)
+    assert store.get_run(a) is None
+
+
+def test_compare_overlays_on_shared_dates(store):
+    a = store.save_result(make_result("orb", [100.0] * 5), source="test")
+    b = store.save_result(make_result("vwap", [-50.0] * 3), source="test")
+
+    result = store.compare([a, b])
+    overlay = result["equity_overlay"]
+    assert overlay["axis"] == "date"
+    assert overlay["x"] == [f"2025-01-{d:02d}" for d in range(1, 6)]
+    assert overlay["series"][a] == [100.0, 200.0, 300.0, 400.0, 500.0]
+    # Run b stops trading after day 3 - its cumulative P&L carries forward
+    assert overlay["series"][b] == [-50.0, -100.0, -150.0, -150.0, -150.0]
+    assert result["ranking"]["total_pnl"] == [a, b]
@@ -0,0 +1,98 @@
+"""
+Tests for the shared bot runtime: concurrent bots share one upstream fetch
+per topic, failures are never published, and market replay bypasses the
+shared snapshots.
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import market_replay
+from services.bot_runtime import BotRuntime, subscriber_id, topic
+
+
+def test_concurrent_bots_share_one_fetch_per_topic():
+    async def scenario():
+        runtime = BotRuntime(enabled=True)
+        calls = []
+
+        async def fetch_chain():
+            calls.append("chain")
+            await asyncio.sleep(0.01)
+            return {"underlying_price": 25000.0, "strikes": [24900, 25000, 25100]}
+
+        name = topic("chain", "nifty", "dhan", "nearest")
+        assert name == "chain:NIFTY:dhan:nearest"
+        bots = [object() for _ in range(50)]
+        for bot in bots:
+            runtime.subscribe(subscriber_id(bot), name)
+
+        chains = await asyncio.gather(*(runtime.get(name, fetch_chain) for _ in bots))
+        assert len(calls) == 1
+        assert all(chain is chains[0] for chain in chains)
+
+        # Fresh snapshot is served without refetching; a stale one is refreshed
+        await runtime.get(name, fetch_chain)
+        assert len(calls) == 1
+        snapshot = await runtime.read(name, fetch_chain, max_age=0)
+        assert len(calls) == 2 and snapshot.version == 2
+
+        status = runtime.get_status()
+        assert status["subscribers"] == 50
+        assert status["feeds"][name]["fetches"] == 2
+        assert status["fetches_saved"] == 50
+
+        for bot in bots:
+            runtime.unsubscribe(subscriber_id(bot))
+        assert runtime.get_status()["topics"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_failures_are_raised_to_every_reader_and_not_published():
+    async def scenario():
+        runtime = BotRuntime(enabled=True)
+        attempts = []
+
+        async def failing():
+            attempts.append(1)
+            await asyncio.sleep(0.01)
+            raise ValueError("Dhan option chain error")
+
+        results = await asyncio.gather(*(runtime.get("spot:NIFTY", failing) for _ in range(3)), return_exceptions=True)
+        assert len(attempts) == 1
+        assert all(isinstance(r, ValueError) for r in results)
+        assert runtime.peek("spot:NIFTY") is None
+
+        async def live():
+            return 25912.5
+
+        assert await runtime.get("spot:NIFTY", live) == 25912.5
+        status = runtime.get_status()["feeds"]["spot:NIFTY"]
+        assert status["failures"] == 1 and status["last_error"] is None and status["version"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_replay_bypasses_shared_snapshots():
+    async def scenario():
+        runtime = BotRuntime(enabled=True)
+
+        async def live():
+            return 25000.0
+
+        async def replayed():
+            return 24100.0
+
+        await runtime.get("spot:NIFTY", live)
+        market_replay.set_active_clock(market_replay.VirtualClock(market_replay.ist_now()))
+        try:
+            assert await runtime.get("spot:NIFTY", replayed) == 24100.0
+        finally:
+            market_replay.set_active_clock(None)
+        assert await runtime.get("spot:NIFTY", replayed) == 25000.0
+        assert runtime.get_status()["bypassed"] == 1
+
+    asyncio.run(scenario())
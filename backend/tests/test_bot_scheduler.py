@@ -0,0 +1,141 @@
+"""
+Tests for the bot scheduler: bounded concurrency, risk-lane cycles ahead of
+entry scans (and on reserved slots), overrun / error accounting and stopping
+a bot mid-cycle.
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.bot_scheduler import BotScheduler, Lane
+
+
+def test_risk_cycles_start_first_and_concurrency_is_bounded():
+    async def scenario():
+        scheduler = BotScheduler(max_concurrency=2)
+        order, running, peak = [], [0], [0]
+
+        def bot(name: str, lane: Lane):
+            async def cycle():
+                order.append(name)
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+                await asyncio.sleep(0.02)
+                running[0] -= 1
+                return 60
+
+            return scheduler.run(f"{name}@1", cycle, interval=60, lane=lane, active=lambda: True)
+
+        tasks = [
+            asyncio.create_task(bot("EntryA", Lane.ENTRY)),
+            asyncio.create_task(bot("EntryB", Lane.ENTRY)),
+            asyncio.create_task(bot("Risk", Lane.RISK)),
+        ]
+        await asyncio.sleep(0.1)
+
+        assert order[0] == "Risk" and sorted(order) == ["EntryA", "EntryB", "Risk"]
+        assert peak[0] == 2
+        status = scheduler.get_status()
+        assert status["bots"]["Risk@1"]["lane"] == "risk"
+        assert status["bots"]["EntryA@1"]["next_tick_in_s"] > 50
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await scheduler.stop()
+
+    asyncio.run(scenario())
+
+
+def test_slow_entry_cycles_cannot_hold_up_a_risk_cycle():
+    async def scenario():
+        scheduler = BotScheduler(max_concurrency=8, risk_slots=2)
+        entries_started, risk_ran = [0], asyncio.Event()
+
+        async def slow_entry():
+            entries_started[0] += 1
+            await asyncio.sleep(5)  # an LLM call / fill tracking
+
+        async def risk_check():
+            risk_ran.set()
+
+        tasks = [asyncio.create_task(scheduler.run(f"Entry{i}@1", slow_entry, interval=60)) for i in range(8)]
+        await asyncio.sleep(0.05)
+        assert entries_started[0] == 6 and scheduler.get_status()["queued"] == 2
+
+        tasks.append(asyncio.create_task(
+            scheduler.run("Risk@1", risk_check, interval=60, lane=Lane.RISK, active=lambda: not risk_ran.is_set())
+        ))
+        await asyncio.wait_for(risk_ran.wait(), timeout=0.5)
+        await asyncio.wait_for(tasks[-1], timeout=0.5)
+        assert scheduler.get_status()["finished"]["Risk@1"]["max_wait_ms"] < 100
+        assert entries_started[0] == 6
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await scheduler.stop()
+
+    asyncio.run(scenario())
+
+
+def test_overruns_errors_and_histograms_are_recorded():
+    async def scenario():
+        scheduler = BotScheduler(max_concurrency=1)
+        calls = [0]
+
+        async def slow_then_failing():
+            calls[0] += 1
+            if calls[0] == 1:
+                await asyncio.sleep(0.06)
+                return 0.01
+            raise RuntimeError("broker timeout")
+
+        task = asyncio.create_task(
+            scheduler.run("SlowBot@1", slow_then_failing, interval=30, slo=0.05, active=lambda: calls[0] < 2)
+        )
+        await asyncio.wait_for(task, timeout=1)
+
+        stats = scheduler.get_status()["finished"]["SlowBot@1"]
+        assert stats["cycles"] == 2 and stats["errors"] == 1 and stats["overruns"] == 1
+        assert stats["histogram"] == {"<=50ms": 1, "<=100ms": 1}
+        assert scheduler.get_status()["kinds"]["SlowBot"]["cycles"] == 2
+        await scheduler.stop()
+
+    asyncio.run(scenario())
+
+
+def test_cancelling_the_bot_loop_cancels_its_cycle():
+    async def scenario():
+        scheduler = BotScheduler(max_concurrency=1)
+        cancelled = asyncio.Event()
+
+        async def stuck_cycle():
+            try:
+                await asyncio.sleep(30)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        loop_task = asyncio.create_task(scheduler.run("StuckBot@1", stuck_cycle, interval=5))
+        await asyncio.sleep(0.02)
+        assert scheduler.get_status()["running"] == 1
+
+        loop_task.cancel()
+        await asyncio.gather(loop_task, return_exceptions=True)
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+        assert "StuckBot@1" not in scheduler.get_status()["bots"]
+
+        # The worker slot is free again for other bots
+        ran = asyncio.Event()
+
+        async def quick():
+            ran.set()
+
+        next_task = asyncio.create_task(scheduler.run("NextBot@1", quick, interval=5, active=lambda: not ran.is_set()))
+        await asyncio.wait_for(next_task, timeout=1)
+        await scheduler.stop()
+
+    asyncio.run(scenario())
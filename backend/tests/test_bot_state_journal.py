@@ -0,0 +1,118 @@
+"""
+Tests for the bot state journal: unchanged writes are skipped, a crash
+recovers from the local log, the write-behind flusher batches many streams
+into one store commit, and a new instance recovers from the store.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import market_replay
+from services.bot_state_journal import BotStateJournal
+
+
+class FakeStore:
+    """In-memory stand-in for the Firestore snapshot store"""
+
+    def __init__(self, fail: bool = False):
+        self.docs = {}
+        self.saves = []
+        self.fail = fail
+
+    def load(self, name):
+        return self.docs.get(name)
+
+    def save(self, snapshots):
+        if self.fail:
+            raise RuntimeError("firestore unavailable")
+        self.saves.append(sorted(snapshots))
+        self.docs.update(snapshots)
+        return 1
+
+
+def test_crash_recovers_from_local_log_and_skips_unchanged_writes():
+    async def scenario():
+        directory = tempfile.mkdtemp()
+        journal = BotStateJournal(directory, store=FakeStore(), flush_interval=60)
+        stream = await journal.open("delta_strangle", "user_1")
+
+        position = {"status": "open", "call_leg": {"strike": 25300, "current_price": 42.5}}
+        assert stream.set("position", position, urgent=True)
+        for _ in range(20):
+            assert not stream.set("position", dict(position))
+        stream.append("fills", {"side": "SELL", "strike": 25300}, limit=2)
+        stream.append("fills", {"side": "SELL", "strike": 24700}, limit=2)
+        stream.append("fills", {"side": "BUY", "strike": 25300}, limit=2)
+        assert journal.entries_logged == 4 and journal.entries_unchanged == 20
+
+        # Crash: no flush, the log ends with a torn line
+        with open(os.path.join(directory, "delta_strangle_user_1.log"), "a") as f:
+            f.write('{"seq": 5, "op": "se')
+        journal._task.cancel()
+
+        restarted = BotStateJournal(directory, store=FakeStore(), flush_interval=60)
+        recovered = await restarted.open("delta_strangle", "user_1")
+        assert recovered.recovered_from == "local" and recovered.replayed == 4
+        assert recovered.get("position") == position
+        assert [f["strike"] for f in recovered.get("fills")] == [24700, 25300]
+        assert not recovered.set("position", position)
+        await restarted.stop()
+
+    asyncio.run(scenario())
+
+
+def test_write_behind_batches_streams_and_retries_failures():
+    async def scenario():
+        store = FakeStore(fail=True)
+        journal = BotStateJournal(tempfile.mkdtemp(), store=store, flush_interval=60, urgent_delay=0.01)
+        streams = [await journal.open("vwap", f"user_{i}") for i in range(3)]
+        for cycle in range(10):
+            for stream in streams:
+                stream.set("session_stats", {"last_scan": cycle})
+
+        assert await journal.flush() == 0
+        assert journal.failed_flushes == 1 and journal.get_status()["pending_streams"] == 3
+
+        store.fail = False
+        streams[0].set("positions", {"RELIANCE": {"quantity": 10}}, urgent=True)
+        await asyncio.sleep(0.1)
+        assert store.saves == [["vwap:user_0", "vwap:user_1", "vwap:user_2"]]
+        assert store.docs["vwap:user_0"]["state"]["positions"]["RELIANCE"]["quantity"] == 10
+        status = journal.get_status()
+        assert status["entries_logged"] == 31 and status["batch_commits"] == 1
+        assert status["pending_streams"] == 0
+
+        # Nothing changed since: no further commits
+        assert await journal.flush() == 0
+        await journal.stop()
+
+    asyncio.run(scenario())
+
+
+def test_new_instance_recovers_from_store_and_replay_is_not_journaled():
+    async def scenario():
+        store = FakeStore()
+        first = BotStateJournal(tempfile.mkdtemp(), store=store, flush_interval=60)
+        stream = await first.open("ai_agent", "user_9")
+        stream.set("active_positions", [{"id": "POS-1", "strategy": "short_strangle"}])
+        await first.stop()
+
+        # New instance: empty local disk, snapshot comes from the store
+        second = BotStateJournal(tempfile.mkdtemp(), store=store, flush_interval=60)
+        recovered = await second.open("ai_agent", "user_9")
+        assert recovered.recovered_from == "firestore" and recovered.seq == 1
+        assert recovered.get("active_positions")[0]["id"] == "POS-1"
+
+        market_replay.set_active_clock(market_replay.VirtualClock(market_replay.ist_now()))
+        try:
+            assert not recovered.set("active_positions", [])
+        finally:
+            market_replay.set_active_clock(None)
+        assert recovered.get("active_positions")[0]["id"] == "POS-1"
+        assert second.get_status()["replay_skipped"] == 1
+        await second.stop()
+
+    asyncio.run(scenario())
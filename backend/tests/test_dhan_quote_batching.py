@@ -0,0 +1,45 @@
+"""
+Tests for batched Dhan quotes: packing the universe into <=1000-instrument
+requests and merging batches into the shared quote snapshot.
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.dhan_unified_service import DhanUnifiedService, pack_instruments
+
+
+def test_pack_instruments_fills_requests_across_segments():
+    instruments = {"NSE_EQ": list(range(1500)) + [7], "NSE_FNO": list(range(700))}
+    batches = pack_instruments(instruments)
+
+    assert [sum(len(ids) for ids in b.values()) for b in batches] == [1000, 1000, 200]
+    assert batches[0] == {"NSE_EQ": list(range(1000))}
+    assert batches[1] == {"NSE_EQ": list(range(1000, 1500)), "NSE_FNO": list(range(500))}
+    assert pack_instruments({}) == []
+
+
+def test_quotes_batched_merge_into_snapshot():
+    service = DhanUnifiedService()
+    requests = []
+
+    async def fake_quote(batch, priority=None):
+        requests.append(batch)
+        return {str(sid): {"ltp": float(sid), "segment": seg} for seg, ids in batch.items() for sid in ids if sid % 50}
+
+    service.get_quote = fake_quote
+    try:
+        quotes = asyncio.run(service.get_quotes_batched({"NSE_EQ": list(range(1, 201))}))
+    finally:
+        del service.get_quote
+
+    # ~200 F&O stocks: one request
+    assert len(requests) == 1
+    assert len(quotes) == 196 and quotes["7"]["ltp"] == 7.0
+    assert service.get_quote_snapshot(["7", "50"]) == {"7": quotes["7"]}
+
+    stats = service.get_batch_stats()
+    assert stats["requests"] == 1 and stats["instruments"] == 200 and stats["quotes"] == 196
+    assert stats["batches"][0]["latency_ms"] >= 0
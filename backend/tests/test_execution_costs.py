@@ -0,0 +1,73 @@
+"""
+Tests for the shared execution cost model: vectorized charges match per-order
+charges, fills use bid/ask depth when quoted, and SPAN-like margins.
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.execution_costs import calculate_charges, fill_price, order_charges, span_margin
+
+
+def test_intraday_charges_match_dhan_schedule():
+    charges = order_charges("SELL", 100, 2450.0, "equity_intraday")
+    turnover = 245000.0
+    assert charges["brokerage"] == 20.0
+    assert charges["stt"] == round(turnover * 0.00025, 2)
+    assert charges["stamp_duty"] == 0.0
+    assert charges["gst"] == round((20 + turnover * 0.0000345 + turnover * 0.000001) * 0.18, 2)
+
+
+def test_vectorized_charges_match_single_orders():
+    sides = np.array(["BUY", "SELL", "BUY", "SELL"])
+    qty = np.array([65, 65, 10, 500])
+    price = np.array([120.5, 0.0, 2450.0, 15.0])
+    segments = np.array(["options", "options", "equity_delivery", "futures"])
+
+    batch = calculate_charges(sides, qty, price, segments)
+    for i in range(len(sides)):
+        single = order_charges(sides[i], qty[i], price[i], segments[i])
+        assert single["total"] == round(float(batch["total"][i]), 2)
+
+    # An option that expired worthless needs no exit order
+    assert batch["total"][1] == 0.0
+
+    with pytest.raises(ValueError):
+        calculate_charges("BUY", 1, 100.0, "commodity")
+
+
+def test_fill_price_walks_depth_and_falls_back():
+    fills = fill_price(
+        ["BUY", "BUY", "SELL", "SELL"], [100.0] * 4, quantity=[50, 300, 50, 50],
+        bid=[99.5, 99.5, 99.5, 0.0], ask=[100.5, 100.5, 100.5, 0.0],
+        bid_qty=[100, 100, 100, 0], ask_qty=[100, 100, 100, 0],
+    )
+    # Within the touch: pay the ask / hit the bid
+    assert fills[0] == 100.5 and fills[2] == 99.5
+    # 3x the touch quantity walks 2 x DEPTH_IMPACT spreads past the ask
+    assert fills[1] == pytest.approx(101.5)
+    # No quote: flat market-order slippage
+    assert fills[3] == pytest.approx(100.0 * (1 - 0.0005))
+
+    np.testing.assert_allclose(
+        fill_price(["SELL", "SELL", "BUY"], [100.0] * 3, moneyness=[0.005, 0.02, 0.05]),
+        [99.5, 98.5, 102.5],
+    )
+    assert fill_price("BUY", 100.0, order_type="LIMIT") == 100.0
+
+
+def test_span_margin():
+    spot, qty = 25000.0, 65
+    notional = spot * qty
+    margins = span_margin(
+        ["SELL", "SELL", "BUY", "BUY"], spot, qty,
+        strike=[25000, 25500, 25000, 25000], option_type=["CE", "CE", "PE", "FUT"], premium=120.0,
+    )
+    assert margins[0] == pytest.approx(0.09 * notional)
+    assert margins[1] == pytest.approx(0.07 * notional - 0.5 * 500 * qty + 0.02 * notional)
+    assert margins[2] == pytest.approx(120.0 * qty)
+    assert margins[3] == pytest.approx(0.09 * notional)
@@ -0,0 +1,101 @@
+"""
+Tests for the HTTP cache middleware: strong ETags, If-None-Match -> 304,
+Accept-Encoding negotiation and the pre-compressed body cache.
+"""
+import os
+import sys
+
+from fastapi import FastAPI, Response
+from fastapi.responses import PlainTextResponse
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.http_cache import EncodedBodyCache, HTTPCacheMiddleware, etag_matches, negotiate_encoding
+
+HEATMAP = {"stocks": [{"symbol": f"STOCK{i}", "price": 100 + i, "price_change": 1.5} for i in range(200)]}
+
+
+def _app(cache: EncodedBodyCache):
+    app = FastAPI()
+    app.add_middleware(HTTPCacheMiddleware, cache=cache)
+
+    @app.get("/api/tools/fno-heatmap")
+    async def heatmap():
+        return HEATMAP
+
+    @app.get("/api/small")
+    async def small():
+        return {"ok": True}
+
+    @app.get("/api/versioned")
+    async def versioned():
+        return Response(content=b'{"v":1}', media_type="application/json", headers={"ETag": '"v1"'})
+
+    @app.get("/api/text")
+    async def text():
+        return PlainTextResponse("x" * 5000)
+
+    @app.post("/api/orders")
+    async def orders():
+        return HEATMAP
+
+    return app
+
+
+def test_negotiation_and_etag_matching():
+    assert negotiate_encoding("gzip, deflate", ("br", "gzip")) == "gzip"
+    assert negotiate_encoding("gzip, br", ("br", "gzip")) == "br"
+    assert negotiate_encoding("br;q=0.5, gzip;q=0.8", ("br", "gzip")) == "gzip"
+    assert negotiate_encoding("gzip;q=0, identity", ("gzip",)) is None
+    assert negotiate_encoding("*", ("gzip",)) == "gzip"
+    assert negotiate_encoding(None) is None
+
+    # A client holding any encoding of the same content matches
+    assert etag_matches('"abc-gzip"', '"abc"')
+    assert etag_matches('W/"abc"', '"abc-br"')
+    assert not etag_matches('"abd-gzip"', '"abc"')
+
+
+def test_compresses_once_and_answers_304():
+    cache = EncodedBodyCache()
+    with TestClient(_app(cache)) as client:
+        first = client.get("/api/tools/fno-heatmap", headers={"Accept-Encoding": "gzip"})
+        assert first.status_code == 200
+        assert first.headers["content-encoding"] == "gzip"
+        assert first.headers["vary"] == "Accept-Encoding"
+        assert first.headers["cache-control"] == "no-cache"
+        etag = first.headers["etag"]
+        assert etag.endswith('-gzip"')
+        assert first.json() == HEATMAP
+        # httpx decodes the body; the wire size is in content-length
+        assert int(first.headers["content-length"]) < len(first.content) / 4
+
+        second = client.get("/api/tools/fno-heatmap", headers={"Accept-Encoding": "gzip"})
+        assert second.headers["etag"] == etag
+        assert cache.hits == 1 and cache.misses == 1
+
+        unchanged = client.get("/api/tools/fno-heatmap", headers={"If-None-Match": etag, "Accept-Encoding": "identity"})
+        assert unchanged.status_code == 304
+        assert unchanged.content == b""
+        assert unchanged.headers["etag"] == etag[:-len('-gzip"')] + '"'
+        assert cache.get_status()["not_modified"] == 1
+
+
+def test_passthrough_cases():
+    cache = EncodedBodyCache()
+    with TestClient(_app(cache)) as client:
+        small = client.get("/api/small", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in small.headers
+        assert small.headers["etag"]
+
+        # The endpoint's own ETag is kept and used for If-None-Match
+        versioned = client.get("/api/versioned")
+        assert versioned.headers["etag"] == '"v1"'
+        assert client.get("/api/versioned", headers={"If-None-Match": '"v1"'}).status_code == 304
+
+        text = client.get("/api/text", headers={"Accept-Encoding": "gzip"})
+        assert "etag" not in text.headers and "content-encoding" not in text.headers
+
+        posted = client.post("/api/orders", headers={"Accept-Encoding": "gzip"})
+        assert "etag" not in posted.headers and "content-encoding" not in posted.headers
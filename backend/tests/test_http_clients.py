@@ -0,0 +1,82 @@
+"""
+Tests for the shared HTTP client registry: metrics, NSE cookie warm-up and
+retry, per-loop clients and shutdown.
+"""
+import asyncio
+import os
+import sys
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.http_clients import HTTPClientRegistry
+
+
+def _mock(registry, name, handler):
+    entry = registry._entry(name)
+    entry.transport._transport = httpx.MockTransport(handler)
+    return entry.client
+
+
+def test_reuses_client_and_records_metrics():
+    async def scenario():
+        registry = HTTPClientRegistry(http2=False)
+        client = _mock(registry, "dhan", lambda request: httpx.Response(200 if request.url.path == "/ok" else 500))
+        assert registry.get("dhan") is client
+        assert registry.get("upstox") is not client
+
+        await client.get("https://api.dhan.co/ok")
+        await client.get("https://api.dhan.co/ok")
+        await client.get("https://api.dhan.co/fail")
+
+        metrics = registry.get_metrics()["clients"]["dhan"]
+        assert metrics["requests"] == 3 and metrics["in_flight"] == 0
+        assert metrics["status"] == {"2xx": 2, "5xx": 1}
+        assert metrics["max_connections"] == 10
+
+        await registry.close()
+        assert client.is_closed
+        assert registry.get("dhan") is not client  # recreated on next use
+        await registry.close()
+
+    asyncio.run(scenario())
+
+
+def test_nse_warms_cookies_once_and_refreshes_on_403():
+    seen = []
+
+    def handler(request):
+        seen.append(request.url.path)
+        if request.url.path == "/":
+            return httpx.Response(200, headers={"set-cookie": f"nsit=v{seen.count('/')}; Path=/"})
+        if request.headers.get("cookie") == "nsit=v1":
+            return httpx.Response(403)
+        return httpx.Response(200, json={"cookie": request.headers.get("cookie")})
+
+    async def scenario():
+        registry = HTTPClientRegistry(http2=False)
+        _mock(registry, "nse", handler)
+        response = await registry.nse_get("/api/marketStatus")
+        assert response.json() == {"cookie": "nsit=v2"}
+        assert seen == ["/", "/api/marketStatus", "/", "/api/marketStatus"]
+
+        # Jar is warm: concurrent callers share it without another homepage hit
+        await asyncio.gather(*[registry.nse_get("/api/allIndices") for _ in range(3)])
+        assert seen.count("/") == 2
+        assert registry.get_metrics()["clients"]["nse"]["cookies"]["warmups"] == 2
+        await registry.close()
+
+    asyncio.run(scenario())
+
+
+def test_each_event_loop_gets_its_own_client():
+    registry = HTTPClientRegistry(http2=False)
+
+    async def grab():
+        return registry.get("default")
+
+    first = asyncio.run(grab())
+    second = asyncio.run(grab())
+    assert first is not second
+    assert len(registry._clients) == 1  # client of the closed loop was dropped
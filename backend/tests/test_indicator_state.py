@@ -0,0 +1,112 @@
+"""
+Tests for the incremental indicator state: parity with the ta-library
+DataFrame indicators, replacing a re-sent bar, and persistence.
+"""
+import os
+import sys
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.indicator_state import IndicatorState, IndicatorStore, history_bars
+
+warnings.filterwarnings("ignore", category=RuntimeWarning)
+
+
+def _history(n, seed=0, start="2025-01-01"):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    return pd.DataFrame({
+        "Open": close + rng.normal(0, 0.5, n),
+        "High": close + rng.uniform(0, 2, n),
+        "Low": close - rng.uniform(0, 2, n),
+        "Close": close,
+        "Volume": rng.integers(1_000, 100_000, n).astype(float),
+    }, index=pd.date_range(start, periods=n, freq="B"))
+
+
+def _ta_indicators(hist):
+    from ta.momentum import RSIIndicator, StochasticOscillator
+    from ta.trend import ADXIndicator, EMAIndicator, MACD
+    from ta.volatility import AverageTrueRange, BollingerBands
+
+    close, high, low = hist["Close"], hist["High"], hist["Low"]
+    macd = MACD(close)
+    bb = BollingerBands(close)
+    stoch = StochasticOscillator(high, low, close)
+    return {
+        "rsi": RSIIndicator(close, window=14).rsi().iloc[-1],
+        "macd": macd.macd().iloc[-1],
+        "macd_signal": macd.macd_signal().iloc[-1],
+        "macd_histogram": macd.macd_diff().iloc[-1],
+        "ema_20": EMAIndicator(close, window=20).ema_indicator().iloc[-1],
+        "ema_50": EMAIndicator(close, window=50).ema_indicator().iloc[-1],
+        "ema_200": EMAIndicator(close, window=200).ema_indicator().iloc[-1],
+        "bb_upper": bb.bollinger_hband().iloc[-1],
+        "bb_lower": bb.bollinger_lband().iloc[-1],
+        "atr": AverageTrueRange(high, low, close).average_true_range().iloc[-1],
+        "adx": ADXIndicator(high, low, close).adx().iloc[-1],
+        "stoch_k": stoch.stoch().iloc[-1],
+        "stoch_d": stoch.stoch_signal().iloc[-1],
+    }
+
+
+@pytest.mark.parametrize("n", [40, 120, 250])
+def test_matches_ta_library(n):
+    pytest.importorskip("ta")
+    hist = _history(n, seed=n)
+    state = IndicatorState()
+    for bar in history_bars(hist):
+        state.update(*bar)
+    got = state.indicators()
+
+    for key, expected in _ta_indicators(hist).items():
+        if key == "ema_200" and n < 200:
+            assert got[key] == got["ema_50"]
+        elif pd.isna(expected):
+            assert key == "ema_50" and got[key] == hist["Close"].iloc[-1]  # not enough bars: close
+        else:
+            assert got[key] == pytest.approx(expected, rel=1e-9, abs=1e-9), key
+
+
+def test_resent_bar_replaces_and_old_bars_are_ignored():
+    hist = _history(60)
+    full = IndicatorState()
+    for bar in history_bars(hist):
+        full.update(*bar)
+
+    # Last bar first arrives as a partial candle, then final
+    partial = IndicatorState()
+    bars = list(history_bars(hist))
+    for bar in bars[:-1]:
+        partial.update(*bar)
+    ts, o, h, l, c, v = bars[-1]
+    assert partial.update(ts, o, h * 0.99, l, c * 0.99, v / 2)
+    assert partial.update(*bars[-1])
+    assert not partial.update(*bars[10])
+    assert partial.indicators() == full.indicators()
+
+
+def test_store_catches_up_and_persists(tmp_path):
+    hist = _history(80)
+    store = IndicatorStore(root=str(tmp_path), save_interval=3600)
+
+    # A short window first, then the full history backfills the state
+    store.update_history("RELIANCE.NS", hist.iloc[-10:])
+    assert store.get("RELIANCE") == {}
+    indicators = store.update_history("RELIANCE.NS", hist.iloc[:-1])
+    assert indicators["bars"] == 79
+
+    # Only the new bar is applied on catch-up
+    updated = store.update_history("RELIANCE", hist.iloc[-5:])
+    assert updated["bars"] == 80
+
+    store.save()
+    reloaded = IndicatorStore(root=str(tmp_path))
+    assert reloaded.get("RELIANCE.NS") == updated
+    assert reloaded.history_period("RELIANCE", "3mo") == "3mo"  # synthetic bars are old
+    assert reloaded.history_period("TCS", "3mo") == "3mo"
@@ -0,0 +1,109 @@
+"""
+Tests for the orjson response path: NumPy/pandas serialization, routes
+returning raw NumPy data, the runtime toggle, and routes that keep FastAPI's
+normal handling.
+"""
+import json
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from fastapi import APIRouter, FastAPI, Response
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import json_response
+from services.json_response import FastJSONResponse, FastJSONRoute, dumps
+
+
+class Quote(BaseModel):
+    symbol: str
+    ltp: float
+
+
+def _app():
+    router = APIRouter(prefix="/api", route_class=FastJSONRoute, default_response_class=FastJSONResponse)
+
+    @router.get("/chain")
+    async def get_chain():
+        return {"strike": np.int64(24500), "iv": np.float64(14.2), "greeks": np.array([0.5, np.nan])}
+
+    @router.post("/orders", status_code=201)
+    def place_order():
+        return {"order_id": "A1", "qty": np.int32(75)}
+
+    @router.get("/quote", response_model=Quote)
+    async def get_quote():
+        return {"symbol": "NIFTY", "ltp": 24500.5, "dropped": True}
+
+    @router.get("/cookie")
+    async def set_cookie(response: Response):
+        response.headers["X-Source"] = "cache"
+        return {"ok": True}
+
+    app = FastAPI()
+    app.include_router(router)
+    return app
+
+
+def test_dumps_numpy_pandas_and_nan():
+    payload = {
+        "i": np.int64(3),
+        "f": np.float32(1.5),
+        "b": np.bool_(True),
+        "arr": np.array([1, 2]),
+        "nan": float("nan"),
+        "np_nan": np.float64("nan"),
+        "ts": pd.Timestamp("2026-01-15 09:15"),
+        "nat": pd.NaT,
+        "when": datetime(2026, 1, 15, 9, 15),
+        "series": pd.Series([1.0, 2.0]),
+        "name": "निफ्टी",
+    }
+
+    decoded = json.loads(dumps(payload))
+
+    assert decoded["i"] == 3 and decoded["f"] == 1.5 and decoded["b"] is True
+    assert decoded["arr"] == [1, 2] and decoded["series"] == [1.0, 2.0]
+    assert decoded["nan"] is None and decoded["np_nan"] is None and decoded["nat"] is None
+    assert decoded["ts"] == "2026-01-15T09:15:00"
+    assert decoded["when"] == "2026-01-15T09:15:00"
+    assert decoded["name"] == "निफ्टी"
+
+
+def test_routes_serialize_numpy_and_keep_status_code():
+    with TestClient(_app()) as client:
+        chain = client.get("/api/chain")
+        assert chain.status_code == 200
+        assert chain.json() == {"strike": 24500, "iv": 14.2, "greeks": [0.5, None]}
+
+        order = client.post("/api/orders")
+        assert order.status_code == 201
+        assert order.json() == {"order_id": "A1", "qty": 75}
+
+
+def test_response_model_and_response_param_routes_are_not_wrapped():
+    with TestClient(_app()) as client:
+        # response_model still filters fields
+        assert client.get("/api/quote").json() == {"symbol": "NIFTY", "ltp": 24500.5}
+        # headers set on the injected Response survive
+        cookie = client.get("/api/cookie")
+        assert cookie.headers["X-Source"] == "cache"
+        assert cookie.json() == {"ok": True}
+
+
+def test_toggle_switches_to_stdlib_encoder_with_same_output():
+    payload = {"strike": np.int64(24500), "iv": np.float64("nan"), "legs": np.array([1.5, 2.5]), "name": "निफ्टी"}
+    fast = dumps(payload)
+
+    json_response.set_fast_json_enabled(False)
+    try:
+        assert dumps(payload) == fast
+        with TestClient(_app()) as client:
+            assert client.get("/api/chain").json() == {"strike": 24500, "iv": 14.2, "greeks": [0.5, None]}
+    finally:
+        json_response.set_fast_json_enabled(True)
@@ -0,0 +1,91 @@
+"""
+Tests for the LLM decision cache: nearby market states share a
+fingerprint, concurrent bots in the same state share one LLM call, and the
+stale tier only serves decisions when the LLM cannot be called.
+"""
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import market_replay
+from services.llm_decision_cache import LLMDecisionCache, config_digest, market_fingerprint
+
+
+def test_fingerprint_quantizes_spot_iv_position_and_time():
+    at = datetime(2026, 10, 16, 10, 31)
+    base = market_fingerprint("delta_strangle:abc", "nifty", 25003.4, 13.1, "open:CE25300d3", now=at)
+
+    # A few points of spot, a tenth of IV and two minutes later: same decision
+    near = market_fingerprint("delta_strangle:abc", "NIFTY", 25010.0, 13.2, "open:CE25300d3",
+                              now=datetime(2026, 10, 16, 10, 34))
+    assert near.key == base.key and base.symbol == "NIFTY"
+
+    assert market_fingerprint("delta_strangle:abc", "NIFTY", 25040, 13.1, "open:CE25300d3", now=at).key != base.key
+    assert market_fingerprint("delta_strangle:abc", "NIFTY", 25003, 14.0, "open:CE25300d3", now=at).key != base.key
+    assert market_fingerprint("delta_strangle:abc", "NIFTY", 25003, 13.1, "open:CE25300d4", now=at).key != base.key
+    assert market_fingerprint("delta_strangle:abc", "NIFTY", 25003, 13.1, "open:CE25300d3",
+                              now=datetime(2026, 10, 16, 10, 36)).key != base.key
+    assert config_digest({"num_lots": 1}) != config_digest({"num_lots": 2})
+
+
+def test_concurrent_bots_in_same_state_share_one_call():
+    async def scenario():
+        cache = LLMDecisionCache(ttl=60)
+        calls = []
+
+        async def llm():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return '{"action": "HOLD"}'
+
+        results = await asyncio.gather(*(cache.get_or_compute("NIFTY|s1000", llm) for _ in range(5)))
+        assert len(calls) == 1
+        assert sorted(source for _, source in results) == ["coalesced"] * 4 + ["computed"]
+        assert all(value == '{"action": "HOLD"}' for value, _ in results)
+
+        assert await cache.get_or_compute("NIFTY|s1000", llm) == ('{"action": "HOLD"}', "hit")
+        assert len(calls) == 1
+        status = cache.get_status()
+        assert status["hits"] == 1 and status["coalesced"] == 4 and status["hit_rate"] == 0.833
+
+        # Replay bots never share or store decisions
+        market_replay.set_active_clock(market_replay.VirtualClock(market_replay.ist_now()))
+        try:
+            assert (await cache.get_or_compute("NIFTY|s1000", llm))[1] == "computed"
+        finally:
+            market_replay.set_active_clock(None)
+        assert len(calls) == 2
+
+    asyncio.run(scenario())
+
+
+def test_failures_are_not_cached_and_stale_tier_is_fallback_only():
+    async def scenario():
+        cache = LLMDecisionCache(ttl=0.05, stale_ttl=60)
+
+        async def down():
+            return None
+
+        assert await cache.get_or_compute("k", down) == (None, "computed")
+        assert cache.get_stale("k") is None and cache.stats["failures"] == 1
+
+        async def llm():
+            return "decision"
+
+        await cache.get_or_compute("k", llm)
+        time.sleep(0.06)
+        assert cache.get("k") is None
+        assert cache.get_stale("k") == "decision"
+
+        # Past its fresh TTL the entry is recomputed, not served
+        async def newer():
+            return "newer"
+
+        assert await cache.get_or_compute("k", newer) == ("newer", "computed")
+        assert cache.get_status()["stale_hits"] == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,143 @@
+"""
+Tests for the LLM gateway: a slow primary is hedged and the loser is
+cancelled, errors fail over to the next provider, 429s and repeated errors
+open a provider's circuit until a half-open probe succeeds, and slow
+providers are routed last.
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import llm_gateway
+from services.llm_gateway import CircuitState, LLMGateway, LLMProvider, LLMRequest, ProviderError
+
+
+class FakeProvider(LLMProvider):
+    """Provider that answers after `delay` seconds, or raises `error`"""
+    kind = "fake"
+
+    def __init__(self, model, delay=0.0, chunks=("ok",), error=None):
+        super().__init__(model)
+        self.delay = delay
+        self.chunks = chunks
+        self.error = error
+        self.calls = 0
+
+    def configured(self, request):
+        return True
+
+    async def stream(self, request, usage):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        usage["output"] = len(self.chunks)
+        for chunk in self.chunks:
+            yield chunk
+
+
+def gateway_with(*providers) -> LLMGateway:
+    gateway = LLMGateway(timeout=5)
+    for provider in providers:
+        gateway.register(provider)
+    return gateway
+
+
+def test_slow_primary_is_hedged_and_loser_cancelled(monkeypatch):
+    monkeypatch.setattr(llm_gateway, "HEDGE_MIN_SECONDS", 0.01)
+    monkeypatch.setattr(llm_gateway, "DEFAULT_FIRST_TOKEN_SECONDS", 0.05)
+
+    async def scenario():
+        slow = FakeProvider("slow", delay=2.0, chunks=("slow",))
+        fast = FakeProvider("fast", delay=0.01, chunks=('{"action": ', '"WAIT"}'))
+        gateway = gateway_with(slow, fast)
+
+        result = await gateway.complete(LLMRequest(prompt="p"), providers=("fake:slow", "fake:fast"))
+        assert result.text == '{"action": "WAIT"}' and result.provider == "fake:fast"
+        assert result.hedged and result.first_token_ms is not None and result.usage == {"output": 2}
+        await asyncio.sleep(0)
+
+        status = gateway.get_status()
+        assert status["hedged"] == 1 and status["hedge_wins"] == 1
+        assert status["providers"]["fake:slow"]["cancelled"] == 1
+        assert status["providers"]["fake:slow"]["failures"] == 0
+        assert status["providers"]["fake:fast"]["successes"] == 1
+
+        # Without hedging the primary is simply awaited
+        slow.delay = 0.1
+        result = await gateway.complete(LLMRequest(prompt="p"), providers=("fake:slow", "fake:fast"), hedge=False)
+        assert result.provider == "fake:slow" and not result.hedged
+
+    asyncio.run(scenario())
+
+
+def test_errors_fail_over_and_open_the_circuit():
+    async def scenario():
+        flaky = FakeProvider("flaky", error=ProviderError(500, "boom"))
+        limited = FakeProvider("limited", error=ProviderError(429, "quota"))
+        backup = FakeProvider("backup", chunks=("fine",))
+        gateway = gateway_with(flaky, limited, backup)
+        providers = ("fake:flaky", "fake:backup")
+
+        for _ in range(llm_gateway.FAILURES_TO_OPEN):
+            result = await gateway.complete(LLMRequest(prompt="p"), providers=providers)
+            assert result.provider == "fake:backup" and not result.hedged
+        assert gateway.stats("fake:flaky").state == CircuitState.OPEN
+        assert gateway.route(providers, LLMRequest()) == ["fake:backup"]
+        assert gateway.get_status()["failovers"] == 3
+
+        # Open circuit: the provider is not called at all
+        await gateway.complete(LLMRequest(prompt="p"), providers=providers)
+        assert flaky.calls == 3
+
+        # A single 429 opens the circuit at once; a 400 does not count against the provider
+        await gateway.complete(LLMRequest(prompt="p"), providers=("fake:limited", "fake:backup"))
+        assert gateway.stats("fake:limited").state == CircuitState.OPEN
+        limited.error = ProviderError(400, "bad request")
+        gateway.stats("fake:limited").open_until = 0.0
+        await gateway.complete(LLMRequest(prompt="p"), providers=("fake:limited",))
+        assert gateway.stats("fake:limited").state == CircuitState.CLOSED
+
+        # After the cooldown one probe goes through; success closes the circuit
+        stats = gateway.stats("fake:flaky")
+        stats.open_until = 1.0
+        assert stats.state == CircuitState.HALF_OPEN and stats.allow()
+        flaky.error = None
+        result = await gateway.complete(LLMRequest(prompt="p"), providers=providers)
+        assert result.provider == "fake:flaky" and stats.state == CircuitState.CLOSED
+
+        # Nothing usable: None, counted as failed
+        gateway.stats("fake:backup")._open(60)
+        stats._open(60)
+        assert await gateway.complete(LLMRequest(prompt="p"), providers=providers) is None
+        assert gateway.get_status()["failed"] == 2  # this one and the 400 above
+
+    asyncio.run(scenario())
+
+
+def test_slow_providers_routed_last_and_stream_fails_over(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+
+    async def scenario():
+        first = FakeProvider("first", error=ProviderError(503, "unavailable"))
+        second = FakeProvider("second", chunks=("a", "b", "c"))
+        gateway = gateway_with(first, second)
+
+        chunks = [chunk async for chunk in gateway.stream(LLMRequest(prompt="p"), ("fake:first", "fake:second"))]
+        assert chunks == ["a", "b", "c"]
+        assert gateway.stats("fake:first").failures == 1
+        assert gateway.stats("fake:second").successes == 1
+
+        for _ in range(llm_gateway.MIN_SAMPLES):
+            gateway.stats("fake:first").record_success(20.0, 5.0)
+            gateway.stats("fake:second").record_success(2.0, 0.5)
+        assert gateway.route(("fake:first", "fake:second"), LLMRequest()) == ["fake:second", "fake:first"]
+        assert gateway.get_status()["providers"]["fake:second"]["hedge_after_ms"] == 1000
+
+        # Providers without an API key are skipped
+        assert gateway.route(("openai:gpt-4o-mini", "fake:first"), LLMRequest()) == ["fake:first"]
+        assert gateway.route(("openai:gpt-4o-mini",), LLMRequest(api_keys={"openai": "sk-test"})) == ["openai:gpt-4o-mini"]
+
+    asyncio.run(scenario())
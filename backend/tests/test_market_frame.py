@@ -0,0 +1,88 @@
+"""
+Tests for the columnar market frame: normalization of the different provider
+layouts, row filtering, and atomic publishing by the ingestor.
+"""
+import asyncio
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.market_frame import MarketFrame, MarketFrameIngestor
+
+
+RECORDS = [
+    # Dhan layout
+    {"symbol": "RELIANCE", "ltp": 2450.5, "prev_close": 2400, "change_percent": 2.1, "volume": 120000,
+     "high": 2460, "low": 2390, "open": 2400, "data_source": "dhan"},
+    # Yahoo / cache layout with aliases
+    {"symbol": "TCS.NS", "price": 3850, "previousClose": 3900, "volume": 5000, "avgVolume": 4000,
+     "dayHigh": 3900, "dayLow": 3800, "RSI": 0, "ema_50": 3700, "sector": "IT"},
+]
+
+
+def test_normalizes_provider_layouts():
+    frame = MarketFrame.from_records(RECORDS, sectors={"RELIANCE": "Energy"})
+    reliance, tcs = frame.to_records()
+
+    assert list(frame.symbols) == ["RELIANCE", "TCS"]
+    assert reliance["vwap"] == round((2460 + 2390 + 2450.5) / 3, 2)
+    assert reliance["atr"] == 70
+    assert reliance["adx"] == pytest.approx(min(50, max(15, 70 / 2450.5 * 100 * 10)))
+    assert reliance["ema20"] == reliance["ema21"] == pytest.approx(2450.5 * 0.99)
+    assert reliance["sector"] == "Energy"
+
+    assert tcs["ltp"] == tcs["close"] == 3850
+    assert tcs["change_percent"] == round((3850 - 3900) / 3900 * 100, 2)
+    assert tcs["volume_ratio"] == 1.25
+    assert tcs["ema50"] == 3700 and tcs["ema55"] == pytest.approx(3850 * 0.98)
+    assert tcs["rsi"] == 50
+    assert isinstance(tcs["volume"], int)
+
+    quote = frame.to_quotes([0])[0]
+    assert quote["price"] == 2450.5 and quote["change_pct"] == 2.1 and quote["source"] == "dhan"
+
+
+def test_mask_filter_and_lookup():
+    frame = MarketFrame.from_records(RECORDS)
+    cheap = frame.filter(frame.mask(max_price=3000))
+    assert list(cheap.symbols) == ["RELIANCE"]
+    assert cheap.version == frame.version
+
+    rows, missing = frame.rows_for(["TCS.NS", "INFY"])
+    assert rows.tolist() == [1] and missing == ["INFY"]
+
+    with pytest.raises(ValueError):
+        frame["ltp"][0] = 1.0  # published arrays are read-only
+
+
+def test_ingestor_coalesces_refreshes_and_keeps_last_frame():
+    calls = []
+    published = []
+
+    async def fetcher(symbols):
+        calls.append(symbols)
+        await asyncio.sleep(0.01)
+        return RECORDS if len(calls) == 1 else []
+
+    async def scenario():
+        ingestor = MarketFrameIngestor(fetcher=fetcher, interval=60)
+        ingestor.configure(symbols=["RELIANCE.NS", "TCS"])
+        ingestor.add_listener(published.append)
+
+        frames = await asyncio.gather(*[ingestor.get_frame() for _ in range(5)])
+        assert len(calls) == 1
+        assert {f.version for f in frames} == {1}
+        assert calls[0] == ["RELIANCE", "TCS"]
+
+        # A failed refresh keeps serving the last good frame
+        frame = await ingestor.refresh()
+        assert frame.version == 1 and ingestor.last_error == "no data"
+        return frames[0]
+
+    frame = asyncio.run(scenario())
+    assert published == [frame]
+    np.testing.assert_allclose(frame["ltp"], [2450.5, 3850])
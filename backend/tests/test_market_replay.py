@@ -0,0 +1,131 @@
+"""
+Tests for the market replay simulator: bars only become visible once they
+close, bot clocks follow simulated time, and a replayed day is reproducible.
+"""
+import asyncio
+import math
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.market_replay import MarketReplay, ReplaySession, VirtualClock, IST, is_replay_active
+from services.vwap_trading_bot import VWAPTradingBot, get_ist_now
+from services.ai_strangle_bot import AIStrangleBot
+
+
+SESSION_START = datetime(2026, 1, 15, 9, 15)
+
+
+def make_session(minutes=375):
+    bars = {}
+    for symbol, base, drift in [("RELIANCE", 2450, 0.0004), ("TCS", 3850, -0.0004),
+                                ("NIFTY", 22500, 0.00005), ("INDIAVIX", 13, 0)]:
+        rows, price = [], base
+        for i in range(minutes):
+            open_ = price
+            price = price * (1 + drift + 0.001 * math.sin(i / 7))
+            rows.append({
+                "timestamp": (SESSION_START + timedelta(minutes=i)).isoformat(),
+                "open": open_,
+                "high": max(open_, price) * 1.0005,
+                "low": min(open_, price) * 0.9995,
+                "close": price,
+                "volume": 1000 + 10 * i,
+            })
+        bars[symbol] = rows
+
+    chains = []
+    for i in range(0, minutes, 5):
+        spot = bars["NIFTY"][i]["close"]
+        atm = round(spot / 50) * 50
+        chains.append({
+            "timestamp": (SESSION_START + timedelta(minutes=i + 1)).isoformat(),
+            "symbol": "NIFTY",
+            "expiry": "2026-01-20",
+            "spot": spot,
+            "strikes": [{
+                "strike": atm + k * 50,
+                "ce_ltp": max(5, 120 - k * 20), "pe_ltp": max(5, 120 + k * 20),
+                "ce_iv": 14, "pe_iv": 15, "ce_oi": 100000, "pe_oi": 100000,
+                "ce_delta": 0.5 - k * 0.08, "pe_delta": -0.5 - k * 0.08,
+            } for k in range(-8, 9)],
+        })
+
+    return ReplaySession.from_dict({
+        "date": "2026-01-15",
+        "bars": bars,
+        "option_chains": chains,
+        "avg_volume": {"RELIANCE": 1000, "TCS": 1000},
+    })
+
+
+def test_bars_visible_only_after_close():
+    replay = MarketReplay(make_session(minutes=10))
+    data = replay.data
+
+    # First 1-minute bar closes at 09:16
+    assert replay.clock.now() == datetime(2026, 1, 15, 9, 16, tzinfo=IST)
+    assert data.get_stock_quote("RELIANCE")["ltp"] == round(make_session(10).bars["RELIANCE"][0].close, 2)
+
+    replay.clock.advance(59)
+    data.tick()
+    assert data._cursor == 4  # still only the 09:15 bars (4 symbols)
+
+    replay.clock.advance(1)
+    data.tick()
+    assert data._cursor == 8
+
+
+def test_bot_clock_follows_replay():
+    replay = MarketReplay(make_session(minutes=10))
+    bot = VWAPTradingBot()
+    replay.attach(bot)
+
+    replay.activate()
+    try:
+        assert is_replay_active()
+        assert get_ist_now() == datetime(2026, 1, 15, 9, 16, tzinfo=IST)
+        assert not bot._is_market_hours()  # market_start is 09:20
+        replay.clock.advance(5 * 60)
+        assert bot._is_market_hours()
+    finally:
+        replay.deactivate()
+
+    assert not is_replay_active()
+    assert bot._is_market_hours()  # plain mock mode is always open
+
+
+def test_full_day_replay_is_deterministic():
+    def run_once():
+        replay = MarketReplay(make_session(), speed=0)
+        bots = [VWAPTradingBot(), AIStrangleBot(None, "")]
+        return asyncio.run(replay.run(bots, scan_interval=60))
+
+    first, second = run_once(), run_once()
+
+    assert first["scans"] == second["scans"] == 2 * 375
+    assert not first["errors"]
+    for key in ("realized_pnl", "trade_count", "net_pnl"):
+        assert first["account"][key] == second["account"][key]
+    vwap_first = first["bots"]["VWAPTradingBot"]["session_stats"]
+    vwap_second = second["bots"]["VWAPTradingBot"]["session_stats"]
+    assert vwap_first["total_trades"] > 0
+    assert vwap_first["total_pnl"] == vwap_second["total_pnl"]
+    assert first["bots"]["VWAPTradingBot"]["active_positions"] == 0  # squared off at 15:15
+
+
+def test_virtual_clock_sleepers_wake_in_order():
+    async def scenario():
+        clock = VirtualClock(SESSION_START, speed=0)
+        woke = []
+
+        async def sleeper(name, seconds):
+            await clock.sleep(seconds)
+            woke.append((name, clock.now().strftime("%H:%M")))
+
+        await asyncio.gather(sleeper("late", 600), sleeper("early", 60), sleeper("mid", 300))
+        return woke
+
+    assert asyncio.run(scenario()) == [("early", "09:16"), ("mid", "09:20"), ("late", "09:25")]
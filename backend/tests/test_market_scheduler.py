@@ -0,0 +1,85 @@
+"""
+Tests for the market scheduler: session phases and holidays, per-phase
+cadence, and the run/pause controls.
+"""
+import asyncio
+import os
+import sys
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.market_replay import IST
+from services.market_scheduler import MarketCalendar, MarketScheduler, Phase, parse_holidays
+
+
+def at(day, hour, minute=0):
+    return datetime(2026, 10, day, hour, minute, tzinfo=IST)
+
+
+def test_phases_holidays_and_next_change():
+    holidays = parse_holidays({"FO": [{"tradingDate": "09-Oct-2026"}], "CM": [{"tradingDate": "bad"}]})
+    holidays |= parse_holidays([{"date": "2026-10-10"}])
+    assert holidays == {date(2026, 10, 9), date(2026, 10, 10)}
+
+    calendar = MarketCalendar(holidays)
+    assert calendar.phase(at(8, 8, 59)) == Phase.CLOSED
+    assert calendar.phase(at(8, 9, 5)) == Phase.PRE_OPEN
+    assert calendar.phase(at(8, 12)) == Phase.LIVE
+    assert calendar.phase(at(8, 15, 45)) == Phase.POST_CLOSE
+    assert calendar.phase(at(8, 16)) == Phase.CLOSED
+    assert calendar.phase(at(9, 12)) == Phase.CLOSED  # Friday holiday
+
+    assert calendar.next_change(at(8, 12)) == at(8, 15, 30)
+    # Thursday evening -> skips the holiday and the weekend
+    assert calendar.next_change(at(8, 17)) == at(12, 9, 0)
+
+
+class FixedCalendar(MarketCalendar):
+    def __init__(self, moment):
+        super().__init__()
+        self.moment = moment
+
+    def now(self):
+        return self.moment
+
+
+def test_runs_only_in_phases_with_cadence_and_obeys_controls():
+    runs = {"live": 0, "closed": 0}
+
+    async def scenario():
+        calendar = FixedCalendar(at(8, 12))  # live
+        scheduler = MarketScheduler(calendar)
+        phases = []
+        scheduler.add_phase_listener(phases.append)
+
+        async def live_job():
+            runs["live"] += 1
+
+        async def closed_job():
+            runs["closed"] += 1
+
+        scheduler.register("live", live_job, {Phase.LIVE: 0.05}, jitter=0)
+        scheduler.register("closed", closed_job, {Phase.CLOSED: 0.05}, jitter=0)
+        scheduler.start()
+        await asyncio.sleep(0.18)
+        assert phases == [Phase.LIVE]
+        assert 3 <= runs["live"] <= 5 and runs["closed"] == 0
+
+        scheduler.pause("live")
+        paused_at = runs["live"]
+        scheduler.trigger("closed")  # on demand, whatever the phase
+        await asyncio.sleep(0.1)
+        assert runs["live"] == paused_at and runs["closed"] == 1
+
+        scheduler.set_cadence("closed", {Phase.LIVE: 0.05})
+        await asyncio.sleep(0.12)
+        status = scheduler.get_status()
+        await scheduler.stop()
+        return status
+
+    status = asyncio.run(scenario())
+    assert status["phase"] == "live"
+    assert status["jobs"]["live"]["paused"] is True
+    assert status["jobs"]["closed"]["runs_by_phase"]["live"] >= 2
+    assert runs["closed"] >= 2
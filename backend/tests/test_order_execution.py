@@ -0,0 +1,239 @@
+"""
+Tests for the order execution pipeline: hedge legs go first and in
+parallel, partial hedge fills cap the legs they protect, an unfilled hedge
+aborts the rest (so does a hedge whose status is lost), stale orders are cancelled at the fill timeout (a fill
+that lands before the cancel is still booked), postbacks wake the fill
+tracker and replay orders are not tracked.
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import market_replay
+from services.broker_integration import BaseBroker, OrderRequest, OrderResponse
+from services.order_execution import (
+    ExecutionMetrics, LegOrder, OrderState, notify_order_update, parse_order_status,
+)
+
+
+def dhan(status: str, filled: int = 0, price: float = 0.0):
+    return {"orderStatus": status, "filledQty": filled, "averageTradedPrice": price}
+
+
+class FakeBroker(BaseBroker):
+    """Broker whose order status follows a script per symbol"""
+    BROKER_NAME = "fake"
+
+    def __init__(self, scripts):
+        super().__init__()
+        self.scripts = scripts
+        self.orders = {}
+        self.placed = []
+        self.cancelled = []
+        self.status_calls = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    async def place_order(self, order: OrderRequest) -> OrderResponse:
+        self.placed.append((order.symbol, order.quantity))
+        order_id = f"OID{len(self.placed)}"
+        self.orders[order_id] = list(self.scripts[order.symbol])
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        await asyncio.sleep(0.02)
+        self.in_flight -= 1
+        return OrderResponse(success=True, order_id=order_id, broker="fake")
+
+    async def get_order_status(self, order_id: str):
+        self.status_calls += 1
+        script = self.orders[order_id]
+        return script.pop(0) if len(script) > 1 else script[0]
+
+    async def cancel_order(self, order_id: str) -> OrderResponse:
+        self.cancelled.append(order_id)
+        return OrderResponse(success=True, order_id=order_id)
+
+
+def leg(name: str, side: str, quantity: int = 65) -> LegOrder:
+    return LegOrder(name, OrderRequest(symbol=name, exchange="NFO", transaction_type=side, quantity=quantity))
+
+
+def test_hedges_fill_first_in_parallel_and_partial_fills_cap_shorts():
+    async def scenario():
+        broker = FakeBroker({
+            "long_call": [dhan("PENDING"), dhan("TRADED", 65, 12.5)],
+            "long_put": [dhan("PART_TRADED", 40, 10.0), dhan("CANCELLED", 50, 10.2)],
+            "short_call": [dhan("TRADED", 50, 41.0)],
+            "short_put": [dhan("TRADED", 50, 38.0)],
+        })
+        metrics = ExecutionMetrics()
+        report = await broker.place_legs(
+            [leg("short_call", "SELL"), leg("long_call", "BUY"), leg("short_put", "SELL"), leg("long_put", "BUY")],
+            poll_interval=0.01, metrics=metrics,
+        )
+
+        assert {symbol for symbol, _ in broker.placed[:2]} == {"long_call", "long_put"}
+        assert broker.placed[2:] == [("short_call", 50), ("short_put", 50)]
+        assert broker.peak_in_flight == 2
+        assert report.success and report.leg_skew_ms is not None
+        assert report.legs["long_put"].state == OrderState.PARTIAL
+        assert report.legs["long_put"].executed_qty == 50
+        assert report.result("short_call")["price"] == 41.0
+        assert report.result("long_call")["filled_quantity"] == 65
+
+        status = metrics.get_status()["fake"]
+        assert status["executions"] == 1
+        assert status["orders"] == {"filled": 3, "partial": 1}
+        assert status["fill_ms"]["p50"] is not None
+
+    asyncio.run(scenario())
+
+
+def test_unfilled_hedge_aborts_and_open_orders_are_cancelled_at_timeout():
+    async def scenario():
+        broker = FakeBroker({
+            "long_call": [dhan("REJECTED")],
+            "short_call": [dhan("TRADED", 65, 41.0)],
+            "call": [dhan("PENDING", 20, 40.0)],
+            "put": [dhan("TRADED", 65, 35.0)],
+        })
+        report = await broker.place_legs(
+            [leg("long_call", "BUY"), leg("short_call", "SELL")],
+            poll_interval=0.01, metrics=ExecutionMetrics(),
+        )
+        assert report.aborted == "long_call not filled" and not report.success
+        assert report.legs["short_call"].state == OrderState.SKIPPED
+        assert [symbol for symbol, _ in broker.placed] == ["long_call"]
+        assert not report.result("short_call")["success"]
+
+        report = await broker.place_legs(
+            [leg("call", "SELL"), leg("put", "SELL")],
+            poll_interval=0.01, fill_timeout=0.1, metrics=ExecutionMetrics(),
+        )
+        call = report.legs["call"]
+        assert call.state == OrderState.PARTIAL and call.executed_qty == 20
+        assert "cancelled" in call.message
+        assert broker.cancelled == [call.order_id]
+        assert report.legs["put"].state == OrderState.FILLED
+
+    asyncio.run(scenario())
+
+
+def test_postback_wakes_tracker_and_replay_orders_are_untracked():
+    async def scenario():
+        broker = FakeBroker({"short_put": [dhan("TRANSIT"), dhan("TRADED", 65, 38.0)]})
+
+        async def postback():
+            await asyncio.sleep(0.05)
+            assert notify_order_update("OID1")
+
+        started = time.monotonic()
+        task = asyncio.create_task(postback())
+        report = await broker.place_legs([leg("short_put", "SELL")], poll_interval=5, metrics=ExecutionMetrics())
+        await task
+        assert report.legs["short_put"].state == OrderState.FILLED
+        assert time.monotonic() - started < 1 and broker.status_calls == 2
+        assert not notify_order_update("OID1")
+
+        market_replay.set_active_clock(market_replay.VirtualClock(market_replay.ist_now()))
+        try:
+            report = await broker.place_legs([leg("short_put", "SELL")], metrics=ExecutionMetrics())
+        finally:
+            market_replay.set_active_clock(None)
+        assert report.legs["short_put"].state == OrderState.UNTRACKED and report.success
+        assert broker.status_calls == 2
+
+        upstox = parse_order_status({"status": "success", "data": {
+            "status": "complete", "filled_quantity": 65, "average_price": 41.5,
+        }})
+        assert upstox.state == OrderState.FILLED and upstox.avg_price == 41.5
+        assert parse_order_status({"status": "error", "message": "Not configured"}) is None
+
+    asyncio.run(scenario())
+
+
+def test_fill_between_last_poll_and_cancel_is_booked():
+    class FillsAtCancel(FakeBroker):
+        """The order fills while the cancel is on its way"""
+
+        async def cancel_order(self, order_id: str) -> OrderResponse:
+            self.orders[order_id] = [dhan("TRADED", 65, 12.0)]
+            return await super().cancel_order(order_id)
+
+    async def scenario():
+        broker = FillsAtCancel({
+            "long_call": [dhan("PENDING")],
+            "short_call": [dhan("TRADED", 65, 41.0)],
+        })
+        report = await broker.place_legs(
+            [leg("long_call", "BUY"), leg("short_call", "SELL")],
+            poll_interval=0.01, fill_timeout=0.1, metrics=ExecutionMetrics(),
+        )
+        hedge = report.legs["long_call"]
+        assert hedge.state == OrderState.FILLED and hedge.executed_qty == 65 and hedge.avg_price == 12.0
+        assert broker.cancelled == [hedge.order_id] and report.aborted is None
+        assert broker.placed == [("long_call", 65), ("short_call", 65)] and report.success
+
+    asyncio.run(scenario())
+
+
+def test_hedge_with_lost_status_aborts_the_shorts():
+    class StatusDown(FakeBroker):
+        """The status API fails for the hedge order"""
+
+        async def get_order_status(self, order_id: str):
+            if order_id == "OID1":
+                raise ConnectionError("status API down")
+            return await super().get_order_status(order_id)
+
+    async def scenario():
+        broker = StatusDown({"long_put": [dhan("TRADED", 65, 9.0)], "short_put": [dhan("TRADED", 65, 38.0)]})
+        report = await broker.place_legs(
+            [leg("long_put", "BUY"), leg("short_put", "SELL")],
+            poll_interval=0.01, metrics=ExecutionMetrics(),
+        )
+        hedge = report.legs["long_put"]
+        assert hedge.state == OrderState.UNKNOWN and not hedge.ok and hedge.executed_qty == 0
+        assert "reconcile" in hedge.message and report.aborted == "long_put not filled"
+        assert report.legs["short_put"].state == OrderState.SKIPPED and not report.success
+        assert broker.placed == [("long_put", 65)]
+
+    asyncio.run(scenario())
+
+
+def test_uneven_condor_fills_are_squared_off_to_the_booked_quantity():
+    from services.ai_delta_strangle_bot import AIDeltaStrangleBot
+    from services.order_execution import ExecutionReport, LegFill
+
+    async def scenario():
+        bot = AIDeltaStrangleBot(broker_service=None, access_token="token")
+        placed = []
+
+        async def execute(legs):
+            placed.extend((o.name, o.request.transaction_type, o.request.quantity) for o in legs)
+            return ExecutionReport()
+        bot._execute_legs = execute
+
+        specs = [
+            ("long_call", 25500, "CE", 65, "BUY", 5.0, "2026-10-20", "", ""),
+            ("long_put", 24500, "PE", 65, "BUY", 5.0, "2026-10-20", "", ""),
+            ("short_call", 25300, "CE", 65, "SELL", 40.0, "2026-10-20", "", ""),
+            ("short_put", 24700, "PE", 65, "SELL", 38.0, "2026-10-20", "", ""),
+        ]
+        fills = {"long_call": 65, "long_put": 40, "short_call": 40, "short_put": 40}
+        report = ExecutionReport(legs={
+            name: LegFill(name, side, 65, OrderState.FILLED if fills[name] == 65 else OrderState.PARTIAL, filled_qty=fills[name])
+            for name, _, _, _, side, *_ in specs
+        })
+        quantity = min(fill.executed_qty for fill in report.legs.values())
+        assert quantity == 40
+        assert await bot._trim_to_quantity(report, specs, quantity) is not None
+        assert placed == [("trim_long_call", "SELL", 25)]
+
+        placed.clear()
+        assert await bot._trim_to_quantity(report, specs, 65) is None and placed == []
+
+    asyncio.run(scenario())
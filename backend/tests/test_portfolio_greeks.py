@@ -0,0 +1,106 @@
+"""
+Tests for vectorized portfolio Greeks and the hedge planner: book totals
+match per-leg closed forms, the engines' deltas are unchanged, and the
+planner picks rolls / wings / bought options that bring delta to target.
+"""
+import math
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from services.algo_trading_engine import AlgoTradingEngine, Position
+from services.delta_neutral_strategy import DeltaNeutralStrategy
+from services.portfolio_greeks import BookLeg, OptionBook, bs_greeks, plan_hedges, strike_for_delta
+
+
+def scalar_delta(spot, strike, t, vol, option_type, rate=0.07):
+    d1 = (math.log(spot / strike) + (rate + 0.5 * vol ** 2) * t) / (vol * math.sqrt(t))
+    cdf = (1.0 + math.erf(d1 / math.sqrt(2.0))) / 2.0
+    return cdf if option_type == "CE" else cdf - 1.0
+
+
+def strangle(call_strike=25300, put_strike=24700, qty=-65):
+    return OptionBook([
+        BookLeg(call_strike, "CE", qty, expiry_years=0.02, iv=0.14),
+        BookLeg(put_strike, "PE", qty, expiry_years=0.02, iv=0.15),
+    ])
+
+
+def test_book_greeks_match_closed_forms():
+    strikes = np.array([24800.0, 25000.0, 25200.0])
+    calls = bs_greeks(25000, strikes, 0.05, 0.16, True)
+    puts = bs_greeks(25000, strikes, 0.05, 0.16, False)
+    assert np.allclose(calls["delta"] - puts["delta"], 1.0)
+    assert np.allclose(calls["gamma"], puts["gamma"]) and np.allclose(calls["vega"], puts["vega"])
+    # Put-call parity
+    assert np.allclose(calls["price"] - puts["price"], 25000 - strikes * np.exp(-0.07 * 0.05))
+    assert (calls["theta"] < 0).all() and calls["delta"][0] > calls["delta"][2]
+
+    expired = bs_greeks(25000, [24900, 25100], 0.0, 0.16, [True, False])
+    assert list(expired["delta"]) == [1.0, -1.0] and list(expired["price"]) == [100.0, 100.0]
+    assert not expired["gamma"].any()
+
+    book = strangle()
+    greeks = book.greeks(25100)
+    legs = bs_greeks(25100, book.strike, book.expiry_years, book.iv, book.is_call)
+    assert math.isclose(greeks.delta, float((legs["delta"] * -65).sum()))
+    assert greeks.theta > 0 and greeks.gamma < 0 and greeks.vega < 0
+    assert OptionBook().greeks(25000).delta == 0.0
+
+    engine = AlgoTradingEngine(broker_service=None, access_token="")
+    positions = [
+        Position("NIFTY25300CE", "1", -2, 40, 40, 0, option_type="CE", strike=25300),
+        Position("NIFTY24700PE", "2", -2, 38, 38, 0, option_type="PE", strike=24700),
+        Position("NIFTYFUT", "3", 25, 25000, 25000, 0),
+    ]
+    expected = sum(
+        scalar_delta(25100, p.strike, 0.02, 0.15, p.option_type) * p.quantity * engine.config.lot_size
+        for p in positions[:2]
+    ) + 25
+    assert math.isclose(engine.calculate_portfolio_delta(positions, 25100), expected)
+    assert math.isclose(engine.calculate_option_delta(25100, 25300, 0.02, 0.15), scalar_delta(25100, 25300, 0.02, 0.15, "CE"))
+
+
+def test_strike_for_delta_matches_strategy_search():
+    strikes = np.arange(25000, 30001, 50)
+    strike = strike_for_delta(25000, 0.175, strikes, 0.02, 0.15, "CE")
+    deltas = [scalar_delta(25000, k, 0.02, 0.15, "CE") for k in strikes]
+    assert strike == strikes[int(np.argmin([abs(d - 0.175) for d in deltas]))]
+
+    strategy = DeltaNeutralStrategy()
+    expiry = datetime.now() + timedelta(days=7)
+    ce = strategy.find_strike_for_delta(25000, 17.5, expiry, 0.15, "CE")
+    pe = strategy.find_strike_for_delta(25000, 17.5, expiry, 0.15, "PE")
+    assert 25000 < ce < 26000 and 24000 < pe < 25000 and ce % 50 == 0 and pe % 50 == 0
+    assert math.isclose(strategy.calculate_black_scholes_delta(25000, ce, 7 / 365.25, 0.15), scalar_delta(25000, ce, 7 / 365.25, 0.15, "CE"))
+
+
+def test_hedge_planner_scores_the_grid():
+    book = strangle()
+    spot = 25250  # rally: the short call is breached
+    before = book.greeks(spot).delta
+    strikes = range(24400, 26101, 50)
+
+    rolls = plan_hedges(book, spot, strikes, actions=("roll_call",), gamma_weight=0.0, top=40)
+    assert len(rolls) == len([k for k in strikes if k > spot and k != 25300])
+    best = rolls[0]
+    assert best.replaces == 0 and best.quantity == -65 and best.strike > 25300
+    assert abs(best.delta) < abs(before) and all(abs(best.delta) <= abs(p.delta) for p in rolls)
+    assert best.cost > 0  # buying back the breached call costs more than the new one brings in
+
+    wings = plan_hedges(book, spot, strikes, actions=("add_call_wing", "add_put_wing"), top=100)
+    assert all(p.quantity == 65 for p in wings)
+    assert all(p.strike > 25300 for p in wings if p.option_type == "CE")
+    assert all(p.strike < 24700 for p in wings if p.option_type == "PE")
+
+    bought = plan_hedges(book, spot, strikes, actions=("buy_call",), sizes=[65, 130, 195], top=3)
+    assert all(p.option_type == "CE" and p.replaces is None for p in bought)
+    assert abs(bought[0].delta) < abs(before)
+    assert [p.score for p in bought] == sorted(p.score for p in bought)
+
+    assert plan_hedges(OptionBook(), spot, strikes, actions=("roll_call",)) == []
+    assert plan_hedges(book, spot, [], actions=("buy_put",)) == []
@@ -0,0 +1,104 @@
+"""
+Tests for the shared upstream rate limiter: pacing, priority lanes,
+cancellation, queue-wait metrics and per-account buckets.
+"""
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import rate_limiter
+from services.rate_limiter import Priority, RateLimiter, TokenBucket, account_key
+
+
+def test_burst_then_paced_at_rate():
+    async def scenario():
+        bucket = TokenBucket("test", rate=50.0, burst=2)
+        started = time.monotonic()
+        waits = [await bucket.acquire() for _ in range(5)]
+        return time.monotonic() - started, waits
+
+    elapsed, waits = asyncio.run(scenario())
+    assert waits[:2] == [pytest.approx(0, abs=0.005)] * 2
+    assert elapsed >= 3 / 50 * 0.9
+
+
+def test_higher_priority_lane_goes_first():
+    order = []
+
+    async def scenario():
+        bucket = TokenBucket("test", rate=20.0, burst=1)
+        await bucket.acquire()  # drain the burst so everyone queues
+
+        async def request(label, priority):
+            await bucket.acquire(priority)
+            order.append(label)
+
+        low = [asyncio.create_task(request(f"low{i}", Priority.LOW)) for i in range(3)]
+        await asyncio.sleep(0)
+        critical = asyncio.create_task(request("order", Priority.CRITICAL))
+        await asyncio.gather(*low, critical)
+        return bucket.get_status()
+
+    status = asyncio.run(scenario())
+    assert order == ["order", "low0", "low1", "low2"]
+    assert status["lanes"]["low"]["acquired"] == 3
+    assert status["lanes"]["low"]["max_wait_ms"] > status["lanes"]["critical"]["max_wait_ms"]
+    assert sum(status["queued"].values()) == 0
+
+
+def test_cancelled_waiter_leaves_queue_and_defaults():
+    async def scenario():
+        limiter = RateLimiter({"dhan.orders": (0.5, 1), "dhan.data": (10.0, 1)})
+        await limiter.acquire("dhan.orders")
+        waiter = asyncio.create_task(limiter.acquire("dhan.orders"))
+        await asyncio.sleep(0.01)
+        assert limiter.get_status()["dhan.orders"]["queued"]["critical"] == 1  # orders default lane
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert limiter.get_status()["dhan.orders"]["queued"]["critical"] == 0
+
+        await limiter.acquire("dhan.data")
+        assert limiter.get_status()["dhan.data"]["lanes"]["high"]["acquired"] == 1
+        with pytest.raises(KeyError):
+            await limiter.acquire("unknown.api")
+
+    asyncio.run(scenario())
+
+
+def test_accounts_do_not_throttle_each_other(monkeypatch):
+    monkeypatch.setenv("DHAN_ACCESS_TOKEN", "app-feed-token")
+    assert account_key("app-feed-token") is None and account_key("") is None
+    alice, bob = account_key("token-alice"), account_key("token-bob")
+    assert alice != bob and "token" not in alice
+
+    async def scenario():
+        limiter = RateLimiter({"dhan.orders": (1.0, 1)})
+        await limiter.acquire("dhan.orders", account=alice)
+        started = time.monotonic()
+        await asyncio.gather(
+            limiter.acquire("dhan.orders", account=bob),
+            limiter.acquire("dhan.orders"),
+        )
+        assert time.monotonic() - started < 0.05  # bob and the global bucket still had their token
+
+        waiter = asyncio.create_task(limiter.acquire("dhan.orders", account=alice))
+        await asyncio.sleep(0.01)
+        status = limiter.get_status()
+        assert status[f"dhan.orders@{alice}"]["queued"]["critical"] == 1
+        assert status[f"dhan.orders@{bob}"]["queued"]["critical"] == 0
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        monkeypatch.setattr(rate_limiter, "ACCOUNT_BUCKET_IDLE_SECONDS", 0.0)
+        await asyncio.sleep(0.01)
+        limiter.bucket("dhan.orders", account_key("token-carol"))
+        assert set(limiter.get_status()) == {"dhan.orders", f"dhan.orders@{account_key('token-carol')}"}
+
+    asyncio.run(scenario())
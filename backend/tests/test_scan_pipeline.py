@@ -0,0 +1,124 @@
+"""
+Tests for the delta strangle bot's scan pipeline: rule-based exits never
+wait for the LLM, background advice is applied on a later scan only while
+the snapshot it was asked on still matches, and replays await it inline.
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import market_replay
+from services.ai_delta_strangle_bot import (
+    AIDeltaStrangleBot, OptionGreeks, OptionLeg, PositionStatus, StranglePosition,
+)
+
+
+def chain(spot: float, call_price: float = 40.0, put_price: float = 38.0):
+    return {
+        "underlying_price": spot,
+        "expiry": "2026-10-20",
+        "strikes": [25000.0, 25300.0, 24700.0],
+        "calls": {25300.0: {"price": call_price, "delta": 20, "iv": 13.0}},
+        "puts": {24700.0: {"price": put_price, "delta": -20, "iv": 13.0}},
+    }
+
+
+class PipelineBot(AIDeltaStrangleBot):
+    """Delta strangle bot with a scripted chain, a slow LLM and no broker"""
+
+    def __init__(self, llm_delay: float, action: str = "CLOSE_POSITION"):
+        super().__init__(broker_service=None, access_token="token")
+        self.claude_api_key = "test-key"
+        self.llm_delay = llm_delay
+        self.action = action
+        self.chain = chain(25000)
+        self.llm_calls = 0
+        self.closed = []
+        self.position = StranglePosition(
+            call_leg=OptionLeg("CE", 25300.0, 40.0, 40.0, 65, OptionGreeks(delta=20)),
+            put_leg=OptionLeg("PE", 24700.0, 38.0, 38.0, 65, OptionGreeks(delta=-20)),
+            status=PositionStatus.OPEN,
+            entry_credit=78.0 * 65,
+        )
+
+    async def fetch_option_chain(self, expiry=None):
+        return self.chain
+
+    async def get_claude_decision(self, option_chain, position=None):
+        self.llm_calls += 1
+        await asyncio.sleep(self.llm_delay)
+        decision = {
+            "decision": {"action": self.action, "urgency": "MEDIUM", "confidence_score": 90},
+            "reasoning": {"why_this_action": "test"},
+            "ai_available": True,
+        }
+        self.last_ai_decision = decision
+        return decision
+
+    async def close_position(self):
+        self.closed.append(self.position.total_pnl)
+        self.position = StranglePosition()
+        return {"success": True}
+
+
+def test_stop_loss_does_not_wait_for_a_slow_llm():
+    async def scenario():
+        bot = PipelineBot(llm_delay=5.0)
+
+        first = await bot.scan_once()
+        assert first["advisory"]["state"] == "pending" and first["action_taken"] is None
+        await asyncio.sleep(0)
+        assert bot.llm_calls == 1
+
+        # Premiums blow out past 2x credit while the LLM is still thinking
+        bot.chain = chain(25400, call_price=250.0, put_price=30.0)
+        started = time.perf_counter()
+        result = await bot.scan_once()
+        assert time.perf_counter() - started < 0.5
+        assert result["action_taken"]["reason"] == "stop_loss" and len(bot.closed) == 1
+        assert result["advisory"]["risk_path_ms"] < 50
+        assert bot.pipeline_stats["scans"] == 2 and bot.llm_calls == 1
+
+        await bot.stop(close_positions=False)
+        assert bot._advice_task is None
+
+    asyncio.run(scenario())
+
+
+def test_advice_applied_only_while_snapshot_still_matches():
+    async def scenario():
+        bot = PipelineBot(llm_delay=0.01)
+        await bot.scan_once()
+        await asyncio.sleep(0.05)
+
+        # Spot moved out of the bucket the advice was asked on: not applied
+        bot.chain = chain(25100)
+        result = await bot.scan_once()
+        assert result["advisory"]["state"] == "stale" and result["action_taken"] is None
+        assert bot.pipeline_stats["advice_stale"] == 1 and not bot.closed
+        await asyncio.sleep(0.05)
+
+        # Same snapshot state as the new request: applied
+        result = await bot.scan_once()
+        assert result["advisory"]["state"] == "applied"
+        assert result["action_taken"]["reason"] == "ai_recommendation" and len(bot.closed) == 1
+        assert bot.get_status()["pipeline"]["advice_applied"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_replay_awaits_advice_inline():
+    async def scenario():
+        bot = PipelineBot(llm_delay=0.01)
+        market_replay.set_active_clock(market_replay.VirtualClock(market_replay.ist_now()))
+        try:
+            result = await bot.scan_once()
+        finally:
+            market_replay.set_active_clock(None)
+        assert result["advisory"]["state"] == "applied" and len(bot.closed) == 1
+        assert bot._advice_task is None and bot.llm_calls == 1
+
+    asyncio.run(scenario())
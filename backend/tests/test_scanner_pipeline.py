@@ -0,0 +1,102 @@
+"""
+Tests for the scanner pipeline: one computation per refresh, versioned
+pre-serialized results, ETag / 304 handling, and failures keeping the last
+published result.
+"""
+import asyncio
+import os
+import sys
+
+import numpy as np
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.scanner_pipeline import ScannerPipeline, etag_matches, serialize
+
+
+def _pipeline_app():
+    pipeline = ScannerPipeline(max_age=300)
+    router = APIRouter()
+    calls = {"gainers": 0, "flaky": 0}
+
+    @pipeline.scanner(router, "/scanners/gainers", "/scanners/day-gainers", name="day-gainers")
+    async def get_day_gainers():
+        """Day gainers"""
+        calls["gainers"] += 1
+        await asyncio.sleep(0.01)
+        return [{"symbol": "RELIANCE", "score": np.int64(80), "change_pct": np.float64(2.5)}]
+
+    @pipeline.scanner(router, "/scanners/flaky")
+    async def get_flaky():
+        calls["flaky"] += 1
+        if calls["flaky"] > 1:
+            raise RuntimeError("provider down")
+        return {"ok": True}
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    return pipeline, app, calls
+
+
+def test_serves_precomputed_bytes_with_etag():
+    pipeline, app, calls = _pipeline_app()
+    assert pipeline.names == ["day-gainers", "flaky"]
+
+    with TestClient(app) as client:
+        first = client.get("/api/scanners/day-gainers")
+        assert first.status_code == 200
+        assert first.json() == [{"symbol": "RELIANCE", "score": 80, "change_pct": 2.5}]
+        etag = first.headers["etag"]
+
+        # Alias path shares the same result; matching ETag gets a 304
+        assert client.get("/api/scanners/gainers").headers["etag"] == etag
+        cached = client.get("/api/scanners/day-gainers", headers={"If-None-Match": etag})
+        assert cached.status_code == 304 and cached.content == b""
+        assert calls["gainers"] == 1
+
+
+def test_run_all_once_per_refresh_and_keeps_last_good_result():
+    pipeline, _, calls = _pipeline_app()
+
+    async def scenario():
+        await pipeline.run_all(version=7)
+        first = pipeline.get("flaky")
+        await asyncio.gather(*[pipeline.result("day-gainers") for _ in range(5)])
+        assert calls["gainers"] == 1
+
+        await pipeline.run_all(version=8)
+        assert pipeline.get("day-gainers").version == 8
+        # Failed scanner keeps serving v7 and reports the error
+        assert pipeline.get("flaky") is first and first.version == 7
+        assert pipeline.get_status()["scanners"]["flaky"]["error"] == "provider down"
+
+    asyncio.run(scenario())
+    assert calls == {"gainers": 2, "flaky": 2}
+
+
+def test_frames_published_during_a_run_collapse():
+    pipeline, _, calls = _pipeline_app()
+
+    class Frame:
+        def __init__(self, version):
+            self.version = version
+
+    async def scenario():
+        pipeline.on_frame(Frame(1))
+        await asyncio.sleep(0)  # v1 run starts
+        pipeline.on_frame(Frame(2))
+        pipeline.on_frame(Frame(3))
+        await pipeline._task
+        return pipeline.version
+
+    assert asyncio.run(scenario()) == 3
+    assert calls["gainers"] == 2  # v1, then one run for v2+v3
+
+
+def test_etag_matching_and_serialization():
+    assert etag_matches('W/"abc", "def"', '"abc"')
+    assert etag_matches("*", '"x"')
+    assert not etag_matches(None, '"x"')
+    assert serialize({"a": np.array([1, 2]), "b": "₹"}) == '{"a":[1,2],"b":"₹"}'.encode()
@@ -0,0 +1,102 @@
+"""
+Parity tests for the vectorized scanner scoring: every score and breakdown
+must match the per-stock ScannerService reference methods exactly.
+"""
+import asyncio
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import scanner_scoring as scoring
+from services.market_frame import MarketFrame
+from services.scanner_service import ScannerService
+
+
+def _random_stocks(n=400, seed=7):
+    rng = np.random.default_rng(seed)
+    stocks = []
+    for i in range(n):
+        ltp = float(rng.choice([0.0, *rng.uniform(50, 3000, 9)]))
+        def near(scale=0.05):
+            # Some fields missing / zero to exercise the fallbacks
+            return 0.0 if rng.random() < 0.1 else round(ltp * (1 + rng.normal(0, scale)), 2)
+        stock = {
+            "symbol": f"S{i}",
+            "ltp": ltp,
+            "change_percent": round(float(rng.normal(0, 2.5)), 2),
+            "volume": int(rng.integers(0, 2_000_000)),
+            "avg_volume": int(rng.choice([0, *rng.integers(1, 1_000_000, 5)])),
+            "volume_ratio": round(float(rng.uniform(0, 4)), 2),
+            "open": near(), "high": near(0.02), "low": near(0.02), "prev_close": near(0.03),
+            "vwap": near(0.01), "ema8": near(0.02), "ema20": near(0.03), "ema21": near(0.03),
+            "ema50": near(0.05), "ema55": near(0.05), "ema200": near(0.1),
+            "support": near(0.03), "mfi": float(rng.choice([0.0, 0.0, *rng.uniform(0, 100, 2)])),
+            "rsi": round(float(rng.uniform(10, 90)), 2), "adx": round(float(rng.uniform(5, 50)), 2),
+        }
+        for key in ("vwap", "support", "avg_volume", "volume_ratio"):
+            if rng.random() < 0.1:
+                del stock[key]
+        stocks.append(stock)
+    return stocks
+
+
+def test_scores_match_per_stock_reference():
+    service = ScannerService()
+    stocks = _random_stocks()
+
+    gainers = scoring.day_gainer_scores(stocks, nifty_change=0.4)
+    losers = scoring.day_loser_scores(stocks, nifty_change=0.4)
+    flows = scoring.money_flow_scores(stocks)
+    swings = {d: scoring.swing_scores(stocks, d) for d in ("bullish", "bearish", "both")}
+
+    for row, stock in enumerate(stocks):
+        score, details = service._calculate_day_gainer_score(stock, 0.4)
+        assert (score, details) == (gainers["score"][row], scoring.day_gainer_details(gainers, row))
+
+        if stock["change_percent"] < 0 and not (stock.get("support", 0) > 0 and stock["ltp"] == 0):
+            score, details, signal = service._calculate_day_loser_score(stock, 0.4)
+            assert losers["valid"][row]
+            assert (score, details) == (losers["score"][row], scoring.day_loser_details(losers, row, stock))
+            assert list(details) == list(scoring.day_loser_details(losers, row, stock))
+        else:
+            assert not losers["valid"][row]
+
+        for direction, cols in swings.items():
+            score, details, trend = service._calculate_swing_score(stock, direction)
+            assert (score, trend) == (cols["score"][row], cols["trend"][row])
+            assert details == scoring.swing_details(cols, row, stock)
+
+        assert service._analyze_money_flow(stock) == scoring.money_flow_details(flows, row)
+
+
+def test_top_k_matches_stable_sort():
+    rng = np.random.default_rng(3)
+    key = rng.integers(0, 10, 500)
+    mask = rng.random(500) < 0.7
+    expected = sorted(np.flatnonzero(mask), key=lambda i: key[i], reverse=True)
+    for k in (0, 1, 7, 50, 1000):
+        assert scoring.top_k(key, mask, k).tolist() == [int(i) for i in expected[:k]]
+
+
+def test_scans_accept_frames_and_share_timestamp():
+    service = ScannerService()
+    stocks = _random_stocks(200, seed=11)
+    frame = MarketFrame.from_records(stocks)
+
+    for scan, kwargs in (
+        (service.scan_day_gainers, {"filters": {"min_score": 40, "limit": 10}}),
+        (service.scan_day_losers, {"filters": {"min_score": 20, "mode": "short"}}),
+        (service.scan_swing, {"filters": {"min_score": 40, "direction": "both"}}),
+        (service.scan_money_flow, {"filters": {"min_confidence": 50}}),
+    ):
+        results = asyncio.run(scan(frame, **kwargs))
+        assert results and len({r["timestamp"] for r in results}) == 1
+        key = "confidence" if scan == service.scan_money_flow else "score"
+        assert [r[key] for r in results] == sorted((r[key] for r in results), reverse=True)
+
+    losers = asyncio.run(service.scan_day_losers(stocks, filters={"min_score": 0, "mode": "bounce"}))
+    assert all(r["signal"] == "BOUNCE" for r in losers)
+    assert len(asyncio.run(service.scan_day_gainers(frame, filters={"min_score": 0, "limit": 10}))) == 10
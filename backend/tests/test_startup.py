@@ -0,0 +1,112 @@
+"""
+Tests for the startup subsystem: lazy routers keep their route precedence
+and load on first request, warm-ups gate readiness in dependency order, and
+lazy imports defer until first use.
+"""
+import asyncio
+import os
+import sys
+import types
+
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.startup import LazyRouterMiddleware, LazyRouters, StartupManager, lazy_attr, lazy_import
+
+
+def _feature_module(name: str, prefix: str, body: dict) -> str:
+    router = APIRouter(prefix=prefix)
+
+    @router.get("/status")
+    async def status():
+        return body
+
+    module = types.ModuleType(name)
+    module.router = router
+    sys.modules[name] = module
+    return name
+
+
+def test_lazy_router_loads_on_first_request_in_registered_position():
+    app = FastAPI()
+    routers = LazyRouters(app, enabled=True)
+    app.add_middleware(LazyRouterMiddleware, routers=routers)
+    feature = _feature_module("fake_feature_routes", "/feature", {"source": "feature"})
+    routers.register("Feature", feature, paths=["/api/feature"], prefix="/api")
+
+    @app.get("/api/feature/status")
+    async def shadowed():
+        return {"source": "app"}
+
+    other = _feature_module("fake_other_routes", "/other", {"source": "other"})
+    routers.register("Other", other, paths=["/api/other"], prefix="/api")
+
+    with TestClient(app) as client:
+        assert not routers.get_status()["routers"]["Feature"]["loaded"]
+        # Registered before the app route, so it takes precedence once loaded
+        assert client.get("/api/feature/status").json() == {"source": "feature"}
+        assert routers.get_status()["routers"]["Feature"]["loaded"]
+        assert not routers.get_status()["routers"]["Other"]["loaded"]
+
+        assert client.get("/api/other/status").json() == {"source": "other"}
+        assert not routers.pending
+        paths = [getattr(r, "path", None) for r in app.router.routes]
+        assert paths[-3:] == ["/api/feature/status", "/api/feature/status", "/api/other/status"]
+
+
+def test_missing_router_module_is_reported_not_raised():
+    app = FastAPI()
+    routers = LazyRouters(app, enabled=True)
+    routers.register("Broken", "no_such_routes_module", paths=["/broken"])
+
+    asyncio.run(routers.preload())
+
+    status = routers.get_status()["routers"]["Broken"]
+    assert status["loaded"] and "ModuleNotFoundError" in status["error"]
+    assert not any(type(r).__name__ == "_RouteSlot" for r in app.router.routes)
+
+
+def test_warmups_run_in_dependency_order_and_gate_readiness():
+    async def scenario():
+        manager = StartupManager()
+        order = []
+        release = asyncio.Event()
+
+        async def token():
+            await release.wait()
+            order.append("token")
+
+        async def cache():
+            order.append("cache")
+
+        async def broken():
+            raise RuntimeError("firestore down")
+
+        manager.register("token", token)
+        manager.register("cache", cache, after=["token"])
+        manager.register("database", broken, required=False)
+        manager.start()
+        await asyncio.sleep(0.01)
+        assert not manager.ready and order == []
+
+        release.set()
+        assert await manager.wait_ready(timeout=1)
+        status = manager.get_status()
+        assert order == ["token", "cache"]
+        assert status["warmups"]["database"]["status"] == "failed"
+        assert "ready" in status["timeline_s"]
+
+    asyncio.run(scenario())
+
+
+def test_lazy_import_defers_until_first_use():
+    sys.modules.pop("colorsys", None)
+    colorsys = lazy_import("colorsys")
+    hls = lazy_attr("colorsys", "rgb_to_hls")
+    assert "colorsys" not in sys.modules
+
+    assert hls(1.0, 0.0, 0.0)[0] == 0.0
+    assert colorsys.rgb_to_yiq(0.0, 0.0, 0.0) == (0.0, 0.0, 0.0)
+    assert "colorsys" in sys.modules
@@ -0,0 +1,93 @@
+"""
+Parity tests for the streaming indicators used by the VWAP bot and backtester.
+Each incremental indicator must match the full-window recomputation it replaces.
+"""
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.streaming_indicators import SessionVWAP, VWAPSeries, WilderRSI, RollingMean
+
+
+def make_candles(n=300, seed=7, zero_volume_every=0):
+    random.seed(seed)
+    price = 1500.0
+    candles = []
+    for i in range(n):
+        close = price + random.uniform(-8, 8)
+        volume = 0 if zero_volume_every and i % zero_volume_every == 0 else random.randint(100, 5000)
+        candles.append({
+            "open": price,
+            "high": max(price, close) + random.uniform(0, 4),
+            "low": min(price, close) - random.uniform(0, 4),
+            "close": close,
+            "volume": volume,
+        })
+        price = close
+    return candles
+
+
+def naive_vwap(candles, idx):
+    """Previous VWAPTradingBot._calculate_vwap_from_candles"""
+    total_tp_vol = 0
+    total_vol = 0
+    for c in candles[:idx + 1]:
+        volume = c["volume"] if c["volume"] > 0 else 1
+        total_tp_vol += (c["high"] + c["low"] + c["close"]) / 3 * volume
+        total_vol += volume
+    return total_tp_vol / total_vol
+
+
+def test_session_vwap_matches_cumulative_recompute():
+    candles = make_candles(zero_volume_every=9)
+    vwap = SessionVWAP(min_volume=1)
+    for idx, candle in enumerate(candles):
+        assert vwap.update_candle(candle) == pytest.approx(naive_vwap(candles, idx), rel=1e-12)
+
+
+def test_session_vwap_resets_and_falls_back_to_twap():
+    vwap = SessionVWAP()
+    vwap.update(110, 90, 100, 1000, session="2025-01-01")
+    # New session without volume -> TWAP of typical price
+    assert vwap.update(12, 6, 9, 0, session="2025-01-02") == pytest.approx(9)
+    assert vwap.update(15, 9, 12, 0, session="2025-01-02") == pytest.approx(10.5)
+
+
+def test_vwap_series_only_consumes_new_candles():
+    candles = make_candles(60)
+    series = VWAPSeries()
+    series.extend(candles[:30], session="d1")
+    series.extend(candles[:45], session="d1")
+    assert len(series.values) == 45
+    assert series.at(44) == pytest.approx(naive_vwap(candles, 44), rel=1e-12)
+    series.extend(candles[:5], session="d2")
+    assert len(series.values) == 5
+
+
+def test_wilder_rsi_matches_reference():
+    closes = [c["close"] for c in make_candles(200)]
+    period = 14
+    rsi = WilderRSI(period)
+    values = [rsi.update(c) for c in closes]
+
+    deltas = [b - a for a, b in zip(closes, closes[1:])]
+    avg_gain = sum(max(d, 0) for d in deltas[:period]) / period
+    avg_loss = sum(max(-d, 0) for d in deltas[:period]) / period
+    for i, d in enumerate(deltas[period:], start=period + 1):
+        avg_gain = (avg_gain * (period - 1) + max(d, 0)) / period
+        avg_loss = (avg_loss * (period - 1) + max(-d, 0)) / period
+        assert values[i] == pytest.approx(100 - 100 / (1 + avg_gain / avg_loss), rel=1e-9)
+    assert values[period - 1] == 50.0
+
+
+def test_rolling_mean_volume_ratio_matches_window_mean():
+    volumes = [c["volume"] for c in make_candles(120)]
+    window = RollingMean(20)
+    for idx, volume in enumerate(volumes):
+        expected = 1.0 if idx < 20 else volume / (sum(volumes[idx - 20:idx]) / 20)
+        assert window.ratio(volume) == pytest.approx(expected, rel=1e-9)
+        window.update(volume)